@@ -0,0 +1,34 @@
+"""Add prefix search indexes
+
+Revision ID: 79bade7c4df8
+Revises: ec288bbcdefb
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '79bade7c4df8'
+down_revision: Union[str, None] = 'ec288bbcdefb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Классы операторов *_pattern_ops позволяют btree-индексу обслуживать LIKE 'префикс%'
+    # при любых правилах сортировки базы данных (обычный индекс подходит только для локали C).
+    op.create_index('ix_postal_codes_post_code_prefix', 'postal_codes', ['post_code'],
+                    postgresql_ops={'post_code': 'varchar_pattern_ops'})
+    op.create_index('ix_postal_codes_place_name_prefix', 'postal_codes',
+                    [sa.text('lower(place_name) varchar_pattern_ops')])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_postal_codes_place_name_prefix', table_name='postal_codes')
+    op.drop_index('ix_postal_codes_post_code_prefix', table_name='postal_codes')
@@ -0,0 +1,44 @@
+"""Add place name trigram index
+
+Revision ID: a6da58a7b162
+Revises: 79bade7c4df8
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6da58a7b162'
+down_revision: Union[str, None] = '79bade7c4df8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Транслитерация в латиницу (та же таблица, что utils.trigram_index.TRANSLITERATION): нечеткий поиск
+    # сравнивает "Moskva", "Москва" и "Масква" в одном алфавите. Заглавные буквы кириллицы переводятся
+    # в строчные явно, чтобы результат не зависел от локали базы данных. Функция IMMUTABLE - по ней строится индекс.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION postal_translit(value text) RETURNS text
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+            SELECT translate(
+                replace(replace(replace(replace(replace(replace(replace(replace(
+                    lower(translate(value, 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ', 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя')),
+                    'щ', 'shch'), 'ж', 'zh'), 'х', 'kh'), 'ц', 'ts'), 'ч', 'ch'), 'ш', 'sh'), 'ю', 'yu'), 'я', 'ya'),
+                'абвгдеёзийклмнопрстуфыэъь', 'abvgdeeziyklmnoprstufye')
+        $$
+    """)
+    op.execute('CREATE INDEX ix_postal_codes_place_name_trgm ON postal_codes '
+               'USING gin (postal_translit(place_name) gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Расширение pg_trgm не удаляется: им могут пользоваться другие объекты базы данных.
+    op.execute('DROP INDEX IF EXISTS ix_postal_codes_place_name_trgm')
+    op.execute('DROP FUNCTION IF EXISTS postal_translit(text)')
@@ -0,0 +1,51 @@
+"""Create base tables
+
+Revision ID: ec288bbcdefb
+Revises: e64bf71cb144
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ec288bbcdefb'
+down_revision: Union[str, None] = 'e64bf71cb144'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Начальная миграция e64bf71cb144 таблиц не создает: их создавали Psycopg2Models.create_tables /
+    # create_tables(engine), поэтому в базе, помеченной e64bf71cb144, таблиц может и не быть.
+    # Здесь они создаются только при отсутствии.
+    op.create_table(
+        'postal_codes',
+        sa.Column('post_code', sa.String(length=10), nullable=False),
+        sa.Column('country', sa.String(length=60), nullable=False),
+        sa.Column('country_abbreviation', sa.String(length=10), nullable=False),
+        sa.Column('place_name', sa.String(length=100), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('state', sa.String(length=100), nullable=False),
+        sa.Column('state_abbreviation', sa.String(length=10), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('post_code'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'postal_codes_requests_statistics',
+        sa.Column('post_code', sa.String(length=10), nullable=False),
+        sa.Column('request_count', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('post_code'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Таблицы могли существовать и до этой миграции; их удаляет downgrade начальной миграции e64bf71cb144.
+    pass
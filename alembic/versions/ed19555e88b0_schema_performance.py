@@ -0,0 +1,56 @@
+"""Schema performance: secondary indexes and HOT-friendly statistics table
+
+Revision ID: ed19555e88b0
+Revises: a6da58a7b162
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ed19555e88b0'
+down_revision: Union[str, None] = 'a6da58a7b162'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Параметры хранения таблицы статистики - копия `__table_args__["info"]["storage_parameters"]` модели
+# PostalCodeRequestStatistics (models.sqlalchemy_models, применяются обработчиком after_create). Миграция не
+# импортирует их из модели, чтобы не меняться вместе с ней; расхождение находит `python -m models.schema_check`.
+# Каждый запрос кода обновляет строку статистики; request_count не входит ни в один индекс, поэтому при свободном
+# месте на странице (fillfactor) обновление выполняется как HOT - без новых записей в индексе первичного ключа.
+# Частая очистка (autovacuum) возвращает место старых версий строк, пока таблица не разрослась.
+STATISTICS_STORAGE = {
+    'fillfactor': 70,
+    'autovacuum_vacuum_scale_factor': 0.02,
+    'autovacuum_vacuum_threshold': 1000,
+    'autovacuum_analyze_scale_factor': 0.05,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Psycopg2Models создавал столбец state как VARCHAR(255), модель SQLAlchemy - как VARCHAR(100);
+    # приводим к большему: увеличение длины varchar в PostgreSQL не перезаписывает таблицу.
+    op.alter_column('postal_codes', 'state', existing_type=sa.String(length=100), type_=sa.String(length=255),
+                    existing_nullable=False)
+    op.create_index('ix_postal_codes_state_place_name', 'postal_codes', ['state', 'place_name'])
+    op.create_index('ix_postal_codes_place_name', 'postal_codes', ['place_name'])
+    op.create_index('ix_postal_codes_coordinates', 'postal_codes', ['latitude', 'longitude'])
+    # fillfactor действует на вновь заполняемые страницы; чтобы применить его к уже заполненной таблице,
+    # ее нужно перезаписать (VACUUM FULL или pg_repack) в окно обслуживания.
+    options = ', '.join(f'{name} = {value}' for name, value in STATISTICS_STORAGE.items())
+    op.execute(f'ALTER TABLE postal_codes_requests_statistics SET ({options})')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f'ALTER TABLE postal_codes_requests_statistics RESET ({", ".join(STATISTICS_STORAGE)})')
+    op.drop_index('ix_postal_codes_coordinates', table_name='postal_codes')
+    op.drop_index('ix_postal_codes_place_name', table_name='postal_codes')
+    op.drop_index('ix_postal_codes_state_place_name', table_name='postal_codes')
+    # Столбец state остается VARCHAR(255): после upgrade в нем могут быть значения длиннее 100 символов,
+    # и сужение типа на них бы упало (или обрезало бы их).
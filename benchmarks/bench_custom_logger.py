@@ -0,0 +1,72 @@
+# benchmarks/bench_custom_logger.py
+"""Микробенчмарк стоимости одного вызова CustomLogger.log_with_context.
+
+Сравнивает прежнюю реализацию (inspect.stack() и f-строка на каждый вызов) с текущей
+для включенного уровня, отключенного уровня и прореживания. Записи уходят в обработчик,
+который ничего не пишет, поэтому измеряется стоимость самого журналирования.
+
+Запуск: python -m benchmarks.bench_custom_logger [--number 20000]
+"""
+import argparse
+import inspect
+import logging
+import timeit
+
+from utils.custom_logger import CustomLogger
+
+
+class LegacyCustomLogger:
+    """Прежняя реализация логгера - для сравнения."""
+    def __init__(self, name: str) -> None:
+        self.logger = logging.getLogger(name)
+
+    def log_with_context(self, message: str) -> None:
+        stack = inspect.stack()
+        caller_function = stack[1].function
+        self.logger.info(f"{message} (called from {caller_function})")
+
+
+class _DiscardHandler(logging.Handler):
+    """Обработчик, который форматирует запись и отбрасывает результат."""
+    def emit(self, record: logging.LogRecord) -> None:
+        self.format(record)
+
+
+def _isolated_logger(name: str, level: int) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [_DiscardHandler()]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def run(number: int) -> None:
+    postal_code = "101000"
+    legacy = LegacyCustomLogger("bench.legacy")
+    current = CustomLogger("bench.current")
+    sampled = CustomLogger("bench.sampled", sample_every=100)
+
+    def legacy_call():
+        legacy.log_with_context(f"No postal data {postal_code} found in database")
+
+    def current_call():
+        current.log_with_context("No postal data %s found in database", postal_code)
+
+    def sampled_call():
+        sampled.log_with_context("No postal data %s found in database", postal_code)
+
+    print(f"{'scenario':45} {'us/call':>10}")
+    for level, label in ((logging.INFO, "enabled"), (logging.WARNING, "disabled (INFO < WARNING)")):
+        for name in ("bench.legacy", "bench.current", "bench.sampled"):
+            _isolated_logger(name, level)
+        for scenario, func in ((f"legacy inspect.stack, {label}", legacy_call),
+                               (f"current, {label}", current_call),
+                               (f"current, sample 1/100, {label}", sampled_call)):
+            seconds = min(timeit.repeat(func, number=number, repeat=3))
+            print(f"{scenario:45} {seconds / number * 1e6:10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="calls per measurement")
+    run(parser.parse_args().number)
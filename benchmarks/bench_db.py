@@ -0,0 +1,96 @@
+# benchmarks/bench_db.py
+"""Временная база данных для бенчмарков.
+
+База создается на сервере из настроек DB_* (пользователь должен иметь право CREATE DATABASE),
+заполняется кодами `SEEDED_BASE ...` и удаляется после прогона. Локальный сервер для этого можно поднять,
+например, так: docker run --rm -e POSTGRES_PASSWORD=bench -p 55432:5432 postgres:16
+"""
+import os
+import time
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.extensions import make_dsn
+from sqlalchemy import create_engine
+
+from benchmarks.fake_api import postal_document
+from benchmarks.workload import API_ONLY_BASE, SEEDED_BASE
+from config.db_data import Data
+from models.sqlalchemy_models import create_tables
+from utils.psycopg2_pool import Psycopg2PoolRegistry
+from utils.sqlalchemy_engine import SQLAlchemyEngineRegistry
+
+
+class ThrowawayDatabase:
+    """Контекстный менеджер: создает и заполняет временную базу данных и на время блока `with`
+    направляет на нее настройки `Data.DB_NAME`, `Data.DB_DSN` и `Data.DB_URL`."""
+    def __init__(self, seed_count: int, keep: bool = False) -> None:
+        """Инициализация.
+
+        :param seed_count: Количество почтовых кодов, загружаемых в базу данных.
+        :param keep: Не удалять базу данных после прогона (для разбора результатов).
+        """
+        self.seed_count = seed_count
+        self.keep = keep
+        self.name = f"postal_bench_{os.getpid()}_{int(time.time())}"
+        self._saved: Optional[Dict[str, str]] = None
+
+    def __enter__(self) -> "ThrowawayDatabase":
+        _execute_autocommit(Data.DB_DSN, sql.SQL("CREATE DATABASE {}").format(sql.Identifier(self.name)))
+        self._saved = {attr: getattr(Data, attr) for attr in ("DB_NAME", "DB_DSN", "DB_URL")}
+        Data.DB_NAME = self.name
+        Data.DB_DSN = make_dsn(Data.DB_DSN, dbname=self.name)
+        Data.DB_URL = f"postgresql+psycopg2://{Data.DB_USER}:{Data.DB_PASS}@{Data.DB_HOST}:{Data.DB_PORT}/{self.name}"
+        engine = create_engine(Data.DB_URL)
+        try:
+            create_tables(engine)
+        finally:
+            engine.dispose()
+        self._seed()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        Psycopg2PoolRegistry.close_all()
+        SQLAlchemyEngineRegistry.dispose_all()
+        for attr, value in self._saved.items():
+            setattr(Data, attr, value)
+        if not self.keep:
+            _execute_autocommit(Data.DB_DSN, sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(self.name)))
+
+    def reset(self) -> None:
+        """Возвращает базу данных в исходное состояние между сценариями: удаляет коды, загруженные из API,
+        и статистику запросов."""
+        with psycopg2.connect(Data.DB_DSN) as connection, connection.cursor() as cursor:
+            cursor.execute("DELETE FROM postal_codes WHERE post_code >= %s", (str(API_ONLY_BASE), ))
+            cursor.execute("TRUNCATE postal_codes_requests_statistics")
+        connection.close()
+
+    def _seed(self) -> None:
+        rows = []
+        for index in range(self.seed_count):
+            document = postal_document(str(SEEDED_BASE + index))
+            place = document["places"][0]
+            rows.append((document["post code"], document["country"], document["country abbreviation"],
+                         place["place name"], float(place["longitude"]), float(place["latitude"]),
+                         place["state"], place["state abbreviation"]))
+        with psycopg2.connect(Data.DB_DSN) as connection, connection.cursor() as cursor:
+            execute_values(cursor, '''
+                INSERT INTO postal_codes
+                (post_code, country, country_abbreviation, place_name, longitude, latitude, state, state_abbreviation)
+                VALUES %s
+            ''', rows, page_size=1000)
+        connection.close()
+        _execute_autocommit(Data.DB_DSN, "ANALYZE")
+
+
+def _execute_autocommit(dsn: str, statement) -> None:
+    """Выполняет команду вне транзакции (CREATE/DROP DATABASE, ANALYZE) на отдельном соединении."""
+    connection = psycopg2.connect(dsn)
+    try:
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+    finally:
+        connection.close()
@@ -0,0 +1,67 @@
+# benchmarks/compare.py
+"""Сравнение двух прогонов `benchmarks.run_benchmarks` по сценариям.
+
+Для каждого сценария, присутствующего в обоих прогонах, выводятся пропускная способность и p99,
+а также их изменение. Код возврата 1, если пропускная способность упала или p99 вырос больше порога.
+
+Запуск: python -m benchmarks.compare baseline.json current.json [--threshold 0.1]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+
+def _relative_change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> Tuple[List[Dict[str, object]], List[str]]:
+    """Сравнивает результаты двух прогонов.
+
+    :param baseline: Документ результатов базового прогона.
+    :param current: Документ результатов текущего прогона.
+    :param threshold: Допустимое относительное ухудшение (0.1 - 10%).
+    :return: Кортеж (строки сравнения по сценариям, имена сценариев с ухудшением сверх порога).
+    """
+    before = {result["scenario"]["name"]: result for result in baseline["results"]}
+    rows, regressions = [], []
+    for result in current["results"]:
+        name = result["scenario"]["name"]
+        if name not in before:
+            continue
+        throughput_change = _relative_change(before[name]["throughput_ops"], result["throughput_ops"])
+        p99_change = _relative_change(before[name]["latency_ms"]["p99"], result["latency_ms"]["p99"])
+        rows.append({
+            "scenario": name,
+            "throughput": (before[name]["throughput_ops"], result["throughput_ops"], throughput_change),
+            "p99": (before[name]["latency_ms"]["p99"], result["latency_ms"]["p99"], p99_change),
+        })
+        if throughput_change < -threshold or p99_change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, encoding="utf-8") as file:
+        current = json.load(file)
+    rows, regressions = compare(baseline, current, args.threshold)
+    print(f"baseline {baseline['meta'].get('commit')}  ->  current {current['meta'].get('commit')}")
+    print(f"{'scenario':60} {'ops/s before':>12} {'after':>10} {'change':>8} {'p99 ms before':>14} {'after':>9} {'change':>8}")
+    for row in rows:
+        (ops_before, ops_after, ops_change), (p99_before, p99_after, p99_change) = row["throughput"], row["p99"]
+        marker = "  <-- regression" if row["scenario"] in regressions else ""
+        print(f"{row['scenario']:60} {ops_before:12.1f} {ops_after:10.1f} {ops_change:+8.1%} "
+              f"{p99_before:14.3f} {p99_after:9.3f} {p99_change:+8.1%}{marker}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
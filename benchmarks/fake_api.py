@@ -0,0 +1,129 @@
+# benchmarks/fake_api.py
+"""Локальная заглушка API Zippopotam (`GET /RU/{code}`) с настраиваемой задержкой ответа.
+
+Коды, начинающиеся с 9, считаются несуществующими (ответ 404), остальные шестизначные коды
+возвращаются в формате Zippopotam с детерминированными данными.
+
+Запуск отдельно от бенчмарков: python -m benchmarks.fake_api --port 8081 --latency 0.05
+и API_BASE_URL=http://127.0.0.1:8081 для приложения.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+def postal_document(code: str) -> dict:
+    """Ответ API для существующего почтового кода.
+        :param code: Почтовый код.
+        :return: Документ в формате Zippopotam."""
+    return {
+        "post code": code,
+        "country": "Russia",
+        "country abbreviation": "RU",
+        "places": [{
+            "place name": f"Place {code}",
+            "longitude": f"{37 + int(code) % 1000 / 1000:.4f}",
+            "latitude": f"{55 + int(code) % 997 / 1000:.4f}",
+            "state": "Benchmark Oblast",
+            "state abbreviation": "BO",
+        }],
+    }
+
+
+class FakeZippopotamServer:
+    """HTTP-сервер в фоновом потоке, имитирующий API Zippopotam.
+
+    Поддерживает keep-alive (HTTP/1.1), поэтому пул соединений `ApiClient` работает так же, как с настоящим API.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Инициализация сервера.
+
+        :param latency: Задержка каждого ответа в секундах.
+        :param jitter: Дополнительная случайная задержка от 0 до `jitter` секунд.
+        :param host: Адрес прослушивания.
+        :param port: Порт (0 - выбрать свободный).
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Базовый адрес сервера для `Data.API_BASE_URL`."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeZippopotamServer":
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Обслуживает запросы в текущем потоке до вызова `stop()` из другого потока."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        """Останавливает сервер и освобождает порт."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeZippopotamServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                with fake._lock:
+                    fake.requests += 1
+                delay = fake.latency + (random.uniform(0, fake.jitter) if fake.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+                prefix, _, code = self.path.partition("/RU/")
+                if prefix or not code.isdigit() or code.startswith("9"):
+                    self._reply(404, {})
+                else:
+                    self._reply(200, postal_document(code))
+
+            def _reply(self, status: int, document: dict) -> None:
+                body = json.dumps(document).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay in seconds")
+    args = parser.parse_args()
+    server = FakeZippopotamServer(args.latency, args.jitter, args.host, args.port)
+    print(f"Fake API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
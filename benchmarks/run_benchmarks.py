@@ -0,0 +1,198 @@
+# benchmarks/run_benchmarks.py
+"""Воспроизводимый бенчмарк запросов почтовых кодов через Psycopg2Client и SqlAlchemyClient.
+
+Для прогона поднимаются локальная заглушка API (`benchmarks.fake_api`) и временная база данных
+(`benchmarks.bench_db`), после чего выполняется матрица сценариев (`benchmarks.workload`): клиент,
+кэш, количество потоков, «горячий» набор кодов и доля промахов. Результаты записываются в JSON
+вместе с коммитом, на котором они получены; сравнение двух прогонов - `benchmarks.compare`.
+
+Запуск: DB_HOST=... DB_PORT=... DB_USER=... DB_PASS=... DB_NAME=postgres \
+    python -m benchmarks.run_benchmarks --matrix quick --output benchmarks/results/current.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.bench_db import ThrowawayDatabase
+from benchmarks.fake_api import FakeZippopotamServer
+from benchmarks.workload import MATRICES, Scenario, build_matrix, generate_codes
+from clients.api_client import ApiClient
+from clients.base_client import BaseClient
+from clients.psycopg2_client import Psycopg2Client
+from clients.sqlalchemy_client import SqlAlchemyClient
+from config.db_data import Data
+from service.negative_cache import NegativeLookupCache
+from service.request_statistics import RequestStatisticsAggregator
+from utils.metrics import LOOKUPS, StageMetrics
+from utils.psycopg2_connection import Psycopg2Connection
+from utils.sqlalchemy_connection import SQLAlchemyConnection
+from utils.ttl_cache import LRUTTLCache
+
+
+def make_client(scenario: Scenario) -> BaseClient:
+    """Создает клиент сценария так же, как это делает `main.py`: общий пул соединений, кэши
+    и отложенная запись статистики по настройкам `Data`."""
+    cache = LRUTTLCache(max_size=Data.CACHE_MAX_SIZE, ttl=Data.CACHE_TTL) if scenario.cached else None
+    negative_cache = NegativeLookupCache(max_size=Data.NEGATIVE_CACHE_MAX_SIZE,
+                                         not_found_ttl=Data.NEGATIVE_CACHE_NOT_FOUND_TTL,
+                                         failure_ttl=Data.NEGATIVE_CACHE_FAILURE_TTL)
+    if scenario.client == "psycopg2":
+        client = Psycopg2Client(Psycopg2Connection(), cache=cache, negative_cache=negative_cache)
+    else:
+        connection = SQLAlchemyConnection()
+        connection.connect()
+        client = SqlAlchemyClient(connection, cache=cache, negative_cache=negative_cache)
+    if Data.STATS_FLUSH_INTERVAL > 0:
+        client.statistics = RequestStatisticsAggregator(client.flush_request_statistics,
+                                                        flush_interval=Data.STATS_FLUSH_INTERVAL,
+                                                        flush_threshold=Data.STATS_FLUSH_THRESHOLD)
+    return client
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Квантиль отсортированной выборки (ближайший ранг).
+        :param sorted_values: Отсортированные значения.
+        :param q: Квантиль от 0 до 1."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _drive(client: BaseClient, codes: List[str], concurrency: int) -> Tuple[List[float], int]:
+    """Выполняет запросы кодов в `concurrency` потоков.
+        :return: Кортеж (задержки запросов в секундах по порядку кодов, количество исключений)."""
+    latencies = [0.0] * len(codes)
+    errors = []
+    lock = threading.Lock()
+
+    def worker(offset: int) -> None:
+        for index in range(offset, len(codes), concurrency):
+            started = time.perf_counter()
+            try:
+                client.select_postal_code(codes[index])
+            except Exception as e:  # Ошибки учитываются в результате, прогон продолжается
+                with lock:
+                    errors.append(e)
+            latencies[index] = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return latencies, len(errors)
+
+
+def run_scenario(scenario: Scenario, database: ThrowawayDatabase, api: FakeZippopotamServer,
+                 seed: int, warmup: int) -> Dict[str, object]:
+    """Выполняет один сценарий на чистой базе данных и возвращает его результат."""
+    database.reset()
+    codes = generate_codes(scenario, database.seed_count, warmup + scenario.operations, seed)
+    client = make_client(scenario)
+    try:
+        _drive(client, codes[:warmup], scenario.concurrency)
+        outcomes = {result: LOOKUPS.labels(scenario.client, result) for result in StageMetrics.RESULTS}
+        outcomes_before = {result: counter.value for result, counter in outcomes.items()}
+        api_requests_before = api.requests
+        started = time.perf_counter()
+        latencies, errors = _drive(client, codes[warmup:], scenario.concurrency)
+        wall = time.perf_counter() - started
+    finally:
+        if client.statistics is not None:
+            client.statistics.close()
+    latencies.sort()
+    return {
+        "scenario": scenario.to_dict(),
+        "operations": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall, 6),
+        "throughput_ops": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 4),
+            "p90": round(percentile(latencies, 0.90) * 1000, 4),
+            "p99": round(percentile(latencies, 0.99) * 1000, 4),
+            "max": round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        },
+        "outcomes": {result: int(counter.value - outcomes_before[result]) for result, counter in outcomes.items()},
+        "api_requests": api.requests - api_requests_before,
+    }
+
+
+def _git_revision() -> Dict[str, Optional[object]]:
+    """Коммит и признак незакоммиченных изменений рабочей копии."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run(matrix: str, operations: int, warmup: int, seed_count: int, api_latency: float,
+        seed: int, keep_db: bool = False) -> Dict[str, object]:
+    """Выполняет матрицу сценариев.
+        :return: Документ результатов: параметры прогона и результаты сценариев."""
+    scenarios = build_matrix(matrix, operations)
+    report = {
+        "meta": {
+            **_git_revision(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "matrix": matrix,
+            "operations": operations,
+            "warmup": warmup,
+            "seed_count": seed_count,
+            "api_latency": api_latency,
+            "seed": seed,
+        },
+        "results": [],
+    }
+    with FakeZippopotamServer(latency=api_latency) as api, ThrowawayDatabase(seed_count, keep=keep_db) as database:
+        saved_base_url = Data.API_BASE_URL
+        Data.API_BASE_URL = api.base_url
+        ApiClient.close_shared()  # Общий клиент API создается заново с адресом заглушки
+        try:
+            for number, scenario in enumerate(scenarios, 1):
+                result = run_scenario(scenario, database, api, seed, warmup)
+                report["results"].append(result)
+                print(f"[{number}/{len(scenarios)}] {scenario.name:60} "
+                      f"{result['throughput_ops']:>10.1f} ops/s  p99 {result['latency_ms']['p99']:>8.3f} ms",
+                      file=sys.stderr)
+        finally:
+            ApiClient.close_shared()
+            Data.API_BASE_URL = saved_base_url
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matrix", choices=sorted(MATRICES), default="quick", help="scenario matrix")
+    parser.add_argument("--operations", type=int, default=2000, help="measured lookups per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured lookups before each scenario")
+    parser.add_argument("--seed-count", type=int, default=20000, help="postal codes preloaded into the database")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="fake API response delay in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="workload random seed")
+    parser.add_argument("--keep-db", action="store_true", help="do not drop the benchmark database")
+    parser.add_argument("--output", help="results JSON path (default: stdout)")
+    args = parser.parse_args()
+    report = run(args.matrix, args.operations, args.warmup, args.seed_count, args.api_latency, args.seed, args.keep_db)
+    document = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(document + "\n")
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
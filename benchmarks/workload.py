@@ -0,0 +1,122 @@
+# benchmarks/workload.py
+"""Сценарии нагрузки и детерминированная генерация запрашиваемых почтовых кодов.
+
+Пространство кодов разбито на диапазоны:
+- `SEEDED_BASE + i` (i < seed_count) - коды, заранее загруженные в базу данных;
+- `API_ONLY_BASE + n` - коды, которых нет в базе данных, но которые отдает API; каждый такой запрос -
+  новый код, то есть промах базы данных и запрос к API;
+- `ABSENT_BASE + n` - коды, на которые заглушка API отвечает 404 (`benchmarks.fake_api`).
+"""
+import itertools
+import random
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+SEEDED_BASE = 100000
+API_ONLY_BASE = 200000
+ABSENT_BASE = 900000
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Один сценарий нагрузки.
+
+    :param client: Клиент базы данных: `psycopg2` или `sqlalchemy`.
+    :param cached: Включен ли кэш результатов перед базой данных.
+    :param concurrency: Количество потоков, одновременно выполняющих запросы.
+    :param hot_keys: Размер «горячего» набора кодов (0 - равномерное распределение).
+    :param hot_share: Доля запросов к «горячему» набору.
+    :param miss_ratio: Доля запросов кодов, отсутствующих в базе данных и загружаемых из API.
+    :param absent_ratio: Доля запросов кодов, которых нет ни в базе данных, ни в API.
+    :param operations: Количество измеряемых запросов.
+    """
+    client: str
+    cached: bool
+    concurrency: int
+    hot_keys: int
+    hot_share: float
+    miss_ratio: float
+    absent_ratio: float = 0.0
+    operations: int = 2000
+
+    @property
+    def name(self) -> str:
+        """Устойчивое имя сценария - ключ для сравнения результатов разных прогонов."""
+        cache = "cached" if self.cached else "uncached"
+        skew = f"hot{self.hot_keys}x{self.hot_share:g}" if self.hot_keys else "uniform"
+        return (f"{self.client}-{cache}-c{self.concurrency}-{skew}"
+                f"-miss{self.miss_ratio:g}-absent{self.absent_ratio:g}")
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, **asdict(self)}
+
+
+def generate_codes(scenario: Scenario, seed_count: int, count: int, seed: int = 0) -> List[str]:
+    """Генерирует последовательность запрашиваемых кодов; при одинаковых параметрах она одинакова в любом прогоне.
+
+    :param scenario: Сценарий нагрузки.
+    :param seed_count: Количество кодов, загруженных в базу данных.
+    :param count: Длина последовательности.
+    :param seed: Зерно генератора случайных чисел.
+    :return: Список почтовых кодов.
+    """
+    rng = random.Random(f"{seed}:{scenario.name}")
+    api_only = itertools.count(API_ONLY_BASE)
+    absent = itertools.count(ABSENT_BASE)
+    hot_keys = min(scenario.hot_keys, seed_count)
+    codes = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < scenario.miss_ratio:
+            code = next(api_only)
+        elif roll < scenario.miss_ratio + scenario.absent_ratio:
+            code = next(absent)
+        elif hot_keys and rng.random() < scenario.hot_share:
+            code = SEEDED_BASE + rng.randrange(hot_keys)
+        else:
+            code = SEEDED_BASE + rng.randrange(seed_count)
+        codes.append(str(code))
+    return codes
+
+
+# Матрицы сценариев: перебираются все сочетания значений.
+MATRICES: Dict[str, Dict[str, tuple]] = {
+    "smoke": {
+        "client": ("psycopg2", "sqlalchemy"),
+        "cached": (True,),
+        "concurrency": (4,),
+        "skew": ((100, 0.9),),
+        "miss_ratio": (0.05,),
+    },
+    "quick": {
+        "client": ("psycopg2", "sqlalchemy"),
+        "cached": (False, True),
+        "concurrency": (1, 8),
+        "skew": ((100, 0.9),),
+        "miss_ratio": (0.0, 0.1),
+    },
+    "full": {
+        "client": ("psycopg2", "sqlalchemy"),
+        "cached": (False, True),
+        "concurrency": (1, 4, 16),
+        "skew": ((0, 0.0), (100, 0.9), (1000, 0.5)),
+        "miss_ratio": (0.0, 0.01, 0.1),
+    },
+}
+
+
+def build_matrix(name: str, operations: int, absent_ratio: float = 0.0) -> List[Scenario]:
+    """Строит список сценариев матрицы.
+
+    :param name: Имя матрицы из `MATRICES`.
+    :param operations: Количество измеряемых запросов в каждом сценарии.
+    :param absent_ratio: Доля запросов несуществующих кодов во всех сценариях.
+    :return: Список сценариев.
+    """
+    matrix = MATRICES[name]
+    scenarios = []
+    for client, cached, concurrency, (hot_keys, hot_share), miss_ratio in itertools.product(
+            matrix["client"], matrix["cached"], matrix["concurrency"], matrix["skew"], matrix["miss_ratio"]):
+        scenarios.append(Scenario(client, cached, concurrency, hot_keys, hot_share, miss_ratio,
+                                  absent_ratio, operations))
+    return scenarios
@@ -1,30 +1,198 @@
 # clients/api_client.py
+import logging
+import random
+import threading
+import time
+from enum import Enum
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from config.db_data import Data
 from utils.custom_logger import CustomLogger
-from typing import Optional, Dict, Any
+from utils.metrics import STAGE_DURATION
+from typing import Callable, Optional, Dict, Any, Tuple
 
 custom_logger = CustomLogger(__name__)
+_fetch_duration = STAGE_DURATION.labels("api", "api_fetch")
+
+
+class ApiLookupStatus(Enum):
+    """Результат запроса к API почтовых индексов."""
+    FOUND = "found"
+    NOT_FOUND = "not_found"  # API ответил 404: такого индекса нет
+    FAILURE = "failure"  # Временная ошибка: таймаут, ошибка сети, ответ 5xx и т.п.
+
 
 class ApiClient:
-    """ Клиент для взаимодействия с API почтовых индексов. """
+    """ Клиент для взаимодействия с API почтовых индексов.
+
+    Клиент владеет одной `requests.Session` с пулом keep-alive соединений, поэтому TLS-рукопожатие
+    с API выполняется один раз на соединение, а не на каждый запрос. Ответы 429/5xx и сетевые ошибки
+    повторяются с экспоненциальной задержкой со случайным разбросом (full jitter); заголовок `Retry-After` учитывается.
+    Экземпляр потокобезопасен: один клиент можно использовать из нескольких потоков.
+    """
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    _shared: Optional["ApiClient"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 pool_size: Optional[int] = None,
+                 timeout: Optional[Tuple[float, float]] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 base_url: Optional[str] = None) -> None:
+        """Инициализация клиента. Незаданные параметры берутся из настроек `Data.API_*`.
+
+        :param pool_size: Максимальное количество keep-alive соединений с API.
+        :param timeout: Кортеж (таймаут подключения, таймаут чтения) в секундах.
+        :param max_retries: Количество повторов запроса после первой неудачной попытки.
+        :param backoff_base: База экспоненциальной задержки между повторами в секундах.
+        :param backoff_max: Максимальная задержка между повторами в секундах.
+        :param sleep: Функция ожидания (подменяется в тестах).
+        :param base_url: Базовый адрес API (по умолчанию `Data.API_BASE_URL`).
+        """
+        self.base_url = (base_url or Data.API_BASE_URL).rstrip("/")
+        pool_size = pool_size or Data.API_POOL_SIZE
+        self.timeout = timeout or (Data.API_CONNECT_TIMEOUT, Data.API_READ_TIMEOUT)
+        self.max_retries = Data.API_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Data.API_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Data.API_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._sleep = sleep
+        self.session = requests.Session()
+        # Повторы выполняются вручную в fetch_postal_data, поэтому встроенные повторы urllib3 отключены.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @classmethod
+    def shared(cls) -> "ApiClient":
+        """Возвращает общий для процесса экземпляр клиента (создается при первом обращении).
+            :return: Экземпляр ApiClient."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls) -> None:
+        """Закрывает общий экземпляр клиента и его соединения."""
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.close()
+                cls._shared = None
+
+    def close(self) -> None:
+        """Закрывает пул HTTP-соединений."""
+        self.session.close()
+
     def get_postal_data(self, post_code: str) -> Optional[Dict[str, Any]]:
         """Извлекает данные о почтовом индексе из API по заданному почтовому коду.
             :param post_code: Почтовый код, для которого необходимо получить данные.
             :return: Метод возвращает `Optional[Dict[str, Any]]`: Словарь с данными(где ключи — строки и значения могут быть любого типа)
              о почтовом индексе, если запрос успешен; иначе возвращает `None`, если произошла ошибка при выполнении запроса.
         """
-        url = f"https://api.zippopotam.us/RU/{post_code}"
+        return self.fetch_postal_data(post_code)[0]
+
+    def fetch_postal_data(self, post_code: str) -> Tuple[Optional[Dict[str, Any]], ApiLookupStatus]:
+        """Извлекает данные о почтовом индексе из API и сообщает, почему данные не получены.
+        Время выполнения и количество повторов запроса доступны через `last_request()` в том же потоке.
+            :param post_code: Почтовый код, для которого необходимо получить данные.
+            :return: Кортеж (данные, статус): данные о почтовом индексе или `None`, и статус `ApiLookupStatus`,
+                отличающий отсутствующий индекс (`NOT_FOUND`) от временной ошибки (`FAILURE`).
+        """
+        url = f"{self.base_url}/RU/{post_code}"
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code == 404:
+                    custom_logger.log_with_context("Postal code %s not found in API", post_code,
+                                                    sample_every=Data.LOG_SAMPLE_EVERY)
+                    return self._finish(post_code, started, attempt, None, ApiLookupStatus.NOT_FOUND)
+                if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                    retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                    raise requests.exceptions.RetryError(f"{response.status_code} response from API")
+                """Метод raise_for_status() используется для проверки ответа HTTP на наличие ошибок. Он выполняет следующее:
+                    - Если статус-код ответа указывает на успешное выполнение запроса (например, 200 OK),
+                    метод просто возвращает управление без каких-либо действий.
+                    - Если статус-код указывает на ошибку (например, 404 Not Found или 500 Internal Server Error), метод
+                    вызывает исключение requests.exceptions.HTTPError."""
+                response.raise_for_status()
+                return self._finish(post_code, started, attempt, response.json(), ApiLookupStatus.FOUND)
+
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.RetryError) as e:
+                if attempt >= self.max_retries:
+                    custom_logger.log_with_context("Error fetching data from API: %s", e, level=logging.WARNING)
+                    return self._finish(post_code, started, attempt, None, ApiLookupStatus.FAILURE)
+                delay = self._backoff_delay(attempt, retry_after)
+                attempt += 1
+                custom_logger.log_with_context("Retrying API request for %s in %.2fs (attempt %s/%s): %s",
+                                               post_code, delay, attempt, self.max_retries, e, level=logging.WARNING)
+                self._sleep(delay)
+
+            except requests.exceptions.RequestException as e:
+                custom_logger.log_with_context("Error fetching data from API: %s", e, level=logging.WARNING)
+                return self._finish(post_code, started, attempt, None, ApiLookupStatus.FAILURE)
+
+    def last_request(self) -> Optional[Dict[str, Any]]:
+        """Возвращает сведения о последнем запросе, выполненном в текущем потоке.
+            :return: Словарь с почтовым кодом, статусом, временем выполнения в секундах (включая повторы)
+                и количеством повторов, или `None`, если поток еще не выполнял запросов."""
+        return getattr(self._local, "last_request", None)
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает накопленную статистику запросов к API.
+            :return: Словарь с количеством запросов, повторов и неудачных запросов,
+                суммарным, средним и максимальным временем выполнения запроса в секундах."""
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "failures": self._failures,
+                "latency_total": self._latency_total,
+                "latency_avg": self._latency_total / self._requests if self._requests else 0.0,
+                "latency_max": self._latency_max,
+            }
+
+    def _finish(self, post_code: str, started: float, retries: int,
+                data: Optional[Dict[str, Any]], status: ApiLookupStatus) -> Tuple[Optional[Dict[str, Any]], ApiLookupStatus]:
+        """Учитывает завершенный запрос в статистике и возвращает его результат."""
+        latency = time.perf_counter() - started
+        _fetch_duration.observe(latency)
+        with self._stats_lock:
+            self._requests += 1
+            self._retries += retries
+            self._failures += status is ApiLookupStatus.FAILURE
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+        self._local.last_request = {"post_code": post_code, "status": status, "latency": latency, "retries": retries}
+        return data, status
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Вычисляет задержку перед повтором: `Retry-After`, если он задан, иначе случайная величина
+        из [0, min(backoff_max, backoff_base * 2 ** attempt)]."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Разбирает заголовок `Retry-After`, заданный в секундах; формат HTTP-даты не поддерживается."""
         try:
-            response = requests.get(url)
-            """Метод raise_for_status() используется для проверки ответа HTTP на наличие ошибок. Он выполняет следующее:
-                - Если статус-код ответа указывает на успешное выполнение запроса (например, 200 OK), 
-                метод просто возвращает управление без каких-либо действий.
-                - Если статус-код указывает на ошибку (например, 404 Not Found или 500 Internal Server Error), метод 
-                вызывает исключение requests.exceptions.HTTPError."""
-            response.raise_for_status()
-            return response.json()
-
-        except requests.exceptions.RequestException as e:
-            custom_logger.log_with_context(f"Error fetching data from API: {e}")
-            return None
\ No newline at end of file
+            return max(0.0, float(value)) if value is not None else None
+        except ValueError:
+            return None
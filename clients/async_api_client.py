@@ -0,0 +1,115 @@
+# clients/async_api_client.py
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from clients.api_client import ApiClient, ApiLookupStatus
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import STAGE_DURATION
+
+custom_logger = CustomLogger(__name__)
+_fetch_duration = STAGE_DURATION.labels("api", "api_fetch")
+
+
+class AsyncApiClient:
+    """Асинхронный клиент API почтовых индексов.
+
+    Использует один `httpx.AsyncClient` с пулом keep-alive соединений на все запросы;
+    количество одновременных запросов к API ограничено семафором. Таймауты и повторы те же, что у `ApiClient`:
+    ответы 429/5xx и сетевые ошибки повторяются с экспоненциальной задержкой (full jitter) с учетом `Retry-After`.
+    """
+    def __init__(self,
+                 max_concurrency: Optional[int] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 base_url: Optional[str] = None,
+                 timeout: Optional[Tuple[float, float]] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep) -> None:
+        """Инициализация клиента. Незаданные параметры берутся из настроек `Data.API_*`.
+
+        :param max_concurrency: Максимальное количество одновременных запросов к API (по умолчанию `Data.API_MAX_WORKERS`).
+        :param transport: Транспорт httpx (используется для подмены сети в тестах).
+        :param base_url: Базовый адрес API (по умолчанию `Data.API_BASE_URL`).
+        :param timeout: Кортеж (таймаут подключения, таймаут чтения) в секундах.
+        :param max_retries: Количество повторов запроса после первой неудачной попытки.
+        :param backoff_base: База экспоненциальной задержки между повторами в секундах.
+        :param backoff_max: Максимальная задержка между повторами в секундах.
+        :param sleep: Корутина ожидания (подменяется в тестах).
+        """
+        max_concurrency = max_concurrency or Data.API_MAX_WORKERS
+        connect_timeout, read_timeout = timeout or (Data.API_CONNECT_TIMEOUT, Data.API_READ_TIMEOUT)
+        self.max_retries = Data.API_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Data.API_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Data.API_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._sleep = sleep
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url or Data.API_BASE_URL,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=transport)
+
+    async def get_postal_data(self, post_code: str) -> Optional[Dict[str, Any]]:
+        """Извлекает данные о почтовом индексе из API.
+            :param post_code: Почтовый код, для которого необходимо получить данные.
+            :return: Словарь с данными о почтовом индексе или `None`, если данные не получены."""
+        return (await self.fetch_postal_data(post_code))[0]
+
+    async def fetch_postal_data(self, post_code: str) -> Tuple[Optional[Dict[str, Any]], ApiLookupStatus]:
+        """Извлекает данные о почтовом индексе из API и сообщает, почему данные не получены.
+            :param post_code: Почтовый код, для которого необходимо получить данные.
+            :return: Кортеж (данные или `None`, статус `ApiLookupStatus`)."""
+        with _fetch_duration.time():
+            return await self._fetch(post_code)
+
+    async def _fetch(self, post_code: str) -> Tuple[Optional[Dict[str, Any]], ApiLookupStatus]:
+        """Выполняет запрос к API с повторами; каждая попытка ждет свободного места под семафором
+        одновременных запросов, а задержка перед повтором его не занимает."""
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(f"/RU/{post_code}")
+                if response.status_code == 404:
+                    custom_logger.log_with_context("Postal code %s not found in API", post_code,
+                                                    sample_every=Data.LOG_SAMPLE_EVERY)
+                    return None, ApiLookupStatus.NOT_FOUND
+                if response.status_code in ApiClient.RETRY_STATUSES and attempt < self.max_retries:
+                    retry_after = ApiClient._parse_retry_after(response.headers.get("Retry-After"))
+                    raise httpx.HTTPStatusError(f"{response.status_code} response from API",
+                                                request=response.request, response=response)
+                response.raise_for_status()
+                return response.json(), ApiLookupStatus.FOUND
+
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or e.response.status_code in ApiClient.RETRY_STATUSES
+                if not retryable or attempt >= self.max_retries:
+                    custom_logger.log_with_context("Error fetching data from API: %s", e, level=logging.WARNING)
+                    return None, ApiLookupStatus.FAILURE
+                delay = self._backoff_delay(attempt, retry_after)
+                attempt += 1
+                custom_logger.log_with_context("Retrying API request for %s in %.2fs (attempt %s/%s): %s",
+                                               post_code, delay, attempt, self.max_retries, e, level=logging.WARNING)
+                await self._sleep(delay)
+
+            except httpx.HTTPError as e:
+                custom_logger.log_with_context("Error fetching data from API: %s", e, level=logging.WARNING)
+                return None, ApiLookupStatus.FAILURE
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Вычисляет задержку перед повтором так же, как `ApiClient`: `Retry-After`, если он задан, иначе случайная
+        величина из [0, min(backoff_max, backoff_base * 2 ** attempt)]."""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def aclose(self) -> None:
+        """Закрывает пул HTTP-соединений."""
+        await self._client.aclose()
@@ -0,0 +1,94 @@
+# clients/async_base_client.py
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+from clients.postal_code_info import PostalCodeInfo
+
+
+class AsyncBaseClient(ABC):
+    """Абстрактный базовый класс для асинхронных клиентов базы данных.
+    Тот же контракт, что у `BaseClient`, но все методы - корутины и вызываются через `await`;
+    поэтому асинхронный клиент не является `BaseClient` и не передается туда, где ждут синхронный клиент."""
+
+    @abstractmethod
+    async def select_postal_code(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """
+           Получает информацию о почтовом коде.
+
+           :param postal_code: Почтовый код.
+           :return: Информация о почтовом коде или `None`, если она не найдена.
+           """
+        pass
+
+    @abstractmethod
+    async def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """
+           Получает информацию о пакете почтовых кодов.
+
+           :param postal_codes: Почтовые коды (повторы допускаются).
+           :return: Словарь {почтовый код: информация или None} в порядке первого появления кода во входных данных.
+           """
+        pass
+
+    @abstractmethod
+    async def insert_postal_code(self, postal_data: dict) -> None:
+        """
+           Вставляет данные о почтовом коде.
+
+           :param postal_data: Словарь с данными о почтовом коде.
+           :return: None
+           """
+        pass
+
+    @abstractmethod
+    async def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """
+           Вставляет пакет данных о почтовых кодах.
+
+           :param postal_data_list: Список словарей с данными о почтовых кодах.
+           :return: None
+           """
+        pass
+
+    @abstractmethod
+    async def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """
+           Сохраняет почтовый код, полученный из API при промахе, и учитывает запрос в статистике
+           одной транзакцией (см. `BaseClient.insert_fetched_postal_code`). Ошибка базы данных не пробрасывается:
+           она записывается в лог, а статистика, кэши и индексы не изменяются.
+
+           :param postal_code: Запрошенный почтовый код (для статистики).
+           :param postal_data: Словарь с данными о почтовом коде.
+           :return: `True`, если строка вставлена; `False`, если код уже был в базе данных или запрос не выполнен.
+           """
+        pass
+
+    @abstractmethod
+    async def increment_request_statistic(self, postal_code: str) -> None:
+        """
+            Увеличивает статистику запросов для заданного почтового кода.
+
+            :param postal_code: Строка, представляющая почтовый код.
+            :return: None
+            """
+        pass
+
+    @abstractmethod
+    async def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """
+            Увеличивает статистику запросов для пакета почтовых кодов.
+
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}.
+            :return: None
+            """
+        pass
+
+    @abstractmethod
+    async def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """
+            Записывает пакет приростов статистики запросов одним запросом к базе данных.
+
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}.
+            :return: None
+            """
+        pass
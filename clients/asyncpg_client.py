@@ -0,0 +1,201 @@
+# clients/asyncpg_client.py
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from clients.async_base_client import AsyncBaseClient
+from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from models.postal_queries import (FLUSH_STATISTICS, INSERT_FETCHED, INSERT_POSTAL_CODE_IF_MISSING, LOOKUP,
+                                   LOOKUP_BATCH, insert_fetched_params)
+from service.negative_cache import NegativeLookupCache
+from utils.asyncpg_connection import AsyncpgConnection
+from utils.custom_logger import CustomLogger
+from utils.geo_index import GeoIndex
+from utils.metrics import StageMetrics
+from utils.ttl_cache import BaseCache
+
+custom_logger = CustomLogger(__name__)
+_metrics = StageMetrics("asyncpg")
+
+
+class AsyncpgClient(AsyncBaseClient):
+    """Асинхронный клиент базы данных на asyncpg.
+
+    Реализует контракт `AsyncBaseClient`: все методы - корутины и вызываются через `await`.
+    Статистика запросов записывается сразу одним запросом UPSERT на пакет.
+    """
+    def __init__(self, connection: AsyncpgConnection, cache: Optional[BaseCache] = None,
+                 negative_cache: Optional[NegativeLookupCache] = None, api_service=None,
+                 geo_index: Optional[GeoIndex] = None) -> None:
+        """Инициализирует клиент.
+            :param connection: Асинхронное соединение с базой данных.
+            :param cache: Кэш объектов `PostalCodeInfo` перед базой данных; `None` - без кэширования.
+            :param negative_cache: Кэш почтовых кодов, которые недавно не удалось получить из API.
+            :param api_service: Экземпляр `AsyncApiDBService` для загрузки отсутствующих кодов из API;
+                `None` - отсутствующие в базе данных коды не запрашиваются из API.
+            :param geo_index: Пространственный индекс для поиска ближайших кодов; вставленные коды
+                добавляются в него; `None` - индекс не ведется."""
+        self.connection = connection
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.api_service = api_service
+        self.geo_index = geo_index
+
+    async def select_postal_code(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Получает информацию о почтовом коде из кэша, базы данных или API.
+            :param postal_code: Почтовый код.
+            :return: Информация о почтовом коде или `None`, если она не найдена."""
+        started = time.perf_counter()
+        if self.cache is not None:
+            with _metrics.cache.time():
+                postal_info = self.cache.get(postal_code)
+            if postal_info is not None:
+                await self.increment_request_statistic(postal_code)
+                _metrics.lookup_done(started, "cache_hit")
+                return postal_info
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            _metrics.lookup_done(started, "not_found")
+            return None
+        postal_info = await self.get_postal_code_from_db(postal_code)
+        result = "db_hit"
+        if not postal_info:
+            if self.api_service is not None:
+                postal_info = await self.api_service.fetch_postal_code_from_api(postal_code)
+            result = "api_hit" if postal_info else "not_found"
+        if postal_info and self.cache is not None:
+            self.cache.set(postal_code, postal_info)
+        _metrics.lookup_done(started, result)
+        return postal_info
+
+    async def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """Получает информацию о пакете почтовых кодов из кэша, базы данных или API.
+            :param postal_codes: Почтовые коды (повторы допускаются и учитываются в статистике).
+            :return: Словарь {почтовый код: PostalCodeInfo или None} в порядке первого появления кода."""
+        requested = Counter(str(postal_code) for postal_code in postal_codes)
+        results: Dict[str, Optional[PostalCodeInfo]] = {}
+        pending = []
+        for postal_code in requested:
+            postal_info = self.cache.get(postal_code) if self.cache is not None else None
+            if postal_info is not None:
+                results[postal_code] = postal_info
+            elif self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+                results[postal_code] = None
+            else:
+                pending.append(postal_code)
+        _metrics.count("cache_hit", sum(postal_info is not None for postal_info in results.values()))
+
+        found = await self.get_postal_codes_from_db(pending)
+        missing = [postal_code for postal_code in pending if postal_code not in found]
+        db_hits = len(found)
+        if missing and self.api_service is not None:
+            found.update(await self.api_service.fetch_postal_codes_from_api(missing))
+        if self.cache is not None:
+            for postal_code, postal_info in found.items():
+                if postal_info is not None:
+                    self.cache.set(postal_code, postal_info)
+        results.update(found)
+        _metrics.count("db_hit", db_hits)
+        _metrics.count("api_hit", sum(postal_info is not None for postal_info in found.values()) - db_hits)
+        _metrics.count("not_found", len(requested) - sum(postal_info is not None for postal_info in results.values()))
+
+        await self.increment_request_statistics({postal_code: requested[postal_code]
+                                                 for postal_code, postal_info in results.items() if postal_info is not None})
+        return {postal_code: results.get(postal_code) for postal_code in requested}
+
+    async def get_postal_code_from_db(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Получает выборку о почтовом коде из базы данных и увеличивает статистику запросов.
+            :param postal_code: Почтовый код.
+            :return: Информация о почтовом коде или `None`, если она не найдена."""
+        with _metrics.db_select.time():
+            result = await self.connection.execute_query(LOOKUP.statement, postal_code, fetch_one=True)
+        if result is None:
+            custom_logger.log_with_context("No postal data %s found in database", postal_code,
+                                          sample_every=Data.LOG_SAMPLE_EVERY)
+            return None
+        await self.increment_request_statistic(postal_code)
+        return PostalCodeInfo(*result)
+
+    async def get_postal_codes_from_db(self, postal_codes: List[str]) -> Dict[str, PostalCodeInfo]:
+        """Получает выборку о пакете почтовых кодов запросами `ANY($1)` по `Data.BATCH_CHUNK_SIZE` кодов.
+            :param postal_codes: Список почтовых кодов.
+            :return: Словарь {почтовый код: PostalCodeInfo} только для найденных кодов."""
+        found: Dict[str, PostalCodeInfo] = {}
+        for start in range(0, len(postal_codes), Data.BATCH_CHUNK_SIZE):
+            chunk = postal_codes[start:start + Data.BATCH_CHUNK_SIZE]
+            with _metrics.db_select.time():
+                rows = await self.connection.execute_query(LOOKUP_BATCH.statement, chunk, fetch_all=True) or []
+            for post_code, *columns in rows:
+                found[post_code] = PostalCodeInfo(*columns)
+        return found
+
+    async def insert_postal_code(self, postal_data: dict) -> None:
+        """Вставляет данные о почтовом коде в базу данных.
+            :param postal_data: Словарь, содержащий информацию о почтовых данных."""
+        await self.insert_postal_codes([postal_data])
+
+    async def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """Вставляет пакет данных о почтовых кодах; уже существующие коды пропускаются.
+        Если вставка не выполнена (ошибка записана в лог), кэши и индексы не изменяются.
+            :param postal_data_list: Список словарей с информацией о почтовых данных."""
+        rows = [(
+            postal_data['post code'],
+            postal_data['country'],
+            postal_data['country abbreviation'],
+            postal_data['places'][0]['place name'],
+            float(postal_data['places'][0]['longitude']),  # API возвращает координаты строками
+            float(postal_data['places'][0]['latitude']),
+            postal_data['places'][0]['state'],
+            postal_data['places'][0]['state abbreviation']
+        ) for postal_data in postal_data_list]
+        with _metrics.db_insert.time():
+            inserted = await self.connection.execute_many(INSERT_POSTAL_CODE_IF_MISSING.statement, rows)
+        if not inserted:
+            return
+        for postal_data in postal_data_list:
+            if self.cache is not None:
+                self.cache.invalidate(postal_data['post code'])
+            if self.negative_cache is not None:
+                self.negative_cache.invalidate(postal_data['post code'])
+            if self.geo_index is not None:
+                self.geo_index.add(postal_data['post code'], PostalCodeInfo.from_api_data(postal_data))
+
+    async def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """Сохраняет почтовый код, полученный из API при промахе, одним запросом `INSERT_FETCHED`:
+        INSERT ... ON CONFLICT DO NOTHING RETURNING и UPSERT статистики в одной транзакции.
+            :param postal_code: Запрошенный почтовый код (для статистики).
+            :param postal_data: Словарь, содержащий информацию о почтовых данных.
+            :return: `True`, если строка вставлена; `False`, если код уже был в базе данных или запрос не выполнен."""
+        with _metrics.db_insert.time():
+            row = await self.connection.execute_query(INSERT_FETCHED.statement,
+                                                      *insert_fetched_params(postal_code, postal_data, 1),
+                                                      fetch_one=True)
+        if row is None:  # SELECT count(*) всегда возвращает строку, None - ошибка базы данных
+            return False
+        if self.cache is not None:
+            self.cache.invalidate(postal_data['post code'])
+        if self.negative_cache is not None:
+            self.negative_cache.invalidate(postal_data['post code'])
+        if self.geo_index is not None:
+            self.geo_index.add(postal_data['post code'], PostalCodeInfo.from_api_data(postal_data))
+        return bool(row and row[0])
+
+    async def increment_request_statistic(self, postal_code: str) -> None:
+        """Увеличивает счетчик запросов для заданного почтового кода.
+            :param postal_code: Почтовый код."""
+        await self.flush_request_statistics({postal_code: 1})
+
+    async def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Увеличивает счетчики запросов для пакета почтовых кодов.
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        await self.flush_request_statistics(counts)
+
+    async def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Записывает пакет приростов статистики одним запросом INSERT ... ON CONFLICT DO UPDATE.
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        if not counts:
+            return
+        postal_codes = sorted(counts)  # Единый порядок блокировок строк при параллельной записи пакетов
+        with _metrics.stats.time():
+            await self.connection.execute_query(FLUSH_STATISTICS.statement, postal_codes,
+                                                [counts[code] for code in postal_codes])
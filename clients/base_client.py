@@ -1,5 +1,8 @@
 #clients/base.client.py
 from abc import ABC,abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+from clients.postal_code_info import PostalCodeInfo
 
 
 class BaseClient(ABC):
@@ -15,6 +18,40 @@ class BaseClient(ABC):
            """
         pass
 
+    @abstractmethod
+    def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """
+           Получает информацию о пакете почтовых кодов.
+
+           :param postal_codes: Почтовые коды (повторы допускаются).
+           :return: Словарь {почтовый код: информация или None} в порядке первого появления кода во входных данных.
+           """
+        pass
+
+    @abstractmethod
+    def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """
+           Вставляет пакет данных о почтовых кодах.
+
+           :param postal_data_list: Список словарей с данными о почтовых кодах.
+           :return: None
+           """
+        pass
+
+    @abstractmethod
+    def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """
+           Сохраняет почтовый код, полученный из API при промахе, и учитывает запрос в статистике
+           одной транзакцией. Код, уже вставленный параллельным запросом, не считается ошибкой.
+           Ошибка базы данных не пробрасывается: она записывается в лог, транзакция отменяется, а статистика,
+           кэши и индексы не изменяются.
+
+           :param postal_code: Запрошенный почтовый код (для статистики).
+           :param postal_data: Словарь с данными о почтовом коде.
+           :return: `True`, если строка вставлена; `False`, если код уже был в базе данных или запрос не выполнен.
+           """
+        pass
+
     @abstractmethod
     def increment_request_statistic(self, postal_code: str) -> None:
         """
@@ -23,4 +60,24 @@ class BaseClient(ABC):
             :param postal_code: Строка, представляющая почтовый код.
             :return: None
             """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """
+            Увеличивает статистику запросов для пакета почтовых кодов.
+
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}.
+            :return: None
+            """
+        pass
+
+    @abstractmethod
+    def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """
+            Записывает пакет приростов статистики запросов одним запросом к базе данных.
+
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}.
+            :return: None
+            """
+        pass
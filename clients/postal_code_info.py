@@ -1,4 +1,5 @@
 # clients/postal_code_info.py
+from typing import Any, Dict
 
 class PostalCodeInfo:
     """Класс для хранения и представления информации о почтовом коде."""
@@ -15,6 +16,25 @@ class PostalCodeInfo:
         self.country = country
         self.state = state
 
+    @classmethod
+    def from_api_data(cls, postal_data: Dict[str, Any]) -> "PostalCodeInfo":
+        """Создает объект PostalCodeInfo из ответа API почтовых индексов.
+
+        :param postal_data: Словарь с данными о почтовом коде в формате API.
+        :return: Объект PostalCodeInfo с данными первого населенного пункта из ответа.
+        """
+        place = postal_data['places'][0]
+        return cls(place['longitude'], place['latitude'], postal_data['country'], place['state'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Возвращает данные о почтовом коде в виде словаря (для ответов в формате JSON).
+
+        :return: Словарь с долготой, широтой, страной и субъектом.
+        """
+        # Из ответа API координаты приходят строками, из базы данных - числами: в словаре они всегда числа
+        return {"longitude": float(self.longitude), "latitude": float(self.latitude),
+                "country": self.country, "state": self.state}
+
     def __str__(self) -> str:
         """
         Возвращает строковое представление объекта PostalCodeInfo.
@@ -1,44 +1,150 @@
 # models/psycopg2_client.py
-from typing import Optional
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
 
 from clients.base_client import BaseClient
 from utils.custom_logger import CustomLogger
 from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from models.postal_queries import (FLUSH_STATISTICS, INSERT_FETCHED, INSERT_POSTAL_CODE, LOOKUP, LOOKUP_AND_COUNT,
+                                   LOOKUP_BATCH, insert_fetched_params)
 from utils.psycopg2_connection import Psycopg2Connection
+from service.negative_cache import NegativeLookupCache
+from service.request_statistics import RequestStatisticsAggregator
+from utils.geo_index import GeoIndex
+from utils.metrics import StageMetrics
+from utils.ttl_cache import BaseCache
 
 custom_logger = CustomLogger(__name__)
+_metrics = StageMetrics("psycopg2")
 
 class Psycopg2Client(BaseClient):
     """Класс `Psycopg2Client` предназначен для работы с базой данных PostgresSQL и предоставляет методы для получения
     информации о почтовых кодах."""
-    def __init__(self,  connection: Psycopg2Connection) -> None:
+    def __init__(self,  connection: Psycopg2Connection, cache: Optional[BaseCache] = None,
+                 negative_cache: Optional[NegativeLookupCache] = None,
+                 statistics: Optional[RequestStatisticsAggregator] = None,
+                 geo_index: Optional[GeoIndex] = None) -> None:
         """Инициализирует экземпляр класса `Psycopg2Client` с соединением с базой данных.
-            :param connection: Объект типа `Psycopg2Connection`, представляющий соединение с базой данных."""
+            :param connection: Объект типа `Psycopg2Connection`, представляющий соединение с базой данных.
+            :param cache: Кэш объектов `PostalCodeInfo` перед базой данных (может быть общим для нескольких клиентов);
+                `None` - без кэширования.
+            :param negative_cache: Кэш почтовых кодов, которые недавно не удалось получить из API;
+                такие коды не запрашиваются повторно ни из базы данных, ни из API.
+            :param statistics: Накопитель статистики запросов для отложенной пакетной записи;
+                `None` - статистика записывается сразу при каждом запросе.
+            :param geo_index: Пространственный индекс для поиска ближайших кодов; вставленные коды
+                добавляются в него; `None` - индекс не ведется."""
         self.connection = connection
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.statistics = statistics
+        self.geo_index = geo_index
 
     def select_postal_code(self, postal_code: str) -> Optional[PostalCodeInfo]:
-        """Получает информацию о почтовом коде из базы данных или API.
+        """Получает информацию о почтовом коде из кэша, базы данных или API.
             :param postal_code: Строка, представляющая почтовый код, для которого необходимо получить информацию.
             :return: Optional[PostalCodeInfo]: Содержит данные о почтовом коде, если они найдены в базе данных или
                 получены через API; иначе возвращает `None`."""
+        started = time.perf_counter()
+        if self.cache is not None:
+            with _metrics.cache.time():
+                postal_info = self.cache.get(postal_code)
+            if postal_info is not None:
+                self.increment_request_statistic(postal_code)  # Попадание в кэш тоже учитывается в статистике
+                _metrics.lookup_done(started, "cache_hit")
+                return postal_info
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            _metrics.lookup_done(started, "not_found")
+            return None
         postal_info = self.get_postal_code_from_db(postal_code)
+        result = "db_hit"
         if not postal_info:
             from service.api_db_service import ApiDBService
-            return ApiDBService(self).fetch_postal_code_from_api(postal_code)
+            postal_info = ApiDBService(self, self.negative_cache).fetch_postal_code_from_api(postal_code)
+            result = "api_hit" if postal_info else "not_found"
+        if postal_info and self.cache is not None:
+            self.cache.set(postal_code, postal_info)
+        _metrics.lookup_done(started, result)
         return postal_info
 
+    def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """Получает информацию о пакете почтовых кодов из кэша, базы данных или API.
+        Коды, отсутствующие в кэше, выбираются из базы данных пачками запросов `WHERE post_code = ANY(%s)`,
+        отсутствующие в базе данных загружаются из API и вставляются одной пакетной вставкой;
+        статистика всего пакета записывается одним запросом.
+            :param postal_codes: Почтовые коды (повторы допускаются и учитываются в статистике).
+            :return: Словарь {почтовый код: PostalCodeInfo или None} в порядке первого появления кода."""
+        requested = Counter(str(postal_code) for postal_code in postal_codes)
+        results: Dict[str, Optional[PostalCodeInfo]] = {}
+        pending = []
+        for postal_code in requested:
+            postal_info = self.cache.get(postal_code) if self.cache is not None else None
+            if postal_info is not None:
+                results[postal_code] = postal_info
+            elif self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+                results[postal_code] = None
+            else:
+                pending.append(postal_code)
+        _metrics.count("cache_hit", sum(postal_info is not None for postal_info in results.values()))
+
+        found = self.get_postal_codes_from_db(pending)
+        missing = [postal_code for postal_code in pending if postal_code not in found]
+        db_hits = len(found)
+        if missing:
+            from service.api_db_service import ApiDBService
+            found.update(ApiDBService(self, self.negative_cache).fetch_postal_codes_from_api(missing))
+        if self.cache is not None:
+            for postal_code, postal_info in found.items():
+                if postal_info is not None:
+                    self.cache.set(postal_code, postal_info)
+        results.update(found)
+        _metrics.count("db_hit", db_hits)
+        _metrics.count("api_hit", sum(postal_info is not None for postal_info in found.values()) - db_hits)
+        _metrics.count("not_found", len(requested) - sum(postal_info is not None for postal_info in results.values()))
+
+        self.increment_request_statistics({postal_code: requested[postal_code]
+                                           for postal_code, postal_info in results.items() if postal_info is not None})
+        return {postal_code: results.get(postal_code) for postal_code in requested}
+
+    def get_postal_codes_from_db(self, postal_codes: List[str]) -> Dict[str, PostalCodeInfo]:
+        """Получает выборку о пакете почтовых кодов из базы данных запросами `ANY($1)` по `Data.BATCH_CHUNK_SIZE` кодов.
+        Статистика запросов не увеличивается; запросы выполняются на реплике, если она настроена.
+            :param postal_codes: Список почтовых кодов.
+            :return: Словарь {почтовый код: PostalCodeInfo} только для найденных кодов."""
+        found: Dict[str, PostalCodeInfo] = {}
+        for start in range(0, len(postal_codes), Data.BATCH_CHUNK_SIZE):
+            chunk = postal_codes[start:start + Data.BATCH_CHUNK_SIZE]
+            with _metrics.db_select.time():
+                rows = self.connection.execute_prepared(LOOKUP_BATCH, (chunk, ), fetch_all=True,
+                                                        read_only=True, keys=chunk) or []
+            for post_code, *columns in rows:
+                found[post_code] = PostalCodeInfo(*columns)
+        return found
+
     def get_postal_code_from_db(self, postal_code: str) -> Optional[PostalCodeInfo]:
-        """Получает выборку о почтовом коде из базы данных.
+        """Получает выборку о почтовом коде из базы данных и учитывает найденный код в статистике.
+        Без накопителя статистики поиск и UPSERT статистики выполняются одним подготовленным запросом
+        `LOOKUP_AND_COUNT` за одно обращение к основному серверу; с накопителем код читается запросом `LOOKUP`
+        на реплике, если она настроена.
             :param postal_code: Строка, представляющая почтовый код.
             :return: Optional[PostalCodeInfo]: Содержит данные о почтовом коде, если они найдены; иначе возвращает `None`."""
-        query = '''
-            SELECT longitude, latitude, country, state
-            FROM postal_codes
-            WHERE post_code = %s;                
-        '''
-        result = self.connection.execute_query(query, (postal_code, ), fetch_one=True)
+        if self.statistics is None:
+            with _metrics.db_select.time():
+                result = self.connection.execute_prepared(LOOKUP_AND_COUNT, (postal_code, ), fetch_one=True,
+                                                          commit=True)
+            if result is None:
+                custom_logger.log_with_context("No postal data %s found in database", postal_code,
+                                               sample_every=Data.LOG_SAMPLE_EVERY)
+                return None
+            return PostalCodeInfo(*result)
+        with _metrics.db_select.time():
+            result = self.connection.execute_prepared(LOOKUP, (postal_code, ), fetch_one=True,
+                                                      read_only=True, keys=(postal_code, ))
         if result is None:
-            custom_logger.log_with_context(f"No postal data {postal_code} found in database")
+            custom_logger.log_with_context("No postal data %s found in database", postal_code,
+                                          sample_every=Data.LOG_SAMPLE_EVERY)
             return None
         # longitude, latitude, country, state = result  # Извлекаем данные результата
         postal_info = PostalCodeInfo(*result)  # PostalCodeInfo(longitude, latitude, country, state)
@@ -48,12 +154,62 @@ class Psycopg2Client(BaseClient):
     def insert_postal_code(self, postal_data: dict) -> None:
         """Вставляет данные о почтовом коде в базу данных.
             :param postal_data: Словарь, содержащий информацию о почтовых данных."""
+        with _metrics.db_insert.time():
+            self.connection.execute_prepared(INSERT_POSTAL_CODE, (
+                postal_data['post code'],
+                postal_data['country'],
+                postal_data['country abbreviation'],
+                postal_data['places'][0]['place name'],
+                postal_data['places'][0]['longitude'],
+                postal_data['places'][0]['latitude'],
+                postal_data['places'][0]['state'],
+                postal_data['places'][0]['state abbreviation']
+            ), commit=True)
+        self._register_inserted(postal_data)
+
+    def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """Сохраняет почтовый код, полученный из API при промахе, одним подготовленным запросом `INSERT_FETCHED`:
+        INSERT ... ON CONFLICT DO NOTHING RETURNING и UPSERT статистики в одной транзакции с одним commit.
+        При заданном накопителе статистика учитывается в нем, а запрос только вставляет код.
+        Если запрос не выполнен (ошибка записана в лог), ни статистика, ни кэши и индексы не изменяются.
+            :param postal_code: Запрошенный почтовый код (для статистики).
+            :param postal_data: Словарь, содержащий информацию о почтовых данных.
+            :return: `True`, если строка вставлена; `False`, если код уже был в базе данных или запрос не выполнен."""
+        request_count = 1 if self.statistics is None else 0
+        with _metrics.db_insert.time():
+            row = self.connection.execute_prepared(INSERT_FETCHED,
+                                                   insert_fetched_params(postal_code, postal_data, request_count),
+                                                   fetch_one=True, commit=True)
+        if row is None:  # SELECT count(*) всегда возвращает строку, None - ошибка базы данных
+            return False
+        if self.statistics is not None:
+            self.statistics.increment(postal_code, 1)
+        self._register_inserted(postal_data)
+        return bool(row and row[0])
+
+    def _register_inserted(self, postal_data: dict) -> None:
+        """Сбрасывает устаревшие записи кэшей, добавляет вставленный код в пространственный индекс
+        и направляет его чтения на основной сервер, пока реплики могут его еще не получить."""
+        self.connection.note_written((postal_data['post code'], ))
+        if self.cache is not None:
+            self.cache.invalidate(postal_data['post code'])
+        if self.negative_cache is not None:
+            self.negative_cache.invalidate(postal_data['post code'])
+        if self.geo_index is not None:
+            self.geo_index.add(postal_data['post code'], PostalCodeInfo.from_api_data(postal_data))
+
+    def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """Вставляет пакет данных о почтовых кодах одним запросом `execute_values`.
+        Коды, которые уже есть в таблице (например, вставлены параллельным запросом), пропускаются.
+        Если вставка не выполнена (ошибка записана в лог), кэши и индексы не изменяются.
+            :param postal_data_list: Список словарей с информацией о почтовых данных."""
         query = '''
-            INSERT INTO postal_codes 
+            INSERT INTO postal_codes
             (post_code, country, country_abbreviation, place_name, longitude, latitude, state, state_abbreviation)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+            VALUES %s
+            ON CONFLICT (post_code) DO NOTHING;
         '''
-        self.connection.execute_query(query, (
+        rows = [(
             postal_data['post code'],
             postal_data['country'],
             postal_data['country abbreviation'],
@@ -62,31 +218,38 @@ class Psycopg2Client(BaseClient):
             postal_data['places'][0]['latitude'],
             postal_data['places'][0]['state'],
             postal_data['places'][0]['state abbreviation']
-        ), commit=True)
+        ) for postal_data in postal_data_list]
+        with _metrics.db_insert.time():
+            inserted = self.connection.execute_values(query, rows, page_size=Data.BATCH_CHUNK_SIZE)
+        if not inserted:
+            return
+        for postal_data in postal_data_list:
+            self._register_inserted(postal_data)
 
     def increment_request_statistic(self, postal_code: str) -> None:
-        """Обновляет или создает запись статистики запросов для заданного почтового кода.
+        """Увеличивает счетчик запросов для заданного почтового кода: через накопитель статистики, если он задан,
+        иначе сразу одним запросом UPSERT.
         :param postal_code: Строка, представляющая почтовый код, для которого необходимо обновить статистику."""
-        query_select = '''
-            SELECT 1 FROM postal_codes_requests_statistics WHERE post_code = %s
-        '''
-        result = self.connection.execute_query(query_select, (postal_code,), fetch_one=True)  # Проверяем существование записи
-
-        query_update = '''
-            UPDATE postal_codes_requests_statistics
-            SET request_count = request_count + 1
-            WHERE post_code = %s
-        '''
-        query_insert = '''
-            INSERT INTO postal_codes_requests_statistics (post_code, request_count)
-            VALUES (%s, 1)
-        '''
-        if result:
-            self.connection.execute_query(query_update, (postal_code,), commit=True)  # Обновляем существующую запись
-        else:
-            self.connection.execute_query(query_insert, (postal_code,), commit=True)  # Создаем новую запись
-
-
-
+        self.increment_request_statistics({postal_code: 1})
 
+    def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Увеличивает счетчики запросов для пакета почтовых кодов: через накопитель статистики, если он задан,
+        иначе сразу одним запросом UPSERT.
+        :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        with _metrics.stats.time():
+            if self.statistics is not None:
+                for postal_code, count in counts.items():
+                    self.statistics.increment(postal_code, count)
+            else:
+                self.flush_request_statistics(counts)
 
+    def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Записывает пакет приростов статистики одним подготовленным запросом `FLUSH_STATISTICS`
+        (INSERT ... ON CONFLICT DO UPDATE).
+        Коды передаются массивами и разворачиваются через unnest, поэтому размер запроса не зависит от размера пакета.
+        :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        if not counts:
+            return
+        postal_codes = sorted(counts)  # Единый порядок блокировок строк при параллельной записи пакетов
+        self.connection.execute_prepared(FLUSH_STATISTICS, (postal_codes, [counts[code] for code in postal_codes]),
+                                         commit=True, raise_errors=True)
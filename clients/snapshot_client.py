@@ -0,0 +1,78 @@
+# clients/snapshot_client.py
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from clients.base_client import BaseClient
+from clients.postal_code_info import PostalCodeInfo
+from service.request_statistics import RequestStatisticsAggregator
+from utils.postal_snapshot import PostalSnapshot
+
+
+class ReadOnlyClientError(PermissionError):
+    """Запись через клиент, который по устройству доступен только для чтения (`SnapshotClient`)."""
+
+
+class SnapshotClient(BaseClient):
+    """Клиент только для чтения, отвечающий на запросы из снимка postal_codes, отображенного в память.
+    Не обращается ни к базе данных, ни к API: коды, которых нет в снимке, возвращаются как `None`.
+    Снимок создается командой `python -m service.snapshot_exporter`."""
+    def __init__(self, snapshot: PostalSnapshot,
+                 statistics: Optional[RequestStatisticsAggregator] = None) -> None:
+        """Инициализирует клиент.
+            :param snapshot: Открытый снимок почтовых кодов.
+            :param statistics: Накопитель статистики запросов, записывающий ее через клиент базы данных;
+                `None` - статистика запросов не учитывается."""
+        self.snapshot = snapshot
+        self.statistics = statistics
+
+    def select_postal_code(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Получает информацию о почтовом коде из снимка.
+            :param postal_code: Почтовый код.
+            :return: Информация о почтовом коде или `None`, если кода нет в снимке."""
+        postal_info = self.snapshot.get(postal_code)
+        if postal_info is not None and self.statistics is not None:
+            self.statistics.increment(postal_code, 1)
+        return postal_info
+
+    def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """Получает информацию о пакете почтовых кодов из снимка.
+            :param postal_codes: Почтовые коды (повторы допускаются и учитываются в статистике).
+            :return: Словарь {почтовый код: PostalCodeInfo или None} в порядке первого появления кода."""
+        requested = Counter(str(postal_code) for postal_code in postal_codes)
+        results = {postal_code: self.snapshot.get(postal_code) for postal_code in requested}
+        self.increment_request_statistics({postal_code: requested[postal_code]
+                                           for postal_code, postal_info in results.items() if postal_info is not None})
+        return results
+
+    def insert_postal_code(self, postal_data: dict) -> None:
+        """Снимок доступен только для чтения.
+            :raises ReadOnlyClientError: Всегда."""
+        raise ReadOnlyClientError("SnapshotClient is read-only; insert postal codes through a database client")
+
+    def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """Снимок доступен только для чтения.
+            :raises ReadOnlyClientError: Всегда."""
+        raise ReadOnlyClientError("SnapshotClient is read-only; insert postal codes through a database client")
+
+    def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """Снимок доступен только для чтения.
+            :raises ReadOnlyClientError: Всегда."""
+        raise ReadOnlyClientError("SnapshotClient is read-only; insert postal codes through a database client")
+
+    def increment_request_statistic(self, postal_code: str) -> None:
+        """Учитывает запрос почтового кода в накопителе статистики, если он подключен.
+            :param postal_code: Почтовый код."""
+        self.increment_request_statistics({postal_code: 1})
+
+    def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Учитывает запросы пакета почтовых кодов в накопителе статистики, если он подключен.
+            :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        if self.statistics is None:
+            return
+        for postal_code, count in counts.items():
+            self.statistics.increment(postal_code, count)
+
+    def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """У снимка нет собственного хранилища статистики: накопитель записывает ее через клиент базы данных.
+            :raises ReadOnlyClientError: Всегда."""
+        raise ReadOnlyClientError("SnapshotClient has no statistics storage; use a database client's writer")
@@ -1,61 +1,221 @@
 # models/sqlalchemy_client.py
-from typing import Optional
+import logging
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
 
-from sqlalchemy import select
+from psycopg2.errors import InvalidSqlStatementName
+
+from sqlalchemy import String, any_, bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert
+from sqlalchemy.exc import ProgrammingError, SQLAlchemyError
 
 from clients.base_client import BaseClient
 from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from models.postal_queries import LOOKUP_AND_COUNT
 from models.sqlalchemy_models import PostalCode, PostalCodeRequestStatistics
 from utils.custom_logger import CustomLogger
+from utils.geo_index import GeoIndex
+from utils.metrics import StageMetrics
+from utils.prepared_statements import PREPARED_STATEMENTS
 from utils.sqlalchemy_connection import SQLAlchemyConnection
+from service.negative_cache import NegativeLookupCache
+from service.request_statistics import RequestStatisticsAggregator
+from utils.ttl_cache import BaseCache
 
 custom_logger = CustomLogger(__name__)
+_metrics = StageMetrics("sqlalchemy")
 
 class SqlAlchemyClient(BaseClient):
     """ Клиент для взаимодействия с базой данных через SQLAlchemy."""
-    def __init__(self, connection: SQLAlchemyConnection) -> None:
+    def __init__(self, connection: SQLAlchemyConnection, cache: Optional[BaseCache] = None,
+                 negative_cache: Optional[NegativeLookupCache] = None,
+                 statistics: Optional[RequestStatisticsAggregator] = None,
+                 geo_index: Optional[GeoIndex] = None) -> None:
         """
         Инициализация клиента с соединением с базой данных.
 
+        Каждая операция открывает собственную сессию через `connection.get_session()`,
+        поэтому один клиент можно использовать для любого количества запросов.
+
         :param connection: Соединение с базой данных.
+        :param cache: Кэш объектов `PostalCodeInfo` перед базой данных (может быть общим для нескольких клиентов);
+            `None` - без кэширования.
+        :param negative_cache: Кэш почтовых кодов, которые недавно не удалось получить из API;
+            такие коды не запрашиваются повторно ни из базы данных, ни из API.
+        :param statistics: Накопитель статистики запросов для отложенной пакетной записи;
+            `None` - статистика записывается сразу при каждом запросе.
+        :param geo_index: Пространственный индекс для поиска ближайших кодов; вставленные коды
+            добавляются в него; `None` - индекс не ведется.
         """
         self.connection = connection
-        self.session = connection.get_session()
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.statistics = statistics
+        self.geo_index = geo_index
 
     def select_postal_code(self, postal_code) -> Optional[PostalCodeInfo]:
         """
-        Получение информации о почтовом коде из базы данных или API.
+        Получение информации о почтовом коде из кэша, базы данных или API.
 
-        Если почтовый код не найден в базе данных, то происходит запрос к API.
+        Если почтовый код не найден в кэше и базе данных, то происходит запрос к API.
 
         :param postal_code: Почтовый код для поиска.
         :return: Информация о почтовом коде или None, если не найдено.
         """
-
+        started = time.perf_counter()
+        if self.cache is not None:
+            with _metrics.cache.time():
+                postal_info = self.cache.get(postal_code)
+            if postal_info is not None:
+                self.increment_request_statistic(postal_code)  # Попадание в кэш тоже учитывается в статистике
+                _metrics.lookup_done(started, "cache_hit")
+                return postal_info
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            _metrics.lookup_done(started, "not_found")
+            return None
         postal_info = self.get_postal_code_from_db(postal_code)
+        result = "db_hit"
         if not postal_info:
             from service.api_db_service import ApiDBService
-            return ApiDBService(self).fetch_postal_code_from_api(postal_code)
+            postal_info = ApiDBService(self, self.negative_cache).fetch_postal_code_from_api(postal_code)
+            result = "api_hit" if postal_info else "not_found"
+        if postal_info and self.cache is not None:
+            self.cache.set(postal_code, postal_info)
+        _metrics.lookup_done(started, result)
         return postal_info
 
+    def select_postal_codes(self, postal_codes: Iterable[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """
+        Получение информации о пакете почтовых кодов из кэша, базы данных или API.
+
+        Коды, отсутствующие в кэше, выбираются из базы данных пачками запросов `WHERE post_code = ANY(...)`,
+        отсутствующие в базе данных загружаются из API и вставляются одной пакетной вставкой;
+        статистика всего пакета записывается одним запросом.
+
+        :param postal_codes: Почтовые коды (повторы допускаются и учитываются в статистике).
+        :return: Словарь {почтовый код: информация или None} в порядке первого появления кода.
+        """
+        requested = Counter(str(postal_code) for postal_code in postal_codes)
+        results: Dict[str, Optional[PostalCodeInfo]] = {}
+        pending = []
+        for postal_code in requested:
+            postal_info = self.cache.get(postal_code) if self.cache is not None else None
+            if postal_info is not None:
+                results[postal_code] = postal_info
+            elif self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+                results[postal_code] = None
+            else:
+                pending.append(postal_code)
+        _metrics.count("cache_hit", sum(postal_info is not None for postal_info in results.values()))
+
+        found = self.get_postal_codes_from_db(pending)
+        missing = [postal_code for postal_code in pending if postal_code not in found]
+        db_hits = len(found)
+        if missing:
+            from service.api_db_service import ApiDBService
+            found.update(ApiDBService(self, self.negative_cache).fetch_postal_codes_from_api(missing))
+        if self.cache is not None:
+            for postal_code, postal_info in found.items():
+                if postal_info is not None:
+                    self.cache.set(postal_code, postal_info)
+        results.update(found)
+        _metrics.count("db_hit", db_hits)
+        _metrics.count("api_hit", sum(postal_info is not None for postal_info in found.values()) - db_hits)
+        _metrics.count("not_found", len(requested) - sum(postal_info is not None for postal_info in results.values()))
+
+        self.increment_request_statistics({postal_code: requested[postal_code]
+                                           for postal_code, postal_info in results.items() if postal_info is not None})
+        return {postal_code: results.get(postal_code) for postal_code in requested}
+
+    def get_postal_codes_from_db(self, postal_codes: List[str]) -> Dict[str, PostalCodeInfo]:
+        """
+        Получение информации о пакете почтовых кодов из базы данных запросами `ANY(...)`
+        по `Data.BATCH_CHUNK_SIZE` кодов. Статистика запросов не увеличивается; запросы выполняются на реплике,
+        если она настроена.
+
+        :param postal_codes: Список почтовых кодов.
+        :return: Словарь {почтовый код: информация} только для найденных кодов.
+        """
+        found: Dict[str, PostalCodeInfo] = {}
+        if not postal_codes:
+            return found
+        # Весь пакет передается одним параметром-массивом, поэтому текст запроса не зависит от размера пакета
+        query = select(PostalCode.post_code, PostalCode.longitude, PostalCode.latitude, PostalCode.country,
+                       PostalCode.state).where(
+            PostalCode.post_code == any_(bindparam("post_codes", type_=ARRAY(String))))
+
+        def lookup(session) -> Dict[str, PostalCodeInfo]:
+            # При повторе на основном сервере результат собирается заново
+            found.clear()
+            for start in range(0, len(postal_codes), Data.BATCH_CHUNK_SIZE):
+                chunk = postal_codes[start:start + Data.BATCH_CHUNK_SIZE]
+                for post_code, *columns in session.execute(query, {"post_codes": chunk}).fetchall():
+                    found[post_code] = PostalCodeInfo(*columns)
+            return found
+
+        with _metrics.db_select.time():
+            return self.connection.read(lookup, keys=postal_codes)
+
     def get_postal_code_from_db(self, postal_code: str)-> Optional[PostalCodeInfo]:
         """
-        Получение информации о почтовом коде из базы данных.
+        Получение информации о почтовом коде из базы данных с учетом найденного кода в статистике.
+        Без накопителя статистики поиск и UPSERT статистики выполняются одним подготовленным запросом
+        `LOOKUP_AND_COUNT` за одно обращение к основному серверу; с накопителем код читается на реплике,
+        если она настроена.
 
         :param postal_code: Почтовый код для поиска.
         :return: Информация о почтовом коде или None, если не найдено.
         """
+        if self.statistics is None:
+            return self._lookup_and_count(str(postal_code))
         query = select(PostalCode.longitude, PostalCode.latitude, PostalCode.country, PostalCode.state).where(
             PostalCode.post_code == str(postal_code))
-        with self.session as session:
-            result = session.execute(query).fetchone()
+        with _metrics.db_select.time():
+            result = self.connection.read(lambda session: session.execute(query).fetchone(),
+                                          keys=(str(postal_code), ))
         if result is None:
-            custom_logger.log_with_context(f"No postal data {postal_code} found in database")
+            custom_logger.log_with_context("No postal data %s found in database", postal_code,
+                                          sample_every=Data.LOG_SAMPLE_EVERY)
             return None
         postal_info = PostalCodeInfo(*result)
         self.increment_request_statistic(postal_code)
         return postal_info
 
+    def _lookup_and_count(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Выполняет `LOOKUP_AND_COUNT` на соединении сессии, подготавливая запрос при первом использовании
+        соединения пула; транзакция фиксируется, только если код найден (иначе записывать нечего).
+        Если сервер запрос не помнит (соединение переоткрыто пулером, `DISCARD ALL`), запрос подготавливается
+        повторно и выполняется еще раз, как в `Psycopg2Connection.execute_prepared`."""
+        with _metrics.db_select.time(), self.connection.get_session() as session:
+            for attempt in range(2):
+                # После rollback сессия может получить из пула другое соединение
+                dbapi_connection = session.connection().connection.dbapi_connection
+                if not PREPARED_STATEMENTS.is_prepared(dbapi_connection, LOOKUP_AND_COUNT):
+                    session.execute(text(LOOKUP_AND_COUNT.prepare_sql()))
+                    PREPARED_STATEMENTS.mark_prepared(dbapi_connection, LOOKUP_AND_COUNT)
+                try:
+                    with PREPARED_STATEMENTS.metrics(LOOKUP_AND_COUNT).duration.time():
+                        result = session.execute(text(LOOKUP_AND_COUNT.execute_sql([":post_code"])),
+                                                 {"post_code": postal_code}).fetchone()
+                    break
+                except ProgrammingError as e:
+                    if attempt or not isinstance(e.orig, InvalidSqlStatementName):
+                        raise
+                    custom_logger.log_with_context("Prepared statement %s is missing on connection %s, re-preparing",
+                                                   LOOKUP_AND_COUNT.name, id(dbapi_connection),
+                                                   level=logging.WARNING)
+                    session.rollback()
+                    PREPARED_STATEMENTS.forget(dbapi_connection)
+            if result is not None:
+                session.commit()
+        if result is None:
+            custom_logger.log_with_context("No postal data %s found in database", postal_code,
+                                          sample_every=Data.LOG_SAMPLE_EVERY)
+            return None
+        return PostalCodeInfo(*result)
+
     def insert_postal_code(self, postal_data: dict) -> None:
         """
         Вставка информации о почтовых данных в базу данных.
@@ -72,23 +232,116 @@ class SqlAlchemyClient(BaseClient):
             state=postal_data['places'][0]['state'],
             state_abbreviation=postal_data['places'][0]['state abbreviation']
         )
-        with self.session as session:
+        with _metrics.db_insert.time(), self.connection.get_session() as session:
             session.add(postal_info)
             session.commit()
+        self._register_inserted(postal_data)
+
+    def insert_fetched_postal_code(self, postal_code: str, postal_data: dict) -> bool:
+        """
+        Сохраняет почтовый код, полученный из API при промахе: INSERT ... ON CONFLICT DO NOTHING RETURNING
+        и UPSERT статистики в одной сессии с одним commit. При заданном накопителе статистика учитывается в нем.
+        Если запрос не выполнен (ошибка записана в лог, транзакция отменена), ни статистика, ни кэши и индексы
+        не изменяются.
+
+        :param postal_code: Запрошенный почтовый код (для статистики).
+        :param postal_data: Словарь с информацией о почтовых данных.
+        :return: `True`, если строка вставлена; `False`, если код уже был в базе данных или запрос не выполнен.
+        """
+        statement = insert(PostalCode).values(self._postal_code_row(postal_data)).on_conflict_do_nothing(
+            index_elements=[PostalCode.post_code]).returning(PostalCode.post_code)
+        try:
+            with _metrics.db_insert.time(), self.connection.get_session() as session:
+                inserted = session.execute(statement).first() is not None
+                if self.statistics is None:
+                    session.execute(self._statistics_upsert({postal_code: 1}))
+                session.commit()
+        except SQLAlchemyError as e:  # Сессия при закрытии откатывает незафиксированную транзакцию
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
+            return False
+        if self.statistics is not None:
+            self.statistics.increment(postal_code, 1)
+        self._register_inserted(postal_data)
+        return inserted
+
+    @staticmethod
+    def _postal_code_row(postal_data: dict) -> dict:
+        """Значения столбцов postal_codes из данных API."""
+        return {
+            "post_code": postal_data['post code'],
+            "country": postal_data['country'],
+            "country_abbreviation": postal_data['country abbreviation'],
+            "place_name": postal_data['places'][0]['place name'],
+            "longitude": postal_data['places'][0]['longitude'],
+            "latitude": postal_data['places'][0]['latitude'],
+            "state": postal_data['places'][0]['state'],
+            "state_abbreviation": postal_data['places'][0]['state abbreviation'],
+        }
+
+    def _register_inserted(self, postal_data: dict) -> None:
+        """Сбрасывает устаревшие записи кэшей, добавляет вставленный код в пространственный индекс
+        и направляет его чтения на основной сервер, пока реплики могут его еще не получить."""
+        self.connection.note_written((postal_data['post code'], ))
+        if self.cache is not None:
+            self.cache.invalidate(postal_data['post code'])
+        if self.negative_cache is not None:
+            self.negative_cache.invalidate(postal_data['post code'])
+        if self.geo_index is not None:
+            self.geo_index.add(postal_data['post code'], PostalCodeInfo.from_api_data(postal_data))
+
+    def insert_postal_codes(self, postal_data_list: List[dict]) -> None:
+        """
+        Вставка пакета данных о почтовых кодах одним запросом `INSERT ... VALUES (...), (...)`.
+        Коды, которые уже есть в таблице (например, вставлены параллельным запросом), пропускаются.
+
+        :param postal_data_list: Список словарей с информацией о почтовых данных.
+        """
+        if not postal_data_list:
+            return
+        rows = [self._postal_code_row(postal_data) for postal_data in postal_data_list]
+        with _metrics.db_insert.time(), self.connection.get_session() as session:
+            for start in range(0, len(rows), Data.BATCH_CHUNK_SIZE):
+                statement = insert(PostalCode).values(rows[start:start + Data.BATCH_CHUNK_SIZE])
+                session.execute(statement.on_conflict_do_nothing(index_elements=[PostalCode.post_code]))
+            session.commit()
+        for postal_data in postal_data_list:
+            self._register_inserted(postal_data)
 
     def increment_request_statistic(self, postal_code: str) -> None:
-        """Обновляет или создает запись статистики запросов для заданного почтового кода.
+        """Увеличивает счетчик запросов для заданного почтового кода: через накопитель статистики, если он задан,
+        иначе сразу одним запросом UPSERT.
                :param postal_code: Строка, представляющая почтовый код, для которого необходимо обновить статистику."""
+        self.increment_request_statistics({postal_code: 1})
 
-        with self.session as session:
-            # statistic = session.execute(
-            #     select(PostalCodeRequestStatistics).where(PostalCodeRequestStatistics.post_code == postal_code)
-            # ).scalars().first()
-            statistic = session.query(PostalCodeRequestStatistics).filter_by(post_code=postal_code).first()
-            if statistic:
-                statistic.request_count += 1
+    def increment_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Увеличивает счетчики запросов для пакета почтовых кодов: через накопитель статистики, если он задан,
+        иначе сразу одним запросом UPSERT.
+               :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        with _metrics.stats.time():
+            if self.statistics is not None:
+                for postal_code, count in counts.items():
+                    self.statistics.increment(postal_code, count)
             else:
-                statistic = PostalCodeRequestStatistics(post_code=postal_code, request_count=1)
-                session.add(statistic)
+                self.flush_request_statistics(counts)
+
+    def flush_request_statistics(self, counts: Dict[str, int]) -> None:
+        """Записывает пакет приростов статистики одним запросом INSERT ... ON CONFLICT DO UPDATE без загрузки ORM-объектов.
+               :param counts: Словарь {почтовый код: прирост счетчика запросов}."""
+        if not counts:
+            return
+        with self.connection.get_session() as session:
+            session.execute(self._statistics_upsert(counts))
+            session.commit()
 
-            session.commit()
\ No newline at end of file
+    @staticmethod
+    def _statistics_upsert(counts: Dict[str, int]) -> Insert:
+        """Запрос INSERT ... ON CONFLICT DO UPDATE, прибавляющий приросты к счетчикам запросов."""
+        statement = insert(PostalCodeRequestStatistics).values([
+            {"post_code": postal_code, "request_count": counts[postal_code]}
+            for postal_code in sorted(counts)  # Единый порядок блокировок строк при параллельной записи пакетов
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[PostalCodeRequestStatistics.post_code],
+            set_={"request_count": func.coalesce(PostalCodeRequestStatistics.request_count, 0)
+                                   + statement.excluded.request_count})
+        return statement
@@ -2,6 +2,7 @@
 
 import os
 from dotenv import load_dotenv
+from psycopg2.extensions import make_dsn
 
 load_dotenv()  # Загружаем переменные окружения из .env файла
 
@@ -16,6 +17,108 @@ class Data:
     DB_PASS = os.getenv("DB_PASS")
     DB_NAME = os.getenv("DB_NAME")
     DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # make_dsn экранирует значения: пробелы, кавычки и \ в пароле или имени базы не ломают строку подключения
+    DB_DSN = make_dsn(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASS)
+
+    # Размеры общего пула psycopg2. Пул psycopg2 держит открытыми не более DB_POOL_MIN простаивающих соединений,
+    # остальные закрываются при возврате, поэтому DB_POOL_MIN стоит выбирать близким к ожидаемой конкурентности.
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+    # Сколько секунд ждать свободное соединение, когда все DB_POOL_MAX соединений заняты.
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+    # Реплики только для чтения: "host:port" через запятую (пользователь, пароль и база данных - как у DB_HOST).
+    # Чтения почтовых кодов распределяются по репликам по кругу (round_robin) или на реплику с наименьшей
+    # задержкой (least_latency), записи идут на DB_HOST. Реплика с отставанием больше DB_REPLICA_MAX_LAG секунд
+    # (проверяется раз в DB_REPLICA_CHECK_INTERVAL секунд) не используется, после ошибки соединения она
+    # исключается на DB_REPLICA_RETRY_AFTER секунд.
+    DB_REPLICAS = [replica.strip() for replica in os.getenv("DB_REPLICAS", "").split(",") if replica.strip()]
+    DB_REPLICA_SELECTION = os.getenv("DB_REPLICA_SELECTION", "round_robin")
+    DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+    DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1"))
+    DB_REPLICA_RETRY_AFTER = float(os.getenv("DB_REPLICA_RETRY_AFTER", "30"))
+
+    # Настройки пула общего движка SQLAlchemy.
+    SQLALCHEMY_POOL_SIZE = int(os.getenv("SQLALCHEMY_POOL_SIZE", "5"))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", "5"))
+    SQLALCHEMY_POOL_RECYCLE = int(os.getenv("SQLALCHEMY_POOL_RECYCLE", "3600"))
+
+    # Кэш результатов select_postal_code: максимальное число записей и время жизни записи в секундах.
+    CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+    # Кэш индексов, не полученных из API: отсутствующие в API индексы (404) помнятся долго, временные ошибки - недолго.
+    NEGATIVE_CACHE_MAX_SIZE = int(os.getenv("NEGATIVE_CACHE_MAX_SIZE", "50000"))
+    NEGATIVE_CACHE_NOT_FOUND_TTL = float(os.getenv("NEGATIVE_CACHE_NOT_FOUND_TTL", "86400"))
+    NEGATIVE_CACHE_FAILURE_TTL = float(os.getenv("NEGATIVE_CACHE_FAILURE_TTL", "30"))
+
+    # Отложенная запись статистики запросов: период записи в секундах и порог накопленных увеличений.
+    # STATS_FLUSH_INTERVAL=0 отключает накопление - каждое увеличение сразу записывается в базу данных.
+    STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "1"))
+    STATS_FLUSH_THRESHOLD = int(os.getenv("STATS_FLUSH_THRESHOLD", "1000"))
+
+    # Пакетная обработка: сколько кодов передавать в одном запросе к базе данных
+    # и сколько параллельных запросов к API выполнять при загрузке отсутствующих кодов.
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+    API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "8"))
+
+    # Базовый адрес API почтовых индексов (переопределяется, например, для локальной заглушки в бенчмарках).
+    API_BASE_URL = os.getenv("API_BASE_URL", "https://api.zippopotam.us")
+
+    # HTTP-клиент API: размер пула keep-alive соединений, таймауты подключения и чтения в секундах,
+    # количество повторов при ответах 429/5xx и сетевых ошибках, база и потолок экспоненциальной задержки.
+    API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+    API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+    API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "10"))
+    API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+    API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "0.5"))
+    API_BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "10"))
+
+    # Сколько секунд запрос ждет результат одновременного запроса того же почтового кода к API.
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "30"))
+
+    # Прореживание частых сообщений журнала (промахи базы данных и API): выводится одно из LOG_SAMPLE_EVERY.
+    LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "1"))
+
+    # HTTP-сервис (`python main.py serve`): адрес, клиент базы данных (psycopg2 или sqlalchemy), количество
+    # одновременно обрабатываемых запросов, время простоя keep-alive соединения, максимальный размер пакета
+    # POST /postal и сколько секунд при остановке дожидаться завершения уже принятых запросов.
+    HTTP_HOST = os.getenv("HTTP_HOST", "127.0.0.1")
+    HTTP_PORT = int(os.getenv("HTTP_PORT", "8080"))
+    HTTP_CLIENT = os.getenv("HTTP_CLIENT", "psycopg2")
+    HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "16"))
+    HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "15"))
+    HTTP_MAX_BATCH = int(os.getenv("HTTP_MAX_BATCH", "1000"))
+    HTTP_DRAIN_TIMEOUT = float(os.getenv("HTTP_DRAIN_TIMEOUT", "30"))
+
+    # Геопоиск: ограничение памяти в байтах на вычисление одного блока строк матрицы расстояний
+    # (сама матрица 10 000 × 10 000 в float32 занимает еще 400 МБ).
+    GEO_MATRIX_BLOCK_BYTES = int(os.getenv("GEO_MATRIX_BLOCK_BYTES", str(64 * 1024 * 1024)))
+
+    # Нечеткий поиск по названию населенного пункта: минимальное сходство триграмм (0..1) по умолчанию.
+    FUZZY_SIMILARITY_THRESHOLD = float(os.getenv("FUZZY_SIMILARITY_THRESHOLD", "0.3"))
+
+    # Метрики задержек: порт HTTP-эндпоинта /metrics в формате Prometheus (0 - не запускать)
+    # и файл, в который метрики записываются при завершении процесса (пусто - не записывать).
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_DUMP_PATH = os.getenv("METRICS_DUMP_PATH", "")
+
+    @classmethod
+    def replica_address(cls, replica: str) -> tuple:
+        """Хост и порт реплики `host[:port]` (по умолчанию порт - DB_PORT)."""
+        host, separator, port = replica.rpartition(":")
+        return (host, port) if separator else (replica, cls.DB_PORT)
+
+    @classmethod
+    def replica_dsn(cls, replica: str) -> str:
+        """Строка подключения psycopg2 к реплике `host[:port]`."""
+        host, port = cls.replica_address(replica)
+        return make_dsn(host=host, port=port, dbname=cls.DB_NAME, user=cls.DB_USER, password=cls.DB_PASS)
+
+    @classmethod
+    def replica_url(cls, replica: str) -> str:
+        """URL SQLAlchemy реплики `host[:port]`."""
+        host, port = cls.replica_address(replica)
+        return f"postgresql+psycopg2://{cls.DB_USER}:{cls.DB_PASS}@{host}:{port}/{cls.DB_NAME}"
 
     @classmethod
     def validate(cls) -> None:
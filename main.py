@@ -1,50 +1,183 @@
 # main.py
+import argparse
+import sys
+from typing import Optional
 
+from clients.api_client import ApiClient
+from clients.base_client import BaseClient
 from clients.sqlalchemy_client import SqlAlchemyClient
+from config.db_data import Data
 from utils.psycopg2_connection import Psycopg2Connection
 from clients.psycopg2_client import Psycopg2Client
+from service.batch_lookup import WRITERS, BatchLookup, format_summary, iter_postal_codes
+from service.autocomplete_service import AutocompleteService
+from service.geo_service import GeoService
+from service.place_search_service import PlaceSearchService
+from service.http_server import PostalLookupServer, serve
+from service.negative_cache import NegativeLookupCache
+from service.request_statistics import RequestStatisticsAggregator
+from utils.psycopg2_pool import Psycopg2PoolRegistry
 from utils.sqlalchemy_connection import SQLAlchemyConnection
+from utils.sqlalchemy_engine import SQLAlchemyEngineRegistry
+from utils.geo_index import GeoIndex
+from utils.metrics import REGISTRY
+from utils.postal_snapshot import PostalSnapshot
+from utils.ttl_cache import LRUTTLCache
 
-def main():
+CLIENT_NAMES = ("psycopg2", "sqlalchemy")
+
+
+def main(argv=None):
+    """Точка входа: интерактивный режим (по умолчанию) или HTTP-сервис (`serve`)."""
+    parser = argparse.ArgumentParser(description="Поиск информации о почтовых индексах РФ")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("interactive", help="interactive lookups from the terminal (default)")
+    serve_parser = subparsers.add_parser("serve", help="long-running HTTP lookup service")
+    serve_parser.add_argument("--host", default=Data.HTTP_HOST)
+    serve_parser.add_argument("--port", type=int, default=Data.HTTP_PORT)
+    serve_parser.add_argument("--client", choices=CLIENT_NAMES, default=Data.HTTP_CLIENT)
+    serve_parser.add_argument("--workers", type=int, default=Data.HTTP_WORKERS, help="concurrent lookups")
+    serve_parser.add_argument("--geo-index", action="store_true",
+                              help="load postal_codes into memory and serve GET /nearest and GET /within")
+    serve_parser.add_argument("--autocomplete", choices=("memory", "db"),
+                              help="serve GET /autocomplete from an in-memory prefix index or from the database")
+    serve_parser.add_argument("--fuzzy", choices=("memory", "db"),
+                              help="serve GET /places from an in-memory trigram index or from pg_trgm in the database")
+    serve_parser.add_argument("--fuzzy-snapshot", metavar="PATH",
+                              help="build the in-memory trigram index from a postal_codes snapshot file")
+    serve_parser.add_argument("--drain-timeout", type=float, default=Data.HTTP_DRAIN_TIMEOUT,
+                              help="seconds to wait for in-flight requests on shutdown")
+    batch_parser = subparsers.add_parser("batch", help="look up codes from a file or stdin, write JSONL/CSV")
+    batch_parser.add_argument("--input", default="-", help="file with one postal code per line (default: stdin)")
+    batch_parser.add_argument("--output", default="-", help="results file (default: stdout)")
+    batch_parser.add_argument("--format", choices=sorted(WRITERS), help="output format (default: by extension, jsonl)")
+    batch_parser.add_argument("--client", choices=CLIENT_NAMES, default="psycopg2")
+    batch_parser.add_argument("--chunk-size", type=int, default=Data.BATCH_CHUNK_SIZE, help="codes per batch query")
+    batch_parser.add_argument("--workers", type=int, default=1, help="batches processed in parallel")
+    args = parser.parse_args(argv)
+
+    clients = {}
+    metrics_server = REGISTRY.start_http_server(Data.METRICS_PORT) if Data.METRICS_PORT else None
+    try:
+        if args.command == "serve":
+            geo_service = None
+            if args.geo_index:
+                geo_service = GeoService()
+                geo_service.load(Psycopg2Connection())
+            clients[args.client] = _create_client(args.client, *_create_caches(),
+                                                  geo_index=geo_service.index if geo_service else None)
+            autocomplete_service = AutocompleteService(Psycopg2Connection()) if args.autocomplete else None
+            if args.autocomplete == "memory":
+                autocomplete_service.load()
+            place_search_service = _create_place_search_service(args.fuzzy, args.fuzzy_snapshot)
+            server = PostalLookupServer((args.host, args.port), clients[args.client], max_workers=args.workers,
+                                        geo_service=geo_service, autocomplete_service=autocomplete_service,
+                                        place_search_service=place_search_service)
+            serve(server, args.drain_timeout)
+        elif args.command == "batch":
+            clients[args.client] = _create_client(args.client, *_create_caches())
+            _run_batch(args, clients[args.client])
+        else:
+            _interactive_loop(clients)
+    finally:
+        for client in clients.values():
+            if client.statistics is not None:
+                client.statistics.close()  # Дописываем накопленную статистику до закрытия пулов
+        Psycopg2PoolRegistry.close_all()
+        SQLAlchemyEngineRegistry.dispose_all()
+        ApiClient.close_shared()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if Data.METRICS_DUMP_PATH:
+            REGISTRY.dump(Data.METRICS_DUMP_PATH)
+
+
+def _run_batch(args: argparse.Namespace, client: BaseClient) -> None:
+    """Пакетный режим: коды читаются потоком, результаты записываются по мере готовности, сводка - в stderr."""
+    output_format = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    target = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        batch = BatchLookup(client, WRITERS[output_format](target), chunk_size=args.chunk_size, workers=args.workers)
+        summary = batch.run(iter_postal_codes(source), progress_every=100000)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print(format_summary(summary), file=sys.stderr)
+
+
+def _create_caches():
+    """Создает кэши результатов, общие для всех клиентов процесса."""
+    cache = LRUTTLCache(max_size=Data.CACHE_MAX_SIZE, ttl=Data.CACHE_TTL)
+    negative_cache = NegativeLookupCache(max_size=Data.NEGATIVE_CACHE_MAX_SIZE,
+                                         not_found_ttl=Data.NEGATIVE_CACHE_NOT_FOUND_TTL,
+                                         failure_ttl=Data.NEGATIVE_CACHE_FAILURE_TTL)
+    return cache, negative_cache
+
+
+def _create_client(client_name: str, cache: LRUTTLCache, negative_cache: NegativeLookupCache,
+                   geo_index: Optional[GeoIndex] = None) -> BaseClient:
+    """Создает долгоживущий клиент: соединения берутся из общего пула (psycopg2)
+    или общего движка с отдельной сессией на каждую операцию (SQLAlchemy)."""
+    if client_name == "psycopg2":
+        client = Psycopg2Client(Psycopg2Connection(), cache=cache, negative_cache=negative_cache, geo_index=geo_index)
+    else:
+        conn = SQLAlchemyConnection()
+        conn.connect()
+        client = SqlAlchemyClient(conn, cache=cache, negative_cache=negative_cache, geo_index=geo_index)
+    return _enable_write_behind_statistics(client)
+
+
+def _create_place_search_service(mode: Optional[str], snapshot_path: Optional[str]) -> Optional[PlaceSearchService]:
+    """Создает сервис нечеткого поиска по названию: индекс из снимка (без базы данных), индекс в памяти
+    по таблице postal_codes или поиск через pg_trgm в базе данных; `None`, если поиск не включен."""
+    if snapshot_path:
+        service = PlaceSearchService()
+        with PostalSnapshot(snapshot_path) as snapshot:
+            service.load_snapshot(snapshot)
+        return service
+    if mode is None:
+        return None
+    service = PlaceSearchService(Psycopg2Connection())
+    if mode == "memory":
+        service.load()
+    return service
+
+
+def _enable_write_behind_statistics(client: BaseClient) -> BaseClient:
+    """Подключает к клиенту накопитель статистики, если отложенная запись не отключена настройками."""
+    if Data.STATS_FLUSH_INTERVAL > 0:
+        client.statistics = RequestStatisticsAggregator(client.flush_request_statistics,
+                                                        flush_interval=Data.STATS_FLUSH_INTERVAL,
+                                                        flush_threshold=Data.STATS_FLUSH_THRESHOLD)
+    return client
+
+
+def _interactive_loop(clients: dict):
+    """Интерактивный цикл запросов. Клиенты создаются один раз и переиспользуются для всех индексов,
+    кэши результатов общие для обоих клиентов."""
+    cache, negative_cache = _create_caches()
     while True:
         postal_code = input("\nВведите почтовый индекс (или 'exit' для выхода): ").strip()
         if postal_code.lower() == 'exit':
             break
 
         client_type = input("Выберите клиент (1 - Psycopg2, 2 - SQLAlchemy): ").strip()
-
-        if client_type == '1':
-            """Обработка через Psycopg2"""
-            conn = Psycopg2Connection()
-            try:
-                conn.connect()
-                if conn.connection:
-                    client = Psycopg2Client(conn)
-                    result = client.select_postal_code(postal_code)
-                    print("Результат Psycopg2:", result)
-                else:
-                    print("Не удалось подключиться к базе данных через Psycopg2")
-            except Exception as e:
-                print(f"Ошибка Psycopg2: {str(e)}")
-            finally:
-                conn.disconnect()
-
-        elif client_type == '2':
-            """Обработка через SQLAlchemy"""
-            conn = SQLAlchemyConnection()
-            try:
-                conn.connect()
-                client = SqlAlchemyClient(conn)
-                result = client.select_postal_code(postal_code)
-                print("Результат SQLAlchemy:\n", result)
-            except Exception as e:
-                print(f"Ошибка SQLAlchemy: {str(e)}")
-            finally:
-                conn.disconnect()
-
-        else:
+        if client_type not in ('1', '2'):
             print("Неверный выбор клиента. Введите 1 или 2")
+            continue
 
+        client_name = CLIENT_NAMES[int(client_type) - 1]
+        title = "Psycopg2" if client_name == "psycopg2" else "SQLAlchemy"
+        try:
+            if client_name not in clients:
+                clients[client_name] = _create_client(client_name, cache, negative_cache)
+            result = clients[client_name].select_postal_code(postal_code)
+            print(f"Результат {title}:\n", result)
+        except Exception as e:
+            print(f"Ошибка {title}: {str(e)}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,96 @@
+# models/postal_queries.py
+from typing import Any, Tuple
+
+from utils.prepared_statements import PREPARED_STATEMENTS, PreparedStatement
+
+# Горячие запросы клиентов к postal_codes и статистике - серверные подготовленные запросы
+# (`Psycopg2Connection.execute_prepared`): сервер разбирает и планирует каждый из них один раз на соединение.
+# Текст запросов (`.statement`, параметры $1, $2, ...) без изменений выполняет и `AsyncpgClient`, поэтому типы
+# параметров-массивов указаны в тексте явно: asyncpg подготавливает запрос сам и не видит `parameter_types`.
+LOOKUP = PREPARED_STATEMENTS.register(PreparedStatement("postal_lookup", ("varchar", ), '''
+    SELECT longitude, latitude, country, state
+    FROM postal_codes
+    WHERE post_code = $1
+'''))
+
+LOOKUP_BATCH = PREPARED_STATEMENTS.register(PreparedStatement("postal_lookup_batch", ("varchar[]", ), '''
+    SELECT post_code, longitude, latitude, country, state
+    FROM postal_codes
+    WHERE post_code = ANY($1::varchar[])
+'''))
+
+INSERT_POSTAL_CODE = PREPARED_STATEMENTS.register(PreparedStatement("postal_insert", (
+    "varchar", "varchar", "varchar", "varchar", "float8", "float8", "varchar", "varchar"), '''
+    INSERT INTO postal_codes
+    (post_code, country, country_abbreviation, place_name, longitude, latitude, state, state_abbreviation)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+'''))
+
+# Вставка пакета кодов: коды, уже вставленные параллельным запросом, пропускаются без ошибки.
+INSERT_POSTAL_CODE_IF_MISSING = PREPARED_STATEMENTS.register(PreparedStatement("postal_insert_if_missing", (
+    "varchar", "varchar", "varchar", "varchar", "float8", "float8", "varchar", "varchar"), '''
+    INSERT INTO postal_codes
+    (post_code, country, country_abbreviation, place_name, longitude, latitude, state, state_abbreviation)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (post_code) DO NOTHING
+'''))
+
+# Пакет приростов статистики передается массивами и разворачивается через unnest,
+# поэтому один подготовленный запрос подходит для пакета любого размера.
+FLUSH_STATISTICS = PREPARED_STATEMENTS.register(PreparedStatement("postal_flush_statistics", ("varchar[]", "int[]"), '''
+    INSERT INTO postal_codes_requests_statistics (post_code, request_count)
+    SELECT post_code, request_count
+    FROM unnest($1::varchar[], $2::int[]) AS batch(post_code, request_count)
+    ON CONFLICT (post_code) DO UPDATE
+    SET request_count = COALESCE(postal_codes_requests_statistics.request_count, 0) + EXCLUDED.request_count
+'''))
+
+# Поиск почтового кода и учет запроса в статистике за одно обращение к серверу: CTE с INSERT ... ON CONFLICT
+# выполняется всегда, даже если основной SELECT на него не ссылается, и добавляет строку статистики,
+# только если код найден.
+LOOKUP_AND_COUNT = PREPARED_STATEMENTS.register(PreparedStatement("postal_lookup_and_count", ("varchar", ), '''
+    WITH hit AS (
+        SELECT post_code, longitude, latitude, country, state
+        FROM postal_codes
+        WHERE post_code = $1
+    ), counted AS (
+        INSERT INTO postal_codes_requests_statistics (post_code, request_count)
+        SELECT post_code, 1 FROM hit
+        ON CONFLICT (post_code) DO UPDATE
+        SET request_count = COALESCE(postal_codes_requests_statistics.request_count, 0) + EXCLUDED.request_count
+    )
+    SELECT longitude, latitude, country, state FROM hit
+'''))
+
+# Сохранение кода, полученного из API при промахе, одной транзакцией: вставка без ошибки при гонке
+# (код уже вставлен параллельным запросом - ON CONFLICT DO NOTHING) и учет запроса в статистике.
+# Статистика не записывается, если прирост $10 равен нулю (его учитывает накопитель статистики).
+# Запрос возвращает количество действительно вставленных строк (0 или 1).
+INSERT_FETCHED = PREPARED_STATEMENTS.register(PreparedStatement("postal_insert_fetched", (
+    "varchar", "varchar", "varchar", "varchar", "float8", "float8", "varchar", "varchar", "varchar", "int"), '''
+    WITH inserted AS (
+        INSERT INTO postal_codes
+        (post_code, country, country_abbreviation, place_name, longitude, latitude, state, state_abbreviation)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+        ON CONFLICT (post_code) DO NOTHING
+        RETURNING post_code
+    ), counted AS (
+        INSERT INTO postal_codes_requests_statistics (post_code, request_count)
+        SELECT $9::varchar, $10::int WHERE $10::int > 0
+        ON CONFLICT (post_code) DO UPDATE
+        SET request_count = COALESCE(postal_codes_requests_statistics.request_count, 0) + EXCLUDED.request_count
+    )
+    SELECT count(*) FROM inserted
+'''))
+
+
+def insert_fetched_params(postal_code: str, postal_data: dict, request_count: int) -> Tuple[Any, ...]:
+    """Параметры запроса `INSERT_FETCHED`.
+        :param postal_code: Запрошенный почтовый код (для статистики).
+        :param postal_data: Данные о почтовом коде из API.
+        :param request_count: Прирост счетчика запросов; 0 - статистика не записывается.
+        :return: Кортеж параметров $1 ... $10."""
+    place = postal_data['places'][0]
+    return (postal_data['post code'], postal_data['country'], postal_data['country abbreviation'],
+            place['place name'], float(place['longitude']), float(place['latitude']),  # API возвращает строки
+            place['state'], place['state abbreviation'], postal_code, request_count)
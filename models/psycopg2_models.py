@@ -33,19 +33,31 @@ class Psycopg2Models:
             '''
             # Выполнение команды: это создает новую таблицу
             self.conn.cursor.execute(create_table_query)
+            # Индексы те же, что в миграциях Alembic (кроме индекса триграмм, которому нужно расширение pg_trgm):
+            # поиск по префиксу (LIKE 'префикс%') - миграция 79bade7c4df8, остальные - миграция ed19555e88b0
+            self.conn.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS ix_postal_codes_post_code_prefix
+                    ON postal_codes (post_code varchar_pattern_ops);
+                CREATE INDEX IF NOT EXISTS ix_postal_codes_place_name_prefix
+                    ON postal_codes (lower(place_name) varchar_pattern_ops);
+                CREATE INDEX IF NOT EXISTS ix_postal_codes_state_place_name ON postal_codes (state, place_name);
+                CREATE INDEX IF NOT EXISTS ix_postal_codes_place_name ON postal_codes (place_name);
+                CREATE INDEX IF NOT EXISTS ix_postal_codes_coordinates ON postal_codes (latitude, longitude);
+            ''')
 
             create_table_query = '''
                 CREATE TABLE IF NOT EXISTS postal_codes_requests_statistics (
                     post_code VARCHAR(10) PRIMARY KEY NOT NULL,
                     request_count INT DEFAULT 0
-                );
+                ) WITH (fillfactor = 70, autovacuum_vacuum_scale_factor = 0.02, autovacuum_vacuum_threshold = 1000,
+                        autovacuum_analyze_scale_factor = 0.05);  -- HOT-обновления счетчика, см. миграцию ed19555e88b0
             '''
             self.conn.cursor.execute(create_table_query)
             self.conn.connection.commit()
             custom_logger.log_with_context("Tables created successfully.")
 
         except psycopg2.Error as e:
-            custom_logger.log_with_context(f"Error creating tables: {e}")
+            custom_logger.log_with_context("Error creating tables: %s", e)
 
         finally:
             self.conn.disconnect()
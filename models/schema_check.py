@@ -0,0 +1,168 @@
+# models/schema_check.py
+import argparse
+import io
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import MetaData, create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from models.sqlalchemy_models import Base
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# Индексы, которые есть только в миграциях: им нужны объекты, которых нет в моделях (расширение pg_trgm).
+MIGRATION_ONLY_INDEXES = {"ix_postal_codes_place_name_trgm"}
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE (?:IF NOT EXISTS )?(\w+) \((.*)\)", re.S)
+_COLUMN = re.compile(r"^\s*(\w+) ([A-Z]+(?:\(\d+\))?)")
+_CREATE_INDEX = re.compile(r"CREATE (?:UNIQUE )?INDEX (?:IF NOT EXISTS )?(\w+) ON (\w+) (.*)", re.S)
+_ALTER_TYPE = re.compile(r"ALTER TABLE (\w+) ALTER COLUMN (\w+) TYPE ([A-Z]+(?:\(\d+\))?)")
+_SET_STORAGE = re.compile(r"ALTER TABLE (\w+) SET \((.*)\)", re.S)
+
+
+class TableSchema(NamedTuple):
+    """Описание таблицы для сравнения: столбцы с типами, индексы с определениями, параметры хранения."""
+    columns: Dict[str, str]
+    indexes: Dict[str, str]
+    storage: Dict[str, str]
+
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def model_schema(metadata: MetaData = Base.metadata) -> Dict[str, TableSchema]:
+    """Схема, описанная моделями SQLAlchemy (в тех же терминах, что `migration_schema`)."""
+    dialect = postgresql.dialect()
+    schema = {}
+    for table in metadata.sorted_tables:
+        indexes = {index.name: _normalize(str(CreateIndex(index).compile(dialect=dialect))).split(f" ON {table.name} ")[1]
+                   for index in table.indexes}
+        schema[table.name] = TableSchema(
+            {column.name: column.type.compile(dialect=dialect) for column in table.columns}, indexes,
+            {name: str(value) for name, value in table.info.get("storage_parameters", {}).items()})
+    return schema
+
+
+def migration_statements() -> List[str]:
+    """SQL всех миграций от начальной до последней, сгенерированный без подключения к базе данных."""
+    config = Config()
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    script = ScriptDirectory.from_config(config)
+    buffer = io.StringIO()
+    context = MigrationContext.configure(dialect_name="postgresql",
+                                         opts={"as_sql": True, "output_buffer": buffer, "literal_binds": True})
+    with Operations.context(context):
+        for revision in reversed(list(script.walk_revisions("base", "heads"))):
+            revision.module.upgrade()
+    return [_normalize(statement) for statement in buffer.getvalue().split(";") if statement.strip()]
+
+
+def migration_schema() -> Dict[str, TableSchema]:
+    """Схема, которую создает цепочка миграций Alembic."""
+    schema: Dict[str, TableSchema] = {}
+    for statement in migration_statements():
+        if match := _CREATE_TABLE.fullmatch(statement):
+            columns = {}
+            for line in match.group(2).split(", "):
+                column = _COLUMN.match(line)
+                if column and column.group(1) not in ("PRIMARY", "CONSTRAINT", "UNIQUE", "FOREIGN"):
+                    columns[column.group(1)] = column.group(2)
+            schema[match.group(1)] = TableSchema(columns, {}, {})
+        elif match := _CREATE_INDEX.fullmatch(statement):
+            schema[match.group(2)].indexes[match.group(1)] = match.group(3)
+        elif match := _ALTER_TYPE.fullmatch(statement):
+            schema[match.group(1)].columns[match.group(2)] = match.group(3)
+        elif match := _SET_STORAGE.fullmatch(statement):
+            for option in match.group(2).split(","):
+                name, value = (part.strip() for part in option.split("="))
+                schema[match.group(1)].storage[name] = value
+    return schema
+
+
+def compare_models_with_migrations(metadata: MetaData = Base.metadata) -> List[str]:
+    """Сравнивает модели SQLAlchemy со схемой, которую создают миграции.
+        :param metadata: Метаданные моделей.
+        :return: Список расхождений (пустой, если модели и миграции согласованы)."""
+    models, migrations = model_schema(metadata), migration_schema()
+    differences = [f"table {name} is missing in migrations" for name in sorted(models.keys() - migrations.keys())]
+    differences += [f"table {name} is missing in models" for name in sorted(migrations.keys() - models.keys())]
+    for name in sorted(models.keys() & migrations.keys()):
+        model, migration = models[name], migrations[name]
+        for kind, label in zip(TableSchema._fields, ("column", "index", "storage parameter")):
+            expected, actual = getattr(model, kind), getattr(migration, kind)
+            if kind == "indexes":
+                actual = {index: definition for index, definition in actual.items()
+                          if index not in MIGRATION_ONLY_INDEXES}
+            for key in sorted(expected.keys() | actual.keys()):
+                if expected.get(key) != actual.get(key):
+                    differences.append(f"{name}: {label} {key}: models {expected.get(key)!r}, "
+                                       f"migrations {actual.get(key)!r}")
+    return differences
+
+
+def compare_models_with_database(connection: Connection) -> List[str]:
+    """Сравнивает модели SQLAlchemy с базой данных: версию миграций, таблицы, столбцы, индексы
+    (через autogenerate Alembic) и параметры хранения таблиц.
+        :param connection: Соединение SQLAlchemy с проверяемой базой данных.
+        :return: Список расхождений (пустой, если база данных соответствует моделям)."""
+    config = Config()
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    context = MigrationContext.configure(connection, opts={
+        "compare_type": True,
+        "include_object": lambda obj, name, type_, reflected, compare_to: not (
+            type_ == "index" and name in MIGRATION_ONLY_INDEXES),
+        "include_name": lambda name, type_, parent_names: not (type_ == "table" and name == "alembic_version"),
+    })
+    differences = []
+    current = context.get_current_revision()
+    if current != head:
+        differences.append(f"database is at revision {current}, migrations head is {head}")
+    differences.extend(repr(difference) for difference in compare_metadata(context, Base.metadata))
+    for table in Base.metadata.sorted_tables:
+        expected = {name: str(value) for name, value in table.info.get("storage_parameters", {}).items()}
+        options = connection.execute(text("SELECT reloptions FROM pg_class WHERE oid = to_regclass(:name)"),
+                                     {"name": table.name}).scalar() or []
+        actual = dict(option.split("=", 1) for option in options)
+        if actual != expected:
+            differences.append(f"{table.name}: storage parameters {actual}, models {expected}")
+    return differences
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки: `python -m models.schema_check [--database URL]`.
+    Код возврата 1, если модели расходятся с миграциями (или с базой данных)."""
+    parser = argparse.ArgumentParser(description="Check that ORM models, Alembic migrations and the database agree")
+    parser.add_argument("--database", nargs="?", const="", metavar="URL",
+                        help="also compare with a migrated database (default URL: config.db_data.Data.DB_URL)")
+    args = parser.parse_args(argv)
+    differences = compare_models_with_migrations()
+    if args.database is not None:
+        from config.db_data import Data
+        engine = create_engine(args.database or Data.DB_URL)
+        try:
+            with engine.connect() as connection:
+                differences.extend(compare_models_with_database(connection))
+        finally:
+            engine.dispose()
+    for difference in differences:
+        print(difference, file=sys.stderr)
+    custom_logger.log_with_context("Schema check: %s differences", len(differences))
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
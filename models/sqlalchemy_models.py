@@ -1,6 +1,6 @@
 # models/sqlalchemy_models.py
 
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Index, Integer, String, Float, event, text
 from sqlalchemy.orm import declarative_base
 
 # Определяем базовый класс для моделей
@@ -18,10 +18,22 @@ class PostalCode(Base):
     country_abbreviation = Column(String(10), nullable=False)
     place_name = Column(String(100), nullable=False)
     longitude = Column(Float, nullable=False)
-    state = Column(String(100), nullable=False)
+    state = Column(String(255), nullable=False)
     state_abbreviation = Column(String(10))
     latitude = Column(Float, nullable=False)
 
+    # Индексы должны совпадать с миграциями Alembic (проверяется models.schema_check). Индекс триграмм
+    # ix_postal_codes_place_name_trgm создается только миграцией: он зависит от расширения pg_trgm.
+    __table_args__ = (
+        # Поиск по префиксу (LIKE 'префикс%'), см. миграцию 79bade7c4df8
+        Index("ix_postal_codes_post_code_prefix", "post_code", postgresql_ops={"post_code": "varchar_pattern_ops"}),
+        Index("ix_postal_codes_place_name_prefix", text("lower(place_name) varchar_pattern_ops")),
+        # Выборки по субъекту, населенному пункту и прямоугольнику координат, см. миграцию ed19555e88b0
+        Index("ix_postal_codes_state_place_name", "state", "place_name"),
+        Index("ix_postal_codes_place_name", "place_name"),
+        Index("ix_postal_codes_coordinates", "latitude", "longitude"),
+    )
+
 
 class PostalCodeRequestStatistics(Base):
     """Модель для таблицы postal_codes_requests_statistics в базе данных.
@@ -33,6 +45,20 @@ class PostalCodeRequestStatistics(Base):
     post_code = Column(String(10), primary_key=True)
     request_count = Column(Integer, default=0)
 
+    # Запас места на страницах и частая очистка, чтобы увеличения счетчика оставались HOT-обновлениями,
+    # см. миграцию ed19555e88b0. SQLAlchemy не поддерживает WITH (...) для таблиц, поэтому параметры хранения
+    # задаются в info и применяются после создания таблицы (обработчик after_create ниже).
+    __table_args__ = {"info": {"storage_parameters": {"fillfactor": 70, "autovacuum_vacuum_scale_factor": 0.02,
+                                                      "autovacuum_vacuum_threshold": 1000,
+                                                      "autovacuum_analyze_scale_factor": 0.05}}}
+
+
+@event.listens_for(PostalCodeRequestStatistics.__table__, "after_create")
+def _set_storage_parameters(table, connection, **kwargs) -> None:
+    """Применяет параметры хранения из `info["storage_parameters"]` к только что созданной таблице."""
+    options = ", ".join(f"{name} = {value}" for name, value in table.info["storage_parameters"].items())
+    connection.execute(text(f"ALTER TABLE {table.name} SET ({options})"))
+
 def create_tables(engine):
     """Метод создает таблицы в базе данных, если они еще не существуют."""
     # Создаем движок SQLAlchemy
@@ -1,40 +1,110 @@
 #service/api_db_service.py
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from clients.postal_code_info import PostalCodeInfo
 from clients.base_client import BaseClient
 from utils.custom_logger import CustomLogger
 from clients.api_client import ApiClient
+from config.db_data import Data
+from service.negative_cache import NegativeLookupCache
+from utils.single_flight import SingleFlight
 
 custom_logger = CustomLogger(__name__)
 
 class ApiDBService:
     """Класс ApiDBService предназначен для получения данных о почтовых кодах из API и
-       их сохранения в базе данных."""
-    def __init__(self, db_client: BaseClient) -> None:
+       их сохранения в базе данных.
+
+       Одновременные промахи по одному коду, одиночные и пакетные, объединяются: запрос к API и вставку
+       выполняет один поток, остальные получают его результат. Таблица объединения общая для всех
+       экземпляров сервиса."""
+    _flight = SingleFlight()
+
+    def __init__(self, db_client: BaseClient, negative_cache: Optional[NegativeLookupCache] = None,
+                 api_client: Optional[ApiClient] = None) -> None:
         """Инициализирует ApiDBService с клиентом базы данных.
             :param db_client: Экземпляр BaseClient для взаимодействия с базой данных.
+            :param negative_cache: Кэш почтовых кодов, которые недавно не удалось получить из API;
+                `None` - неудачные запросы не запоминаются.
+            :param api_client: Клиент API; по умолчанию общий для процесса `ApiClient.shared()`,
+                чтобы keep-alive соединения с API переиспользовались между запросами.
             :return: None """
         self.db_client = db_client
+        self.negative_cache = negative_cache
+        self.api_client = api_client if api_client is not None else ApiClient.shared()
 
     def fetch_postal_code_from_api(self, postal_code: str) -> Optional[PostalCodeInfo]:
         """Получает данные о почтовом коде из API и сохраняет их в базе данных.
             :param postal_code: Почтовый код, для которого необходимо получить данные.
             :return: Метод возвращает Optional[PostalCodeInfo]: объект PostalCodeInfo с данными о почтовом коде, если запрос успешен;
-            иначе возвращает None, если данные не были получены."""
+            иначе возвращает None, если данные не были получены.
+            :raises TimeoutError: Если одновременный запрос того же кода из другого потока
+                не завершился за `Data.SINGLE_FLIGHT_TIMEOUT` секунд."""
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            custom_logger.log_with_context("Skipping API request for recently failed postal code %s", postal_code)
+            return None
+        return self._fetch_shared(postal_code, count_request=True)
 
-        postal_data = ApiClient().get_postal_data(postal_code)
-        if postal_data:
-            self.db_client.insert_postal_code(postal_data)
+    def _fetch_shared(self, postal_code: str, count_request: bool) -> Optional[PostalCodeInfo]:
+        """Получает код из API и сохраняет его, объединяя одновременные одиночные и пакетные запросы того же кода.
+            :param postal_code: Почтовый код.
+            :param count_request: Учесть запрос в статистике: ведущий вызов учитывает его в транзакции вставки,
+                присоединившийся - отдельным увеличением счетчика.
+            :return: Объект PostalCodeInfo или `None`, если данные не получены."""
+        leader = False
+
+        def fetch_and_store() -> Optional[PostalCodeInfo]:
+            nonlocal leader
+            leader = True
+            return self._fetch_and_store(postal_code, count_request)
+
+        postal_info = self._flight.do(postal_code, fetch_and_store, timeout=Data.SINGLE_FLIGHT_TIMEOUT)
+        if postal_info is not None and count_request and not leader:
             self.db_client.increment_request_statistic(postal_code)
-            return PostalCodeInfo(
-                postal_data['places'][0]['longitude'],
-                postal_data['places'][0]['latitude'],
-                postal_data['country'],
-                postal_data['places'][0]['state']
-            )
+        return postal_info
+
+    def _fetch_and_store(self, postal_code: str, count_request: bool) -> Optional[PostalCodeInfo]:
+        """Получает данные о почтовом коде из API и сохраняет их в базе данных.
+        Выполняется одним потоком на код, остальные одновременные запросы того же кода получают его результат.
+        С учетом статистики вставка и учет запроса выполняются одной транзакцией (`insert_fetched_postal_code`).
+            :param postal_code: Почтовый код.
+            :param count_request: Учесть запрос в статистике.
+            :return: Объект PostalCodeInfo или `None`, если данные не получены."""
+        postal_data, status = self.api_client.fetch_postal_data(postal_code)
+        if postal_data:
+            if count_request:
+                self.db_client.insert_fetched_postal_code(postal_code, postal_data)
+            else:
+                self.db_client.insert_postal_codes([postal_data])
+            return PostalCodeInfo.from_api_data(postal_data)
         else:
-            custom_logger.log_with_context(f"No postal data found from API for {postal_code}")
+            custom_logger.log_with_context("No postal data found from API for %s", postal_code)
+            if self.negative_cache is not None:
+                self.negative_cache.add(postal_code, status)
             return None
 
+    def fetch_postal_codes_from_api(self, postal_codes: List[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """Получает данные о пакете почтовых кодов из API и сохраняет найденные в базе данных.
+        Запросы к API выполняются параллельно (не более `Data.API_MAX_WORKERS` одновременно); каждый код
+        получается и вставляется через общую с `fetch_postal_code_from_api` таблицу объединения, поэтому код,
+        который одновременно запрашивают несколько вызовов, запрашивается из API и вставляется один раз.
+        Статистика запросов не увеличивается: ее учитывает вызывающий клиент вместе с остальным пакетом.
+            :param postal_codes: Список различных почтовых кодов, отсутствующих в базе данных.
+            :return: Словарь {почтовый код: PostalCodeInfo или None, если данные не получены}."""
+        results: Dict[str, Optional[PostalCodeInfo]] = {}
+        to_fetch = []
+        for postal_code in postal_codes:
+            if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+                results[postal_code] = None
+            else:
+                to_fetch.append(postal_code)
+        if not to_fetch:
+            return results
 
+        with ThreadPoolExecutor(max_workers=min(Data.API_MAX_WORKERS, len(to_fetch))) as executor:
+            results.update(zip(to_fetch, executor.map(lambda code: self._fetch_shared(code, count_request=False),
+                                                      to_fetch)))
+        fetched = sum(results[postal_code] is not None for postal_code in to_fetch)
+        custom_logger.log_with_context("Fetched %s of %s postal codes from API", fetched, len(to_fetch))
+        return results
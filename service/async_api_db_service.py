@@ -0,0 +1,92 @@
+# service/async_api_db_service.py
+import asyncio
+from typing import Awaitable, Dict, List, Optional
+
+from clients.async_api_client import AsyncApiClient
+from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from service.negative_cache import NegativeLookupCache
+from utils.custom_logger import CustomLogger
+from utils.single_flight import AsyncSingleFlight
+
+custom_logger = CustomLogger(__name__)
+
+
+class AsyncApiDBService:
+    """Асинхронный аналог `ApiDBService`: получает данные о почтовых кодах из API и сохраняет их в базе данных.
+    Одновременные промахи по одному коду, одиночные и пакетные, объединяются в один запрос к API и одну вставку.
+    Таблица объединения общая для всех экземпляров сервиса."""
+    _flight = AsyncSingleFlight()
+
+    def __init__(self, db_client, api_client: AsyncApiClient,
+                 negative_cache: Optional[NegativeLookupCache] = None) -> None:
+        """Инициализирует сервис.
+            :param db_client: Асинхронный клиент базы данных (`AsyncBaseClient`, например, `AsyncpgClient`).
+            :param api_client: Асинхронный клиент API, общий для всех запросов.
+            :param negative_cache: Кэш почтовых кодов, которые недавно не удалось получить из API."""
+        self.db_client = db_client
+        self.api_client = api_client
+        self.negative_cache = negative_cache
+
+    async def fetch_postal_code_from_api(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Получает данные о почтовом коде из API и сохраняет их в базе данных.
+            :param postal_code: Почтовый код.
+            :return: Объект PostalCodeInfo или `None`, если данные не получены.
+            :raises TimeoutError: Если одновременный запрос того же кода не завершился за `Data.SINGLE_FLIGHT_TIMEOUT` секунд."""
+        if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+            return None
+        return await self._fetch_shared(postal_code, count_request=True)
+
+    async def _fetch_shared(self, postal_code: str, count_request: bool) -> Optional[PostalCodeInfo]:
+        """Получает код из API и сохраняет его, объединяя одновременные одиночные и пакетные запросы того же кода.
+            :param postal_code: Почтовый код.
+            :param count_request: Учесть запрос в статистике: ведущий вызов учитывает его в транзакции вставки,
+                присоединившийся - отдельным увеличением счетчика.
+            :return: Объект PostalCodeInfo или `None`, если данные не получены."""
+        leader = False
+
+        def fetch_and_store() -> Awaitable[Optional[PostalCodeInfo]]:
+            nonlocal leader
+            leader = True
+            return self._fetch_and_store(postal_code, count_request)
+
+        postal_info = await self._flight.do(postal_code, fetch_and_store, timeout=Data.SINGLE_FLIGHT_TIMEOUT)
+        if postal_info is not None and count_request and not leader:
+            await self.db_client.increment_request_statistic(postal_code)
+        return postal_info
+
+    async def _fetch_and_store(self, postal_code: str, count_request: bool) -> Optional[PostalCodeInfo]:
+        """Получает данные о почтовом коде из API и сохраняет их в базе данных.
+        Выполняется один раз на код, одновременные запросы того же кода получают его результат.
+            :param postal_code: Почтовый код.
+            :param count_request: Учесть запрос в статистике (в одной транзакции со вставкой).
+            :return: Объект PostalCodeInfo или `None`, если данные не получены."""
+        postal_data, status = await self.api_client.fetch_postal_data(postal_code)
+        if not postal_data:
+            custom_logger.log_with_context("No postal data found from API for %s", postal_code)
+            if self.negative_cache is not None:
+                self.negative_cache.add(postal_code, status)
+            return None
+        if count_request:
+            await self.db_client.insert_fetched_postal_code(postal_code, postal_data)
+        else:
+            await self.db_client.insert_postal_codes([postal_data])
+        return PostalCodeInfo.from_api_data(postal_data)
+
+    async def fetch_postal_codes_from_api(self, postal_codes: List[str]) -> Dict[str, Optional[PostalCodeInfo]]:
+        """Получает данные о пакете почтовых кодов из API параллельно (с ограничением клиента API)
+        и сохраняет найденные; каждый код получается и вставляется через общую с `fetch_postal_code_from_api`
+        таблицу объединения. Статистика запросов учитывается вызывающим клиентом.
+            :param postal_codes: Список различных почтовых кодов, отсутствующих в базе данных.
+            :return: Словарь {почтовый код: PostalCodeInfo или None}."""
+        results: Dict[str, Optional[PostalCodeInfo]] = {}
+        to_fetch = []
+        for postal_code in postal_codes:
+            if self.negative_cache is not None and self.negative_cache.get(postal_code) is not None:
+                results[postal_code] = None
+            else:
+                to_fetch.append(postal_code)
+
+        results.update(zip(to_fetch, await asyncio.gather(*(self._fetch_shared(code, count_request=False)
+                                                             for code in to_fetch))))
+        return results
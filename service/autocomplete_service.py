@@ -0,0 +1,83 @@
+# service/autocomplete_service.py
+import time
+from typing import List, Optional
+
+from utils.custom_logger import CustomLogger
+from utils.prefix_index import FIELDS, PLACE_NAME, POST_CODE, PrefixIndex, PrefixMatch, normalize_place_name
+from utils.psycopg2_connection import Psycopg2Connection
+
+custom_logger = CustomLogger(__name__)
+
+# Запросы для поиска по префиксу в базе данных. Условие LIKE 'префикс%' использует btree-индексы
+# с классами операторов varchar_pattern_ops (см. миграцию add_prefix_search_indexes) независимо от
+# правил сортировки базы данных; psycopg2 подставляет префикс в текст запроса, поэтому планировщик его видит.
+_DB_QUERIES = {
+    POST_CODE: '''
+        SELECT p.post_code, p.place_name, COALESCE(s.request_count, 0) AS request_count
+        FROM postal_codes p
+        LEFT JOIN postal_codes_requests_statistics s ON s.post_code = p.post_code
+        WHERE p.post_code LIKE %s
+        ORDER BY request_count DESC, p.post_code
+        LIMIT %s;
+    ''',
+    PLACE_NAME: '''
+        SELECT p.post_code, p.place_name, COALESCE(s.request_count, 0) AS request_count
+        FROM postal_codes p
+        LEFT JOIN postal_codes_requests_statistics s ON s.post_code = p.post_code
+        WHERE lower(p.place_name) LIKE %s
+        ORDER BY request_count DESC, lower(p.place_name), p.post_code
+        LIMIT %s;
+    ''',
+}
+
+
+def like_prefix(prefix: str) -> str:
+    """Шаблон LIKE для поиска строк, начинающихся с `prefix` (спецсимволы LIKE экранируются)."""
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class AutocompleteService:
+    """Автодополнение почтовых кодов и названий населенных пунктов по префиксу,
+    результаты упорядочены по количеству запросов кода (postal_codes_requests_statistics).
+
+    После `load()` поиск выполняется по индексу в памяти, до загрузки - запросами к базе данных.
+    Индекс - снимок на момент загрузки (новые коды и изменения статистики учитываются следующим `load()`).
+    """
+    def __init__(self, connection: Psycopg2Connection, index: Optional[PrefixIndex] = None) -> None:
+        """Инициализация сервиса.
+            :param connection: Соединение с базой данных для загрузки индекса и поиска без него.
+            :param index: Уже построенный индекс; `None` - искать в базе данных до вызова `load()`."""
+        self.connection = connection
+        self.index = index
+
+    def load(self) -> int:
+        """Строит индекс в памяти по таблицам postal_codes и postal_codes_requests_statistics.
+            :return: Количество проиндексированных кодов."""
+        started = time.perf_counter()
+        rows = self.connection.execute_query('''
+            SELECT p.post_code, p.place_name, COALESCE(s.request_count, 0)
+            FROM postal_codes p
+            LEFT JOIN postal_codes_requests_statistics s ON s.post_code = p.post_code;
+        ''', fetch_all=True, raise_errors=True) or []
+        index = PrefixIndex()
+        count = index.build(rows)
+        self.index = index
+        custom_logger.log_with_context("Loaded %s postal codes into prefix index in %.2fs",
+                                       count, time.perf_counter() - started)
+        return count
+
+    def complete(self, field: str, prefix: str, k: int = 10) -> List[PrefixMatch]:
+        """Находит `k` самых запрашиваемых почтовых кодов, у которых поле `field` начинается с `prefix`.
+            :param field: `post_code` или `place_name` (без учета регистра).
+            :param prefix: Начало почтового кода или названия населенного пункта.
+            :param k: Количество результатов.
+            :return: Список (почтовый код, населенный пункт, количество запросов) по убыванию количества запросов.
+            :raises ValueError: Если поле не поддерживается."""
+        if field not in FIELDS:
+            raise ValueError(f"Unsupported prefix search field: {field}")
+        if self.index is not None:
+            return self.index.search(field, prefix, k)
+        key = prefix.strip() if field == POST_CODE else normalize_place_name(prefix)
+        rows = self.connection.execute_query(_DB_QUERIES[field], (like_prefix(key), k),
+                                             fetch_all=True, raise_errors=True) or []
+        return [PrefixMatch(post_code, place_name, request_count) for post_code, place_name, request_count in rows]
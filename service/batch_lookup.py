@@ -0,0 +1,172 @@
+# service/batch_lookup.py
+import csv
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from clients.api_client import ApiClient
+from clients.base_client import BaseClient
+from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import LOOKUPS, StageMetrics
+
+custom_logger = CustomLogger(__name__)
+
+CSV_FIELDS = ("post_code", "found", "longitude", "latitude", "country", "state", "error")
+
+
+def iter_postal_codes(stream: TextIO) -> Iterator[str]:
+    """Читает почтовые коды построчно: берется первое поле строки (до запятой, точки с запятой или табуляции),
+    пустые строки и строки, начинающиеся с `#`, пропускаются.
+        :param stream: Текстовый поток (файл или stdin).
+        :return: Итератор почтовых кодов."""
+    for line in stream:
+        postal_code = line.replace(";", ",").replace("\t", ",").split(",", 1)[0].strip()
+        if postal_code and not postal_code.startswith("#"):
+            yield postal_code
+
+
+def iter_chunks(postal_codes: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Разбивает поток кодов на пачки не больше `size` кодов, не читая поток целиком."""
+    iterator = iter(postal_codes)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class JsonlWriter:
+    """Записывает результаты по одной JSON-строке на входной код."""
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def write(self, postal_code: str, postal_info: Optional[PostalCodeInfo], error: Optional[str] = None) -> None:
+        record = {"post_code": postal_code, "found": postal_info is not None}
+        if postal_info is not None:
+            record.update(postal_info.to_dict())
+        if error is not None:
+            record["error"] = error
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class CsvWriter:
+    """Записывает результаты в CSV со строкой заголовка `CSV_FIELDS`."""
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self._writer = csv.writer(stream, lineterminator="\n")
+        self._writer.writerow(CSV_FIELDS)
+
+    def write(self, postal_code: str, postal_info: Optional[PostalCodeInfo], error: Optional[str] = None) -> None:
+        values = postal_info.to_dict() if postal_info is not None else {}
+        self._writer.writerow((postal_code, "true" if postal_info is not None else "false",
+                               values.get("longitude", ""), values.get("latitude", ""),
+                               values.get("country", ""), values.get("state", ""), error or ""))
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter}
+
+
+class BatchLookup:
+    """Потоковая пакетная обработка почтовых кодов через один долгоживущий клиент.
+
+    Коды читаются пачками по `chunk_size` и передаются в `select_postal_codes` (один запрос `ANY(...)` к базе
+    данных и пакетная загрузка отсутствующих кодов из API на пачку). Пачки обрабатываются `workers` потоками;
+    одновременно в памяти не больше `2 * workers` пачек, а результаты записываются в порядке входных кодов
+    по мере готовности, поэтому память не растет с размером входных данных.
+    """
+    def __init__(self, client: BaseClient, writer, chunk_size: Optional[int] = None, workers: int = 1,
+                 api_client: Optional[ApiClient] = None) -> None:
+        """Инициализация.
+
+        :param client: Клиент базы данных.
+        :param writer: Объект записи результатов (`JsonlWriter` или `CsvWriter`).
+        :param chunk_size: Количество кодов в пачке (по умолчанию `Data.BATCH_CHUNK_SIZE`).
+        :param workers: Количество пачек, обрабатываемых одновременно.
+        :param api_client: Клиент API, статистика которого попадает в итоговую сводку
+            (по умолчанию общий экземпляр `ApiClient.shared()`).
+        """
+        self.client = client
+        self.writer = writer
+        self.chunk_size = chunk_size or Data.BATCH_CHUNK_SIZE
+        self.workers = max(1, workers)
+        self.api_client = api_client or ApiClient.shared()
+
+    def run(self, postal_codes: Iterable[str], progress_every: int = 0) -> Dict[str, float]:
+        """Обрабатывает все коды и записывает результаты.
+            :param postal_codes: Поток почтовых кодов.
+            :param progress_every: Журналировать прогресс каждые N кодов (0 - не журналировать).
+            :return: Сводка: количество кодов, найденных, не найденных, попаданий в кэш и базу данных,
+                загруженных из API, запросов к API, ошибок, время выполнения и пропускная способность.
+                Количество кодов и найденных считается по входным строкам, попадания - по различным кодам пачки."""
+        outcomes_before = _lookup_outcomes()
+        api_before = self.api_client.stats()
+        started = time.perf_counter()
+        summary = {"codes": 0, "found": 0, "not_found": 0, "failed": 0}
+        next_progress = progress_every
+        pending: Deque[Tuple[List[str], Future]] = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            for chunk in iter_chunks(postal_codes, self.chunk_size):
+                pending.append((chunk, executor.submit(self.client.select_postal_codes, chunk)))
+                if len(pending) >= 2 * self.workers:
+                    self._write_chunk(*pending.popleft(), summary)
+                if progress_every and summary["codes"] >= next_progress:
+                    custom_logger.log_with_context("Processed %s postal codes", summary["codes"])
+                    next_progress += progress_every
+            while pending:
+                self._write_chunk(*pending.popleft(), summary)
+        elapsed = time.perf_counter() - started
+
+        outcomes = {result: value - outcomes_before[result] for result, value in _lookup_outcomes().items()}
+        api_after = self.api_client.stats()
+        summary.update({
+            "cache_hits": int(outcomes["cache_hit"]),
+            "db_hits": int(outcomes["db_hit"]),
+            "api_hits": int(outcomes["api_hit"]),
+            "api_requests": int(api_after["requests"] - api_before["requests"]),
+            "api_failures": int(api_after["failures"] - api_before["failures"]),
+            "elapsed_seconds": round(elapsed, 3),
+            "codes_per_second": round(summary["codes"] / elapsed, 1) if elapsed else 0.0,
+        })
+        return summary
+
+    def _write_chunk(self, chunk: List[str], future: Future, summary: Dict[str, int]) -> None:
+        """Дожидается результата пачки и записывает строку на каждый входной код (повторы тоже)."""
+        try:
+            results = future.result()
+            error = None
+        except Exception as e:  # Ошибка одной пачки не прерывает обработку остальных
+            custom_logger.log_with_context("Batch of %s codes failed: %s", len(chunk), e, level=logging.ERROR)
+            results, error = {}, str(e) or type(e).__name__
+        for postal_code in chunk:
+            postal_info = results.get(postal_code)
+            self.writer.write(postal_code, postal_info, error)
+            summary["codes"] += 1
+            if error is not None:
+                summary["failed"] += 1
+            elif postal_info is not None:
+                summary["found"] += 1
+            else:
+                summary["not_found"] += 1
+        self.writer.stream.flush()
+
+
+def _lookup_outcomes() -> Dict[str, float]:
+    """Суммирует счетчики результатов запросов всех клиентов по виду результата."""
+    totals = dict.fromkeys(StageMetrics.RESULTS, 0.0)
+    for (_, result), counter in LOOKUPS.children():
+        totals[result] = totals.get(result, 0.0) + counter.value
+    return totals
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """Форматирует сводку для вывода в терминал."""
+    return (f"{summary['codes']} codes in {summary['elapsed_seconds']}s ({summary['codes_per_second']} codes/s): "
+            f"{summary['found']} found, {summary['not_found']} not found, {summary['failed']} failed; "
+            f"cache hits {summary['cache_hits']}, DB hits {summary['db_hits']}, API hits {summary['api_hits']}, "
+            f"API requests {summary['api_requests']} ({summary['api_failures']} failed)")
@@ -0,0 +1,246 @@
+# service/dataset_loader.py
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from utils.custom_logger import CustomLogger
+from utils.psycopg2_connection import Psycopg2Connection
+
+custom_logger = CustomLogger(__name__)
+
+# Порядок столбцов строки набора данных, совпадает с порядком в COPY и во вставке.
+COLUMNS = ("post_code", "country", "country_abbreviation", "place_name",
+           "longitude", "latitude", "state", "state_abbreviation")
+Record = Tuple[str, str, str, str, float, float, str, str]
+
+# Названия стран для кодов ISO в формате GeoNames (в нем есть только код страны).
+COUNTRY_NAMES = {"RU": "Russia"}
+
+
+def iter_geonames_records(lines: Iterable[str]) -> Iterator[Optional[Record]]:
+    """Разбирает построчно файл почтовых кодов GeoNames (RU.txt): столбцы через табуляцию -
+    код страны, почтовый код, населенный пункт, admin1 (название и код), admin2, admin3, широта, долгота, точность.
+        :param lines: Строки файла.
+        :return: Итератор записей в порядке `COLUMNS`; `None` для строк, которые не удалось разобрать."""
+    for row in csv.reader(lines, delimiter="\t", quoting=csv.QUOTE_NONE):
+        try:
+            country_code, post_code, place_name, state, state_code = row[:5]
+            latitude, longitude = float(row[9]), float(row[10])
+        except (ValueError, IndexError):
+            yield None
+            continue
+        yield (post_code, COUNTRY_NAMES.get(country_code, country_code), country_code, place_name,
+               longitude, latitude, state, state_code)
+
+
+def iter_zippopotam_records(stream: TextIO) -> Iterator[Optional[Record]]:
+    """Разбирает ответы API Zippopotam: JSON-массив ответов или JSON Lines (один ответ на строку).
+    Как и при загрузке из API, из ответа берется первый населенный пункт.
+        :param stream: Текстовый поток файла.
+        :return: Итератор записей в порядке `COLUMNS`; `None` для ответов, которые не удалось разобрать."""
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == "[":
+        documents: Iterable = json.loads(first + stream.read())
+    else:
+        documents = (json.loads(line) for line in _prepend(first, stream) if line.strip())
+    for document in documents:
+        try:
+            place = document["places"][0]
+            yield (document["post code"], document["country"], document["country abbreviation"],
+                   place["place name"], float(place["longitude"]), float(place["latitude"]),
+                   place["state"], place["state abbreviation"])
+        except (KeyError, IndexError, TypeError, ValueError):
+            yield None
+
+
+def _prepend(first: str, stream: TextIO) -> Iterator[str]:
+    """Возвращает строки потока, дополнив первую строку уже прочитанным символом."""
+    lines = iter(stream)
+    yield first + next(lines, "")
+    yield from lines
+
+
+class CopyStream(io.TextIOBase):
+    """Файлоподобный объект для `COPY ... FROM STDIN`: формирует текстовый формат COPY из итератора записей
+    по мере чтения, не загружая набор данных в память целиком."""
+    def __init__(self, records: Iterable[Record], on_row: Optional[Callable[[], None]] = None) -> None:
+        """:param records: Итератор записей в порядке `COLUMNS`.
+        :param on_row: Функция, вызываемая после каждой переданной строки (для отчета о прогрессе)."""
+        self._records = iter(records)
+        self._on_row = on_row
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        """Возвращает следующую порцию данных в текстовом формате COPY (не меньше `size` символов, пока есть записи)."""
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            record = next(self._records, None)
+            if record is None:
+                break
+            line = "\t".join(self._escape(value) for value in record) + "\n"
+            parts.append(line)
+            length += len(line)
+            if self._on_row is not None:
+                self._on_row()
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    @staticmethod
+    def _escape(value) -> str:
+        """Экранирует значение для текстового формата COPY."""
+        if value is None:
+            return "\\N"
+        return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class DatasetLoader:
+    """Массовая загрузка набора почтовых кодов из файла в таблицу postal_codes.
+
+    Записи потоково передаются командой `COPY FROM STDIN` во временную таблицу, затем одним запросом
+    `INSERT ... SELECT DISTINCT ON ... ON CONFLICT` переносятся в postal_codes. Загрузка выполняется
+    в одной транзакции: при ошибке таблица postal_codes не меняется.
+    """
+    def __init__(self, connection: Psycopg2Connection, update_existing: bool = False,
+                 progress_every: int = 10000) -> None:
+        """Инициализация загрузчика.
+
+        :param connection: Соединение с базой данных.
+        :param update_existing: Обновлять ли уже существующие почтовые коды данными из файла
+            (по умолчанию существующие строки не меняются).
+        :param progress_every: Через сколько строк выводить отчет о прогрессе.
+        """
+        self.connection = connection
+        self.update_existing = update_existing
+        self.progress_every = progress_every
+
+    def load(self, path: str, file_format: Optional[str] = None) -> Dict[str, float]:
+        """Загружает набор данных из файла.
+
+        :param path: Путь к файлу: GeoNames TSV (`.txt`, `.tsv` или `.zip` с ним) или ответы Zippopotam (`.json`, `.jsonl`).
+        :param file_format: `geonames` или `zippopotam`; по умолчанию определяется по расширению файла.
+        :return: Словарь с количеством прочитанных, пропущенных и вставленных (или обновленных) строк,
+            временем загрузки в секундах и скоростью в строках в секунду.
+        """
+        file_format = file_format or self.detect_format(path)
+        counters = {"read": 0, "skipped": 0}
+        started = time.perf_counter()
+
+        def valid_records(records: Iterable[Optional[Record]]) -> Iterator[Record]:
+            for record in records:
+                counters["read"] += 1
+                if record is None or not record[0] or len(record[0]) > 10:
+                    counters["skipped"] += 1
+                    continue
+                yield record
+
+        def report_progress() -> None:
+            staged = counters["read"] - counters["skipped"]
+            if staged % self.progress_every == 0:
+                elapsed = time.perf_counter() - started
+                custom_logger.log_with_context("Staged %s rows (%.0f rows/sec)", staged, staged / elapsed if elapsed else 0)
+
+        with self._open(path) as stream:
+            records = iter_geonames_records(stream) if file_format == "geonames" else iter_zippopotam_records(stream)
+            merged = self._copy_and_merge(CopyStream(valid_records(records), report_progress))
+
+        elapsed = time.perf_counter() - started
+        staged = counters["read"] - counters["skipped"]
+        report = {
+            "read": counters["read"],
+            "skipped": counters["skipped"],
+            "staged": staged,
+            "merged": merged,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(staged / elapsed, 1) if elapsed else 0.0,
+        }
+        custom_logger.log_with_context("Dataset %s loaded: %s", path, report)
+        return report
+
+    def _copy_and_merge(self, copy_stream: CopyStream) -> int:
+        """Передает записи во временную таблицу и переносит их в postal_codes в одной транзакции.
+            :return: Количество вставленных (или обновленных) строк postal_codes."""
+        columns = ", ".join(COLUMNS)
+        if self.update_existing:
+            conflict = "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in COLUMNS[1:])
+        else:
+            conflict = "DO NOTHING"
+        with self.connection.checkout() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("CREATE TEMP TABLE postal_codes_staging (LIKE postal_codes) ON COMMIT DROP")
+                    cursor.copy_expert(f"COPY postal_codes_staging ({columns}) FROM STDIN", copy_stream, size=65536)
+                    # DISTINCT ON: в GeoNames у одного кода бывает несколько населенных пунктов, берем первый.
+                    cursor.execute(f'''
+                        INSERT INTO postal_codes ({columns})
+                        SELECT DISTINCT ON (post_code) {columns}
+                        FROM postal_codes_staging
+                        ORDER BY post_code
+                        ON CONFLICT (post_code) {conflict}
+                    ''')
+                    merged = cursor.rowcount
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        with self.connection.checkout() as connection, connection.cursor() as cursor:
+            connection.autocommit = True  # Статистика ANALYZE не должна откатиться при возврате соединения в пул
+            cursor.execute("ANALYZE postal_codes")
+        return merged
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        """Определяет формат файла по расширению.
+            :return: `zippopotam` для `.json`/`.jsonl`, иначе `geonames`."""
+        return "zippopotam" if path.lower().endswith((".json", ".jsonl")) else "geonames"
+
+    @staticmethod
+    @contextmanager
+    def _open(path: str) -> Iterator[TextIO]:
+        """Открывает файл набора данных как текстовый поток; для `.zip` открывает вложенный файл `<имя>.txt`
+        (так распространяется GeoNames) или единственный файл архива."""
+        if not path.lower().endswith(".zip"):
+            with open(path, encoding="utf-8", newline="") as stream:
+                yield stream
+            return
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            expected = os.path.splitext(os.path.basename(path))[0] + ".txt"
+            member = expected if expected in names else names[0]
+            with archive.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def main(argv=None) -> None:
+    """Точка входа командной строки: `python -m service.dataset_loader RU.zip`."""
+    parser = argparse.ArgumentParser(description="Bulk load a postal code dataset into postal_codes.")
+    parser.add_argument("path", help="GeoNames TSV (.txt/.zip) or Zippopotam JSON (.json/.jsonl) file")
+    parser.add_argument("--format", choices=("geonames", "zippopotam"), help="file format (default: by extension)")
+    parser.add_argument("--update", action="store_true", help="overwrite postal codes that already exist")
+    parser.add_argument("--progress-every", type=int, default=10000, help="rows between progress reports")
+    args = parser.parse_args(argv)
+
+    loader = DatasetLoader(Psycopg2Connection(), update_existing=args.update, progress_every=args.progress_every)
+    report = loader.load(args.path, args.format)
+    print(f"Loaded {report['merged']} of {report['staged']} rows ({report['skipped']} skipped) "
+          f"in {report['seconds']}s, {report['rows_per_sec']} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
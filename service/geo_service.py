@@ -0,0 +1,75 @@
+# service/geo_service.py
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clients.postal_code_info import PostalCodeInfo
+from service.snapshot_exporter import iter_postal_codes
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.geo_arrays import GeoArrays
+from utils.geo_index import GeoIndex, NearestPostalCode
+from utils.psycopg2_connection import Psycopg2Connection
+
+custom_logger = CustomLogger(__name__)
+
+
+class GeoService:
+    """Геопоиск по почтовым кодам: ближайшие к точке коды (например, к GPS-координатам курьера),
+    все коды в радиусе и матрицы расстояний для планирования зон доставки.
+
+    Индекс и массивы координат строятся в памяти из таблицы postal_codes при `load()`. Коды, вставленные
+    после загрузки, добавляют в индекс сами клиенты, которым передан тот же индекс (параметр `geo_index`);
+    массивы для радиусов и матриц обновляются только при следующем `load()`.
+    """
+    def __init__(self, index: Optional[GeoIndex] = None, arrays: Optional[GeoArrays] = None) -> None:
+        """Инициализация сервиса.
+            :param index: Пространственный индекс; по умолчанию создается пустой.
+            :param arrays: Массивы координат; по умолчанию создаются пустые с ограничением памяти
+                на блок матрицы расстояний `Data.GEO_MATRIX_BLOCK_BYTES`."""
+        self.index = index if index is not None else GeoIndex()
+        self.arrays = arrays if arrays is not None else GeoArrays(Data.GEO_MATRIX_BLOCK_BYTES)
+
+    def load(self, connection: Psycopg2Connection) -> int:
+        """Строит индекс и массивы координат по всей таблице postal_codes, читая ее порциями через серверный курсор.
+            :param connection: Соединение с базой данных.
+            :return: Количество проиндексированных кодов."""
+        started = time.perf_counter()
+        rows = [(post_code, PostalCodeInfo(longitude, latitude, country, state))
+                for post_code, longitude, latitude, country, state, _ in iter_postal_codes(connection)]
+        count = self.index.build(rows)
+        self.arrays.build(rows)
+        custom_logger.log_with_context("Loaded %s postal codes into geo index in %.2fs",
+                                       count, time.perf_counter() - started)
+        return count
+
+    def find_nearest(self, latitude: float, longitude: float, k: int = 1) -> List[NearestPostalCode]:
+        """Находит `k` почтовых кодов, ближайших к точке по расстоянию по большому кругу.
+            :param latitude: Широта в градусах.
+            :param longitude: Долгота в градусах.
+            :param k: Количество результатов.
+            :return: Список (почтовый код, PostalCodeInfo, расстояние в км) по возрастанию расстояния.
+            :raises ValueError: Если координаты вне допустимых диапазонов."""
+        return self.index.nearest(latitude, longitude, k)
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Находит все почтовые коды не дальше `radius_km` от точки (векторный расчет по массивам координат).
+            :param latitude: Широта в градусах.
+            :param longitude: Долгота в градусах.
+            :param radius_km: Радиус в километрах.
+            :param limit: Сколько ближайших результатов вернуть; `None` - все.
+            :return: Список (почтовый код, расстояние в км) по возрастанию расстояния.
+            :raises ValueError: Если координаты вне допустимых диапазонов или радиус отрицательный."""
+        return self.arrays.within_radius(latitude, longitude, radius_km, limit)
+
+    def distance_matrix(self, postal_codes1: Sequence[str], postal_codes2: Sequence[str],
+                        out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Матрица расстояний в километрах между двумя наборами почтовых кодов (см. `GeoArrays.distance_matrix`).
+            :param postal_codes1: Коды строк матрицы.
+            :param postal_codes2: Коды столбцов матрицы.
+            :param out: Массив (например, `np.memmap`) для результата формы (N, M); `None` - создать новый float32.
+            :return: Массив формы (N, M) с расстояниями в километрах.
+            :raises KeyError: Если некоторых кодов нет в загруженных данных."""
+        return self.arrays.distance_matrix(postal_codes1, postal_codes2, out=out)
@@ -0,0 +1,332 @@
+# service/http_server.py
+import json
+import logging
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from clients.base_client import BaseClient
+from config.db_data import Data
+from service.autocomplete_service import AutocompleteService
+from service.geo_service import GeoService
+from service.place_search_service import PlaceSearchService
+from utils.custom_logger import CustomLogger
+from utils.metrics import REGISTRY
+from utils.prefix_index import FIELDS, POST_CODE
+
+custom_logger = CustomLogger(__name__)
+
+MAX_POSTAL_CODE_LENGTH = 10  # Длина столбца postal_codes.post_code
+MAX_NEAREST = 100  # Максимальное значение k в GET /nearest и GET /autocomplete
+
+
+class PostalLookupServer(ThreadingHTTPServer):
+    """HTTP-сервер поиска почтовых кодов поверх одного долгоживущего клиента базы данных.
+
+    Каждое соединение обслуживается своим потоком (keep-alive, HTTP/1.1), а одновременно выполняемых
+    запросов к клиенту не больше `max_workers`, поэтому пул соединений с базой данных не перегружается
+    при всплеске соединений. Остановка - `drain()`: новые соединения не принимаются, принятые запросы
+    дорабатываются.
+    """
+    daemon_threads = True
+
+    def __init__(self,
+                 address: Tuple[str, int],
+                 client: BaseClient,
+                 max_workers: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None,
+                 max_batch: Optional[int] = None,
+                 geo_service: Optional[GeoService] = None,
+                 autocomplete_service: Optional[AutocompleteService] = None,
+                 place_search_service: Optional[PlaceSearchService] = None) -> None:
+        """Создает сервер и начинает слушать адрес.
+
+        :param address: Пара (адрес, порт); порт 0 - выбрать свободный.
+        :param client: Клиент, через который выполняются запросы (`select_postal_code`, `select_postal_codes`).
+        :param max_workers: Максимальное количество одновременно обрабатываемых запросов (по умолчанию `Data.HTTP_WORKERS`).
+        :param keepalive_timeout: Сколько секунд держать простаивающее keep-alive соединение
+            (по умолчанию `Data.HTTP_KEEPALIVE_TIMEOUT`).
+        :param max_batch: Максимальное количество кодов в запросе POST /postal (по умолчанию `Data.HTTP_MAX_BATCH`).
+        :param geo_service: Сервис поиска ближайших кодов для GET /nearest; `None` - эндпоинт отключен.
+        :param autocomplete_service: Сервис поиска по префиксу для GET /autocomplete; `None` - эндпоинт отключен.
+        :param place_search_service: Сервис нечеткого поиска по названию для GET /places; `None` - эндпоинт отключен.
+        """
+        super().__init__(address, PostalRequestHandler)
+        self.client = client
+        self.geo_service = geo_service
+        self.autocomplete_service = autocomplete_service
+        self.place_search_service = place_search_service
+        self.keepalive_timeout = keepalive_timeout or Data.HTTP_KEEPALIVE_TIMEOUT
+        self.max_batch = max_batch or Data.HTTP_MAX_BATCH
+        self.draining = False
+        self._workers = threading.BoundedSemaphore(max_workers or Data.HTTP_WORKERS)
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextmanager
+    def request_slot(self) -> Iterator[None]:
+        """Учитывает запрос как выполняющийся и ждет свободного места среди `max_workers`."""
+        with self._idle:
+            self._in_flight += 1
+        try:
+            with self._workers:
+                yield
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def handle_error(self, request, client_address) -> None:
+        """Журналирует ошибку обработки соединения; разрыв соединения клиентом ошибкой не считается."""
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            custom_logger.log_with_context("Client %s disconnected", client_address, level=logging.DEBUG)
+            return
+        custom_logger.log_with_context("Error handling request from %s", client_address,
+                                       level=logging.ERROR, exc_info=True)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Останавливает прием соединений и ждет завершения выполняющихся запросов.
+        Вызывается из потока, отличного от потока `serve_forever`.
+            :param timeout: Сколько секунд ждать (по умолчанию `Data.HTTP_DRAIN_TIMEOUT`).
+            :return: `True`, если все запросы завершились за отведенное время."""
+        self.draining = True
+        self.shutdown()
+        with self._idle:
+            drained = self._idle.wait_for(lambda: self._in_flight == 0,
+                                          Data.HTTP_DRAIN_TIMEOUT if timeout is None else timeout)
+        self.server_close()
+        if not drained:
+            custom_logger.log_with_context("Stopped with %s requests still in flight", self._in_flight,
+                                           level=logging.WARNING)
+        return drained
+
+
+class PostalRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов:
+    - `GET /postal/{code}` - информация о почтовом коде (404, если код не найден);
+    - `POST /postal` с телом `{"codes": [...]}` - информация о пакете кодов (`null` для не найденных);
+    - `GET /nearest?lat=..&lon=..&k=..` - `k` ближайших к точке кодов (если задан `geo_service`);
+    - `GET /within?lat=..&lon=..&radius_km=..&limit=..` - коды в радиусе от точки, не больше `limit`
+      (по умолчанию и максимум - `max_batch`) ближайших (если задан `geo_service`);
+    - `GET /autocomplete?q=..&field=post_code|place_name&k=..` - самые запрашиваемые коды, у которых
+      почтовый код (по умолчанию) или название населенного пункта начинается с `q` (если задан `autocomplete_service`);
+    - `GET /places?q=..&k=..&threshold=..` - коды населенных пунктов с названием, похожим на `q`
+      (если задан `place_search_service`);
+    - `GET /health` - 200, пока сервер принимает запросы, 503 во время остановки;
+    - `GET /metrics` - метрики в формате Prometheus.
+    """
+    protocol_version = "HTTP/1.1"
+    server: PostalLookupServer
+
+    def setup(self) -> None:
+        self.timeout = self.server.keepalive_timeout  # Простаивающее keep-alive соединение закрывается по таймауту
+        super().setup()
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path.startswith("/postal/"):
+            postal_code = unquote(path[len("/postal/"):])
+            if not _is_valid_postal_code(postal_code):
+                self._send_json(400, {"error": "invalid postal code"})
+                return
+            with self.server.request_slot():
+                postal_info = self._lookup(self.server.client.select_postal_code, postal_code)
+            if postal_info is _FAILED:
+                return
+            if postal_info is None:
+                self._send_json(404, {"post_code": postal_code, "error": "not found"})
+            else:
+                self._send_json(200, {"post_code": postal_code, **postal_info.to_dict()})
+        elif path == "/nearest":
+            self._nearest(parse_qs(urlsplit(self.path).query))
+        elif path == "/within":
+            self._within(parse_qs(urlsplit(self.path).query))
+        elif path == "/autocomplete":
+            self._autocomplete(parse_qs(urlsplit(self.path).query))
+        elif path == "/places":
+            self._places(parse_qs(urlsplit(self.path).query))
+        elif path == "/health":
+            self._send_json(503 if self.server.draining else 200,
+                            {"status": "draining" if self.server.draining else "ok"})
+        elif path == "/metrics":
+            self._send(200, REGISTRY.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": "unknown path"})
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/postal":
+            self._send_json(404, {"error": "unknown path"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            self._send_json(411, {"error": "Content-Length required"})
+            return
+        if length > self.server.max_batch * 32:  # С запасом: код в JSON-массиве занимает не больше ~15 байт
+            self._send_json(413, {"error": f"at most {self.server.max_batch} codes per request"})
+            return
+        try:
+            codes = json.loads(self.rfile.read(length))["codes"]
+            if not isinstance(codes, list):
+                raise TypeError("codes must be a list")
+            codes = [str(code) for code in codes]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": "expected a JSON object {\"codes\": [...]}"})
+            return
+        if len(codes) > self.server.max_batch:
+            self._send_json(413, {"error": f"at most {self.server.max_batch} codes per request"})
+            return
+        invalid = [code for code in codes if not _is_valid_postal_code(code)]
+        if invalid:
+            self._send_json(400, {"error": "invalid postal codes", "codes": invalid[:10]})
+            return
+        with self.server.request_slot():
+            results = self._lookup(self.server.client.select_postal_codes, codes)
+        if results is _FAILED:
+            return
+        self._send_json(200, {"results": {code: postal_info.to_dict() if postal_info is not None else None
+                                          for code, postal_info in results.items()}})
+
+    def _nearest(self, query: dict) -> None:
+        if self.server.geo_service is None:
+            self._send_json(404, {"error": "geo index is disabled"})
+            return
+        try:
+            latitude, longitude = float(query["lat"][0]), float(query["lon"][0])
+            k = int(query.get("k", ["1"])[0])
+            if not 1 <= k <= MAX_NEAREST:
+                raise ValueError(f"k must be between 1 and {MAX_NEAREST}")
+            nearest = self.server.geo_service.find_nearest(latitude, longitude, k)
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"expected lat, lon and optional k: {e}"})
+            return
+        self._send_json(200, {"results": [{"post_code": result.post_code,
+                                           "distance_km": round(result.distance_km, 3),
+                                           **result.postal_info.to_dict()} for result in nearest]})
+
+    def _within(self, query: dict) -> None:
+        if self.server.geo_service is None:
+            self._send_json(404, {"error": "geo index is disabled"})
+            return
+        try:
+            latitude, longitude = float(query["lat"][0]), float(query["lon"][0])
+            radius_km = float(query["radius_km"][0])
+            limit = int(query.get("limit", [str(self.server.max_batch)])[0])
+            if not 1 <= limit <= self.server.max_batch:
+                raise ValueError(f"limit must be between 1 and {self.server.max_batch}")
+            within = self.server.geo_service.within_radius(latitude, longitude, radius_km, limit)
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"expected lat, lon, radius_km and optional limit: {e}"})
+            return
+        self._send_json(200, {"results": [{"post_code": post_code, "distance_km": round(distance_km, 3)}
+                                          for post_code, distance_km in within]})
+
+    def _autocomplete(self, query: dict) -> None:
+        if self.server.autocomplete_service is None:
+            self._send_json(404, {"error": "autocomplete is disabled"})
+            return
+        try:
+            prefix = query["q"][0]
+            field = query.get("field", [POST_CODE])[0]
+            if field not in FIELDS:
+                raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+            k = int(query.get("k", ["10"])[0])
+            if not 1 <= k <= MAX_NEAREST:
+                raise ValueError(f"k must be between 1 and {MAX_NEAREST}")
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"expected q, optional field and k: {e}"})
+            return
+        with self.server.request_slot():
+            matches = self._lookup(lambda arguments: self.server.autocomplete_service.complete(*arguments),
+                                   (field, prefix, k))
+        if matches is _FAILED:
+            return
+        self._send_json(200, {"results": [match._asdict() for match in matches]})
+
+    def _places(self, query: dict) -> None:
+        if self.server.place_search_service is None:
+            self._send_json(404, {"error": "place search is disabled"})
+            return
+        try:
+            text = query["q"][0]
+            k = int(query.get("k", ["10"])[0])
+            if not 1 <= k <= MAX_NEAREST:
+                raise ValueError(f"k must be between 1 and {MAX_NEAREST}")
+            threshold = float(query["threshold"][0]) if "threshold" in query else None
+            if threshold is not None and not 0 <= threshold <= 1:
+                raise ValueError("threshold must be between 0 and 1")
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"expected q, optional k and threshold: {e}"})
+            return
+        with self.server.request_slot():
+            matches = self._lookup(lambda arguments: self.server.place_search_service.search(*arguments),
+                                   (text, k, threshold))
+        if matches is _FAILED:
+            return
+        self._send_json(200, {"results": [{"post_code": match.post_code, "place_name": match.place_name,
+                                           "similarity": round(match.similarity, 3), **match.postal_info.to_dict()}
+                                          for match in matches]})
+
+    def _lookup(self, method, argument) -> Any:
+        """Выполняет запрос к клиенту; при исключении отвечает 500 и возвращает `_FAILED`."""
+        try:
+            return method(argument)
+        except Exception as e:
+            custom_logger.log_with_context("Lookup of %s failed: %s", argument, e, level=logging.ERROR, exc_info=True)
+            self._send_json(500, {"error": "internal error"})
+            return _FAILED
+
+    def _send_json(self, status: int, document: dict) -> None:
+        self._send(status, json.dumps(document, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.draining:
+            # Во время остановки keep-alive соединения закрываются после текущего ответа
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        custom_logger.log_with_context("%s - " + format, self.address_string(), *args, level=logging.DEBUG)
+
+
+_FAILED = object()
+
+
+def _is_valid_postal_code(postal_code: str) -> bool:
+    # isalnum() без isascii() пропустил бы любые буквы и цифры Unicode ("١٢٣", кириллицу)
+    return 0 < len(postal_code) <= MAX_POSTAL_CODE_LENGTH and postal_code.isascii() and postal_code.isalnum()
+
+
+def serve(server: PostalLookupServer, drain_timeout: Optional[float] = None) -> None:
+    """Обслуживает запросы до сигнала SIGINT или SIGTERM, затем корректно останавливает сервер (`drain`).
+    Вызывается из главного потока.
+        :param server: Сервер.
+        :param drain_timeout: Сколько секунд ждать завершения принятых запросов (по умолчанию `Data.HTTP_DRAIN_TIMEOUT`)."""
+    stop = threading.Event()
+    previous = {signum: signal.signal(signum, lambda *_: stop.set()) for signum in (signal.SIGINT, signal.SIGTERM)}
+    thread = threading.Thread(target=server.serve_forever, name="http-accept", daemon=True)
+    thread.start()
+    custom_logger.log_with_context("Serving postal lookups on %s", server.url)
+    try:
+        stop.wait()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        custom_logger.log_with_context("Shutting down, draining in-flight requests")
+        server.drain(drain_timeout)
+        thread.join()
@@ -0,0 +1,56 @@
+# service/negative_cache.py
+from typing import Dict, Optional
+
+from clients.api_client import ApiLookupStatus
+from utils.ttl_cache import LRUTTLCache
+
+
+class NegativeLookupCache:
+    """Кэш почтовых кодов, которые не удалось получить из API.
+
+    Индексы, которых нет в API (ответ 404), запоминаются надолго, а временные ошибки (таймаут, 5xx) - на короткое
+    время, чтобы повторный запрос вскоре снова дошел до API. Пока запись жива, повторные запросы того же индекса
+    не обращаются ни к базе данных, ни к API.
+    """
+    def __init__(self, max_size: int, not_found_ttl: float, failure_ttl: float) -> None:
+        """Инициализация кэша.
+
+        :param max_size: Максимальное количество записей.
+        :param not_found_ttl: Время жизни записи об отсутствующем в API индексе, в секундах.
+        :param failure_ttl: Время жизни записи о временной ошибке API, в секундах.
+        """
+        self.not_found_ttl = not_found_ttl
+        self.failure_ttl = failure_ttl
+        self._entries = LRUTTLCache(max_size=max_size, ttl=not_found_ttl)
+        self.not_found_stored = 0
+        self.failures_stored = 0
+
+    def get(self, postal_code: str) -> Optional[ApiLookupStatus]:
+        """Проверяет, известно ли, что почтовый код недавно не удалось получить.
+            :param postal_code: Почтовый код.
+            :return: Статус неудачного запроса (`NOT_FOUND` или `FAILURE`) или `None`, если записи нет."""
+        return self._entries.get(postal_code)
+
+    def add(self, postal_code: str, status: ApiLookupStatus) -> None:
+        """Запоминает неудачный запрос почтового кода со временем жизни, зависящим от причины.
+            :param postal_code: Почтовый код.
+            :param status: Причина неудачи: `NOT_FOUND` или `FAILURE`."""
+        if status is ApiLookupStatus.NOT_FOUND:
+            self.not_found_stored += 1
+            self._entries.set(postal_code, status, ttl=self.not_found_ttl)
+        elif status is ApiLookupStatus.FAILURE:
+            self.failures_stored += 1
+            self._entries.set(postal_code, status, ttl=self.failure_ttl)
+
+    def invalidate(self, postal_code: str) -> None:
+        """Удаляет запись о почтовом коде, например, после того как данные о нем появились в базе данных.
+            :param postal_code: Почтовый код."""
+        self._entries.invalidate(postal_code)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики работы кэша.
+            :return: Словарь со счетчиками попаданий, промахов, вытеснений и сохраненных записей по причинам."""
+        stats = self._entries.stats()
+        stats["not_found_stored"] = self.not_found_stored
+        stats["failures_stored"] = self.failures_stored
+        return stats
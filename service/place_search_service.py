@@ -0,0 +1,79 @@
+# service/place_search_service.py
+import time
+from typing import List, Optional
+
+from clients.postal_code_info import PostalCodeInfo
+from config.db_data import Data
+from service.snapshot_exporter import iter_postal_codes
+from utils.custom_logger import CustomLogger
+from utils.postal_snapshot import PostalSnapshot
+from utils.psycopg2_connection import Psycopg2Connection
+from utils.trigram_index import FuzzyMatch, TrigramIndex, transliterate
+
+custom_logger = CustomLogger(__name__)
+
+# Нечеткий поиск в базе данных по GIN-индексу pg_trgm на postal_translit(place_name)
+# (миграция add_place_name_trigram_index). Оператор % использует порог pg_trgm.similarity_threshold;
+# SET LOCAL действует только в неявной транзакции этого многооператорного запроса и не остается на соединении пула.
+_DB_QUERY = '''
+    SET LOCAL pg_trgm.similarity_threshold = %s;
+    SELECT post_code, place_name, longitude, latitude, country, state,
+           similarity(postal_translit(place_name), %s) AS score
+    FROM postal_codes
+    WHERE postal_translit(place_name) %% %s
+    ORDER BY score DESC, postal_translit(place_name), post_code
+    LIMIT %s;
+'''
+
+
+class PlaceSearchService:
+    """Нечеткий поиск почтовых кодов по названию населенного пункта (опечатки, латинская транслитерация).
+
+    После `load()` или `load_snapshot()` поиск выполняется по индексу триграмм в памяти
+    (в том числе без базы данных - по снимку postal_codes), до загрузки - запросами к базе данных через pg_trgm.
+    """
+    def __init__(self, connection: Optional[Psycopg2Connection] = None, index: Optional[TrigramIndex] = None) -> None:
+        """Инициализация сервиса.
+            :param connection: Соединение с базой данных для загрузки индекса и поиска без него.
+            :param index: Уже построенный индекс; `None` - искать в базе данных до загрузки индекса."""
+        self.connection = connection
+        self.index = index
+
+    def load(self) -> int:
+        """Строит индекс в памяти по таблице postal_codes.
+            :return: Количество проиндексированных кодов."""
+        started = time.perf_counter()
+        count = self._build((post_code, place_name, PostalCodeInfo(longitude, latitude, country, state))
+                            for post_code, longitude, latitude, country, state, place_name
+                            in iter_postal_codes(self.connection))
+        custom_logger.log_with_context("Loaded %s postal codes into trigram index in %.2fs",
+                                       count, time.perf_counter() - started)
+        return count
+
+    def load_snapshot(self, snapshot: PostalSnapshot) -> int:
+        """Строит индекс в памяти по снимку postal_codes (без обращения к базе данных).
+            :param snapshot: Открытый снимок почтовых кодов.
+            :return: Количество проиндексированных кодов."""
+        return self._build((post_code, place_name, PostalCodeInfo(longitude, latitude, country, state))
+                           for post_code, longitude, latitude, country, state, place_name in snapshot.rows())
+
+    def search(self, query: str, k: int = 10, threshold: Optional[float] = None) -> List[FuzzyMatch]:
+        """Находит почтовые коды населенных пунктов, название которых похоже на `query`.
+            :param query: Название (возможно, с опечатками или в латинской транслитерации).
+            :param k: Максимальное количество результатов.
+            :param threshold: Минимальное сходство от 0 до 1; по умолчанию `Data.FUZZY_SIMILARITY_THRESHOLD`.
+            :return: Список (почтовый код, название, PostalCodeInfo, сходство) по убыванию сходства."""
+        threshold = Data.FUZZY_SIMILARITY_THRESHOLD if threshold is None else threshold
+        if self.index is not None:
+            return self.index.search(query, k, threshold)
+        key = transliterate(query)
+        rows = self.connection.execute_query(_DB_QUERY, (threshold, key, key, k),
+                                             fetch_all=True, raise_errors=True) or []
+        return [FuzzyMatch(post_code, place_name, PostalCodeInfo(longitude, latitude, country, state), score)
+                for post_code, place_name, longitude, latitude, country, state, score in rows]
+
+    def _build(self, rows) -> int:
+        index = TrigramIndex()
+        count = index.build(rows)
+        self.index = index
+        return count
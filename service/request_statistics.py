@@ -0,0 +1,107 @@
+# service/request_statistics.py
+import atexit
+import logging
+import threading
+from typing import Callable, Dict
+
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+
+class RequestStatisticsAggregator:
+    """Накопитель статистики запросов с отложенной пакетной записью в базу данных (write-behind).
+
+    Увеличения счетчиков суммируются в памяти и записываются одним пакетом через `writer`:
+    по истечении `flush_interval` секунд, при накоплении `flush_threshold` увеличений и при завершении процесса.
+    Компромисс надежности: при аварийном завершении процесса теряется не более одного незаписанного пакета.
+    """
+    def __init__(self,
+                 writer: Callable[[Dict[str, int]], None],
+                 flush_interval: float,
+                 flush_threshold: int) -> None:
+        """Инициализация накопителя и запуск фонового потока записи.
+
+        :param writer: Функция, записывающая пакет {почтовый код: прирост счетчика}, например
+            `BaseClient.flush_request_statistics`.
+        :param flush_interval: Период фоновой записи в секундах.
+        :param flush_threshold: Количество накопленных увеличений, при котором запись выполняется досрочно.
+        """
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[str, int] = {}
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.flushed_batches = 0
+        self.flushed_increments = 0
+        self.failed_flushes = 0
+        self._thread = threading.Thread(target=self._run, name="request-statistics-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def increment(self, postal_code: str, count: int = 1) -> None:
+        """Учитывает запрос почтового кода. Запись в базу данных выполняется позже фоновым потоком.
+            :param postal_code: Почтовый код.
+            :param count: Величина прироста счетчика."""
+        with self._lock:
+            self._pending[postal_code] = self._pending.get(postal_code, 0) + count
+            self._pending_total += count
+            threshold_reached = self._pending_total >= self.flush_threshold
+        if threshold_reached:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Записывает накопленные увеличения одним пакетом.
+        Если запись не удалась, увеличения возвращаются в накопитель и будут записаны со следующим пакетом."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._pending_total = 0
+            if not batch:
+                return
+            try:
+                self.writer(batch)
+                self.flushed_batches += 1
+                self.flushed_increments += sum(batch.values())
+            except Exception as e:
+                self.failed_flushes += 1
+                custom_logger.log_with_context("Error flushing request statistics: %s", e, level=logging.ERROR)
+                with self._lock:
+                    for postal_code, count in batch.items():
+                        self._pending[postal_code] = self._pending.get(postal_code, 0) + count
+                        self._pending_total += count
+
+    def close(self) -> None:
+        """Останавливает фоновый поток и записывает оставшиеся увеличения. Повторный вызов ничего не делает."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики работы накопителя.
+            :return: Словарь с количеством ожидающих записи увеличений, записанных пакетов и увеличений
+                и неудачных попыток записи."""
+        with self._lock:
+            pending = self._pending_total
+        return {
+            "pending": pending,
+            "flushed_batches": self.flushed_batches,
+            "flushed_increments": self.flushed_increments,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    def _run(self) -> None:
+        """Цикл фонового потока: запись по таймеру или по сигналу о достижении порога."""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self._closed:
+                self.flush()
@@ -0,0 +1,47 @@
+# service/snapshot_exporter.py
+import argparse
+from typing import Iterator
+
+from utils.custom_logger import CustomLogger
+from utils.postal_snapshot import SnapshotRow, write_snapshot
+from utils.psycopg2_connection import Psycopg2Connection
+
+custom_logger = CustomLogger(__name__)
+
+
+def iter_postal_codes(connection: Psycopg2Connection, batch_size: int = 10000) -> Iterator[SnapshotRow]:
+    """Читает таблицу postal_codes порциями по `batch_size` строк.
+        :param connection: Соединение с базой данных.
+        :param batch_size: Количество строк, получаемых с сервера за одно обращение.
+        :return: Итератор строк (почтовый код, долгота, широта, страна, субъект, населенный пункт)."""
+    with connection.checkout() as raw_connection:
+        # Именованный (серверный) курсор работает в транзакции: соединения пула выдаются в транзакционном режиме.
+        with raw_connection.cursor(name="postal_codes_snapshot") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute('''
+                SELECT post_code, longitude, latitude, country, state, place_name
+                FROM postal_codes
+            ''')
+            yield from cursor
+        raw_connection.commit()
+
+
+def export_snapshot(connection: Psycopg2Connection, path: str) -> int:
+    """Записывает таблицу postal_codes в файл снимка.
+        :param connection: Соединение с базой данных.
+        :param path: Путь к файлу снимка.
+        :return: Количество почтовых кодов в снимке."""
+    return write_snapshot(path, iter_postal_codes(connection))
+
+
+def main(argv=None) -> None:
+    """Точка входа командной строки: `python -m service.snapshot_exporter postal_codes.snap`."""
+    parser = argparse.ArgumentParser(description="Export postal_codes into a memory-mappable snapshot file.")
+    parser.add_argument("path", help="snapshot file to write (replaced atomically)")
+    args = parser.parse_args(argv)
+    count = export_snapshot(Psycopg2Connection(), args.path)
+    print(f"Exported {count} postal codes to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# tests/benchmarks/test_fake_api.py
+import pytest
+
+from benchmarks.fake_api import FakeZippopotamServer
+from clients.api_client import ApiClient, ApiLookupStatus
+from clients.postal_code_info import PostalCodeInfo
+
+
+@pytest.fixture
+def fake_api():
+    """Фикстура с запущенной заглушкой API."""
+    with FakeZippopotamServer() as server:
+        yield server
+
+class TestFakeZippopotamServer:
+    """Класс для тестирования заглушки API через настоящий ApiClient."""
+    def test_found_and_not_found(self, fake_api):
+        """Тестирование ответа в формате Zippopotam и ответа 404 для кодов, начинающихся с 9."""
+        api_client = ApiClient(base_url=fake_api.base_url, max_retries=0)
+        try:
+            postal_data, status = api_client.fetch_postal_data("241014")
+            assert status is ApiLookupStatus.FOUND
+            assert postal_data["post code"] == "241014"
+            assert PostalCodeInfo.from_api_data(postal_data).country == "Russia"
+            assert api_client.fetch_postal_data("900001") == (None, ApiLookupStatus.NOT_FOUND)
+            assert fake_api.requests == 2
+        finally:
+            api_client.close()
+
+    def test_latency(self):
+        """Тестирование задержки ответа."""
+        with FakeZippopotamServer(latency=0.05) as server:
+            api_client = ApiClient(base_url=server.base_url, max_retries=0)
+            try:
+                api_client.fetch_postal_data("241014")
+                assert api_client.last_request()["latency"] >= 0.05
+            finally:
+                api_client.close()
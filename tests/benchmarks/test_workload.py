@@ -0,0 +1,49 @@
+# tests/benchmarks/test_workload.py
+from benchmarks.compare import compare
+from benchmarks.workload import (ABSENT_BASE, API_ONLY_BASE, SEEDED_BASE, MATRICES, Scenario, build_matrix,
+                                 generate_codes)
+
+
+def _result(name, throughput, p99):
+    return {"scenario": {"name": name}, "throughput_ops": throughput, "latency_ms": {"p99": p99}}
+
+class TestWorkload:
+    """Класс для тестирования генерации нагрузки и сравнения прогонов бенчмарков."""
+    def test_generate_codes_is_reproducible(self):
+        """Тестирование одинаковой последовательности кодов при одинаковых параметрах."""
+        scenario = Scenario("psycopg2", True, 4, hot_keys=10, hot_share=0.9, miss_ratio=0.1)
+        first = generate_codes(scenario, seed_count=1000, count=500, seed=1)
+        assert first == generate_codes(scenario, seed_count=1000, count=500, seed=1)
+        assert first != generate_codes(scenario, seed_count=1000, count=500, seed=2)
+
+    def test_generate_codes_ratios(self):
+        """Тестирование диапазонов кодов и долей промахов и «горячего» набора."""
+        scenario = Scenario("psycopg2", False, 1, hot_keys=10, hot_share=0.9, miss_ratio=0.2, absent_ratio=0.1)
+        codes = [int(code) for code in generate_codes(scenario, seed_count=1000, count=10000)]
+        misses = [code for code in codes if API_ONLY_BASE <= code < ABSENT_BASE]
+        absent = [code for code in codes if code >= ABSENT_BASE]
+        seeded = [code for code in codes if SEEDED_BASE <= code < SEEDED_BASE + 1000]
+        assert len(misses) + len(absent) + len(seeded) == len(codes)
+        assert len(set(misses)) == len(misses)  # Каждый промах - новый код
+        assert 0.17 < len(misses) / len(codes) < 0.23
+        assert 0.07 < len(absent) / len(codes) < 0.13
+        hot = [code for code in seeded if code < SEEDED_BASE + 10]
+        assert 0.85 < len(hot) / len(seeded) < 0.95
+
+    def test_build_matrix(self):
+        """Тестирование построения матрицы сценариев с уникальными именами."""
+        scenarios = build_matrix("quick", operations=100)
+        matrix = MATRICES["quick"]
+        assert len(scenarios) == (len(matrix["client"]) * len(matrix["cached"]) * len(matrix["concurrency"])
+                                  * len(matrix["skew"]) * len(matrix["miss_ratio"]))
+        assert len({scenario.name for scenario in scenarios}) == len(scenarios)
+        assert all(scenario.operations == 100 for scenario in scenarios)
+
+    def test_compare_detects_regressions(self):
+        """Тестирование сравнения прогонов: падение пропускной способности и рост p99 сверх порога."""
+        baseline = {"results": [_result("a", 1000, 2.0), _result("b", 1000, 2.0), _result("c", 1000, 2.0)]}
+        current = {"results": [_result("a", 950, 2.1), _result("b", 800, 2.0), _result("c", 1000, 3.0),
+                               _result("new", 1, 1.0)]}
+        rows, regressions = compare(baseline, current, threshold=0.1)
+        assert [row["scenario"] for row in rows] == ["a", "b", "c"]
+        assert regressions == ["b", "c"]
@@ -1,12 +1,12 @@
 # tests/test_api_client.py
 import pytest
 import requests
-from clients.api_client import ApiClient
+from clients.api_client import ApiClient, ApiLookupStatus
 
 @pytest.fixture
 def api_client():
-    """Фикстура для создания экземпляра ApiClient."""
-    return ApiClient()
+    """Фикстура для создания экземпляра ApiClient без задержек между повторами."""
+    return ApiClient(max_retries=2, sleep=lambda delay: None)
 
 class TestApiClient:
     """Класс для тестирования ApiClient."""
@@ -49,3 +49,70 @@ class TestApiClient:
         requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}", exc=requests.exceptions.Timeout)
         result = api_client.get_postal_data(post_code)
         assert result is None
+
+    def test_fetch_postal_data_not_found_status(self, requests_mock, api_client):
+        """Тест статуса NOT_FOUND для индекса, которого нет в API."""
+        post_code = "000000"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}", status_code=404)
+        assert api_client.fetch_postal_data(post_code) == (None, ApiLookupStatus.NOT_FOUND)
+
+    def test_fetch_postal_data_failure_status(self, requests_mock, api_client):
+        """Тест статуса FAILURE для временной ошибки API."""
+        post_code = "500000"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}", status_code=503)
+        assert api_client.fetch_postal_data(post_code) == (None, ApiLookupStatus.FAILURE)
+
+    def test_fetch_postal_data_retries_server_errors(self, requests_mock, api_client):
+        """Тест повтора запроса после ответов 5xx/429 и учета повторов."""
+        post_code = "241014"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}",
+                          [{"status_code": 503}, {"status_code": 429}, {"json": {"post code": post_code}}])
+        assert api_client.fetch_postal_data(post_code) == ({"post code": post_code}, ApiLookupStatus.FOUND)
+        assert requests_mock.call_count == 3
+        assert api_client.last_request()["retries"] == 2
+        assert api_client.stats()["retries"] == 2
+
+    def test_fetch_postal_data_gives_up_after_max_retries(self, requests_mock, api_client):
+        """Тест статуса FAILURE после исчерпания повторов при таймаутах."""
+        post_code = "500000"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}", exc=requests.exceptions.ConnectTimeout)
+        assert api_client.fetch_postal_data(post_code) == (None, ApiLookupStatus.FAILURE)
+        assert requests_mock.call_count == 3
+        assert api_client.stats()["failures"] == 1
+
+    def test_not_found_is_not_retried(self, requests_mock, api_client):
+        """Тест отсутствия повторов для ответа 404."""
+        post_code = "000000"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}", status_code=404)
+        api_client.fetch_postal_data(post_code)
+        assert requests_mock.call_count == 1
+
+    def test_retry_after_header_is_honoured(self, requests_mock):
+        """Тест задержки перед повтором по заголовку Retry-After."""
+        delays = []
+        api_client = ApiClient(max_retries=1, backoff_max=5, sleep=delays.append)
+        post_code = "241014"
+        requests_mock.get(f"https://api.zippopotam.us/RU/{post_code}",
+                          [{"status_code": 429, "headers": {"Retry-After": "2"}}, {"json": {}}])
+        api_client.fetch_postal_data(post_code)
+        assert delays == [2.0]
+
+    def test_backoff_delay_is_bounded(self):
+        """Тест ограничения экспоненциальной задержки потолком backoff_max."""
+        api_client = ApiClient(backoff_base=1, backoff_max=3)
+        assert all(0 <= api_client._backoff_delay(attempt, None) <= 3 for attempt in range(10))
+
+    def test_session_is_reused(self, requests_mock, api_client):
+        """Тест использования одной сессии с таймаутами для всех запросов."""
+        requests_mock.get("https://api.zippopotam.us/RU/241014", json={})
+        session = api_client.session
+        api_client.fetch_postal_data("241014")
+        api_client.fetch_postal_data("241014")
+        assert api_client.session is session
+        assert requests_mock.request_history[0].timeout == api_client.timeout
+
+    def test_custom_base_url(self, requests_mock):
+        """Тест запроса к API по заданному базовому адресу (например, к локальной заглушке)."""
+        requests_mock.get("http://127.0.0.1:8081/RU/241014", json={"post code": "241014"})
+        api_client = ApiClient(base_url="http://127.0.0.1:8081/")
+        assert api_client.fetch_postal_data("241014") == ({"post code": "241014"}, ApiLookupStatus.FOUND)
@@ -0,0 +1,115 @@
+# tests/clients/test_async_api_client.py
+import asyncio
+
+import httpx
+
+from clients.api_client import ApiLookupStatus
+from clients.async_api_client import AsyncApiClient
+from config.db_data import Data
+
+
+def _run_with_client(handler, coroutine_factory, max_concurrency=None, **kwargs):
+    """Создает клиент с подмененным транспортом, выполняет корутину и закрывает клиент."""
+    async def scenario():
+        client = AsyncApiClient(max_concurrency=max_concurrency, transport=httpx.MockTransport(handler), **kwargs)
+        try:
+            return await coroutine_factory(client)
+        finally:
+            await client.aclose()
+    return asyncio.run(scenario())
+
+
+class TestAsyncApiClient:
+    """Класс для тестирования AsyncApiClient."""
+    def test_fetch_postal_data_found(self):
+        """Тестирование успешного получения данных из API."""
+        def handler(request):
+            assert request.url.path == "/RU/101000"
+            return httpx.Response(200, json={"post code": "101000"})
+
+        data, status = _run_with_client(handler, lambda client: client.fetch_postal_data("101000"))
+        assert data == {"post code": "101000"}
+        assert status == ApiLookupStatus.FOUND
+
+    def test_fetch_postal_data_not_found(self):
+        """Тестирование ответа 404: код отсутствует в API."""
+        data, status = _run_with_client(lambda request: httpx.Response(404),
+                                        lambda client: client.fetch_postal_data("000000"))
+        assert data is None
+        assert status == ApiLookupStatus.NOT_FOUND
+
+    def test_fetch_postal_data_failure(self):
+        """Тестирование сетевой ошибки и ответа 5xx."""
+        def handler(request):
+            raise httpx.ConnectError("connection refused")
+
+        assert _run_with_client(handler, lambda client: client.get_postal_data("101000"), max_retries=0) is None
+        _, status = _run_with_client(lambda request: httpx.Response(503),
+                                     lambda client: client.fetch_postal_data("101000"), max_retries=0)
+        assert status == ApiLookupStatus.FAILURE
+
+    def test_retries_with_backoff_and_retry_after(self):
+        """Тестирование повторов после ответов 503/429 и сетевой ошибки с учетом заголовка Retry-After."""
+        responses = [httpx.ConnectError("connection refused"), httpx.Response(503),
+                     httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200, json={"post code": "101000"})]
+        delays = []
+
+        def handler(request):
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        data, status = _run_with_client(handler, lambda client: client.fetch_postal_data("101000"),
+                                        max_retries=3, backoff_base=0.1, backoff_max=5, sleep=sleep)
+        assert status == ApiLookupStatus.FOUND
+        assert data == {"post code": "101000"}
+        assert len(delays) == 3
+        assert 0 <= delays[0] <= 0.1 and 0 <= delays[1] <= 0.2
+        assert delays[2] == 2.0
+
+    def test_client_error_is_not_retried(self):
+        """Тестирование отказа без повторов для ответа 400."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400)
+
+        _, status = _run_with_client(handler, lambda client: client.fetch_postal_data("101000"), max_retries=3)
+        assert status == ApiLookupStatus.FAILURE
+        assert len(calls) == 1
+
+    def test_timeout_from_settings(self):
+        """Тестирование таймаутов подключения и чтения из настроек Data."""
+        async def scenario():
+            client = AsyncApiClient()
+            try:
+                return client._client.timeout
+            finally:
+                await client.aclose()
+
+        timeout = asyncio.run(scenario())
+        assert timeout.connect == Data.API_CONNECT_TIMEOUT
+        assert timeout.read == Data.API_READ_TIMEOUT
+
+    def test_concurrency_is_bounded(self):
+        """Тестирование ограничения количества одновременных запросов к API."""
+        state = {"active": 0, "peak": 0}
+
+        async def handler(request):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return httpx.Response(200, json={})
+
+        async def lookups(client):
+            return await asyncio.gather(*(client.fetch_postal_data(str(code)) for code in range(20)))
+
+        results = _run_with_client(handler, lookups, max_concurrency=3)
+        assert len(results) == 20
+        assert state["peak"] == 3
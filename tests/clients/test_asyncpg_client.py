@@ -0,0 +1,125 @@
+# tests/clients/test_asyncpg_client.py
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from clients.async_base_client import AsyncBaseClient
+from clients.asyncpg_client import AsyncpgClient
+from clients.base_client import BaseClient
+from clients.postal_code_info import PostalCodeInfo
+from models.postal_queries import FLUSH_STATISTICS
+from service.async_api_db_service import AsyncApiDBService
+from utils.asyncpg_connection import AsyncpgConnection
+from utils.ttl_cache import LRUTTLCache
+
+
+@pytest.fixture
+def mock_connection():
+    """Фикстура для имитации асинхронного соединения с базой данных."""
+    connection = Mock(spec=AsyncpgConnection)
+    connection.execute_query = AsyncMock(return_value=None)
+    connection.execute_many = AsyncMock()
+    return connection
+
+@pytest.fixture
+def mock_api_service():
+    """Фикстура для имитации асинхронного сервиса API."""
+    service = Mock(spec=AsyncApiDBService)
+    service.fetch_postal_code_from_api = AsyncMock(return_value=None)
+    service.fetch_postal_codes_from_api = AsyncMock(return_value={})
+    return service
+
+class TestAsyncpgClient:
+    """Класс для тестирования AsyncpgClient."""
+    def test_async_contract(self, mock_connection):
+        """Тестирование того, что асинхронный клиент реализует AsyncBaseClient, а не синхронный BaseClient."""
+        client = AsyncpgClient(mock_connection)
+        assert isinstance(client, AsyncBaseClient)
+        assert not isinstance(client, BaseClient)
+
+    def test_select_postal_code_from_db(self, mock_connection):
+        """Тестирование получения почтового кода из базы данных с учетом статистики."""
+        mock_connection.execute_query.side_effect = [(37.6, 55.7, "Russia", "Москва"), None]
+        client = AsyncpgClient(mock_connection)
+        result = asyncio.run(client.select_postal_code("101000"))
+        assert vars(result) == vars(PostalCodeInfo(37.6, 55.7, "Russia", "Москва"))
+        stats_call = mock_connection.execute_query.call_args_list[1]
+        assert stats_call.args[0] == FLUSH_STATISTICS.statement
+        assert stats_call.args[1:] == (["101000"], [1])
+
+    def test_select_postal_code_falls_back_to_api(self, mock_connection, mock_api_service):
+        """Тестирование обращения к API, если код отсутствует в базе данных."""
+        postal_info = PostalCodeInfo(37.6, 55.7, "Russia", "Москва")
+        mock_api_service.fetch_postal_code_from_api.return_value = postal_info
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        client = AsyncpgClient(mock_connection, cache=cache, api_service=mock_api_service)
+        assert asyncio.run(client.select_postal_code("101000")) == postal_info
+        mock_api_service.fetch_postal_code_from_api.assert_awaited_once_with("101000")
+        assert cache.get("101000") == postal_info
+
+    def test_select_postal_code_cache_hit(self, mock_connection):
+        """Тестирование ответа из кэша без запроса выборки в базу данных."""
+        postal_info = PostalCodeInfo(37.6, 55.7, "Russia", "Москва")
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        cache.set("101000", postal_info)
+        client = AsyncpgClient(mock_connection, cache=cache)
+        assert asyncio.run(client.select_postal_code("101000")) == postal_info
+        mock_connection.execute_query.assert_awaited_once()
+        assert "INSERT INTO postal_codes_requests_statistics" in mock_connection.execute_query.call_args.args[0]
+
+    def test_select_postal_codes(self, mock_connection, mock_api_service):
+        """Тестирование пакетного получения: база данных, затем API для отсутствующих кодов."""
+        from_api = PostalCodeInfo(30.3, 59.9, "Russia", "Санкт-Петербург")
+        mock_connection.execute_query.side_effect = [[("101000", 37.6, 55.7, "Russia", "Москва")], None]
+        mock_api_service.fetch_postal_codes_from_api.return_value = {"190000": from_api, "000000": None}
+        client = AsyncpgClient(mock_connection, api_service=mock_api_service)
+
+        result = asyncio.run(client.select_postal_codes(["101000", "190000", "000000", "101000"]))
+        assert list(result) == ["101000", "190000", "000000"]
+        assert result["190000"] == from_api
+        assert result["000000"] is None
+        mock_api_service.fetch_postal_codes_from_api.assert_awaited_once_with(["190000", "000000"])
+        stats_call = mock_connection.execute_query.call_args_list[-1]
+        assert stats_call.args[1:] == (["101000", "190000"], [2, 1])
+
+    def test_insert_postal_codes_converts_coordinates(self, mock_connection):
+        """Тестирование пакетной вставки: координаты из API приводятся к float."""
+        postal_data = {
+            'post code': '101000', 'country': 'Russia', 'country abbreviation': 'RU',
+            'places': [{'place name': 'Москва', 'longitude': '37.6', 'latitude': '55.7',
+                        'state': 'Москва', 'state abbreviation': ''}]
+        }
+        client = AsyncpgClient(mock_connection)
+        asyncio.run(client.insert_postal_codes([postal_data]))
+        query, rows = mock_connection.execute_many.call_args.args
+        assert "ON CONFLICT (post_code) DO NOTHING" in query
+        assert rows == [('101000', 'Russia', 'RU', 'Москва', 37.6, 55.7, 'Москва', '')]
+
+    def test_insert_postal_codes_failure_skips_registration(self, mock_connection):
+        """Тестирование того, что коды неудавшейся пакетной вставки не попадают в индекс и кэши не сбрасываются."""
+        mock_connection.execute_many.return_value = False
+        postal_data = {
+            'post code': '101000', 'country': 'Russia', 'country abbreviation': 'RU',
+            'places': [{'place name': 'Москва', 'longitude': '37.6', 'latitude': '55.7',
+                        'state': 'Москва', 'state abbreviation': ''}]
+        }
+        geo_index, cache = Mock(), Mock()
+        client = AsyncpgClient(mock_connection, cache=cache, geo_index=geo_index)
+        asyncio.run(client.insert_postal_codes([postal_data]))
+        geo_index.add.assert_not_called()
+        cache.invalidate.assert_not_called()
+
+    def test_insert_fetched_postal_code(self, mock_connection):
+        """Тестирование вставки кода из API и учета запроса в статистике одним запросом."""
+        mock_connection.execute_query.return_value = (1, )
+        postal_data = {
+            'post code': '101000', 'country': 'Russia', 'country abbreviation': 'RU',
+            'places': [{'place name': 'Москва', 'longitude': '37.6', 'latitude': '55.7',
+                        'state': 'Москва', 'state abbreviation': ''}]
+        }
+        client = AsyncpgClient(mock_connection)
+        assert asyncio.run(client.insert_fetched_postal_code("101000", postal_data)) is True
+        query, *params = mock_connection.execute_query.call_args.args
+        assert "ON CONFLICT (post_code) DO NOTHING" in query and "postal_codes_requests_statistics" in query
+        assert params == ['101000', 'Russia', 'RU', 'Москва', 37.6, 55.7, 'Москва', '', '101000', 1]
@@ -6,6 +6,12 @@ import pytest
 from clients.postal_code_info import PostalCodeInfo
 from clients.psycopg2_client import Psycopg2Client
 from utils.psycopg2_connection import Psycopg2Connection
+from clients.api_client import ApiLookupStatus
+from models.postal_queries import FLUSH_STATISTICS, INSERT_FETCHED, LOOKUP, LOOKUP_AND_COUNT, LOOKUP_BATCH
+from service.negative_cache import NegativeLookupCache
+from utils.geo_index import GeoIndex
+from utils.metrics import LOOKUPS, STAGE_DURATION
+from utils.ttl_cache import LRUTTLCache
 
 
 @pytest.fixture
@@ -27,7 +33,7 @@ class TestPsycopg2Client:
         """Тестирование получения почтового кода из базы данных."""
         """Имитация данных из базы данных"""
         mock_result = (76.9133, 48.1699, "Russia", "Брянск 14")
-        mock_connection.execute_query.return_value = mock_result
+        mock_connection.execute_prepared.return_value = mock_result
 
         client = Psycopg2Client(mock_connection)
         result = client.select_postal_code("241014")
@@ -41,7 +47,7 @@ class TestPsycopg2Client:
     def test_select_postal_code_not_found(self, mock_connection):
         """Тестирование получения почтового кода, которого нет в базе данных."""
         """Имитация отсутствия данных в базе данных"""
-        mock_connection.execute_query.return_value = None
+        mock_connection.execute_prepared.return_value = None
 
         client = Psycopg2Client(mock_connection)
         """Имитация вызова ApiDBService для получения данных из API"""
@@ -60,7 +66,7 @@ class TestPsycopg2Client:
         """Тестирование выборки почтового кода из базы данных."""
         """Имитация данных из базы данных"""
         result = (76.9133, 48.1699, "Russia", "Брянск 14")
-        mock_connection.execute_query.return_value = result
+        mock_connection.execute_prepared.return_value = result
 
         client = Psycopg2Client(mock_connection)
         postal_info = client.get_postal_code_from_db("241014")
@@ -70,12 +76,27 @@ class TestPsycopg2Client:
         assert postal_info.latitude == 48.1699
         assert postal_info.country == "Russia"
         assert postal_info.state == "Брянск 14"
+        """Поиск и учет в статистике выполняются одним подготовленным запросом"""
+        mock_connection.execute_prepared.assert_called_once_with(LOOKUP_AND_COUNT, ("241014", ),
+                                                                 fetch_one=True, commit=True)
+        mock_connection.execute_query.assert_not_called()
+
+    def test_get_postal_code_from_db_with_aggregator(self, mock_connection):
+        """Тестирование того, что при заданном накопителе статистики выполняется только SELECT,
+        а попадание учитывается в накопителе."""
+        mock_connection.execute_prepared.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        statistics = Mock()
+        client = Psycopg2Client(mock_connection, statistics=statistics)
+        assert client.get_postal_code_from_db("241014").state == "Брянск 14"
+        mock_connection.execute_prepared.assert_called_once_with(LOOKUP, ("241014", ), fetch_one=True,
+                                                                 read_only=True, keys=("241014", ))
+        statistics.increment.assert_called_once_with("241014", 1)
 
 
     def test_get_postal_code_from_db_not_found(self, mock_connection):
         """Тестирование выборки почтового кода, которого нет в базе данных."""
         """Имитация отсутствия данных в базе данных"""
-        mock_connection.execute_query.return_value = None
+        mock_connection.execute_prepared.return_value = None
 
         client = Psycopg2Client(mock_connection)
         postal_info = client.get_postal_code_from_db("12345")
@@ -101,35 +122,200 @@ class TestPsycopg2Client:
         }
         client = Psycopg2Client(mock_connection)
         client.insert_postal_code(mock_data)
-        """Проверка вызова execute_query с правильными параметрами"""
-        mock_connection.execute_query.assert_called_once()
+        """Проверка вызова execute_prepared с правильными параметрами"""
+        mock_connection.execute_prepared.assert_called_once()
+
+    def test_insert_fetched_postal_code(self, mock_connection):
+        """Тестирование вставки кода из API и учета запроса одним подготовленным запросом с одним commit."""
+        mock_connection.execute_prepared.return_value = (0, )  # Код уже вставлен параллельным запросом
+        mock_data = {"post code": "358001", "country": "Russia", "country abbreviation": "RU",
+                     "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                                 "state abbreviation": "", "latitude": "46.3078"}]}
+        client = Psycopg2Client(mock_connection)
+        assert client.insert_fetched_postal_code("358001", mock_data) is False
+        mock_connection.execute_prepared.assert_called_once_with(
+            INSERT_FETCHED, ("358001", "Russia", "RU", "Элиста 1", 44.2558, 46.3078, "Калмыкия Республика", "",
+                             "358001", 1), fetch_one=True, commit=True)
+        mock_connection.execute_query.assert_not_called()
+
+    def test_insert_fetched_postal_code_failure(self, mock_connection):
+        """Тестирование того, что при ошибке вставки (execute_prepared вернул None) запрос не учитывается
+        в статистике, а код не попадает в кэши, пространственный индекс и чтения с основного сервера."""
+        mock_connection.execute_prepared.return_value = None
+        mock_data = {"post code": "358001", "country": "Russia", "country abbreviation": "RU",
+                     "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                                 "state abbreviation": "", "latitude": "46.3078"}]}
+        statistics, geo_index, cache = Mock(), Mock(), Mock()
+        client = Psycopg2Client(mock_connection, cache=cache, statistics=statistics, geo_index=geo_index)
+        assert client.insert_fetched_postal_code("358001", mock_data) is False
+        statistics.increment.assert_not_called()
+        geo_index.add.assert_not_called()
+        cache.invalidate.assert_not_called()
+        mock_connection.note_written.assert_not_called()
 
 
     def test_increment_request_statistic(self, mock_connection):
         """Тестирование обновления статистики запросов.
-        При первом вызове (SELECT) метод execute_query возвращает True. Это имитирует ситуацию, когда запись в таблице
-        статистики существует. В реальном коде это означает, что результат запроса SELECT не пустой, и метод пойдет
-        по пути обновления существующей записи.
-        """
-        """Имитация существующей записи в статистике"""
-        mock_connection.execute_query.side_effect = [True, None]
+        Без накопителя статистики запись выполняется сразу одним запросом UPSERT с фиксацией транзакции,
+        независимо от того, существует ли запись в таблице статистики."""
         client = Psycopg2Client(mock_connection)
         client.increment_request_statistic("358001")
-        """Проверка вызова execute_query для обновления существующей записи"""
-        assert mock_connection.execute_query.call_count == 2
+        mock_connection.execute_prepared.assert_called_once()
+        args, kwargs = mock_connection.execute_prepared.call_args
+        assert args[0] is FLUSH_STATISTICS
+        assert args[1] == (["358001"], [1])
+        assert kwargs["commit"] is True
+
 
+    def test_increment_request_statistic_with_aggregator(self, mock_connection):
+        """Тестирование того, что при заданном накопителе статистика не записывается в базу данных сразу."""
+        statistics = Mock()
+        client = Psycopg2Client(mock_connection, statistics=statistics)
+        client.increment_request_statistic("156011")
+        statistics.increment.assert_called_once_with("156011", 1)
+        mock_connection.execute_prepared.assert_not_called()
 
-    def test_increment_request_statistic_new_entry(self, mock_connection):
-        """Тестирование создания новой записи статистики запросов.
-            Настраиваем side_effect так, чтобы при первом вызове (SELECT) метод возвращал None (что означает, что записи нет),
-            а при втором вызове (INSERT) он также возвращает None, что не имеет значения для логики теста,
-            поскольку тестируем только количество вызовов.
-        """
-        """Имитация отсутствия записи в статистике"""
-        mock_connection.execute_query.side_effect = [None, None]
 
+    def test_flush_request_statistics(self, mock_connection):
+        """Тестирование записи пакета статистики одним запросом с кодами, упорядоченными по возрастанию."""
         client = Psycopg2Client(mock_connection)
-        client.increment_request_statistic("156011")
+        client.flush_request_statistics({"358001": 3, "156011": 1})
+        mock_connection.execute_prepared.assert_called_once()
+        assert mock_connection.execute_prepared.call_args[0][1] == (["156011", "358001"], [1, 3])
+
+        mock_connection.execute_prepared.reset_mock()
+        client.flush_request_statistics({})
+        mock_connection.execute_prepared.assert_not_called()
+
+    def test_select_postal_code_cache_hit(self, mock_connection):
+        """Тестирование повторного запроса почтового кода из кэша без обращения к базе данных."""
+        mock_connection.execute_prepared.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        client = Psycopg2Client(mock_connection, cache=LRUTTLCache(max_size=10, ttl=60))
+        first = client.select_postal_code("241014")
+        with patch.object(client, 'get_postal_code_from_db') as mock_get_from_db:
+            second = client.select_postal_code("241014")
+            mock_get_from_db.assert_not_called()
+        assert second is first
+        assert client.cache.stats()["hits"] == 1
+
+    def test_select_postal_code_records_metrics(self, mock_connection):
+        """Тестирование учета результата и длительности этапов запроса в метриках."""
+        mock_connection.execute_prepared.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        lookups = LOOKUPS.labels("psycopg2", "db_hit")
+        db_select = STAGE_DURATION.labels("psycopg2", "db_select")
+        lookups_before, db_select_before = lookups.value, db_select.snapshot()[2]
+        Psycopg2Client(mock_connection).select_postal_code("241014")
+        assert lookups.value == lookups_before + 1
+        assert db_select.snapshot()[2] == db_select_before + 1
 
-        """Проверка вызова execute_query для создания новой записи"""
-        assert mock_connection.execute_query.call_count == 2
\ No newline at end of file
+    def test_insert_postal_code_invalidates_cache(self, mock_connection):
+        """Тестирование удаления записи из кэша при вставке новых данных о почтовом коде."""
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        cache.set("358001", PostalCodeInfo(0.0, 0.0, "Russia", "Старые данные"))
+        client = Psycopg2Client(mock_connection, cache=cache)
+        client.insert_postal_code({
+            "post code": "358001",
+            "country": "Russia",
+            "country abbreviation": "RU",
+            "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                        "state abbreviation": "", "latitude": "46.3078"}]
+        })
+        assert cache.get("358001") is None
+
+    def test_insert_postal_code_updates_geo_index(self, mock_connection):
+        """Тестирование добавления вставленного почтового кода в пространственный индекс."""
+        geo_index = GeoIndex()
+        client = Psycopg2Client(mock_connection, geo_index=geo_index)
+        client.insert_postal_code({
+            "post code": "358001",
+            "country": "Russia",
+            "country abbreviation": "RU",
+            "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                        "state abbreviation": "", "latitude": "46.3078"}]
+        })
+        nearest = geo_index.nearest(46.3, 44.25)
+        assert [item.post_code for item in nearest] == ["358001"]
+        assert nearest[0].distance_km < 1
+
+    def test_select_postal_code_negative_cache_hit(self, mock_connection):
+        """Тестирование того, что недавно не найденный индекс не запрашивается ни из базы данных, ни из API."""
+        negative_cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        negative_cache.add("000000", ApiLookupStatus.NOT_FOUND)
+        client = Psycopg2Client(mock_connection, negative_cache=negative_cache)
+        with patch('service.api_db_service.ApiDBService') as api_mock_service:
+            assert client.select_postal_code("000000") is None
+            api_mock_service.assert_not_called()
+        mock_connection.execute_prepared.assert_not_called()
+
+    def test_select_postal_codes(self, mock_connection):
+        """Тестирование пакетного получения почтовых кодов: найденные в базе данных выбираются одним запросом ANY,
+        отсутствующие запрашиваются через ApiDBService, результат сохраняет порядок входных данных."""
+        mock_connection.execute_prepared.return_value = [("241014", 76.9133, 48.1699, "Russia", "Брянск 14")]
+        client = Psycopg2Client(mock_connection)
+        with patch('service.api_db_service.ApiDBService') as api_mock_service:
+            api_mock_service.return_value.fetch_postal_codes_from_api.return_value = {
+                "183008": PostalCodeInfo(33.0819, 68.9717, "Russia", "Мурманск 8"), "000000": None}
+            with patch.object(client, 'flush_request_statistics') as mock_flush:
+                result = client.select_postal_codes(["183008", "241014", "000000", "241014"])
+            api_mock_service.return_value.fetch_postal_codes_from_api.assert_called_once_with(["183008", "000000"])
+        assert list(result) == ["183008", "241014", "000000"]
+        assert result["241014"].state == "Брянск 14"
+        assert result["183008"].state == "Мурманск 8"
+        assert result["000000"] is None
+        mock_flush.assert_called_once_with({"183008": 1, "241014": 2})
+        select_call = mock_connection.execute_prepared.call_args_list[0]
+        assert select_call[0][0] is LOOKUP_BATCH
+        assert select_call[0][1] == (["183008", "241014", "000000"], )
+
+    def test_select_postal_codes_records_outcomes(self, mock_connection):
+        """Тестирование учета результатов пакетного запроса в метриках: по одному на различный код."""
+        mock_connection.execute_prepared.return_value = [("241014", 76.9133, 48.1699, "Russia", "Брянск 14")]
+        counters = {result: LOOKUPS.labels("psycopg2", result) for result in ("db_hit", "api_hit", "not_found")}
+        before = {result: counter.value for result, counter in counters.items()}
+        client = Psycopg2Client(mock_connection)
+        with patch('service.api_db_service.ApiDBService') as api_mock_service:
+            api_mock_service.return_value.fetch_postal_codes_from_api.return_value = {
+                "183008": PostalCodeInfo(33.0819, 68.9717, "Russia", "Мурманск 8"), "000000": None}
+            with patch.object(client, 'flush_request_statistics'):
+                client.select_postal_codes(["183008", "241014", "000000", "241014"])
+        assert {result: counter.value - before[result] for result, counter in counters.items()} == {
+            "db_hit": 1, "api_hit": 1, "not_found": 1}
+
+    def test_get_postal_codes_from_db_chunks(self, mock_connection):
+        """Тестирование разбиения пакета на несколько запросов по BATCH_CHUNK_SIZE кодов."""
+        mock_connection.execute_prepared.return_value = []
+        client = Psycopg2Client(mock_connection)
+        with patch('clients.psycopg2_client.Data.BATCH_CHUNK_SIZE', 2):
+            assert client.get_postal_codes_from_db(["1", "2", "3"]) == {}
+        assert mock_connection.execute_prepared.call_count == 2
+
+    def test_insert_postal_codes(self, mock_connection):
+        """Тестирование пакетной вставки данных о почтовых кодах одним вызовом execute_values."""
+        mock_data = {
+            "post code": "358001",
+            "country": "Russia",
+            "country abbreviation": "RU",
+            "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                        "state abbreviation": "", "latitude": "46.3078"}]
+        }
+        client = Psycopg2Client(mock_connection)
+        client.insert_postal_codes([mock_data, dict(mock_data, **{"post code": "358002"})])
+        mock_connection.execute_values.assert_called_once()
+        query, rows = mock_connection.execute_values.call_args[0]
+        assert "ON CONFLICT (post_code) DO NOTHING" in query
+        assert [row[0] for row in rows] == ["358001", "358002"]
+
+    def test_insert_postal_codes_failure_skips_registration(self, mock_connection):
+        """Тестирование того, что коды неудавшейся пакетной вставки не попадают в индекс и не помечаются записанными."""
+        mock_connection.execute_values.return_value = False
+        mock_data = {
+            "post code": "358001", "country": "Russia", "country abbreviation": "RU",
+            "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                        "state abbreviation": "", "latitude": "46.3078"}]
+        }
+        geo_index, cache = Mock(), Mock()
+        client = Psycopg2Client(mock_connection, cache=cache, geo_index=geo_index)
+        client.insert_postal_codes([mock_data])
+        geo_index.add.assert_not_called()
+        cache.invalidate.assert_not_called()
+        mock_connection.note_written.assert_not_called()
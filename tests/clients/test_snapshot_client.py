@@ -0,0 +1,48 @@
+# tests/clients/test_snapshot_client.py
+from unittest.mock import Mock
+
+import pytest
+
+from clients.snapshot_client import ReadOnlyClientError, SnapshotClient
+from service.request_statistics import RequestStatisticsAggregator
+from utils.postal_snapshot import PostalSnapshot, write_snapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """Фикстура для открытого снимка с двумя почтовыми кодами."""
+    path = str(tmp_path / "postal_codes.snap")
+    write_snapshot(path, [("101000", 37.6, 55.7, "Russia", "Москва", "Москва"),
+                          ("190000", 30.3, 59.9, "Russia", "Санкт-Петербург", "Санкт-Петербург")])
+    with PostalSnapshot(path) as opened:
+        yield opened
+
+class TestSnapshotClient:
+    """Класс для тестирования SnapshotClient."""
+    def test_select_postal_code(self, snapshot):
+        """Тестирование поиска кода и учета статистики в накопителе."""
+        statistics = Mock(spec=RequestStatisticsAggregator)
+        client = SnapshotClient(snapshot, statistics=statistics)
+        assert client.select_postal_code("101000").state == "Москва"
+        assert client.select_postal_code("000000") is None
+        statistics.increment.assert_called_once_with("101000", 1)
+
+    def test_select_postal_codes(self, snapshot):
+        """Тестирование пакетного поиска с повторами кодов."""
+        statistics = Mock(spec=RequestStatisticsAggregator)
+        client = SnapshotClient(snapshot, statistics=statistics)
+        result = client.select_postal_codes(["190000", "000000", "190000"])
+        assert list(result) == ["190000", "000000"]
+        assert result["000000"] is None
+        statistics.increment.assert_called_once_with("190000", 2)
+
+    def test_client_is_read_only(self, snapshot):
+        """Тестирование запрета вставки в снимок."""
+        client = SnapshotClient(snapshot)
+        with pytest.raises(ReadOnlyClientError):
+            client.insert_postal_code({})
+        with pytest.raises(PermissionError):
+            client.insert_fetched_postal_code("101000", {})
+        with pytest.raises(ReadOnlyClientError):
+            client.flush_request_statistics({"101000": 1})
+        client.increment_request_statistic("101000")  # Без накопителя статистика не учитывается
@@ -2,11 +2,15 @@
 from unittest.mock import Mock, MagicMock, patch
 
 import pytest
+from psycopg2.errors import InvalidSqlStatementName
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError, ProgrammingError
 
 from clients.postal_code_info import PostalCodeInfo
 from clients.sqlalchemy_client import SqlAlchemyClient
-from models.sqlalchemy_models import PostalCodeRequestStatistics
+from models.postal_queries import LOOKUP_AND_COUNT
 from utils.sqlalchemy_connection import SQLAlchemyConnection
+from utils.ttl_cache import LRUTTLCache
 
 @pytest.fixture
 def mock_session():
@@ -25,6 +29,7 @@ def mock_connection(mock_session):
     """Фикстура для имитации соединения SQLAlchemy."""
     connection = Mock(spec=SQLAlchemyConnection)
     connection.get_session.return_value = mock_session
+    connection.read.side_effect = lambda work, keys=(): work(mock_session)
     return connection
 
 class TestSQLAlchemyClient:
@@ -76,6 +81,32 @@ class TestSQLAlchemyClient:
         assert result.country == "Russia"
         assert result.state == "Брянск 14"
 
+    def test_get_postal_code_from_db_prepares_once(self, mock_connection, mock_session):
+        """Тестирование того, что поиск и учет в статистике выполняются подготовленным запросом,
+        а PREPARE выполняется только при первом использовании соединения."""
+        mock_session.execute.return_value.fetchone.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        client = SqlAlchemyClient(mock_connection)
+        client.get_postal_code_from_db("241014")
+        client.get_postal_code_from_db("241015")
+        statements = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+        assert statements == [LOOKUP_AND_COUNT.prepare_sql(), "EXECUTE postal_lookup_and_count (:post_code)",
+                              "EXECUTE postal_lookup_and_count (:post_code)"]
+        assert mock_session.execute.call_args.args[1] == {"post_code": "241015"}
+        assert mock_session.commit.call_count == 2
+
+    def test_get_postal_code_from_db_reprepares_missing_statement(self, mock_connection, mock_session):
+        """Тестирование повторной подготовки запроса, который сервер больше не помнит (например, после DISCARD ALL)."""
+        found = Mock()
+        found.fetchone.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        missing = ProgrammingError("EXECUTE", {}, InvalidSqlStatementName("missing"))
+        mock_session.execute.side_effect = [Mock(), missing, Mock(), found]
+        client = SqlAlchemyClient(mock_connection)
+        assert client.get_postal_code_from_db("241014").state == "Брянск 14"
+        statements = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+        assert statements == [LOOKUP_AND_COUNT.prepare_sql(), "EXECUTE postal_lookup_and_count (:post_code)"] * 2
+        mock_session.rollback.assert_called_once()
+        mock_session.commit.assert_called_once()
+
     def test_get_postal_code_from_db_not_found(self, mock_connection, mock_session):
         """Тестирование выборки почтового кода из базы данных, когда код не найден."""
         client = SqlAlchemyClient(mock_connection)
@@ -105,24 +136,93 @@ class TestSQLAlchemyClient:
         mock_session.add.assert_called_once()
         mock_session.commit.assert_called_once()
 
+    def test_insert_fetched_postal_code(self, mock_connection, mock_session):
+        """Тестирование вставки кода из API без ошибки при гонке и учета запроса в той же транзакции."""
+        mock_session.execute.return_value.first.return_value = ("358001", )
+        mock_data = {"post code": "358001", "country": "Russia", "country abbreviation": "RU",
+                     "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                                 "state abbreviation": "", "latitude": "46.3078"}]}
+        client = SqlAlchemyClient(mock_connection)
+        assert client.insert_fetched_postal_code("358001", mock_data) is True
+        insert_sql, statistics_sql = (str(call.args[0].compile(dialect=postgresql.dialect()))
+                                      for call in mock_session.execute.call_args_list)
+        assert "ON CONFLICT (post_code) DO NOTHING RETURNING postal_codes.post_code" in insert_sql
+        assert "postal_codes_requests_statistics" in statistics_sql
+        mock_session.commit.assert_called_once()
+
+    def test_insert_fetched_postal_code_failure(self, mock_connection, mock_session):
+        """Тестирование того, что ошибка базы данных при вставке кода из API дает `False` без изменения статистики,
+        кэшей и индекса, как в остальных клиентах."""
+        mock_session.execute.side_effect = OperationalError("INSERT", {}, Exception("server closed the connection"))
+        mock_data = {"post code": "358001", "country": "Russia", "country abbreviation": "RU",
+                     "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                                 "state abbreviation": "", "latitude": "46.3078"}]}
+        statistics, geo_index = Mock(), Mock()
+        client = SqlAlchemyClient(mock_connection, statistics=statistics, geo_index=geo_index)
+        assert client.insert_fetched_postal_code("358001", mock_data) is False
+        mock_session.commit.assert_not_called()
+        statistics.increment.assert_not_called()
+        geo_index.add.assert_not_called()
+        mock_connection.note_written.assert_not_called()
+
 
     def test_increment_request_statistic(self, mock_connection, mock_session):
-        """Тестирование обновления статистики запросов для почтового кода. """
+        """Тестирование обновления статистики запросов для почтового кода одним запросом UPSERT без загрузки ORM-объекта."""
         client = SqlAlchemyClient(mock_connection)
-        """Случай, когда запись статистики существует"""
-        mock_statistic = Mock()
-        mock_statistic.request_count = 1
-        mock_session.query.return_value.filter_by.return_value.first.return_value = mock_statistic
-
         client.increment_request_statistic("241014")
-        assert mock_statistic.request_count == 2
+        mock_session.execute.assert_called_once()
+        mock_session.query.assert_not_called()
         mock_session.commit.assert_called_once()
+        statement = str(mock_session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (post_code) DO UPDATE" in statement
 
-        """Сброс вызовов commit для нового тестового сценария"""
-        mock_session.commit.reset_mock()
+    def test_increment_request_statistic_with_aggregator(self, mock_connection, mock_session):
+        """Тестирование того, что при заданном накопителе статистика не записывается в базу данных сразу."""
+        statistics = Mock()
+        client = SqlAlchemyClient(mock_connection, statistics=statistics)
+        client.increment_request_statistic("241014")
+        statistics.increment.assert_called_once_with("241014", 1)
+        mock_session.execute.assert_not_called()
 
-        """Случай, когда записи статистики нет"""
-        mock_session.query.return_value.filter_by.return_value.first.return_value = None
-        client.increment_request_statistic("241015")
-        mock_session.add.assert_called_once()
+    def test_select_postal_code_cache_hit(self, mock_connection, mock_session):
+        """Тестирование повторного запроса почтового кода из кэша без обращения к базе данных."""
+        mock_session.execute.return_value.fetchone.return_value = (76.9133, 48.1699, "Russia", "Брянск 14")
+        client = SqlAlchemyClient(mock_connection, cache=LRUTTLCache(max_size=10, ttl=60))
+        first = client.select_postal_code("241014")
+        with patch.object(client, 'get_postal_code_from_db') as mock_get_from_db:
+            second = client.select_postal_code("241014")
+            mock_get_from_db.assert_not_called()
+        assert second is first
+        assert client.cache.stats()["hits"] == 1
+
+    def test_select_postal_codes(self, mock_connection, mock_session):
+        """Тестирование пакетного получения почтовых кодов с сохранением порядка входных данных."""
+        mock_session.execute.return_value.fetchall.return_value = [
+            ("241014", 76.9133, 48.1699, "Russia", "Брянск 14")]
+        client = SqlAlchemyClient(mock_connection)
+        with patch('service.api_db_service.ApiDBService') as api_mock_service:
+            api_mock_service.return_value.fetch_postal_codes_from_api.return_value = {"000000": None}
+            with patch.object(client, 'flush_request_statistics') as mock_flush:
+                result = client.select_postal_codes(["000000", "241014"])
+            api_mock_service.return_value.fetch_postal_codes_from_api.assert_called_once_with(["000000"])
+        assert list(result) == ["000000", "241014"]
+        assert result["000000"] is None
+        assert result["241014"].state == "Брянск 14"
+        mock_flush.assert_called_once_with({"241014": 1})
+        assert mock_session.execute.call_args[0][1] == {"post_codes": ["000000", "241014"]}
+
+    def test_insert_postal_codes(self, mock_connection, mock_session):
+        """Тестирование пакетной вставки данных о почтовых кодах одним запросом."""
+        mock_data = {
+            "post code": "358001",
+            "country": "Russia",
+            "country abbreviation": "RU",
+            "places": [{"place name": "Элиста 1", "longitude": "44.2558", "state": "Калмыкия Республика",
+                        "state abbreviation": "", "latitude": "46.3078"}]
+        }
+        client = SqlAlchemyClient(mock_connection)
+        client.insert_postal_codes([mock_data, dict(mock_data, **{"post code": "358002"})])
+        mock_session.execute.assert_called_once()
         mock_session.commit.assert_called_once()
+        statement = str(mock_session.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (post_code) DO NOTHING" in statement
@@ -0,0 +1,38 @@
+# tests/models/test_schema_check.py
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table
+
+from models.schema_check import compare_models_with_migrations, migration_schema
+
+
+class TestSchemaCheck:
+    """Класс для тестирования согласованности моделей SQLAlchemy и миграций Alembic."""
+    def test_models_match_migrations(self):
+        """Тестирование того, что цепочка миграций создает ту же схему, что описана в моделях."""
+        assert compare_models_with_migrations() == []
+
+    def test_migrations_tune_statistics_table(self):
+        """Тестирование индексов postal_codes и параметров хранения таблицы статистики в миграциях."""
+        schema = migration_schema()
+        assert {"ix_postal_codes_state_place_name", "ix_postal_codes_place_name",
+                "ix_postal_codes_coordinates", "ix_postal_codes_place_name_trgm"} <= schema["postal_codes"].indexes.keys()
+        assert schema["postal_codes"].columns["state"] == "VARCHAR(255)"
+        assert schema["postal_codes_requests_statistics"].storage["fillfactor"] == "70"
+        assert schema["postal_codes_requests_statistics"].indexes == {}  # request_count без индексов: HOT-обновления
+
+    def test_detects_differences(self):
+        """Тестирование обнаружения расхождений: тип столбца, лишний индекс, параметры хранения, лишняя таблица."""
+        metadata = MetaData()
+        Table("postal_codes", metadata,
+              Column("post_code", String(10), primary_key=True), Column("country", String(60)),
+              Column("country_abbreviation", String(10)), Column("place_name", String(100)),
+              Column("longitude", Float), Column("state", String(100)), Column("state_abbreviation", String(10)),
+              Column("latitude", Float), Index("ix_postal_codes_country", "country"))
+        Table("postal_codes_requests_statistics", metadata,
+              Column("post_code", String(10), primary_key=True), Column("request_count", Integer))
+        Table("other", metadata, Column("id", Integer, primary_key=True))
+        differences = compare_models_with_migrations(metadata)
+        assert "table other is missing in migrations" in differences
+        assert any("column state" in difference and "VARCHAR(100)" in difference for difference in differences)
+        assert any("index ix_postal_codes_country" in difference for difference in differences)
+        assert any("index ix_postal_codes_coordinates" in difference for difference in differences)
+        assert any("storage parameter fillfactor" in difference for difference in differences)
@@ -1,12 +1,15 @@
 # tests/service/test_api_db_service.py
+import threading
+import time
 from unittest.mock import Mock, patch
 
 import pytest
 
-from clients.api_client import ApiClient
+from clients.api_client import ApiClient, ApiLookupStatus
 from clients.postal_code_info import PostalCodeInfo
 from clients.sqlalchemy_client import SqlAlchemyClient
 from service.api_db_service import ApiDBService
+from service.negative_cache import NegativeLookupCache
 
 
 @pytest.fixture
@@ -43,8 +46,8 @@ class TestApiDBService:
             ]
         }
         """ Настройка мока для ApiClient """
-        with patch('clients.api_client.ApiClient', return_value=mock_api_client):
-            mock_api_client.get_postal_data.return_value = mock_data
+        with patch('service.api_db_service.ApiClient.shared', return_value=mock_api_client):
+            mock_api_client.fetch_postal_data.return_value = (mock_data, ApiLookupStatus.FOUND)
             service = ApiDBService(mock_db_client)
             result = service.fetch_postal_code_from_api("241014")
             assert isinstance(result, PostalCodeInfo)
@@ -53,18 +56,118 @@ class TestApiDBService:
             assert result.country == "Russia"
             assert result.state == "Брянск 14"
 
-            mock_db_client.insert_postal_code.assert_called_once()
-            mock_db_client.increment_request_statistic.assert_called_once()
+            """Вставка и учет запроса в статистике выполняются одной транзакцией"""
+            mock_db_client.insert_fetched_postal_code.assert_called_once_with("241014", mock_data)
+            mock_db_client.insert_postal_code.assert_not_called()
+            mock_db_client.increment_request_statistic.assert_not_called()
 
 
     def test_fetch_postal_code_from_api_not_found(self,mock_db_client, mock_api_client):
         """Тестирование получения данных о почтовом коде из API, когда данные не найдены."""
         """ Настройка мока для ApiClient """
-        with patch('clients.api_client.ApiClient', return_value=mock_api_client):
-            mock_api_client.get_postal_data.return_value = None
+        with patch('service.api_db_service.ApiClient.shared', return_value=mock_api_client):
+            mock_api_client.fetch_postal_data.return_value = (None, ApiLookupStatus.NOT_FOUND)
 
             service = ApiDBService(mock_db_client)
             result = service.fetch_postal_code_from_api("241014")
             assert result is None
             mock_db_client.insert_postal_code.assert_not_called()
-            mock_db_client.increment_request_statistic.assert_not_called()
\ No newline at end of file
+            mock_db_client.increment_request_statistic.assert_not_called()
+
+    def test_fetch_postal_code_from_api_remembers_not_found(self, mock_db_client, mock_api_client):
+        """Тестирование того, что отсутствующий в API индекс запоминается и повторно не запрашивается."""
+        negative_cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=1)
+        with patch('service.api_db_service.ApiClient.shared', return_value=mock_api_client):
+            mock_api_client.fetch_postal_data.return_value = (None, ApiLookupStatus.NOT_FOUND)
+            service = ApiDBService(mock_db_client, negative_cache)
+            assert service.fetch_postal_code_from_api("000000") is None
+            assert service.fetch_postal_code_from_api("000000") is None
+            mock_api_client.fetch_postal_data.assert_called_once_with("000000")
+            assert negative_cache.get("000000") is ApiLookupStatus.NOT_FOUND
+
+    def test_fetch_postal_codes_from_api(self, mock_db_client, mock_api_client):
+        """Тестирование пакетной загрузки из API: найденные коды вставляются без учета статистики,
+        отсутствующие запоминаются в кэше неудачных запросов."""
+        mock_data = {
+            'post code': '241014',
+            'country': 'Russia',
+            'country abbreviation': 'RU',
+            'places': [{'place name': 'Брянск', 'longitude': 76.9133, 'latitude': 48.1699, 'state': 'Брянск 14',
+                        'state abbreviation': ''}]
+        }
+        responses = {"241014": (mock_data, ApiLookupStatus.FOUND), "000000": (None, ApiLookupStatus.NOT_FOUND)}
+        negative_cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=1)
+        with patch('service.api_db_service.ApiClient.shared', return_value=mock_api_client):
+            mock_api_client.fetch_postal_data.side_effect = responses.get
+            service = ApiDBService(mock_db_client, negative_cache)
+            result = service.fetch_postal_codes_from_api(["241014", "000000"])
+        assert result["241014"].state == "Брянск 14"
+        assert result["000000"] is None
+        mock_db_client.insert_postal_codes.assert_called_once_with([mock_data])
+        mock_db_client.increment_request_statistic.assert_not_called()
+        assert negative_cache.get("000000") is ApiLookupStatus.NOT_FOUND
+
+    def test_concurrent_misses_are_coalesced(self, mock_db_client, mock_api_client):
+        """Тестирование одного запроса к API и одной вставки для одновременных промахов по одному коду."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(postal_code):
+            started.set()
+            release.wait(1)
+            return {'post code': postal_code, 'country': 'Russia', 'country abbreviation': 'RU',
+                    'places': [{'place name': 'Москва', 'longitude': '37.6', 'latitude': '55.7',
+                                'state': 'Москва', 'state abbreviation': ''}]}, ApiLookupStatus.FOUND
+
+        mock_api_client.fetch_postal_data.side_effect = slow_fetch
+        results = []
+        service = ApiDBService(mock_db_client, api_client=mock_api_client)
+        threads = [threading.Thread(target=lambda: results.append(service.fetch_postal_code_from_api("101000")))
+                   for _ in range(3)]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        while ApiDBService._flight._calls["101000"].waiters < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(1)
+
+        assert len(results) == 3 and all(result.state == "Москва" for result in results)
+        mock_api_client.fetch_postal_data.assert_called_once_with("101000")
+        mock_db_client.insert_fetched_postal_code.assert_called_once()
+        assert mock_db_client.increment_request_statistic.call_count == 2  # Ведущий учтен при вставке
+
+    def test_single_and_batch_misses_are_coalesced(self, mock_db_client, mock_api_client):
+        """Тестирование одного запроса к API и одной вставки для одновременных одиночного и пакетного промахов."""
+        started = threading.Event()
+        release = threading.Event()
+        postal_data = {'post code': '101000', 'country': 'Russia', 'country abbreviation': 'RU',
+                       'places': [{'place name': 'Москва', 'longitude': '37.6', 'latitude': '55.7',
+                                   'state': 'Москва', 'state abbreviation': ''}]}
+
+        def slow_fetch(postal_code):
+            started.set()
+            release.wait(1)
+            return postal_data, ApiLookupStatus.FOUND
+
+        mock_api_client.fetch_postal_data.side_effect = slow_fetch
+        results = {}
+        service = ApiDBService(mock_db_client, api_client=mock_api_client)
+        batch = threading.Thread(target=lambda: results.update(service.fetch_postal_codes_from_api(["101000"])))
+        batch.start()
+        started.wait(1)
+        single = threading.Thread(target=lambda: results.update(single=service.fetch_postal_code_from_api("101000")))
+        single.start()
+        while ApiDBService._flight._calls["101000"].waiters < 1:
+            time.sleep(0.001)
+        release.set()
+        batch.join(1)
+        single.join(1)
+
+        assert results["101000"].state == results["single"].state == "Москва"
+        mock_api_client.fetch_postal_data.assert_called_once_with("101000")
+        mock_db_client.insert_postal_codes.assert_called_once_with([postal_data])
+        mock_db_client.insert_fetched_postal_code.assert_not_called()
+        mock_db_client.increment_request_statistic.assert_called_once_with("101000")
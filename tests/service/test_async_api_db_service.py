@@ -0,0 +1,108 @@
+# tests/service/test_async_api_db_service.py
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from clients.api_client import ApiLookupStatus
+from clients.async_api_client import AsyncApiClient
+from clients.asyncpg_client import AsyncpgClient
+from clients.postal_code_info import PostalCodeInfo
+from service.async_api_db_service import AsyncApiDBService
+from service.negative_cache import NegativeLookupCache
+
+MOCK_DATA = {
+    'post code': '241014',
+    'country': 'Russia',
+    'country abbreviation': 'RU',
+    'places': [{'place name': 'Брянск', 'longitude': '34.3', 'latitude': '53.2',
+                'state': 'Брянск 14', 'state abbreviation': ''}]
+}
+
+
+@pytest.fixture
+def mock_db_client():
+    """Фикстура для имитации асинхронного клиента базы данных."""
+    db_client = Mock(spec=AsyncpgClient)
+    db_client.insert_postal_code = AsyncMock()
+    db_client.insert_fetched_postal_code = AsyncMock()
+    db_client.insert_postal_codes = AsyncMock()
+    db_client.increment_request_statistic = AsyncMock()
+    return db_client
+
+@pytest.fixture
+def mock_api_client():
+    """Фикстура для имитации асинхронного клиента API."""
+    api_client = Mock(spec=AsyncApiClient)
+    api_client.fetch_postal_data = AsyncMock()
+    return api_client
+
+class TestAsyncApiDBService:
+    """Класс для тестирования AsyncApiDBService."""
+    def test_fetch_postal_code_from_api_found(self, mock_db_client, mock_api_client):
+        """Тестирование получения данных из API и их сохранения в базе данных."""
+        mock_api_client.fetch_postal_data.return_value = (MOCK_DATA, ApiLookupStatus.FOUND)
+        service = AsyncApiDBService(mock_db_client, mock_api_client)
+        result = asyncio.run(service.fetch_postal_code_from_api("241014"))
+        assert vars(result) == vars(PostalCodeInfo("34.3", "53.2", "Russia", "Брянск 14"))
+        mock_db_client.insert_fetched_postal_code.assert_awaited_once_with("241014", MOCK_DATA)
+        mock_db_client.increment_request_statistic.assert_not_awaited()
+
+    def test_fetch_postal_code_from_api_not_found(self, mock_db_client, mock_api_client):
+        """Тестирование запоминания отсутствующего кода в негативном кэше."""
+        mock_api_client.fetch_postal_data.return_value = (None, ApiLookupStatus.NOT_FOUND)
+        negative_cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        service = AsyncApiDBService(mock_db_client, mock_api_client, negative_cache)
+        assert asyncio.run(service.fetch_postal_code_from_api("000000")) is None
+        assert asyncio.run(service.fetch_postal_code_from_api("000000")) is None
+        mock_api_client.fetch_postal_data.assert_awaited_once_with("000000")
+        mock_db_client.insert_fetched_postal_code.assert_not_awaited()
+
+    def test_fetch_postal_codes_from_api(self, mock_db_client, mock_api_client):
+        """Тестирование параллельной загрузки пакета кодов и вставки найденных без учета статистики."""
+        mock_api_client.fetch_postal_data.side_effect = lambda code: (
+            (MOCK_DATA, ApiLookupStatus.FOUND) if code == "241014" else (None, ApiLookupStatus.FAILURE))
+        service = AsyncApiDBService(mock_db_client, mock_api_client)
+        result = asyncio.run(service.fetch_postal_codes_from_api(["241014", "999999"]))
+        assert vars(result["241014"]) == vars(PostalCodeInfo("34.3", "53.2", "Russia", "Брянск 14"))
+        assert result["999999"] is None
+        mock_db_client.insert_postal_codes.assert_awaited_once_with([MOCK_DATA])
+
+    def test_concurrent_misses_are_coalesced(self, mock_db_client, mock_api_client):
+        """Тестирование одного запроса к API и одной вставки для одновременных промахов по одному коду
+        в разных экземплярах сервиса."""
+        async def slow_fetch(postal_code):
+            await asyncio.sleep(0.01)
+            return MOCK_DATA, ApiLookupStatus.FOUND
+
+        mock_api_client.fetch_postal_data.side_effect = slow_fetch
+        services = [AsyncApiDBService(mock_db_client, mock_api_client) for _ in range(2)]
+
+        async def scenario():
+            return await asyncio.gather(*(services[i % 2].fetch_postal_code_from_api("241014") for i in range(10)))
+
+        assert all(result is not None for result in asyncio.run(scenario()))
+        mock_api_client.fetch_postal_data.assert_awaited_once_with("241014")
+        mock_db_client.insert_fetched_postal_code.assert_awaited_once()
+        assert mock_db_client.increment_request_statistic.await_count == 9  # Ведущий учтен при вставке
+
+    def test_single_and_batch_misses_are_coalesced(self, mock_db_client, mock_api_client):
+        """Тестирование одного запроса к API и одной вставки для одновременных пакетного и одиночного промахов."""
+        async def slow_fetch(postal_code):
+            await asyncio.sleep(0.01)
+            return MOCK_DATA, ApiLookupStatus.FOUND
+
+        mock_api_client.fetch_postal_data.side_effect = slow_fetch
+        service = AsyncApiDBService(mock_db_client, mock_api_client)
+
+        async def scenario():
+            batch_task = asyncio.ensure_future(service.fetch_postal_codes_from_api(["241014"]))
+            await asyncio.sleep(0.001)  # Пакетный вызов становится ведущим
+            return await asyncio.gather(batch_task, service.fetch_postal_code_from_api("241014"))
+
+        batch, single = asyncio.run(scenario())
+        assert batch["241014"] is not None and single is not None
+        mock_api_client.fetch_postal_data.assert_awaited_once_with("241014")
+        mock_db_client.insert_postal_codes.assert_awaited_once_with([MOCK_DATA])
+        mock_db_client.insert_fetched_postal_code.assert_not_awaited()
+        mock_db_client.increment_request_statistic.assert_awaited_once_with("241014")
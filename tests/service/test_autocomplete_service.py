@@ -0,0 +1,43 @@
+# tests/service/test_autocomplete_service.py
+from unittest.mock import Mock
+
+import pytest
+
+from service.autocomplete_service import AutocompleteService, like_prefix
+from utils.prefix_index import PrefixMatch
+from utils.psycopg2_connection import Psycopg2Connection
+
+
+@pytest.fixture
+def mock_connection():
+    """Фикстура для создания мок-объекта соединения."""
+    return Mock(spec=Psycopg2Connection)
+
+class TestAutocompleteService:
+    """Класс для тестирования сервиса автодополнения."""
+    def test_complete_from_db(self, mock_connection):
+        """Тестирование поиска в базе данных, пока индекс в памяти не загружен."""
+        mock_connection.execute_query.return_value = [("101001", "Москва", 40)]
+        service = AutocompleteService(mock_connection)
+        assert service.complete("place_name", " Мос", k=5) == [PrefixMatch("101001", "Москва", 40)]
+        args, kwargs = mock_connection.execute_query.call_args
+        assert "lower(p.place_name) LIKE %s" in args[0]
+        assert "ORDER BY request_count DESC" in args[0]
+        assert args[1] == ("мос%", 5)
+        assert kwargs["fetch_all"] is True
+
+    def test_complete_from_index(self, mock_connection):
+        """Тестирование загрузки индекса и поиска в памяти без запросов к базе данных."""
+        mock_connection.execute_query.return_value = [("101000", "Москва", 5), ("101001", "Москва", 40)]
+        service = AutocompleteService(mock_connection)
+        assert service.load() == 2
+        mock_connection.execute_query.reset_mock()
+        assert [match.post_code for match in service.complete("post_code", "101")] == ["101001", "101000"]
+        mock_connection.execute_query.assert_not_called()
+        with pytest.raises(ValueError):
+            service.complete("country", "Р")
+
+    def test_like_prefix(self):
+        """Тестирование экранирования спецсимволов LIKE."""
+        assert like_prefix("10") == "10%"
+        assert like_prefix("a_b%c\\") == "a\\_b\\%c\\\\%"
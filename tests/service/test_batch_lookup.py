@@ -0,0 +1,86 @@
+# tests/service/test_batch_lookup.py
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from clients.api_client import ApiClient
+from clients.postal_code_info import PostalCodeInfo
+from service.batch_lookup import BatchLookup, CsvWriter, JsonlWriter, iter_chunks, iter_postal_codes
+
+KNOWN = {"241014": PostalCodeInfo(76.9133, 48.1699, "Russia", "Брянск 14")}
+
+
+@pytest.fixture
+def client():
+    """Фикстура с клиентом базы данных, который знает только код 241014."""
+    client = Mock()
+    client.select_postal_codes.side_effect = lambda codes: {code: KNOWN.get(code) for code in codes}
+    return client
+
+@pytest.fixture
+def api_client():
+    """Фикстура с клиентом API, статистика которого не меняется."""
+    api_client = Mock(spec=ApiClient)
+    api_client.stats.return_value = {"requests": 0, "failures": 0}
+    return api_client
+
+class TestBatchLookup:
+    """Класс для тестирования пакетной обработки почтовых кодов."""
+    def test_iter_postal_codes(self):
+        """Тестирование чтения кодов: первое поле строки, пропуск пустых строк и комментариев."""
+        stream = io.StringIO("# header\n241014\n\n 101000 ;Москва\n190000,Санкт-Петербург\n630000\tНовосибирск\n")
+        assert list(iter_postal_codes(stream)) == ["241014", "101000", "190000", "630000"]
+
+    def test_iter_chunks_is_lazy(self):
+        """Тестирование разбиения потока на пачки без чтения потока целиком."""
+        consumed = []
+
+        def codes():
+            for number in range(5):
+                consumed.append(number)
+                yield str(number)
+        chunks = iter_chunks(codes(), 2)
+        assert next(chunks) == ["0", "1"]
+        assert consumed == [0, 1]
+        assert list(chunks) == [["2", "3"], ["4"]]
+
+    def test_run_jsonl(self, client, api_client):
+        """Тестирование записи JSONL в порядке входных кодов (включая повторы) и итоговой сводки."""
+        output = io.StringIO()
+        codes = ["241014", "101000", "241014", "190000", "241014"]
+        summary = BatchLookup(client, JsonlWriter(output), chunk_size=2, workers=3, api_client=api_client).run(codes)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [record["post_code"] for record in records] == codes
+        assert records[0] == {"post_code": "241014", "found": True, "longitude": 76.9133, "latitude": 48.1699,
+                              "country": "Russia", "state": "Брянск 14"}
+        assert records[1] == {"post_code": "101000", "found": False}
+        assert client.select_postal_codes.call_count == 3
+        assert (summary["codes"], summary["found"], summary["not_found"], summary["failed"]) == (5, 3, 2, 0)
+
+    def test_run_csv_with_failed_chunk(self, client, api_client):
+        """Тестирование записи CSV и учета пачки, завершившейся ошибкой."""
+        client.select_postal_codes.side_effect = [{"241014": KNOWN["241014"]}, RuntimeError("database is down")]
+        output = io.StringIO()
+        summary = BatchLookup(client, CsvWriter(output), chunk_size=1, api_client=api_client).run(["241014", "101000"])
+        assert output.getvalue().splitlines() == [
+            "post_code,found,longitude,latitude,country,state,error",
+            "241014,true,76.9133,48.1699,Russia,Брянск 14,",
+            "101000,false,,,,,database is down",
+        ]
+        assert (summary["found"], summary["failed"]) == (1, 1)
+
+    def test_bounded_read_ahead(self, client, api_client):
+        """Тестирование ограничения памяти: входные коды читаются не дальше чем на 2 * workers пачек
+        впереди уже записанных результатов."""
+        output = io.StringIO()
+        read_ahead = []
+
+        def codes():
+            for number in range(50):
+                read_ahead.append(number - output.getvalue().count("\n"))
+                yield str(number)
+        BatchLookup(client, JsonlWriter(output), chunk_size=1, workers=2, api_client=api_client).run(codes())
+        assert output.getvalue().count("\n") == 50
+        assert max(read_ahead) <= 2 * 2
@@ -0,0 +1,109 @@
+# tests/service/test_dataset_loader.py
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from service.dataset_loader import (CopyStream, DatasetLoader, iter_geonames_records,
+                                    iter_zippopotam_records)
+from utils.psycopg2_connection import Psycopg2Connection
+
+GEONAMES_LINES = [
+    "RU\t101000\tМосква\tМосква\t48\t\t\t\t\t55.7522\t37.6156\t4\n",
+    "RU\t101000\tМосква 2\tМосква\t48\t\t\t\t\t55.7522\t37.6156\t4\n",
+    "RU\t190000\tСанкт-Петербург\tСанкт-Петербург\t66\t\t\t\t\t59.9386\t30.3141\t4\n",
+    "RU\tbroken line\n",
+]
+
+API_DOCUMENT = {
+    "post code": "241014", "country": "Russia", "country abbreviation": "RU",
+    "places": [{"place name": "Брянск", "longitude": "34.3", "latitude": "53.2",
+                "state": "Брянская Область", "state abbreviation": ""}]
+}
+
+
+@pytest.fixture
+def mock_connection():
+    """Фикстура для имитации соединения: записывает переданный в COPY поток и выполненные запросы."""
+    cursor = MagicMock()
+    cursor.rowcount = 2
+    cursor.__enter__.return_value = cursor
+    cursor.copied = []
+    cursor.copy_expert.side_effect = lambda sql, stream, size: cursor.copied.append(stream.read())
+    raw_connection = Mock()
+    raw_connection.cursor.return_value = cursor
+
+    @contextmanager
+    def checkout():
+        yield raw_connection
+
+    connection = Mock(spec=Psycopg2Connection)
+    connection.checkout.side_effect = checkout
+    return connection, raw_connection, cursor
+
+class TestDatasetParsers:
+    """Класс для тестирования разбора файлов набора данных."""
+    def test_iter_geonames_records(self):
+        """Тестирование разбора строк GeoNames и пропуска поврежденных строк."""
+        records = list(iter_geonames_records(GEONAMES_LINES))
+        assert records[0] == ("101000", "Russia", "RU", "Москва", 37.6156, 55.7522, "Москва", "48")
+        assert records[3] is None
+
+    def test_iter_zippopotam_records_array_and_lines(self):
+        """Тестирование разбора JSON-массива и JSON Lines в формате ответа API."""
+        expected = ("241014", "Russia", "RU", "Брянск", 34.3, 53.2, "Брянская Область", "")
+        assert list(iter_zippopotam_records(io.StringIO(json.dumps([API_DOCUMENT])))) == [expected]
+        lines = json.dumps(API_DOCUMENT) + "\n" + json.dumps({"post code": "1"}) + "\n"
+        assert list(iter_zippopotam_records(io.StringIO(lines))) == [expected, None]
+
+    def test_copy_stream_escapes_values(self):
+        """Тестирование формирования текстового формата COPY порциями."""
+        stream = CopyStream([("1", "a\tb", "c\\d", None)])
+        data = stream.read(3) + stream.read()
+        assert data == "1\ta\\tb\tc\\\\d\t\\N\n"
+        assert stream.read() == ""
+
+class TestDatasetLoader:
+    """Класс для тестирования DatasetLoader."""
+    def test_load_geonames(self, mock_connection, tmp_path):
+        """Тестирование загрузки через COPY во временную таблицу и слияния в postal_codes."""
+        connection, raw_connection, cursor = mock_connection
+        path = tmp_path / "RU.txt"
+        path.write_text("".join(GEONAMES_LINES), encoding="utf-8")
+
+        report = DatasetLoader(connection).load(str(path))
+
+        assert report["read"] == 4 and report["skipped"] == 1 and report["staged"] == 3
+        assert report["merged"] == 2
+        assert cursor.copied[0].count("\n") == 3
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert "CREATE TEMP TABLE postal_codes_staging" in statements[0]
+        assert "DISTINCT ON (post_code)" in statements[1] and "DO NOTHING" in statements[1]
+        raw_connection.commit.assert_called_once()
+        assert raw_connection.autocommit is True
+
+    def test_load_zip_with_update(self, mock_connection, tmp_path):
+        """Тестирование загрузки архива GeoNames с обновлением существующих кодов."""
+        connection, _, cursor = mock_connection
+        path = tmp_path / "RU.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("readme.txt", "")
+            archive.writestr("RU.txt", "".join(GEONAMES_LINES))
+
+        DatasetLoader(connection, update_existing=True).load(str(path))
+        assert "DO UPDATE SET country = EXCLUDED.country" in cursor.execute.call_args_list[1].args[0]
+
+    def test_load_rolls_back_on_error(self, mock_connection, tmp_path):
+        """Тестирование отката транзакции при ошибке COPY."""
+        connection, raw_connection, cursor = mock_connection
+        cursor.copy_expert.side_effect = RuntimeError("copy failed")
+        path = tmp_path / "codes.json"
+        path.write_text(json.dumps([API_DOCUMENT]), encoding="utf-8")
+
+        with pytest.raises(RuntimeError):
+            DatasetLoader(connection).load(str(path))
+        raw_connection.rollback.assert_called_once()
+        raw_connection.commit.assert_not_called()
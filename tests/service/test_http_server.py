@@ -0,0 +1,218 @@
+# tests/service/test_http_server.py
+import http.client
+import json
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from clients.postal_code_info import PostalCodeInfo
+from service.autocomplete_service import AutocompleteService
+from service.geo_service import GeoService
+from service.place_search_service import PlaceSearchService
+from service.http_server import PostalLookupServer
+from utils.geo_index import GeoIndex
+from utils.prefix_index import PrefixIndex
+from utils.trigram_index import TrigramIndex
+
+
+@pytest.fixture
+def client():
+    """Фикстура с клиентом базы данных, который знает только код 241014."""
+    known = {"241014": PostalCodeInfo("76.9133", "48.1699", "Russia", "Брянск 14")}
+    client = Mock()
+    client.select_postal_code.side_effect = known.get
+    client.select_postal_codes.side_effect = lambda codes: {code: known.get(code) for code in codes}
+    return client
+
+@pytest.fixture
+def server(client):
+    """Фикстура с запущенным сервером на свободном порту."""
+    server = PostalLookupServer(("127.0.0.1", 0), client, max_workers=2, max_batch=3)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    if not server.draining:
+        server.drain(timeout=5)
+    thread.join(5)
+
+def _request(connection, method, path, body=None):
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={"Content-Type": "application/json"} if body is not None else {})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read() or b"null"), response
+
+class TestPostalLookupServer:
+    """Класс для тестирования HTTP-сервиса поиска почтовых кодов."""
+    def test_get_postal_code(self, server):
+        """Тестирование GET /postal/{code}: найденный и не найденный код по одному keep-alive соединению."""
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "GET", "/postal/241014")
+        assert status == 200
+        assert document == {"post_code": "241014", "longitude": 76.9133, "latitude": 48.1699,
+                            "country": "Russia", "state": "Брянск 14"}
+        sock = connection.sock
+        status, document, _ = _request(connection, "GET", "/postal/101000")
+        assert status == 404
+        assert document["post_code"] == "101000"
+        assert connection.sock is sock  # Соединение не переоткрывалось
+        status, _, _ = _request(connection, "GET", "/postal/24%20014")
+        assert status == 400
+        status, _, _ = _request(connection, "GET", "/postal/%D9%A1%D9%A2%D9%A3")  # Арабские цифры "١٢٣"
+        assert status == 400
+        connection.close()
+
+    def test_post_batch(self, server, client):
+        """Тестирование пакетного запроса POST /postal."""
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "POST", "/postal", {"codes": ["241014", 101000]})
+        assert status == 200
+        assert document["results"]["241014"]["state"] == "Брянск 14"
+        assert document["results"]["101000"] is None
+        client.select_postal_codes.assert_called_once_with(["241014", "101000"])
+        assert _request(connection, "POST", "/postal", {"codes": ["1", "2", "3", "4"]})[0] == 413
+        assert _request(connection, "POST", "/postal", {"code": "1"})[0] == 400
+        assert _request(connection, "POST", "/postal", ["241014"])[0] == 400
+        assert _request(connection, "POST", "/postal", {"codes": ["241014", "Москва"]})[0] == 400
+        assert _request(connection, "POST", "/other", {"codes": []})[0] == 404
+        connection.close()
+
+    def test_lookup_error(self, server, client):
+        """Тестирование ответа 500 при ошибке клиента; сервер продолжает работать."""
+        client.select_postal_code.side_effect = RuntimeError("database is down")
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        assert _request(connection, "GET", "/postal/241014")[0] == 500
+        assert _request(connection, "GET", "/health")[0] == 200
+        connection.close()
+
+    def test_nearest(self, client):
+        """Тестирование GET /nearest: ближайшие коды, ошибки параметров и отключенный индекс."""
+        index = GeoIndex()
+        index.build([("101000", PostalCodeInfo(37.6173, 55.7558, "Russia", "Москва")),
+                     ("190000", PostalCodeInfo(30.3351, 59.9343, "Russia", "Санкт-Петербург"))])
+        server = PostalLookupServer(("127.0.0.1", 0), client, max_workers=2, geo_service=GeoService(index))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "GET", "/nearest?lat=59.9&lon=30.3&k=2")
+        assert status == 200
+        assert [item["post_code"] for item in document["results"]] == ["190000", "101000"]
+        assert document["results"][0]["distance_km"] < 5
+        assert document["results"][1]["state"] == "Москва"
+        assert _request(connection, "GET", "/nearest?lat=abc&lon=30.3")[0] == 400
+        assert _request(connection, "GET", "/nearest?lat=95&lon=30.3")[0] == 400
+        assert _request(connection, "GET", "/nearest?lat=59.9&lon=30.3&k=1000")[0] == 400
+        connection.close()
+        server.drain(timeout=5)
+        thread.join(5)
+
+    def test_within(self, client):
+        """Тестирование GET /within: коды в радиусе по возрастанию расстояния и ошибки параметров."""
+        rows = [("101000", PostalCodeInfo(37.6173, 55.7558, "Russia", "Москва")),
+                ("140000", PostalCodeInfo(37.9, 55.6, "Russia", "Люберцы")),
+                ("190000", PostalCodeInfo(30.3351, 59.9343, "Russia", "Санкт-Петербург"))]
+        geo_service = GeoService()
+        geo_service.arrays.build(rows)
+        server = PostalLookupServer(("127.0.0.1", 0), client, max_workers=2, max_batch=10, geo_service=geo_service)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "GET", "/within?lat=55.75&lon=37.62&radius_km=50")
+        assert status == 200
+        assert [item["post_code"] for item in document["results"]] == ["101000", "140000"]
+        status, document, _ = _request(connection, "GET", "/within?lat=55.75&lon=37.62&radius_km=50&limit=1")
+        assert [item["post_code"] for item in document["results"]] == ["101000"]
+        assert _request(connection, "GET", "/within?lat=55.75&lon=37.62")[0] == 400
+        assert _request(connection, "GET", "/within?lat=55.75&lon=37.62&radius_km=50&limit=11")[0] == 400
+        connection.close()
+        server.drain(timeout=5)
+        thread.join(5)
+
+    def test_autocomplete(self, client):
+        """Тестирование GET /autocomplete по почтовому коду и названию населенного пункта."""
+        index = PrefixIndex()
+        index.build([("101000", "Москва", 5), ("101001", "Москва", 40), ("443000", "Самара", 7)])
+        server = PostalLookupServer(("127.0.0.1", 0), client, max_workers=2,
+                                    autocomplete_service=AutocompleteService(Mock(), index))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "GET", "/autocomplete?q=1010")
+        assert status == 200
+        assert document["results"] == [{"post_code": "101001", "place_name": "Москва", "request_count": 40},
+                                       {"post_code": "101000", "place_name": "Москва", "request_count": 5}]
+        status, document, _ = _request(connection, "GET", "/autocomplete?q=%D1%81%D0%B0&field=place_name&k=1")
+        assert [item["post_code"] for item in document["results"]] == ["443000"]
+        assert _request(connection, "GET", "/autocomplete?q=1&field=state")[0] == 400
+        assert _request(connection, "GET", "/autocomplete?field=post_code")[0] == 400
+        connection.close()
+        server.drain(timeout=5)
+        thread.join(5)
+
+    def test_places(self, client):
+        """Тестирование GET /places: нечеткий поиск по названию и ошибки параметров."""
+        index = TrigramIndex()
+        index.build([("101000", "Москва", PostalCodeInfo(37.6173, 55.7558, "Russia", "Москва"))])
+        server = PostalLookupServer(("127.0.0.1", 0), client, max_workers=2,
+                                    place_search_service=PlaceSearchService(index=index))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        status, document, _ = _request(connection, "GET", "/places?q=Moskva")
+        assert status == 200
+        assert document["results"] == [{"post_code": "101000", "place_name": "Москва", "similarity": 1.0,
+                                         "longitude": 37.6173, "latitude": 55.7558,
+                                         "country": "Russia", "state": "Москва"}]
+        assert _request(connection, "GET", "/places?q=Moskva&threshold=2")[0] == 400
+        assert _request(connection, "GET", "/places")[0] == 400
+        connection.close()
+        server.drain(timeout=5)
+        thread.join(5)
+
+    def test_nearest_disabled(self, server):
+        """Тестирование ответа 404 на GET /nearest, если сервис запущен без пространственного индекса."""
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        assert _request(connection, "GET", "/nearest?lat=59.9&lon=30.3")[0] == 404
+        connection.close()
+
+    def test_drain_waits_for_in_flight_requests(self, server, client):
+        """Тестирование корректной остановки: выполняющийся запрос дорабатывается, соединение закрывается."""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_lookup(postal_code):
+            started.set()
+            release.wait(5)
+            return None
+        client.select_postal_code.side_effect = slow_lookup
+        result = {}
+
+        def request():
+            connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+            status, _, response = _request(connection, "GET", "/postal/101000")
+            result["status"], result["connection"] = status, response.getheader("Connection")
+        requester = threading.Thread(target=request)
+        requester.start()
+        assert started.wait(5)
+
+        drained = {}
+        drainer = threading.Thread(target=lambda: drained.setdefault("ok", server.drain(timeout=5)))
+        drainer.start()
+        drainer.join(0.2)
+        assert drainer.is_alive()  # Ждет выполняющийся запрос
+        release.set()
+        drainer.join(5)
+        requester.join(5)
+        assert drained["ok"] is True
+        assert result == {"status": 404, "connection": "close"}
+
+    def test_drain_timeout(self, server, client):
+        """Тестирование остановки по таймауту, если запрос не завершился."""
+        release = threading.Event()
+        client.select_postal_code.side_effect = lambda postal_code: release.wait(5) and None
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+        connection.request("GET", "/postal/101000")
+        while server._in_flight == 0:
+            threading.Event().wait(0.01)
+        assert server.drain(timeout=0.1) is False
+        release.set()
+        connection.close()
@@ -0,0 +1,44 @@
+# tests/service/test_negative_cache.py
+from unittest.mock import patch
+
+from clients.api_client import ApiLookupStatus
+from service.negative_cache import NegativeLookupCache
+
+
+class TestNegativeLookupCache:
+    """Класс для тестирования NegativeLookupCache."""
+    def test_add_and_get(self):
+        """Тестирование сохранения причины неудачного запроса."""
+        cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        assert cache.get("000000") is None
+        cache.add("000000", ApiLookupStatus.NOT_FOUND)
+        cache.add("500000", ApiLookupStatus.FAILURE)
+        assert cache.get("000000") is ApiLookupStatus.NOT_FOUND
+        assert cache.get("500000") is ApiLookupStatus.FAILURE
+        stats = cache.stats()
+        assert stats["not_found_stored"] == 1
+        assert stats["failures_stored"] == 1
+        assert stats["hits"] == 2
+
+    def test_ttl_depends_on_status(self):
+        """Тестирование того, что временная ошибка забывается раньше, чем отсутствующий индекс."""
+        cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        with patch('utils.ttl_cache.time.monotonic', return_value=1000.0):
+            cache.add("000000", ApiLookupStatus.NOT_FOUND)
+            cache.add("500000", ApiLookupStatus.FAILURE)
+        with patch('utils.ttl_cache.time.monotonic', return_value=1010.0):
+            assert cache.get("000000") is ApiLookupStatus.NOT_FOUND
+            assert cache.get("500000") is None
+
+    def test_found_status_is_not_stored(self):
+        """Тестирование того, что успешный результат не попадает в кэш."""
+        cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        cache.add("241014", ApiLookupStatus.FOUND)
+        assert cache.get("241014") is None
+
+    def test_invalidate(self):
+        """Тестирование удаления записи."""
+        cache = NegativeLookupCache(max_size=10, not_found_ttl=60, failure_ttl=5)
+        cache.add("000000", ApiLookupStatus.NOT_FOUND)
+        cache.invalidate("000000")
+        assert cache.get("000000") is None
@@ -0,0 +1,40 @@
+# tests/service/test_place_search_service.py
+from unittest.mock import Mock
+
+import pytest
+
+from service.place_search_service import PlaceSearchService
+from utils.postal_snapshot import PostalSnapshot, write_snapshot
+from utils.psycopg2_connection import Psycopg2Connection
+
+
+@pytest.fixture
+def mock_connection():
+    """Фикстура для создания мок-объекта соединения."""
+    return Mock(spec=Psycopg2Connection)
+
+class TestPlaceSearchService:
+    """Класс для тестирования сервиса нечеткого поиска по названию населенного пункта."""
+    def test_search_in_db(self, mock_connection):
+        """Тестирование поиска через pg_trgm, пока индекс в памяти не загружен."""
+        mock_connection.execute_query.return_value = [("101000", "Москва", 37.6, 55.7, "Russia", "Москва", 0.5)]
+        service = PlaceSearchService(mock_connection)
+        matches = service.search("Масква", k=3, threshold=0.4)
+        assert [(match.post_code, match.similarity) for match in matches] == [("101000", 0.5)]
+        assert matches[0].postal_info.state == "Москва"
+        args, kwargs = mock_connection.execute_query.call_args
+        assert "SET LOCAL pg_trgm.similarity_threshold = %s" in args[0]
+        assert "postal_translit(place_name) %% %s" in args[0]
+        assert args[1] == (0.4, "maskva", "maskva", 3)
+        assert kwargs["fetch_all"] is True
+
+    def test_search_in_snapshot_index(self, tmp_path):
+        """Тестирование поиска по индексу, построенному из снимка, без базы данных."""
+        path = str(tmp_path / "postal_codes.snap")
+        write_snapshot(path, [("101000", 37.6, 55.7, "Russia", "Москва", "Москва"),
+                              ("443000", 50.1, 53.2, "Russia", "Самарская область", "Самара")])
+        service = PlaceSearchService()
+        with PostalSnapshot(path) as snapshot:
+            assert service.load_snapshot(snapshot) == 2
+        match = service.search("Samara")[0]
+        assert (match.post_code, match.postal_info.state) == ("443000", "Самарская область")
@@ -0,0 +1,67 @@
+# tests/service/test_request_statistics.py
+from unittest.mock import Mock
+
+import pytest
+
+from service.request_statistics import RequestStatisticsAggregator
+
+
+@pytest.fixture
+def writer():
+    """Фикстура для имитации функции записи пакета статистики."""
+    return Mock()
+
+@pytest.fixture
+def aggregator(writer):
+    """Фикстура накопителя с большим периодом записи, чтобы запись выполнялась только явно."""
+    aggregator = RequestStatisticsAggregator(writer, flush_interval=3600, flush_threshold=1000)
+    yield aggregator
+    aggregator.close()
+
+class TestRequestStatisticsAggregator:
+    """Класс для тестирования RequestStatisticsAggregator."""
+    def test_increments_are_summed(self, aggregator, writer):
+        """Тестирование суммирования увеличений одного кода в один элемент пакета."""
+        aggregator.increment("241014")
+        aggregator.increment("241014")
+        aggregator.increment("183008", 5)
+        writer.assert_not_called()
+        aggregator.flush()
+        writer.assert_called_once_with({"241014": 2, "183008": 5})
+        assert aggregator.stats() == {"pending": 0, "flushed_batches": 1, "flushed_increments": 7,
+                                      "failed_flushes": 0}
+
+    def test_flush_without_pending_does_nothing(self, aggregator, writer):
+        """Тестирование того, что пустой пакет не записывается."""
+        aggregator.flush()
+        writer.assert_not_called()
+
+    def test_failed_flush_keeps_increments(self, aggregator, writer):
+        """Тестирование возврата увеличений в накопитель при ошибке записи."""
+        writer.side_effect = [Exception("Database error"), None]
+        aggregator.increment("241014")
+        aggregator.flush()
+        assert aggregator.stats()["pending"] == 1
+        assert aggregator.stats()["failed_flushes"] == 1
+        aggregator.increment("241014")
+        aggregator.flush()
+        assert writer.call_args_list[-1][0][0] == {"241014": 2}
+
+    def test_threshold_triggers_background_flush(self, writer):
+        """Тестирование досрочной фоновой записи при достижении порога."""
+        aggregator = RequestStatisticsAggregator(writer, flush_interval=3600, flush_threshold=2)
+        try:
+            aggregator.increment("241014")
+            aggregator.increment("183008")
+            aggregator._thread.join(timeout=0.2)  # Даем фоновому потоку выполнить запись
+            assert writer.called
+        finally:
+            aggregator.close()
+
+    def test_close_flushes_pending(self, writer):
+        """Тестирование записи оставшихся увеличений при завершении работы."""
+        aggregator = RequestStatisticsAggregator(writer, flush_interval=3600, flush_threshold=1000)
+        aggregator.increment("241014")
+        aggregator.close()
+        aggregator.close()
+        writer.assert_called_once_with({"241014": 1})
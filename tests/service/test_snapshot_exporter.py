@@ -0,0 +1,32 @@
+# tests/service/test_snapshot_exporter.py
+from contextlib import contextmanager
+from unittest.mock import MagicMock, Mock
+
+from service.snapshot_exporter import export_snapshot
+from utils.postal_snapshot import PostalSnapshot
+from utils.psycopg2_connection import Psycopg2Connection
+
+
+class TestSnapshotExporter:
+    """Класс для тестирования выгрузки postal_codes в снимок."""
+    def test_export_snapshot(self, tmp_path):
+        """Тестирование выгрузки строк серверного курсора в файл снимка."""
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.__iter__.return_value = iter([("101000", 37.6, 55.7, "Russia", "Москва", "Москва")])
+        raw_connection = Mock()
+        raw_connection.cursor.return_value = cursor
+
+        @contextmanager
+        def checkout():
+            yield raw_connection
+
+        connection = Mock(spec=Psycopg2Connection)
+        connection.checkout.side_effect = checkout
+        path = str(tmp_path / "postal_codes.snap")
+
+        assert export_snapshot(connection, path) == 1
+        raw_connection.cursor.assert_called_once_with(name="postal_codes_snapshot")
+        raw_connection.commit.assert_called_once()
+        with PostalSnapshot(path) as snapshot:
+            assert snapshot.get("101000").country == "Russia"
@@ -0,0 +1,77 @@
+# tests/utils/test_custom_logger.py
+import json
+import logging
+
+import pytest
+
+from utils.custom_logger import CustomLogger, JsonFormatter, TextFormatter
+
+
+class _RecordingHandler(logging.Handler):
+    """Обработчик, сохраняющий записи журнала."""
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@pytest.fixture
+def recorded():
+    """Фикстура для логгера с обработчиком, сохраняющим записи."""
+    handler = _RecordingHandler()
+    custom_logger = CustomLogger("tests.custom_logger")
+    custom_logger.logger.handlers[:] = [handler]
+    custom_logger.logger.propagate = False
+    custom_logger.logger.setLevel(logging.INFO)
+    yield custom_logger, handler.records
+    custom_logger.logger.handlers[:] = []
+
+class TestCustomLogger:
+    """Класс для тестирования CustomLogger."""
+    def test_caller_and_lazy_formatting(self, recorded):
+        """Тестирование имени вызвавшей функции и подстановки аргументов."""
+        custom_logger, records = recorded
+
+        def lookup():
+            custom_logger.log_with_context("No postal data %s found in database", "101000")
+
+        lookup()
+        assert records[0].funcName == "lookup"
+        assert records[0].getMessage() == "No postal data 101000 found in database"
+
+    def test_level_gating_skips_formatting(self, recorded):
+        """Тестирование отсутствия форматирования для отключенного уровня."""
+        custom_logger, records = recorded
+
+        class Explosive:
+            def __str__(self):
+                raise AssertionError("must not be formatted")
+
+        custom_logger.log_with_context("value %s", Explosive(), level=logging.DEBUG)
+        assert records == []
+
+    def test_sampling(self, recorded):
+        """Тестирование вывода одного из sample_every сообщений с одинаковым шаблоном."""
+        custom_logger, records = recorded
+        for code in range(10):
+            custom_logger.log_with_context("Miss %s", code, sample_every=5)
+        custom_logger.log_with_context("Other message", sample_every=5)
+        assert [record.getMessage() for record in records] == ["Miss 0", "Miss 5", "Other message"]
+        assert records[0].fields == {"sample_every": 5}
+
+    def test_formatters(self, recorded):
+        """Тестирование текстового и JSON-формата с дополнительными полями."""
+        custom_logger, records = recorded
+
+        def flush():
+            custom_logger.log_with_context("Flushed %s rows", 3, batch="stats")
+
+        flush()
+        assert TextFormatter().format(records[0]).endswith(
+            "INFO:tests.custom_logger:Flushed 3 rows (called from flush) batch=stats")
+        entry = json.loads(JsonFormatter().format(records[0]))
+        assert entry["message"] == "Flushed 3 rows"
+        assert entry["func"] == "flush"
+        assert entry["batch"] == "stats"
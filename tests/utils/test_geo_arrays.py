@@ -0,0 +1,70 @@
+# tests/utils/test_geo_arrays.py
+import random
+
+import numpy as np
+import pytest
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.geo_arrays import GeoArrays
+from utils.geo_index import great_circle_km
+
+
+@pytest.fixture
+def rows():
+    """Фикстура со случайными почтовыми кодами на территории России."""
+    rng = random.Random(3)
+    return [(str(100000 + number), PostalCodeInfo(rng.uniform(19, 180), rng.uniform(41, 78), "Russia", "S"))
+            for number in range(2000)]
+
+class TestGeoArrays:
+    """Класс для тестирования векторных геозапросов по массивам координат."""
+    def test_within_radius_matches_brute_force(self, rows):
+        """Тестирование совпадения поиска в радиусе с полным перебором."""
+        arrays = GeoArrays()
+        assert arrays.build(rows) == 2000
+        for latitude, longitude, radius_km in ((55.75, 37.62, 300), (65.0, 179.9, 500), (77.9, 100.0, 800)):
+            expected = sorted((great_circle_km(latitude, longitude, info.latitude, info.longitude), code)
+                              for code, info in rows)
+            expected = [(code, distance) for distance, code in expected if distance <= radius_km]
+            result = arrays.within_radius(latitude, longitude, radius_km)
+            assert [code for code, _ in result] == [code for code, _ in expected]
+            assert [distance for _, distance in result] == pytest.approx([distance for _, distance in expected])
+            limited = arrays.within_radius(latitude, longitude, radius_km, limit=3)
+            assert limited == result[:3]
+
+    def test_within_radius_invalid(self, rows):
+        """Тестирование проверки параметров поиска в радиусе."""
+        arrays = GeoArrays()
+        assert arrays.within_radius(55.0, 37.0, 100) == []
+        with pytest.raises(ValueError):
+            arrays.within_radius(55.0, 190.0, 100)
+        with pytest.raises(ValueError):
+            arrays.within_radius(55.0, 37.0, -1)
+
+    def test_distance_matrix_in_blocks(self, rows):
+        """Тестирование матрицы расстояний, вычисленной небольшими блоками, в том числе в переданный массив."""
+        arrays = GeoArrays(max_block_bytes=4096)  # Несколько строк на блок
+        arrays.build(rows + [("000000", PostalCodeInfo(None, None, "Russia", "Нет координат"))])
+        infos = dict(rows)
+        codes1 = [code for code, _ in rows[:37]]
+        codes2 = [code for code, _ in rows[100:150]]
+        matrix = arrays.distance_matrix(codes1, codes2)
+        assert matrix.shape == (37, 50) and matrix.dtype == np.float32
+        for i, j in ((0, 0), (12, 49), (36, 7)):
+            first, second = infos[codes1[i]], infos[codes2[j]]
+            assert matrix[i, j] == pytest.approx(great_circle_km(first.latitude, first.longitude,
+                                                                 second.latitude, second.longitude), rel=1e-5)
+        out = np.zeros((37, 50))
+        assert arrays.distance_matrix(codes1, codes2, out=out) is out
+        assert np.allclose(out, matrix, rtol=1e-5)
+        assert len(list(arrays.distance_blocks(codes1, codes2))) > 1
+
+    def test_distance_matrix_unknown_codes(self, rows):
+        """Тестирование ошибки для кодов, которых нет в массивах."""
+        arrays = GeoArrays()
+        arrays.build(rows)
+        with pytest.raises(KeyError) as error:
+            arrays.distance_matrix(["100000", "000000"], ["100001"])
+        assert error.value.args[0] == ["000000"]
+        with pytest.raises(ValueError):
+            arrays.distance_matrix(["100000"], ["100001"], out=np.zeros((2, 2)))
@@ -0,0 +1,93 @@
+# tests/utils/test_geo_index.py
+import random
+
+import pytest
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.geo_index import GeoIndex, great_circle_km
+
+
+def _random_rows(count, seed=1):
+    rng = random.Random(seed)
+    return [(str(100000 + number), PostalCodeInfo(rng.uniform(19, 180), rng.uniform(41, 78), "Russia", "S"))
+            for number in range(count)]
+
+def _brute_force(rows, latitude, longitude, k):
+    distances = sorted((great_circle_km(latitude, longitude, info.latitude, info.longitude), code)
+                       for code, info in rows)
+    return distances[:k]
+
+class TestGeoIndex:
+    """Класс для тестирования пространственного индекса почтовых кодов."""
+    def test_great_circle_distance(self):
+        """Тестирование расстояния по большому кругу: Москва - Санкт-Петербург около 634 км."""
+        assert great_circle_km(55.7558, 37.6173, 59.9343, 30.3351) == pytest.approx(634, abs=2)
+        assert great_circle_km(10, 20, 10, 20) == 0
+
+    def test_nearest_matches_brute_force(self):
+        """Тестирование совпадения результатов KD-дерева с полным перебором."""
+        rows = _random_rows(3000)
+        index = GeoIndex()
+        assert index.build(rows) == 3000
+        rng = random.Random(2)
+        for _ in range(200):
+            latitude, longitude = rng.uniform(40, 80), rng.uniform(15, 180)
+            result = index.nearest(latitude, longitude, k=5)
+            expected = _brute_force(rows, latitude, longitude, 5)
+            assert [item.post_code for item in result] == [code for _, code in expected]
+            assert [item.distance_km for item in result] == pytest.approx([distance for distance, _ in expected])
+
+    def test_antimeridian(self):
+        """Тестирование поиска через 180-й меридиан (Чукотка)."""
+        index = GeoIndex()
+        index.build([("689000", PostalCodeInfo(179.9, 65.0, "Russia", "Чукотка")),
+                     ("689100", PostalCodeInfo(170.0, 65.0, "Russia", "Чукотка"))])
+        nearest = index.nearest(65.0, -179.9)[0]
+        assert nearest.post_code == "689000"
+        assert nearest.distance_km == pytest.approx(great_circle_km(65.0, -179.9, 65.0, 179.9))
+
+    def test_incremental_add_and_update(self):
+        """Тестирование добавления нового кода и обновления координат кода, который уже есть в дереве."""
+        index = GeoIndex(rebuild_threshold=100)
+        index.build([("101000", PostalCodeInfo(37.62, 55.75, "Russia", "Москва")),
+                     ("190000", PostalCodeInfo(30.31, 59.94, "Russia", "Санкт-Петербург"))])
+        index.add("630000", PostalCodeInfo("82.93", "55.03", "Russia", "Новосибирск"))
+        assert index.nearest(55.0, 83.0)[0].post_code == "630000"
+        index.add("101000", PostalCodeInfo(131.9, 43.1, "Russia", "Перемещен"))
+        assert [item.post_code for item in index.nearest(55.75, 37.62, k=3)] == ["190000", "630000", "101000"]
+        assert index.nearest(43.1, 131.9)[0].postal_info.state == "Перемещен"
+        assert len(index) == 3
+
+    def test_rebuild_after_threshold(self):
+        """Тестирование перестроения дерева при переполнении буфера новых кодов."""
+        rows = _random_rows(50)
+        index = GeoIndex(rebuild_threshold=10)
+        index.build(rows[:20])
+        for code, info in rows[20:]:
+            index.add(code, info)
+        assert len(index._state.pending) < 10
+        assert len(index._state.tree) >= 40
+        expected = _brute_force(rows, 60.0, 100.0, 3)
+        assert [item.post_code for item in index.nearest(60.0, 100.0, k=3)] == [code for _, code in expected]
+
+    def test_state_snapshot_survives_rebuild(self):
+        """Тестирование того, что состояние, прочитанное до перестроения, остается согласованным:
+        данные кодов хранятся в нем, а не в изменяемых атрибутах индекса."""
+        index = GeoIndex()
+        index.build([("101000", PostalCodeInfo(37.62, 55.75, "Russia", "Москва"))])
+        index.add("630000", PostalCodeInfo(82.93, 55.03, "Russia", "Новосибирск"))
+        state = index._state
+        index.build([("190000", PostalCodeInfo(30.31, 59.94, "Russia", "Санкт-Петербург"))])
+        assert state.info("101000").state == "Москва"
+        assert state.info("630000").state == "Новосибирск"
+        assert [item.post_code for item in index.nearest(55.75, 37.62, k=2)] == ["190000"]
+
+    def test_invalid_arguments(self):
+        """Тестирование проверки координат, пустого индекса и строк без координат."""
+        index = GeoIndex()
+        assert index.nearest(55.0, 37.0) == []
+        index.build([("000000", PostalCodeInfo(None, None, "Russia", "Нет координат"))])
+        assert len(index) == 0
+        assert index.nearest(55.0, 37.0, k=0) == []
+        with pytest.raises(ValueError):
+            index.nearest(91.0, 0.0)
@@ -0,0 +1,94 @@
+# tests/utils/test_metrics.py
+import urllib.request
+
+import pytest
+
+from utils.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    """Фикстура с пустым реестром метрик."""
+    return MetricsRegistry()
+
+class TestMetricsRegistry:
+    """Класс для тестирования MetricsRegistry и метрик."""
+    def test_histogram_render(self, registry):
+        """Тестирование выгрузки гистограммы в формате Prometheus: накопительные корзины, сумма и количество."""
+        histogram = registry.histogram("stage_seconds", "Stage duration.", ("stage",), buckets=(0.1, 1.0))
+        child = histogram.labels("db_select")
+        child.observe(0.05)
+        child.observe(0.5)
+        child.observe(5.0)
+        lines = registry.render().splitlines()
+        assert lines[:2] == ["# HELP stage_seconds Stage duration.", "# TYPE stage_seconds histogram"]
+        assert 'stage_seconds_bucket{stage="db_select",le="0.1"} 1' in lines
+        assert 'stage_seconds_bucket{stage="db_select",le="1.0"} 2' in lines
+        assert 'stage_seconds_bucket{stage="db_select",le="+Inf"} 3' in lines
+        assert 'stage_seconds_sum{stage="db_select"} 5.55' in lines
+        assert 'stage_seconds_count{stage="db_select"} 3' in lines
+
+    def test_counter_render_and_label_names(self, registry):
+        """Тестирование счетчика с метками, заданными по именам, и экранирования значений меток."""
+        counter = registry.counter("lookups_total", "Lookups.", ("client", "result"))
+        counter.labels(client="psycopg2", result="cache_hit").inc()
+        counter.labels("psycopg2", "cache_hit").inc(2)
+        counter.labels("a\"b", "x").inc()
+        rendered = registry.render()
+        assert 'lookups_total{client="psycopg2",result="cache_hit"} 3.0' in rendered
+        assert 'lookups_total{client="a\\"b",result="x"} 1.0' in rendered
+        with pytest.raises(ValueError):
+            counter.labels("only_one")
+
+    def test_register_conflict(self, registry):
+        """Тестирование повторной регистрации: та же метрика возвращается, другой тип - ошибка."""
+        counter = registry.counter("requests_total", "Requests.")
+        assert registry.counter("requests_total", "Requests.") is counter
+        with pytest.raises(ValueError):
+            registry.histogram("requests_total", "Requests.")
+
+    def test_quantiles_and_summary(self, registry):
+        """Тестирование оценки квантилей по корзинам."""
+        child = registry.histogram("latency_seconds", "Latency.", buckets=(0.001, 0.01, 0.1)).labels()
+        assert child.quantile(0.5) is None
+        for _ in range(90):
+            child.observe(0.0005)
+        for _ in range(10):
+            child.observe(0.05)
+        assert child.quantile(0.5) == pytest.approx(0.0005 / 0.9)
+        assert 0.01 < child.quantile(0.99) <= 0.1
+        summary = registry.summary()
+        assert summary["latency_seconds"][()]["count"] == 100
+        assert summary["latency_seconds"][()]["p99"] == child.quantile(0.99)
+
+    def test_timer(self, registry):
+        """Тестирование измерения длительности блока with, в том числе завершившегося исключением."""
+        child = registry.histogram("block_seconds", "Block.").labels()
+        with child.time():
+            pass
+        with pytest.raises(RuntimeError):
+            with child.time():
+                raise RuntimeError("boom")
+        assert child.snapshot()[2] == 2
+
+    def test_dump(self, registry, tmp_path):
+        """Тестирование записи метрик в файл."""
+        registry.counter("dumped_total", "Dumped.").labels().inc()
+        path = tmp_path / "metrics.prom"
+        registry.dump(str(path))
+        assert "dumped_total 1.0" in path.read_text(encoding="utf-8")
+
+    def test_http_server(self, registry):
+        """Тестирование HTTP-эндпоинта /metrics."""
+        registry.counter("served_total", "Served.").labels().inc()
+        server = registry.start_http_server(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                assert "served_total 1.0" in response.read().decode("utf-8")
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(url.replace("/metrics", "/other"), timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,72 @@
+# tests/utils/test_postal_snapshot.py
+import struct
+
+import pytest
+
+from utils.postal_snapshot import HEADER, PostalSnapshot, postal_code_key, write_snapshot
+
+ROWS = [
+    ("190000", 30.3141, 59.9386, "Russia", "Санкт-Петербург", "Санкт-Петербург"),
+    ("101000", 37.6156, 55.7522, "Russia", "Москва", "Москва"),
+    ("101000", 0.0, 0.0, "Russia", "Дубликат", "Дубликат"),
+    ("012345", 1.0, 2.0, "Russia", "Москва", "Ведущий ноль"),
+    ("AB-12", 1.0, 2.0, "Russia", "Москва", "Нецифровой код"),
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    """Фикстура для создания файла снимка из тестовых строк."""
+    path = str(tmp_path / "postal_codes.snap")
+    write_snapshot(path, ROWS)
+    return path
+
+class TestPostalSnapshot:
+    """Класс для тестирования записи и чтения снимка почтовых кодов."""
+    def test_write_and_lookup(self, snapshot_path):
+        """Тестирование поиска кодов в снимке."""
+        with PostalSnapshot(snapshot_path) as snapshot:
+            assert len(snapshot) == 3
+            postal_info = snapshot.get("101000")
+            assert postal_info.longitude == pytest.approx(37.6156, abs=1e-5)
+            assert postal_info.latitude == pytest.approx(55.7522, abs=1e-5)
+            assert (postal_info.country, postal_info.state) == ("Russia", "Москва")
+            assert snapshot.place_name("190000") == "Санкт-Петербург"
+            assert snapshot.place_name("012345") == "Ведущий ноль"
+
+    def test_missing_and_invalid_codes(self, snapshot_path):
+        """Тестирование отсутствующих, нецифровых и отличающихся ведущим нулем кодов."""
+        with PostalSnapshot(snapshot_path) as snapshot:
+            assert snapshot.get("999999") is None
+            assert snapshot.get("AB-12") is None
+            assert snapshot.get("12345") is None
+            assert snapshot.get("") is None
+
+    def test_rows(self, snapshot_path):
+        """Тестирование перебора всех кодов снимка с восстановлением ведущих нулей."""
+        with PostalSnapshot(snapshot_path) as snapshot:
+            rows = list(snapshot.rows())
+        assert [row[0] for row in rows] == ["012345", "101000", "190000"]
+        assert rows[1][3:] == ("Russia", "Москва", "Москва")
+        assert rows[1][1] == pytest.approx(37.6156, abs=1e-5)
+
+    def test_strings_are_interned(self, snapshot_path):
+        """Тестирование хранения повторяющихся строк в таблице строк один раз."""
+        with open(snapshot_path, "rb") as file:
+            _, _, _, count, string_count, _, _ = HEADER.unpack(file.read(HEADER.size))
+        assert count == 3
+        assert string_count == 4  # Russia, Санкт-Петербург, Москва, Ведущий ноль
+
+    def test_rejects_unknown_version(self, snapshot_path):
+        """Тестирование отказа открывать снимок неподдерживаемой версии формата."""
+        with open(snapshot_path, "r+b") as file:
+            file.seek(8)
+            file.write(struct.pack("<H", 99))
+        with pytest.raises(ValueError):
+            PostalSnapshot(snapshot_path)
+
+    def test_postal_code_key(self):
+        """Тестирование преобразования почтового кода в ключ."""
+        assert postal_code_key("101000") != postal_code_key("0101000")
+        assert postal_code_key("1234567890") is not None
+        assert postal_code_key("12345678901") is None
@@ -0,0 +1,47 @@
+# tests/utils/test_prefix_index.py
+import random
+
+import pytest
+
+from utils.prefix_index import PrefixIndex, PrefixMatch
+
+
+@pytest.fixture
+def index():
+    """Фикстура с индексом нескольких почтовых кодов Москвы и Самары."""
+    index = PrefixIndex()
+    index.build([("101000", "Москва", 5), ("101001", "Москва", 40), ("101100", "Москва", 0),
+                 ("102000", "Москва", 12), ("443000", "Самара", 7), ("443001", "Самара", None),
+                 ("141000", "Мытищи", 40)])
+    return index
+
+class TestPrefixIndex:
+    """Класс для тестирования индекса автодополнения."""
+    def test_search_post_code(self, index):
+        """Тестирование поиска по началу почтового кода с упорядочиванием по количеству запросов."""
+        assert index.search("post_code", "1010") == [PrefixMatch("101001", "Москва", 40),
+                                                     PrefixMatch("101000", "Москва", 5)]
+        assert [match.post_code for match in index.search("post_code", "1", k=3)] == ["101001", "141000", "102000"]
+        assert index.search("post_code", "2") == []
+        assert index.search("post_code", "", k=0) == []
+
+    def test_search_place_name(self, index):
+        """Тестирование поиска по началу названия без учета регистра."""
+        assert [match.post_code for match in index.search("place_name", "м", k=2)] == ["101001", "141000"]
+        assert [match.post_code for match in index.search("place_name", " САМ")] == ["443000", "443001"]
+        with pytest.raises(ValueError):
+            index.search("state", "М")
+
+    def test_precomputed_matches_scan(self):
+        """Тестирование совпадения заранее вычисленных результатов коротких префиксов с просмотром диапазона."""
+        rng = random.Random(5)
+        rows = [(str(rng.randint(100000, 999999)), rng.choice(["Москва", "Мытищи", "Самара"]), rng.randint(0, 50))
+                for _ in range(3000)]
+        precomputed, scanned = PrefixIndex(precompute_threshold=16), PrefixIndex(precompute_threshold=10 ** 9)
+        precomputed.build(rows)
+        scanned.build(rows)
+        assert len(precomputed._state.precomputed) > len(scanned._state.precomputed)
+        for field, prefix in (("post_code", ""), ("post_code", "1"), ("post_code", "12"), ("post_code", "123"),
+                              ("place_name", "м"), ("place_name", "мыт"), ("place_name", "самара")):
+            assert precomputed.search(field, prefix, k=7) == scanned.search(field, prefix, k=7)
+            assert precomputed.search(field, prefix, k=50) == scanned.search(field, prefix, k=50)
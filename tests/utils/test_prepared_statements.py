@@ -0,0 +1,49 @@
+# tests/utils/test_prepared_statements.py
+from unittest.mock import Mock
+
+import pytest
+
+from utils.prepared_statements import PreparedStatement, PreparedStatementRegistry
+
+STATEMENT = PreparedStatement("test_lookup", ("varchar", "int"), "SELECT $1, $2")
+
+
+class TestPreparedStatementRegistry:
+    """Класс для тестирования PreparedStatementRegistry."""
+
+    def test_statement_sql(self):
+        """Тестирование текста запросов PREPARE и EXECUTE."""
+        assert STATEMENT.prepare_sql() == "PREPARE test_lookup (varchar, int) AS SELECT $1, $2"
+        assert STATEMENT.execute_sql() == "EXECUTE test_lookup (%s, %s)"
+        assert STATEMENT.execute_sql([":code", ":count"]) == "EXECUTE test_lookup (:code, :count)"
+
+    def test_register_rejects_other_query_with_same_name(self):
+        """Тестирование того, что повторная регистрация допускается только для того же запроса."""
+        registry = PreparedStatementRegistry()
+        assert registry.register(STATEMENT) is STATEMENT
+        registry.register(STATEMENT)
+        with pytest.raises(ValueError):
+            registry.register(STATEMENT._replace(statement="SELECT $2, $1"))
+
+    def test_prepared_per_connection(self):
+        """Тестирование учета подготовки отдельно для каждого соединения и сброса после переподключения."""
+        registry = PreparedStatementRegistry()
+        first, second = Mock(), Mock()
+        registry.mark_prepared(first, STATEMENT)
+        assert registry.is_prepared(first, STATEMENT)
+        assert not registry.is_prepared(second, STATEMENT)
+        registry.forget(first)
+        assert not registry.is_prepared(first, STATEMENT)
+
+    def test_stats(self):
+        """Тестирование статистики выполнения: количество вызовов, подготовок и длительность."""
+        registry = PreparedStatementRegistry()
+        registry.mark_prepared(Mock(), STATEMENT)
+        prepares_before = registry.stats()["test_lookup"]["prepares"]
+        calls_before = registry.stats()["test_lookup"]["calls"]
+        registry.mark_prepared(Mock(), STATEMENT)
+        registry.metrics(STATEMENT).duration.observe(0.002)
+        stats = registry.stats()["test_lookup"]
+        assert stats["prepares"] == prepares_before + 1
+        assert stats["calls"] == calls_before + 1
+        assert stats["total_seconds"] >= 0.002
@@ -2,17 +2,24 @@
 from unittest.mock import patch, Mock
 
 import pytest
-from psycopg2 import Error
+from psycopg2 import Error, OperationalError
+from psycopg2.errors import InvalidSqlStatementName
 
 from config.db_data import Data
+from utils.prepared_statements import PreparedStatement
 from utils.psycopg2_connection import Psycopg2Connection
+from utils.psycopg2_pool import Psycopg2PoolRegistry
+from utils.replica_router import ReplicaRouter
 
 
 @pytest.fixture
 def mock_psycopg2_pool():
-    """Фикстура для имитации подключения к базе данных."""
-    with patch('psycopg2.pool.SimpleConnectionPool') as mock_pool:
+    """Фикстура для имитации подключения к базе данных.
+    Общий реестр пулов очищается, чтобы каждый тест создавал свой пул."""
+    Psycopg2PoolRegistry.close_all()
+    with patch('psycopg2.pool.ThreadedConnectionPool') as mock_pool:
         yield mock_pool
+        Psycopg2PoolRegistry.close_all()
     mock_pool.reset_mock()
 
 @pytest.fixture
@@ -37,15 +44,15 @@ class TestPsycopg2Connection:
         mock_psycopg2_pool.return_value = mock_connection_pool
         conn = Psycopg2Connection()
         result = conn.connect_to_db()
-        assert result is mock_connection_pool
-        mock_psycopg2_pool.assert_called_once_with(minconn=1,
-            maxconn=5,
-            user=Data.DB_USER,
-            password=Data.DB_PASS,
-            host=Data.DB_HOST,
-            port=Data.DB_PORT,
-            database=Data.DB_NAME
-        )
+        assert result.pool is mock_connection_pool
+        mock_psycopg2_pool.assert_called_once_with(Data.DB_POOL_MIN, Data.DB_POOL_MAX, dsn=Data.DB_DSN)
+
+    def test_connect_to_db_reuses_shared_pool(self, mock_psycopg2_pool):
+        """Тестирование того, что разные экземпляры Psycopg2Connection используют один пул."""
+        first = Psycopg2Connection().connect_to_db()
+        second = Psycopg2Connection().connect_to_db()
+        assert first is second
+        mock_psycopg2_pool.assert_called_once()
 
     def test_connect_to_db_failure(self, mock_psycopg2_pool):
         """Тестирование неуспешного подключения к базе данных."""
@@ -53,14 +60,7 @@ class TestPsycopg2Connection:
         conn = Psycopg2Connection()
         result = conn.connect_to_db()
         assert result is None
-        mock_psycopg2_pool.assert_called_once_with(minconn=1,
-            maxconn=5,
-            user=Data.DB_USER,
-            password=Data.DB_PASS,
-            host=Data.DB_HOST,
-            port=Data.DB_PORT,
-            database=Data.DB_NAME
-        )
+        mock_psycopg2_pool.assert_called_once_with(Data.DB_POOL_MIN, Data.DB_POOL_MAX, dsn=Data.DB_DSN)
 
     def test_connect(self, mock_psycopg2_pool, mock_psycopg2_cursor):
         """Тестирование метода connect."""
@@ -169,4 +169,111 @@ class TestPsycopg2Connection:
         conn.cursor = mock_cursor
         query = "SELECT * FROM table"
         with pytest.raises(ValueError):
-            conn.execute_query(query, fetch_one=True, fetch_all=True)
\ No newline at end of file
+            conn.execute_query(query, fetch_one=True, fetch_all=True)
+
+    def test_execute_query_borrows_pooled_connection(self, mock_psycopg2_pool):
+        """Тестирование того, что без закрепленного соединения запрос берет соединение из пула и возвращает его."""
+        mock_connection_pool = Mock()
+        mock_psycopg2_pool.return_value = mock_connection_pool
+        mock_connection = Mock(closed=0)
+        mock_connection_pool.getconn.return_value = mock_connection
+        mock_cursor = mock_connection.cursor.return_value
+        conn = Psycopg2Connection()
+        query = "SELECT * FROM table"
+        result = conn.execute_query(query, fetch_one=True)
+        assert result is mock_cursor.fetchone.return_value
+        mock_cursor.execute.assert_called_once_with(query, None)
+        mock_cursor.close.assert_called_once()
+        mock_connection_pool.putconn.assert_called_once_with(mock_connection, close=False)
+        assert conn.connection is None
+
+    def test_execute_prepared_prepares_once_per_connection(self, mock_psycopg2_pool):
+        """Тестирование того, что PREPARE выполняется при первом использовании соединения,
+        а результат запроса, изменяющего данные, читается до commit."""
+        mock_connection_pool = Mock()
+        mock_psycopg2_pool.return_value = mock_connection_pool
+        mock_connection = Mock(closed=0)
+        mock_connection_pool.getconn.return_value = mock_connection
+        mock_cursor = mock_connection.cursor.return_value
+        statement = PreparedStatement("lookup", ("varchar", ), "SELECT $1")
+        conn = Psycopg2Connection()
+        first = conn.execute_prepared(statement, ("241014", ), fetch_one=True, commit=True)
+        second = conn.execute_prepared(statement, ("241015", ), fetch_one=True, commit=True)
+        assert first is second is mock_cursor.fetchone.return_value
+        assert [call.args for call in mock_cursor.execute.call_args_list] == [
+            ("PREPARE lookup (varchar) AS SELECT $1", ),
+            ("EXECUTE lookup (%s)", ("241014", )),
+            ("EXECUTE lookup (%s)", ("241015", )),
+        ]
+        assert mock_connection.commit.call_count == 2
+
+    def test_execute_prepared_reprepares_missing_statement(self, mock_psycopg2_pool):
+        """Тестирование повторной подготовки запроса, который сервер больше не помнит (например, после DISCARD ALL)."""
+        mock_connection = Mock(closed=0, autocommit=True)
+        mock_psycopg2_pool.return_value.getconn.return_value = mock_connection
+        mock_cursor = mock_connection.cursor.return_value
+        mock_cursor.execute.side_effect = [None, InvalidSqlStatementName("missing"), None, None]
+        statement = PreparedStatement("lookup_missing", ("varchar", ), "SELECT $1")
+        conn = Psycopg2Connection()
+        result = conn.execute_prepared(statement, ("241014", ), fetch_one=True, raise_errors=True)
+        assert result is mock_cursor.fetchone.return_value
+        assert [call.args[0] for call in mock_cursor.execute.call_args_list] == [
+            "PREPARE lookup_missing (varchar) AS SELECT $1", "EXECUTE lookup_missing (%s)",
+            "PREPARE lookup_missing (varchar) AS SELECT $1", "EXECUTE lookup_missing (%s)"]
+        assert conn.statements.stats()["lookup_missing"]["prepares"] >= 2
+
+    def test_execute_query_routes_reads_to_replica(self, mock_psycopg2_pool):
+        """Тестирование того, что чтение выполняется на реплике, запись и чтение только что записанного кода -
+        на основном сервере."""
+        pools = {Data.DB_DSN: Mock(), Data.replica_dsn("replica1:5433"): Mock()}
+        mock_psycopg2_pool.side_effect = lambda minconn, maxconn, dsn: pools[dsn]
+        conn = Psycopg2Connection()
+        conn.router = ReplicaRouter(["replica1:5433"])
+        conn.execute_query("SELECT 1", fetch_one=True, read_only=True, keys=("241014", ))
+        assert pools[Data.replica_dsn("replica1:5433")].getconn.call_count == 1
+        conn.execute_query("INSERT 1", commit=True)
+        conn.note_written(("241014", ))
+        conn.execute_query("SELECT 1", fetch_one=True, read_only=True, keys=("241014", ))
+        assert pools[Data.DB_DSN].getconn.call_count == 2
+        assert pools[Data.replica_dsn("replica1:5433")].getconn.call_count == 1
+
+    def test_execute_query_falls_back_to_primary(self, mock_psycopg2_pool):
+        """Тестирование повторения чтения на основном сервере, если реплика недоступна."""
+        primary_pool = Mock()
+        mock_psycopg2_pool.side_effect = lambda minconn, maxconn, dsn: (
+            primary_pool if dsn == Data.DB_DSN else Mock(getconn=Mock(side_effect=OperationalError("down"))))
+        conn = Psycopg2Connection()
+        conn.router = ReplicaRouter(["replica2:5433"])
+        result = conn.execute_query("SELECT 1", fetch_one=True, read_only=True, raise_errors=True)
+        assert result is primary_pool.getconn.return_value.cursor.return_value.fetchone.return_value
+        assert conn.router.stats()["replica2:5433"]["available"] is False
+
+    def test_execute_values(self, mock_psycopg2_pool, mock_psycopg2_cursor):
+        """Тестирование пакетной вставки строк через execute_values с фиксацией транзакции."""
+        mock_connection = Mock()
+        mock_cursor = mock_psycopg2_cursor.return_value
+        conn = Psycopg2Connection()
+        conn.connection = mock_connection
+        conn.cursor = mock_cursor
+        query = "INSERT INTO table VALUES %s"
+        rows = [(1, ), (2, )]
+        with patch('utils.psycopg2_connection.execute_values') as mock_execute_values:
+            assert conn.execute_values(query, rows, page_size=100) is True
+            mock_execute_values.assert_called_once_with(mock_cursor, query, rows, page_size=100)
+        mock_connection.commit.assert_called_once()
+
+    def test_pooled_connection_transaction_mode(self, mock_psycopg2_pool):
+        """Тестирование того, что запрос с commit и пакетная вставка выполняются в транзакции,
+        а чтение без commit - в autocommit."""
+        mock_connection = Mock(closed=0, autocommit=True)
+        mock_psycopg2_pool.return_value.getconn.return_value = mock_connection
+        conn = Psycopg2Connection()
+        conn.execute_query("SELECT 1", fetch_one=True)
+        assert mock_connection.autocommit is True
+        conn.execute_query("UPDATE t SET a = 1", commit=True)
+        assert mock_connection.autocommit is False
+        mock_connection.commit.assert_called_once()
+        with patch('utils.psycopg2_connection.execute_values', side_effect=Error("page 2 failed")):
+            assert conn.execute_values("INSERT INTO t VALUES %s", [(1, ), (2, )], page_size=1) is False
+        assert mock_connection.autocommit is False
+        mock_connection.rollback.assert_called_once()
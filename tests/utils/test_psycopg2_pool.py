@@ -0,0 +1,51 @@
+# tests/utils/test_psycopg2_pool.py
+import threading
+from unittest.mock import Mock
+
+import pytest
+from psycopg2 import pool
+
+from utils.psycopg2_pool import SharedConnectionPool
+
+
+@pytest.fixture
+def mock_pool_class():
+    """Фикстура для имитации класса пула psycopg2."""
+    pool_class = Mock()
+    pool_class.return_value.getconn.side_effect = lambda: Mock(closed=0, autocommit=True)
+    return pool_class
+
+class TestSharedConnectionPool:
+    """Класс для тестирования SharedConnectionPool."""
+    def test_init_creates_pool(self, mock_pool_class):
+        """Тестирование создания пула psycopg2 с заданными размерами."""
+        shared_pool = SharedConnectionPool("dbname=test", minconn=1, maxconn=3, pool_class=mock_pool_class)
+        mock_pool_class.assert_called_once_with(1, 3, dsn="dbname=test")
+        assert shared_pool.pool is mock_pool_class.return_value
+
+    def test_connection_context_manager(self, mock_pool_class):
+        """Тестирование выдачи и возврата соединения контекстным менеджером."""
+        shared_pool = SharedConnectionPool("dbname=test", minconn=1, maxconn=1, pool_class=mock_pool_class)
+        with shared_pool.connection() as connection:
+            assert connection.autocommit is False  # Транзакционный режим, даже если до этого был autocommit
+        mock_pool_class.return_value.putconn.assert_called_once_with(connection, close=False)
+
+    def test_getconn_timeout_when_exhausted(self, mock_pool_class):
+        """Тестирование ожидания и ошибки, когда все соединения пула заняты."""
+        shared_pool = SharedConnectionPool("dbname=test", minconn=1, maxconn=1, pool_class=mock_pool_class,
+                                           timeout=0.01)
+        connection = shared_pool.getconn()
+        with pytest.raises(pool.PoolError):
+            shared_pool.getconn()
+        shared_pool.putconn(connection)
+        assert shared_pool.getconn() is not None
+
+    def test_getconn_waits_for_release(self, mock_pool_class):
+        """Тестирование того, что ожидающий поток получает соединение после его возврата другим потоком."""
+        shared_pool = SharedConnectionPool("dbname=test", minconn=1, maxconn=1, pool_class=mock_pool_class,
+                                           timeout=5)
+        connection = shared_pool.getconn()
+        timer = threading.Timer(0.05, shared_pool.putconn, args=(connection,))
+        timer.start()
+        assert shared_pool.getconn() is not None
+        timer.join()
@@ -0,0 +1,91 @@
+# tests/utils/test_replica_router.py
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from psycopg2.extensions import parse_dsn
+
+from config.db_data import Data
+from utils.replica_router import ReplicaRouter
+
+
+class TestReplicaRouter:
+    """Класс для тестирования ReplicaRouter."""
+
+    def test_round_robin(self):
+        """Тестирование выбора реплик по кругу и чтения с основного сервера без реплик."""
+        router = ReplicaRouter(["a:5432", "b:5432"])
+        assert [router.choose() for _ in range(4)] == ["a:5432", "b:5432", "a:5432", "b:5432"]
+        assert ReplicaRouter([]).choose() is None
+
+    def test_least_latency(self):
+        """Тестирование выбора реплики с наименьшей задержкой проверки."""
+        router = ReplicaRouter(["slow:5432", "fast:5432"], selection="least_latency", check_interval=60,
+                               probe=Mock(return_value=0.0))
+        router.check()
+        router._states["slow:5432"].latency, router._states["fast:5432"].latency = 0.05, 0.001
+        assert router.choose() == "fast:5432"
+        router.close()
+
+    def test_unknown_selection(self):
+        """Тестирование отказа для неизвестного способа выбора реплики."""
+        with pytest.raises(ValueError):
+            ReplicaRouter(["a:5432"], selection="random")
+
+    def test_lagging_and_failed_replicas_are_skipped(self):
+        """Тестирование исключения отстающей реплики и реплики с ошибкой проверки."""
+        lags = {"lagging:5432": 30.0, "ok:5432": 0.2}
+
+        def probe(replica):
+            if replica == "down:5432":
+                raise OSError("connection refused")
+            return lags[replica]
+
+        router = ReplicaRouter(["lagging:5432", "down:5432", "ok:5432"], max_lag=5, check_interval=60, probe=probe)
+        router.check()
+        assert {router.choose() for _ in range(3)} == {"ok:5432"}
+        assert router.stats()["lagging:5432"]["lag"] == 30.0
+        assert router.stats()["down:5432"]["available"] is False
+        lags["ok:5432"] = 10.0
+        router.check()
+        assert router.choose() is None
+        router.close()
+
+    def test_check_runs_in_background(self):
+        """Тестирование того, что реплики проверяет фоновый поток, а выбор реплики не ждет медленную проверку."""
+        checked = threading.Event()
+        release = threading.Event()
+
+        def probe(replica):
+            checked.set()
+            release.wait(5)
+            return 30.0
+
+        router = ReplicaRouter(["slow:5432"], max_lag=5, check_interval=0.01, probe=probe)
+        assert checked.wait(1)
+        started = time.monotonic()
+        assert router.choose() == "slow:5432"  # Результата проверки еще нет
+        assert time.monotonic() - started < 0.5
+        release.set()
+        deadline = time.monotonic() + 1
+        while router.choose() is not None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert router.stats()["slow:5432"]["lag"] == 30.0
+        router.close()
+        assert not router._thread.is_alive()
+
+    def test_read_your_writes(self):
+        """Тестирование чтения только что записанного кода с основного сервера."""
+        router = ReplicaRouter(["a:5432"], max_lag=5, check_interval=1)
+        router.note_written(["241014"])
+        assert router.choose(["241014"]) is None
+        assert router.choose(["241015", "241016"]) == "a:5432"
+        assert router.recent_writes.ttl == 6
+
+    def test_replica_dsn_quotes_values(self):
+        """Тестирование экранирования пароля с пробелом, кавычкой и обратной косой чертой в строке подключения."""
+        with patch.object(Data, "DB_PASS", "p a'ss\\"), patch.object(Data, "DB_NAME", "postal db"):
+            dsn = Data.replica_dsn("replica1:5433")
+        assert parse_dsn(dsn) == {"host": "replica1", "port": "5433", "dbname": "postal db",
+                                  "user": Data.DB_USER, "password": "p a'ss\\"}
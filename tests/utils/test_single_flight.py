@@ -0,0 +1,132 @@
+# tests/utils/test_single_flight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    """Класс для тестирования SingleFlight."""
+    def test_concurrent_calls_share_one_execution(self):
+        """Тестирование выполнения функции один раз для одновременных вызовов с одним ключом."""
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(1)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("101000", fetch)))
+        leader.start()
+        started.wait(1)
+        waiters = [threading.Thread(target=lambda: results.append(flight.do("101000", fetch))) for _ in range(4)]
+        for waiter in waiters:
+            waiter.start()
+        while flight.stats()["shared"] < 4:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader, *waiters]:
+            thread.join(1)
+
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+    def test_error_is_propagated_to_waiters(self):
+        """Тестирование передачи исключения ведущего вызова ожидающим потокам."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(1)
+            raise RuntimeError("API is down")
+
+        def call():
+            try:
+                flight.do("101000", failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(1)
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        while flight.stats()["shared"] < 1:
+            time.sleep(0.001)
+        release.set()
+        leader.join(1)
+        waiter.join(1)
+        assert errors == ["API is down", "API is down"]
+
+    def test_waiter_timeout(self):
+        """Тестирование таймаута ожидания результата ведущего вызова."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do("101000", lambda: (started.set(), release.wait(1))))
+        leader.start()
+        started.wait(1)
+        with pytest.raises(TimeoutError):
+            flight.do("101000", lambda: None, timeout=0.01)
+        release.set()
+        leader.join(1)
+
+    def test_key_is_released_after_completion(self):
+        """Тестирование повторного выполнения функции после завершения предыдущего вызова."""
+        flight = SingleFlight()
+        assert flight.do("101000", lambda: 1) == 1
+        assert flight.do("101000", lambda: 2) == 2
+
+
+class TestAsyncSingleFlight:
+    """Класс для тестирования AsyncSingleFlight."""
+    def test_concurrent_calls_share_one_execution(self):
+        """Тестирование выполнения корутины один раз для одновременных вызовов с одним ключом."""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do("101000", fetch) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == ["result"] * 5
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "shared": 4, "in_flight": 0}
+
+    def test_error_and_timeout(self):
+        """Тестирование передачи исключения и таймаута ожидания."""
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("API is down")
+
+        async def scenario():
+            return await asyncio.gather(flight.do("1", failing), flight.do("1", failing), return_exceptions=True)
+
+        assert [str(error) for error in asyncio.run(scenario())] == ["API is down", "API is down"]
+
+        async def slow():
+            await asyncio.sleep(0.1)
+
+        async def timeout_scenario():
+            with pytest.raises(TimeoutError):
+                await flight.do("2", slow, timeout=0.01)
+
+        asyncio.run(timeout_scenario())
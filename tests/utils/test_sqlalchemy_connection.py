@@ -2,15 +2,21 @@
 from unittest.mock import patch, Mock
 import pytest
 from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 
 from config.db_data import Data
+from utils.replica_router import ReplicaRouter
 from utils.sqlalchemy_connection import SQLAlchemyConnection
+from utils.sqlalchemy_engine import InstrumentedQueuePool, SQLAlchemyEngineRegistry
 
 
 @pytest.fixture
 def mock_sqlalchemy_connection():
-    """Фикстура для создания экземпляра SQLAlchemyConnection."""
-    return SQLAlchemyConnection()
+    """Фикстура для создания экземпляра SQLAlchemyConnection.
+    Общий реестр движков очищается, чтобы каждый тест создавал свой движок."""
+    SQLAlchemyEngineRegistry.dispose_all()
+    yield SQLAlchemyConnection()
+    SQLAlchemyEngineRegistry.dispose_all()
 
 class TestSqlAlchemyConnection:
     """Класс для тестирования SqlAlchemyConnection."""
@@ -18,18 +24,27 @@ class TestSqlAlchemyConnection:
         """Тест инициализации класса."""
         assert mock_sqlalchemy_connection.engine is None
         assert mock_sqlalchemy_connection.SessionLocal is None
-        assert mock_sqlalchemy_connection.session is None
 
     def test_connect(self, mock_sqlalchemy_connection):
         """Тест подключения к базе данных."""
-        with patch('utils.sqlalchemy_connection.create_engine') as mock_create_engine:
+        with patch('utils.sqlalchemy_engine.create_engine') as mock_create_engine:
             mock_sqlalchemy_connection.connect()
-            mock_create_engine.assert_called_once_with(Data.DB_URL,pool_size=5,
-                max_overflow=0,
-                pool_recycle=3600)
+            mock_create_engine.assert_called_once_with(Data.DB_URL,
+                poolclass=InstrumentedQueuePool,
+                pool_size=Data.SQLALCHEMY_POOL_SIZE,
+                max_overflow=Data.SQLALCHEMY_MAX_OVERFLOW,
+                pool_timeout=Data.DB_POOL_TIMEOUT,
+                pool_recycle=Data.SQLALCHEMY_POOL_RECYCLE,
+                pool_pre_ping=True)
             assert mock_sqlalchemy_connection.engine is not None
             assert mock_sqlalchemy_connection.SessionLocal is not None
-            assert mock_sqlalchemy_connection.session is None
+
+    def test_connect_reuses_shared_engine(self, mock_sqlalchemy_connection):
+        """Тест того, что повторные подключения используют один и тот же движок."""
+        mock_sqlalchemy_connection.connect()
+        other_connection = SQLAlchemyConnection()
+        other_connection.connect()
+        assert other_connection.engine is mock_sqlalchemy_connection.engine
 
     def test_get_session(self, mock_sqlalchemy_connection):
         """Тест получения сессии."""
@@ -37,14 +52,58 @@ class TestSqlAlchemyConnection:
         session = mock_sqlalchemy_connection.get_session()
         assert session is not None
 
+    def test_get_session_returns_new_session(self, mock_sqlalchemy_connection):
+        """Тест того, что каждая операция получает собственную сессию."""
+        mock_sqlalchemy_connection.connect()
+        first = mock_sqlalchemy_connection.get_session()
+        second = mock_sqlalchemy_connection.get_session()
+        assert first is not second
+
+    def test_read_uses_replica(self, mock_sqlalchemy_connection):
+        """Тест чтения в сессии реплики и чтения только что записанного кода - в сессии основного сервера."""
+        mock_sqlalchemy_connection.connect()
+        mock_sqlalchemy_connection.router = ReplicaRouter(["replica1:5433"])
+        bind = mock_sqlalchemy_connection.read(lambda session: session.get_bind(), keys=("241014", ))
+        assert bind is SQLAlchemyEngineRegistry.get_replica_engine("replica1:5433")
+        assert bind.url.port == 5433
+        mock_sqlalchemy_connection.note_written(("241014", ))
+        bind = mock_sqlalchemy_connection.read(lambda session: session.get_bind(), keys=("241014", ))
+        assert bind is mock_sqlalchemy_connection.engine
+        with mock_sqlalchemy_connection.get_session() as session:
+            assert session.get_bind() is mock_sqlalchemy_connection.engine
+
+    def test_read_falls_back_to_primary(self, mock_sqlalchemy_connection):
+        """Тест повторения чтения на основном сервере, если реплика недоступна."""
+        mock_sqlalchemy_connection.connect()
+        mock_sqlalchemy_connection.router = ReplicaRouter(["replica2:5433"])
+        replica_engine = SQLAlchemyEngineRegistry.get_replica_engine("replica2:5433")
+
+        def work(session):
+            if session.get_bind() is replica_engine:
+                raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+            return "primary"
+
+        assert mock_sqlalchemy_connection.read(work) == "primary"
+        assert mock_sqlalchemy_connection.router.stats()["replica2:5433"]["available"] is False
+        assert mock_sqlalchemy_connection.read(lambda session: session.get_bind()) is mock_sqlalchemy_connection.engine
+
     def test_disconnect(self, mock_sqlalchemy_connection):
         """Тест отключения от базы данных."""
         mock_sqlalchemy_connection.connect()
-        session = mock_sqlalchemy_connection.get_session()
+        engine = mock_sqlalchemy_connection.engine
         mock_sqlalchemy_connection.disconnect()
-        assert mock_sqlalchemy_connection.session is None
         assert mock_sqlalchemy_connection.engine is None
         assert mock_sqlalchemy_connection.SessionLocal is None
+        """Общий движок не закрывается и переиспользуется при следующем подключении"""
+        assert SQLAlchemyEngineRegistry.get_engine(Data.DB_URL) is engine
+
+    def test_pool_status(self, mock_sqlalchemy_connection):
+        """Тест получения показателей пула соединений."""
+        assert SQLAlchemyEngineRegistry.pool_status() == {}
+        mock_sqlalchemy_connection.connect()
+        status = SQLAlchemyEngineRegistry.pool_status()
+        assert status["size"] == Data.SQLALCHEMY_POOL_SIZE
+        assert status["checked_out"] == 0
 
     def test_execute_query_fetch_one(self, mock_sqlalchemy_connection):
         """Тест выполнения запроса с получением одной записи."""
@@ -0,0 +1,45 @@
+# tests/utils/test_trigram_index.py
+import pytest
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.trigram_index import TrigramIndex, transliterate, trigrams
+
+
+@pytest.fixture
+def index():
+    """Фикстура с индексом нескольких населенных пунктов."""
+    index = TrigramIndex()
+    index.build([(post_code, place_name, PostalCodeInfo(0.0, 0.0, "Russia", place_name))
+                 for post_code, place_name in (("101001", "Москва"), ("101000", "Москва"), ("141000", "Мытищи"),
+                                               ("190000", "Санкт-Петербург"), ("603000", "Нижний Новгород"),
+                                               ("173000", "Великий Новгород"), ("443000", "Самара"))])
+    return index
+
+class TestTrigramIndex:
+    """Класс для тестирования нечеткого поиска по названию населенного пункта."""
+    def test_trigrams_like_pg_trgm(self):
+        """Тестирование разбиения на триграммы по правилам pg_trgm и транслитерации."""
+        assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+        assert trigrams("a-b") == {"  a", " a ", "  b", " b "}
+        assert transliterate("Щёлково Ъ") == "shchelkovo "
+        assert transliterate("Moskva") == "moskva"
+
+    def test_search_misspelled_and_transliterated(self, index):
+        """Тестирование поиска с опечаткой, в латинице и порядка результатов."""
+        assert [match.post_code for match in index.search("Масква")] == ["101000", "101001"]
+        assert index.search("Moskva")[0].similarity == pytest.approx(1.0)
+        match = index.search("sankt peterburg", k=1)[0]
+        assert (match.post_code, match.place_name, match.postal_info.state) == \
+            ("190000", "Санкт-Петербург", "Санкт-Петербург")
+        matches = index.search("Новгород", threshold=0.3)
+        assert {match.place_name for match in matches} == {"Великий Новгород", "Нижний Новгород"}
+        assert matches[0].similarity >= matches[1].similarity
+
+    def test_threshold_and_k(self, index):
+        """Тестирование порога сходства и ограничения количества результатов."""
+        assert index.search("Масква", threshold=0.9) == []
+        assert len(index.search("Москва", k=1)) == 1
+        assert index.search("Москва", k=0) == []
+        assert index.search("") == []
+        assert index.search("Владивосток") == []
+        assert len(index) == 7
@@ -0,0 +1,63 @@
+# tests/utils/test_ttl_cache.py
+from unittest.mock import patch
+
+import pytest
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.ttl_cache import LRUTTLCache
+
+
+@pytest.fixture
+def postal_info():
+    """Фикстура с данными о почтовом коде."""
+    return PostalCodeInfo(76.9133, 48.1699, "Russia", "Брянск 14")
+
+class TestLRUTTLCache:
+    """Класс для тестирования LRUTTLCache."""
+    def test_get_and_set(self, postal_info):
+        """Тестирование сохранения и получения записи."""
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        assert cache.get("241014") is None
+        cache.set("241014", postal_info)
+        assert cache.get("241014") is postal_info
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "expirations": 0, "size": 1}
+
+    def test_lru_eviction(self, postal_info):
+        """Тестирование вытеснения давно не использованной записи при переполнении."""
+        cache = LRUTTLCache(max_size=2, ttl=60)
+        cache.set("1", postal_info)
+        cache.set("2", postal_info)
+        cache.get("1")  # "1" становится последней использованной записью
+        cache.set("3", postal_info)
+        assert cache.get("2") is None
+        assert cache.get("1") is postal_info
+        assert cache.get("3") is postal_info
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiration(self, postal_info):
+        """Тестирование устаревания записи по времени жизни."""
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        with patch('utils.ttl_cache.time.monotonic', return_value=1000.0):
+            cache.set("241014", postal_info)
+            cache.set("183008", postal_info, ttl=500)
+        with patch('utils.ttl_cache.time.monotonic', return_value=1061.0):
+            assert cache.get("241014") is None
+            assert cache.get("183008") is postal_info
+        assert cache.stats()["expirations"] == 1
+        assert len(cache) == 1
+
+    def test_invalidate_and_clear(self, postal_info):
+        """Тестирование удаления записей."""
+        cache = LRUTTLCache(max_size=10, ttl=60)
+        cache.set("1", postal_info)
+        cache.set("2", postal_info)
+        cache.invalidate("1")
+        cache.invalidate("unknown")
+        assert cache.get("1") is None
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_invalid_max_size(self):
+        """Тестирование ошибки при неположительном размере кэша."""
+        with pytest.raises(ValueError):
+            LRUTTLCache(max_size=0, ttl=60)
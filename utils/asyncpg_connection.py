@@ -0,0 +1,118 @@
+# utils/asyncpg_connection.py
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+import asyncpg
+
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import POOL_CHECKOUT_WAIT
+
+custom_logger = CustomLogger(__name__)
+_checkout_wait = POOL_CHECKOUT_WAIT.labels("asyncpg")
+
+
+class AsyncpgConnection:
+    """Класс для управления асинхронным пулом соединений с базой данных PostgresSQL через asyncpg.
+
+    Каждый запрос берет соединение из пула только на время выполнения; размер пула (`Data.DB_POOL_MAX`)
+    ограничивает количество одновременных запросов к базе данных, остальные ждут свободное соединение.
+    """
+    def __init__(self) -> None:
+        """метод устанавливает значение атрибута pool в None."""
+        Data.validate()
+        self.pool: Optional[asyncpg.Pool] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Создает пул соединений с базой данных. Параллельные вызовы создают пул только один раз."""
+        async with self._connect_lock:
+            if self.pool is not None:
+                return
+            self.pool = await asyncpg.create_pool(
+                host=Data.DB_HOST,
+                port=int(Data.DB_PORT),
+                user=Data.DB_USER,
+                password=Data.DB_PASS,
+                database=Data.DB_NAME,
+                min_size=Data.DB_POOL_MIN,
+                max_size=Data.DB_POOL_MAX)
+            custom_logger.log_with_context("Created asyncpg connection pool")
+
+    async def disconnect(self) -> None:
+        """Закрывает пул соединений."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        custom_logger.log_with_context("Disconnected from PostgresSQL", level=logging.DEBUG)
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Берет соединение из пула на время блока `async with`, учитывая время ожидания свободного соединения."""
+        started = time.perf_counter()
+        connection = await self.pool.acquire()
+        _checkout_wait.observe(time.perf_counter() - started)
+        try:
+            yield connection
+        finally:
+            await self.pool.release(connection)
+
+    async def execute_query(self,
+                            query: str,
+                            *params: Any,
+                            fetch_one: bool = False,
+                            fetch_all: bool = False,
+                            raise_errors: bool = False) -> Optional[Any]:
+        """
+        Выполняет SQL-запрос к базе данных. Каждый запрос выполняется в собственной транзакции (autocommit).
+
+        :param query: SQL-запрос с плейсхолдерами `$1`, `$2`, ...
+        :param params: Параметры SQL-запроса.
+        :param fetch_one: Флаг, указывающий, нужно ли возвращать одну строку (по умолчанию False).
+        :param fetch_all: Флаг, указывающий, нужно ли возвращать все строки (по умолчанию False).
+        :param raise_errors: Флаг, указывающий, нужно ли пробрасывать ошибку базы данных вызывающему коду.
+        :return: Одна строка (`asyncpg.Record`), если `fetch_one=True`, список строк, если `fetch_all=True`;
+            `None` в противном случае или при ошибке.
+        """
+        if fetch_one and fetch_all:
+            raise ValueError("You can't get fetch_one and fetch_all at the same time..")
+        if self.pool is None:
+            await self.connect()
+        try:
+            async with self._acquire() as connection:
+                if fetch_one:
+                    return await connection.fetchrow(query, *params)
+                if fetch_all:
+                    return await connection.fetch(query, *params)
+                await connection.execute(query, *params)
+
+        except (asyncpg.PostgresError, OSError) as e:
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
+            if raise_errors:
+                raise
+        return None
+
+    async def execute_many(self, query: str, rows: List[tuple], raise_errors: bool = False) -> bool:
+        """Выполняет запрос для множества наборов параметров одним пакетом в одной транзакции.
+
+        :param query: SQL-запрос с плейсхолдерами `$1`, `$2`, ...
+        :param rows: Список кортежей параметров.
+        :param raise_errors: Флаг, указывающий, нужно ли пробрасывать ошибку базы данных вызывающему коду.
+        :return: `True`, если строки записаны (или вставлять нечего); `False` при ошибке базы данных.
+        """
+        if not rows:
+            return True
+        if self.pool is None:
+            await self.connect()
+        try:
+            async with self._acquire() as connection:
+                await connection.executemany(query, rows)
+        except (asyncpg.PostgresError, OSError) as e:
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
+            if raise_errors:
+                raise
+            return False
+        return True
@@ -1,14 +1,110 @@
 #utils/custom_logger.py
 
+import itertools
+import json
 import logging
-import inspect
+import os
+import threading
+from typing import Any, Dict, Optional
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s (called from %(funcName)s)"
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись журнала одной строкой JSON: время, уровень, имя логгера, сообщение, место вызова
+    и дополнительные поля, переданные в `log_with_context`."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "func": record.funcName,
+            "line": record.lineno,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Текстовый формат `УРОВЕНЬ:логгер:сообщение (called from функция)` с дополнительными полями `ключ=значение`."""
+    def __init__(self) -> None:
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None, force: bool = False) -> None:
+    """Настраивает корневой обработчик журнала один раз на процесс.
+
+    :param level: Уровень журнала (по умолчанию переменная окружения `LOG_LEVEL` или `INFO`).
+    :param log_format: `text` или `json` (по умолчанию переменная окружения `LOG_FORMAT` или `text`).
+    :param force: Перенастроить, даже если журнал уже настроен.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured and not force:
+            return
+        level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+        logging.basicConfig(level=level, handlers=[handler], force=force)
+        _configured = True
+
 
 class CustomLogger:
-    def __init__(self, name:str) -> None:
-        logging.basicConfig(level=logging.INFO)
+    """Логгер модуля с низкими накладными расходами.
+
+    - Уровень проверяется до любой работы: отключенное сообщение стоит один вызов `isEnabledFor`.
+    - Сообщение форматируется лениво в стиле `logging` (`"... %s", значение`) и только если запись будет выведена.
+    - Место вызова определяется стандартным `stacklevel` (обход кадров через `sys._getframe`), без `inspect.stack()`.
+    - Частые сообщения можно прореживать: выводится одно из `sample_every` сообщений с одинаковым шаблоном.
+    """
+    def __init__(self, name: str, sample_every: int = 1) -> None:
+        """Инициализация логгера.
+
+        :param name: Имя логгера (обычно `__name__` модуля).
+        :param sample_every: Прореживание по умолчанию для всех сообщений логгера (1 - выводить все).
+        """
+        configure_logging()
         self.logger = logging.getLogger(name)
+        self.sample_every = sample_every
+        self._sample_counters: Dict[str, itertools.count] = {}
+
+    def log_with_context(self, message: str, *args: Any, level: int = logging.INFO,
+                         sample_every: Optional[int] = None, exc_info: bool = False, **fields: Any) -> None:
+        """Записывает сообщение с именем вызвавшей функции.
 
-    def log_with_context(self, message: str) -> None:
-        stack = inspect.stack()
-        caller_function = stack[1].function
-        self.logger.info(f"{message} (called from {caller_function})")
+        :param message: Шаблон сообщения; `%s` в нем подставляются из `args` только при выводе записи.
+        :param args: Аргументы шаблона.
+        :param level: Уровень записи (по умолчанию INFO).
+        :param sample_every: Выводить только одно из `sample_every` сообщений с этим шаблоном
+            (по умолчанию значение, заданное для логгера).
+        :param exc_info: Добавить к записи текущее исключение.
+        :param fields: Дополнительные поля записи (выводятся как `ключ=значение` или как поля JSON).
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        sample_every = sample_every or self.sample_every
+        if sample_every > 1:
+            counter = self._sample_counters.get(message)
+            if counter is None:
+                counter = self._sample_counters.setdefault(message, itertools.count())
+            if next(counter) % sample_every:  # next() у itertools.count атомарен под GIL
+                return
+            fields["sample_every"] = sample_every
+        self.logger.log(level, message, *args, exc_info=exc_info, stacklevel=2,
+                        extra={"fields": fields} if fields else None)
@@ -0,0 +1,157 @@
+# utils/geo_arrays.py
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.custom_logger import CustomLogger
+from utils.geo_index import EARTH_RADIUS_KM
+
+custom_logger = CustomLogger(__name__)
+
+# Сколько байт занимает одна ячейка блока матрицы расстояний во время вычисления:
+# результат и несколько временных массивов float64 одного размера.
+_BYTES_PER_CELL = 8 * 4
+
+
+def haversine_km(latitudes1: np.ndarray, longitudes1: np.ndarray,
+                 latitudes2: np.ndarray, longitudes2: np.ndarray) -> np.ndarray:
+    """Расстояние по большому кругу в километрах между точками, заданными в радианах (с broadcasting numpy)."""
+    h = (np.sin((latitudes2 - latitudes1) / 2) ** 2
+         + np.cos(latitudes1) * np.cos(latitudes2) * np.sin((longitudes2 - longitudes1) / 2) ** 2)
+    np.clip(h, 0.0, 1.0, out=h)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h, out=h), out=h)
+
+
+def iter_distance_blocks(latitudes1: np.ndarray, longitudes1: np.ndarray,
+                         latitudes2: np.ndarray, longitudes2: np.ndarray,
+                         max_bytes: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Вычисляет матрицу расстояний N×M блоками строк, чтобы временные массивы не превышали `max_bytes`.
+        :param latitudes1: Широты N точек в радианах.
+        :param longitudes1: Долготы N точек в радианах.
+        :param latitudes2: Широты M точек в радианах.
+        :param longitudes2: Долготы M точек в радианах.
+        :param max_bytes: Ограничение памяти на вычисление одного блока.
+        :return: Итератор пар (номер первой строки блока, блок float64 формы (строки, M))."""
+    columns = max(len(latitudes2), 1)
+    rows_per_block = max(1, max_bytes // (columns * _BYTES_PER_CELL))
+    cos_latitudes2 = np.cos(latitudes2)
+    for start in range(0, len(latitudes1), rows_per_block):
+        block_latitudes = latitudes1[start:start + rows_per_block, None]
+        block_longitudes = longitudes1[start:start + rows_per_block, None]
+        h = np.sin((latitudes2 - block_latitudes) / 2) ** 2
+        h += np.cos(block_latitudes) * cos_latitudes2 * np.sin((longitudes2 - block_longitudes) / 2) ** 2
+        np.clip(h, 0.0, 1.0, out=h)
+        np.sqrt(h, out=h)
+        np.arcsin(h, out=h)
+        h *= 2 * EARTH_RADIUS_KM
+        yield start, h
+
+
+class _ArraysState(NamedTuple):
+    """Согласованный набор массивов, который `build` заменяет целиком."""
+    codes: np.ndarray
+    latitudes: np.ndarray  # В радианах, по возрастанию
+    longitudes: np.ndarray  # В радианах
+    positions: Dict[str, int]
+
+
+class GeoArrays:
+    """Координаты почтовых кодов в непрерывных массивах numpy для векторных запросов:
+    поиск всех кодов в радиусе от точки и матрицы расстояний между наборами кодов.
+
+    Массивы отсортированы по широте, поэтому поиск в радиусе считает расстояния только для полосы широт
+    шириной 2×радиус, найденной двоичным поиском. Содержимое неизменно после построения;
+    для учета новых кодов массивы строятся заново (`build`).
+    """
+    def __init__(self, max_block_bytes: int = 64 * 1024 * 1024) -> None:
+        """Инициализация пустого набора.
+
+        :param max_block_bytes: Ограничение памяти на вычисление одного блока матрицы расстояний.
+        """
+        self.max_block_bytes = max_block_bytes
+        self._state = _ArraysState(np.empty(0, dtype=object), np.empty(0), np.empty(0), {})
+
+    def __len__(self) -> int:
+        return len(self._state.codes)
+
+    def build(self, rows: Iterable[Tuple[str, PostalCodeInfo]]) -> int:
+        """Заменяет содержимое массивов.
+            :param rows: Пары (почтовый код, PostalCodeInfo); строки без координат пропускаются.
+            :return: Количество загруженных кодов."""
+        coordinates = {}
+        for post_code, postal_info in rows:
+            try:
+                coordinates[post_code] = (float(postal_info.latitude), float(postal_info.longitude))
+            except (TypeError, ValueError):
+                continue
+        codes = np.array(list(coordinates), dtype=object)
+        points = np.radians(np.array(list(coordinates.values()), dtype=np.float64).reshape(-1, 2))
+        order = np.argsort(points[:, 0], kind="stable")
+        codes = codes[order]
+        self._state = _ArraysState(codes, np.ascontiguousarray(points[order, 0]),
+                                   np.ascontiguousarray(points[order, 1]),
+                                   {post_code: position for position, post_code in enumerate(codes)})
+        custom_logger.log_with_context("Built geo arrays of %s postal codes", len(codes))
+        return len(codes)
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Находит все почтовые коды не дальше `radius_km` от точки.
+            :param latitude: Широта в градусах.
+            :param longitude: Долгота в градусах.
+            :param radius_km: Радиус в километрах.
+            :param limit: Сколько ближайших результатов вернуть; `None` - все.
+            :return: Список (почтовый код, расстояние в км) по возрастанию расстояния.
+            :raises ValueError: Если координаты вне допустимых диапазонов или радиус отрицательный."""
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180 or not radius_km >= 0:
+            raise ValueError(f"Invalid query: latitude={latitude}, longitude={longitude}, radius_km={radius_km}")
+        state = self._state
+        latitude_rad, longitude_rad = np.radians(latitude), np.radians(longitude)
+        band = radius_km / EARTH_RADIUS_KM  # Точки дальше по широте заведомо дальше радиуса
+        lo = np.searchsorted(state.latitudes, latitude_rad - band, side="left")
+        hi = np.searchsorted(state.latitudes, latitude_rad + band, side="right")
+        distances = haversine_km(latitude_rad, longitude_rad, state.latitudes[lo:hi], state.longitudes[lo:hi])
+        inside = np.flatnonzero(distances <= radius_km)
+        if limit is not None and limit < len(inside):
+            inside = inside[np.argpartition(distances[inside], limit)[:limit]]
+        inside = inside[np.argsort(distances[inside], kind="stable")]
+        return list(zip(state.codes[lo:hi][inside].tolist(), distances[inside].tolist()))
+
+    def distance_matrix(self, postal_codes1: Sequence[str], postal_codes2: Sequence[str],
+                        out: Optional[np.ndarray] = None, dtype=np.float32) -> np.ndarray:
+        """Матрица расстояний в километрах между двумя наборами почтовых кодов.
+        Вычисляется блоками строк в пределах `max_block_bytes`, поэтому помимо результата память почти не нужна:
+        для 10 000 × 10 000 результат float32 занимает 400 МБ, а вместо него можно передать `np.memmap` в `out`.
+            :param postal_codes1: Коды строк матрицы.
+            :param postal_codes2: Коды столбцов матрицы.
+            :param out: Массив для результата формы (N, M); `None` - создать новый.
+            :param dtype: Тип элементов нового массива результата.
+            :return: Массив формы (N, M), элемент [i, j] - расстояние между i-м и j-м кодами.
+            :raises KeyError: Если некоторых кодов нет в наборе (в исключении - список таких кодов)."""
+        shape = (len(postal_codes1), len(postal_codes2))
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError(f"out must have shape {shape}, got {out.shape}")
+        for start, block in self.distance_blocks(postal_codes1, postal_codes2):
+            out[start:start + len(block)] = block
+        return out
+
+    def distance_blocks(self, postal_codes1: Sequence[str],
+                        postal_codes2: Sequence[str]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Матрица расстояний между двумя наборами кодов блоками строк (см. `iter_distance_blocks`);
+        подходит для потоковой обработки матриц, которые не нужно держать в памяти целиком.
+            :raises KeyError: Если некоторых кодов нет в наборе (в исключении - список таких кодов)."""
+        state = self._state
+        positions1, positions2 = _positions_of(state, postal_codes1), _positions_of(state, postal_codes2)
+        return iter_distance_blocks(state.latitudes[positions1], state.longitudes[positions1],
+                                    state.latitudes[positions2], state.longitudes[positions2], self.max_block_bytes)
+
+
+def _positions_of(state: _ArraysState, postal_codes: Sequence[str]) -> np.ndarray:
+    """Позиции почтовых кодов в массивах набора или KeyError со списком отсутствующих кодов."""
+    positions = [state.positions.get(post_code, -1) for post_code in postal_codes]
+    if -1 in positions:
+        raise KeyError([post_code for post_code, position in zip(postal_codes, positions) if position < 0])
+    return np.array(positions, dtype=np.intp)
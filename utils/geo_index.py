@@ -0,0 +1,214 @@
+# utils/geo_index.py
+import heapq
+import math
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088  # Средний радиус Земли (IUGG)
+LEAF_SIZE = 8  # Узлы с таким количеством точек и меньше просматриваются перебором
+
+
+class NearestPostalCode(NamedTuple):
+    """Результат поиска ближайшего почтового кода."""
+    post_code: str
+    postal_info: PostalCodeInfo
+    distance_km: float
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Переводит широту и долготу в градусах в точку единичной сферы (x, y, z)."""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat)
+
+
+def chord_to_km(squared_chord: float) -> float:
+    """Переводит квадрат длины хорды единичной сферы в расстояние по большому кругу в километрах."""
+    return EARTH_RADIUS_KM * 2 * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+def great_circle_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Расстояние по большому кругу между двумя точками в километрах (формула гаверсинусов)."""
+    lat1, lat2 = math.radians(latitude1), math.radians(latitude2)
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = math.radians(longitude2 - longitude1) / 2
+    h = math.sin(half_dlat) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(half_dlon) ** 2
+    return EARTH_RADIUS_KM * 2 * math.asin(min(1.0, math.sqrt(h)))
+
+
+class _KDTree:
+    """Неизменяемое KD-дерево точек единичной сферы, хранящееся неявно в массивах:
+    корень поддиапазона [lo, hi) - средний элемент, левее - меньшие по оси разбиения, правее - большие.
+
+    Евклидово расстояние между точками сферы (хорда) монотонно связано с расстоянием по большому кругу,
+    поэтому ближайшие по хорде - ближайшие и на поверхности Земли, без искажений у полюсов и на 180-м меридиане.
+    """
+    __slots__ = ("codes", "xs", "ys", "zs")
+
+    def __init__(self, points: List[Tuple[float, float, float, str]]) -> None:
+        self._build(points, 0, len(points), 0)
+        self.xs = [point[0] for point in points]
+        self.ys = [point[1] for point in points]
+        self.zs = [point[2] for point in points]
+        self.codes = [point[3] for point in points]
+
+    @staticmethod
+    def _build(points: List[Tuple[float, float, float, str]], lo: int, hi: int, axis: int) -> None:
+        stack = [(lo, hi, axis)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[axis])
+            mid = (lo + hi) // 2
+            next_axis = (axis + 1) % 3
+            stack.append((lo, mid, next_axis))
+            stack.append((mid + 1, hi, next_axis))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def search(self, x: float, y: float, z: float, k: int, heap: List[Tuple[float, str]], skip: Set[str]) -> None:
+        """Добавляет в max-кучу `heap` (элементы - (-квадрат хорды, код)) до `k` ближайших точек дерева."""
+        xs, ys, zs, codes = self.xs, self.ys, self.zs, self.codes
+        query = (x, y, z)
+        axes = (xs, ys, zs)
+        stack = [(0, len(codes), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for index in range(lo, hi):
+                    self.offer(heap, k, (xs[index] - x) ** 2 + (ys[index] - y) ** 2 + (zs[index] - z) ** 2,
+                                codes[index], skip)
+                continue
+            mid = (lo + hi) // 2
+            self.offer(heap, k, (xs[mid] - x) ** 2 + (ys[mid] - y) ** 2 + (zs[mid] - z) ** 2, codes[mid], skip)
+            diff = query[axis] - axes[axis][mid]
+            next_axis = (axis + 1) % 3
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # Дальняя половина нужна, только если плоскость разбиения ближе текущей k-й точки
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                stack.append((far[0], far[1], next_axis))
+            stack.append((near[0], near[1], next_axis))
+
+    @staticmethod
+    def offer(heap: List[Tuple[float, str]], k: int, squared_chord: float, code: str, skip: Set[str]) -> None:
+        if code in skip:
+            return
+        if len(heap) < k:
+            heapq.heappush(heap, (-squared_chord, code))
+        elif squared_chord < -heap[0][0]:
+            heapq.heapreplace(heap, (-squared_chord, code))
+
+
+class _IndexState(NamedTuple):
+    """Согласованное состояние индекса для поиска: дерево с данными его кодов, буфер новых кодов с их данными
+    и устаревшие коды дерева. Словари после создания состояния не изменяются - вставка создает новые."""
+    tree: _KDTree
+    tree_codes: frozenset
+    pending: Tuple[Tuple[float, float, float, str], ...]
+    stale: frozenset  # Коды, которые есть в дереве, но изменились после его построения
+    infos: Dict[str, PostalCodeInfo]  # Данные кодов дерева
+    points: Dict[str, Tuple[float, float, float]]  # Точки кодов дерева (для перестроения)
+    pending_infos: Dict[str, PostalCodeInfo]  # Данные кодов буфера (новые и измененные)
+
+    def info(self, post_code: str) -> PostalCodeInfo:
+        postal_info = self.pending_infos.get(post_code)
+        return self.infos[post_code] if postal_info is None else postal_info
+
+
+class GeoIndex:
+    """Пространственный индекс почтовых кодов в памяти для поиска ближайших к точке.
+
+    Основная часть - KD-дерево, построенное один раз; новые и измененные коды попадают в небольшой
+    буфер, который просматривается перебором, и при превышении `rebuild_threshold` дерево перестраивается.
+    Поиск не блокирует вставки: он работает с неизменяемым состоянием (дерево, буфер и данные кодов),
+    которое вставка и перестроение заменяют целиком, поэтому одно чтение `_state` дает согласованный снимок.
+    """
+    def __init__(self, rebuild_threshold: int = 1024) -> None:
+        """Инициализация пустого индекса.
+
+        :param rebuild_threshold: Размер буфера новых кодов, после которого дерево перестраивается.
+        """
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.Lock()
+        self._state = self._rebuilt({}, {})
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.infos) + sum(1 for post_code in state.pending_infos if post_code not in state.infos)
+
+    def build(self, rows: Iterable[Tuple[str, PostalCodeInfo]]) -> int:
+        """Заменяет содержимое индекса.
+            :param rows: Пары (почтовый код, PostalCodeInfo); строки без координат пропускаются.
+            :return: Количество проиндексированных кодов."""
+        infos: Dict[str, PostalCodeInfo] = {}
+        points: Dict[str, Tuple[float, float, float]] = {}
+        for post_code, postal_info in rows:
+            point = _point_of(postal_info)
+            if point is not None:
+                infos[post_code], points[post_code] = postal_info, point
+        state = self._rebuilt(infos, points)
+        with self._lock:
+            self._state = state
+        custom_logger.log_with_context("Built geo index of %s postal codes", len(infos))
+        return len(infos)
+
+    def add(self, post_code: str, postal_info: PostalCodeInfo) -> None:
+        """Добавляет или обновляет почтовый код.
+            :param post_code: Почтовый код.
+            :param postal_info: Информация о почтовом коде с координатами."""
+        point = _point_of(postal_info)
+        if point is None:
+            return
+        with self._lock:
+            state = self._state
+            pending = tuple(entry for entry in state.pending if entry[3] != post_code) + (point + (post_code, ), )
+            # Копируется только небольшой словарь буфера, данные дерева остаются общими со старым состоянием
+            pending_infos = {**state.pending_infos, post_code: postal_info}
+            if len(pending) >= self.rebuild_threshold:
+                infos = {**state.infos, **pending_infos}
+                points = {**state.points, **{code: (px, py, pz) for px, py, pz, code in pending}}
+                self._state = self._rebuilt(infos, points)
+            else:
+                stale = state.stale | {post_code} if post_code in state.tree_codes else state.stale
+                self._state = state._replace(pending=pending, stale=stale, pending_infos=pending_infos)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[NearestPostalCode]:
+        """Находит `k` почтовых кодов, ближайших к точке по расстоянию по большому кругу.
+            :param latitude: Широта в градусах.
+            :param longitude: Долгота в градусах.
+            :param k: Количество результатов.
+            :return: Список результатов по возрастанию расстояния.
+            :raises ValueError: Если координаты вне допустимых диапазонов."""
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            raise ValueError(f"Invalid coordinates: latitude={latitude}, longitude={longitude}")
+        if k <= 0:
+            return []
+        state = self._state
+        x, y, z = to_unit_vector(latitude, longitude)
+        heap: List[Tuple[float, str]] = []
+        state.tree.search(x, y, z, k, heap, state.stale)
+        no_skip: Set[str] = set()
+        for px, py, pz, code in state.pending:
+            _KDTree.offer(heap, k, (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2, code, no_skip)
+        return [NearestPostalCode(code, state.info(code), chord_to_km(-negative_chord))
+                for negative_chord, code in sorted(heap, reverse=True)]
+
+    @staticmethod
+    def _rebuilt(infos: Dict[str, PostalCodeInfo], points: Dict[str, Tuple[float, float, float]]) -> _IndexState:
+        tree = _KDTree([point + (post_code, ) for post_code, point in points.items()])
+        return _IndexState(tree, frozenset(tree.codes), (), frozenset(), infos, points, {})
+
+
+def _point_of(postal_info: PostalCodeInfo) -> Optional[Tuple[float, float, float]]:
+    """Точка единичной сферы для координат почтового кода (в API координаты - строки) или `None`."""
+    try:
+        return to_unit_vector(float(postal_info.latitude), float(postal_info.longitude))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,327 @@
+# utils/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+# Границы корзин гистограмм задержек в секундах: от 50 мкс (попадание в кэш) до 10 с (повторы запросов к API).
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Формирует набор меток в формате Prometheus: `{name="value",...}`."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """Контекстный менеджер, записывающий длительность блока `with` в гистограмму."""
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: "HistogramChild") -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class HistogramChild:
+    """Гистограмма для одного набора значений меток: счетчики по корзинам, сумма и количество наблюдений."""
+    __slots__ = ("bounds", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # Последняя корзина - +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Учитывает наблюдение.
+            :param value: Наблюдаемое значение (для задержек - секунды)."""
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> _Timer:
+        """Возвращает контекстный менеджер, измеряющий длительность блока `with`."""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Возвращает согласованную копию счетчиков: (счетчики корзин, сумма, количество)."""
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценивает квантиль по корзинам линейной интерполяцией (как `histogram_quantile` в Prometheus).
+            :param q: Квантиль от 0 до 1 (например, 0.99).
+            :return: Оценка квантиля или `None`, если наблюдений нет."""
+        counts, _, total = self.snapshot()
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.bounds):
+                    return self.bounds[-1]  # Значение выше последней границы: известна только нижняя оценка
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+
+class CounterChild:
+    """Счетчик для одного набора значений меток."""
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """Увеличивает счетчик.
+            :param amount: Величина прироста."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, имена меток и дочерние метрики по значениям меток."""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **labels: str):
+        """Возвращает дочернюю метрику для значений меток (создается при первом обращении).
+        Дочернюю метрику горячего пути стоит получить один раз и сохранить.
+            :param values: Значения меток по порядку `labelnames`.
+            :param labels: Значения меток по именам."""
+        key = tuple(values) if values else tuple(labels[name] for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Histogram(_Metric):
+    """Гистограмма с метками. Наблюдение - поиск корзины двоичным поиском и три сложения под блокировкой."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def render(self) -> Iterable[str]:
+        for values, child in self.children():
+            counts, total_sum, total_count = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total_sum)}"
+            yield f"{self.name}_count{labels} {total_count}"
+
+
+class Counter(_Metric):
+    """Монотонный счетчик с метками."""
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def render(self) -> Iterable[str]:
+        for values, child in self.children():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса с выгрузкой в текстовом формате Prometheus."""
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Возвращает гистограмму с заданным именем, создавая ее при первом обращении."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Возвращает счетчик с заданным именем, создавая его при первом обращении."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def _get_or_create(self, metric_class, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def render(self) -> str:
+        """Выгружает все метрики в текстовом формате Prometheus (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.99)) -> Dict[str, Dict[LabelValues, Dict[str, float]]]:
+        """Возвращает количество наблюдений и квантили всех гистограмм (для локального анализа без Prometheus).
+            :param quantiles: Квантили, например (0.5, 0.99).
+            :return: Словарь {имя гистограммы: {значения меток: {"count": ..., "p50": ..., "p99": ...}}}."""
+        with self._lock:
+            histograms = [metric for metric in self._metrics.values() if isinstance(metric, Histogram)]
+        result: Dict[str, Dict[LabelValues, Dict[str, float]]] = {}
+        for histogram in histograms:
+            per_labels = result.setdefault(histogram.name, {})
+            for values, child in histogram.children():
+                entry = {"count": child.snapshot()[2]}
+                for q in quantiles:
+                    entry[f"p{q * 100:g}"] = child.quantile(q)
+                per_labels[values] = entry
+        return result
+
+    def dump(self, path: str) -> None:
+        """Атомарно записывает метрики в файл (например, для textfile collector node_exporter).
+            :param path: Путь к файлу."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Запускает в фоновом потоке HTTP-сервер, отдающий метрики по адресу `/metrics`.
+            :param port: Порт (0 - выбрать свободный).
+            :param host: Адрес прослушивания (по умолчанию только локальный).
+            :return: Запущенный сервер; остановка - `server.shutdown()`."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # Запросы сборщика метрик не журналируются
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        custom_logger.log_with_context("Serving metrics on http://%s:%s/metrics", host, server.server_address[1])
+        return server
+
+
+REGISTRY = MetricsRegistry()
+
+# Длительность этапов обработки запроса: client - клиент (psycopg2, sqlalchemy, asyncpg, api),
+# stage - этап (cache, db_select, stats, api_fetch, db_insert, lookup - запрос целиком).
+STAGE_DURATION = REGISTRY.histogram(
+    "postal_stage_duration_seconds", "Duration of postal code lookup stages.", ("client", "stage"))
+# Результаты запросов почтовых кодов: cache_hit, db_hit, api_hit, not_found.
+LOOKUPS = REGISTRY.counter(
+    "postal_lookups_total", "Postal code lookups by where the answer came from.", ("client", "result"))
+# Ожидание свободного соединения в пуле: pool - psycopg2, sqlalchemy, asyncpg.
+POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "postal_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool.", ("pool",))
+# Выполнение серверных подготовленных запросов (EXECUTE и чтение результата): statement - имя запроса.
+PREPARED_STATEMENT_DURATION = REGISTRY.histogram(
+    "postal_prepared_statement_duration_seconds", "Duration of prepared statement executions.", ("statement",))
+# PREPARE на соединениях (первое использование соединения и повторная подготовка после переподключения).
+PREPARED_STATEMENT_PREPARES = REGISTRY.counter(
+    "postal_prepared_statement_prepares_total", "Prepared statements prepared on server connections.", ("statement",))
+# Запросы на чтение по серверу, на который они направлены: server - primary или имя реплики (host:port).
+DB_READS = REGISTRY.counter(
+    "postal_db_reads_total", "Read queries by the database server they were routed to.", ("server",))
+
+
+class StageMetrics:
+    """Заранее полученные метрики этапов одного клиента: на горячем пути нет поиска по меткам."""
+    STAGES = ("lookup", "cache", "db_select", "stats", "api_fetch", "db_insert")
+    RESULTS = ("cache_hit", "db_hit", "api_hit", "not_found")
+
+    def __init__(self, client: str) -> None:
+        """:param client: Значение метки client (psycopg2, sqlalchemy, asyncpg, api)."""
+        for stage in self.STAGES:
+            setattr(self, stage, STAGE_DURATION.labels(client, stage))
+        self._results = {result: LOOKUPS.labels(client, result) for result in self.RESULTS}
+
+    def lookup_done(self, started: float, result: str) -> None:
+        """Учитывает завершенный запрос почтового кода.
+            :param started: Время начала запроса по `time.perf_counter()`.
+            :param result: Откуда получен ответ: cache_hit, db_hit, api_hit или not_found."""
+        self.lookup.observe(time.perf_counter() - started)
+        self._results[result].inc()
+
+    def count(self, result: str, amount: int = 1) -> None:
+        """Учитывает результаты пакетного запроса (без длительности отдельных запросов).
+            :param result: Откуда получен ответ: cache_hit, db_hit, api_hit или not_found.
+            :param amount: Количество почтовых кодов с таким результатом."""
+        if amount:
+            self._results[result].inc(amount)
@@ -0,0 +1,206 @@
+# utils/postal_snapshot.py
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+# Формат файла снимка (все числа little-endian; столбцы читаются без копирования, поэтому
+# снимки поддерживаются только на little-endian платформах):
+#   заголовок HEADER: сигнатура, версия формата, флаги (резерв), количество кодов,
+#       количество строк в таблице строк, размер блока строк в байтах, время создания (unix time);
+#   ключи кодов uint64 по возрастанию; долготы float32; широты float32;
+#   индексы страны, субъекта и населенного пункта в таблице строк uint32;
+#   смещения строк uint32 (количество строк + 1); блок строк UTF-8.
+MAGIC = b"PCSNAP\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIIIq")
+# Ключ включает длину кода, чтобы коды с ведущими нулями ("012345" и "12345") не совпадали.
+MAX_CODE_LENGTH = 10
+_LENGTH_FACTOR = 10 ** MAX_CODE_LENGTH
+
+SnapshotRow = Tuple[str, float, float, str, str, str]
+
+
+def postal_code_key(postal_code: str) -> Optional[int]:
+    """Преобразует почтовый код в целочисленный ключ снимка.
+        :param postal_code: Почтовый код.
+        :return: Ключ или `None`, если код не состоит из цифр или длиннее `MAX_CODE_LENGTH`."""
+    if not postal_code.isdigit() or len(postal_code) > MAX_CODE_LENGTH or not postal_code.isascii():
+        return None
+    return len(postal_code) * _LENGTH_FACTOR + int(postal_code)
+
+
+def write_snapshot(path: str, rows: Iterable[SnapshotRow]) -> int:
+    """Записывает снимок почтовых кодов в файл.
+    Файл сначала записывается рядом во временный файл и затем атомарно заменяет прежний снимок,
+    поэтому процессы, уже отобразившие прежний файл в память, продолжают работать с ним.
+
+    :param path: Путь к файлу снимка.
+    :param rows: Строки (почтовый код, долгота, широта, страна, субъект, населенный пункт).
+    :return: Количество записанных почтовых кодов (нецифровые коды пропускаются).
+    """
+    _check_byteorder()
+    entries = []
+    skipped = 0
+    for post_code, longitude, latitude, country, state, place_name in rows:
+        key = postal_code_key(post_code)
+        if key is None:
+            skipped += 1
+            continue
+        entries.append((key, longitude, latitude, country, state, place_name))
+    entries.sort(key=itemgetter(0))  # Сортировка устойчивая: для повторов кода остается первая строка
+
+    strings: Dict[str, int] = {}
+    keys, longitudes, latitudes = array("Q"), array("f"), array("f")
+    countries, states, places = array("I"), array("I"), array("I")
+    previous = None
+    for key, longitude, latitude, country, state, place_name in entries:
+        if key == previous:
+            continue
+        previous = key
+        keys.append(key)
+        longitudes.append(longitude)
+        latitudes.append(latitude)
+        countries.append(strings.setdefault(country, len(strings)))
+        states.append(strings.setdefault(state, len(strings)))
+        places.append(strings.setdefault(place_name, len(strings)))
+
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array("I", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    blob = b"".join(encoded)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(keys), len(encoded), len(blob), int(time.time())))
+        for column in (keys, longitudes, latitudes, countries, states, places, offsets):
+            column.tofile(file)
+        file.write(blob)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    custom_logger.log_with_context("Wrote snapshot %s: %s postal codes, %s strings, %s skipped",
+                                   path, len(keys), len(encoded), skipped)
+    return len(keys)
+
+
+def _check_byteorder() -> None:
+    """Проверяет, что платформа little-endian (столбцы снимка используются в нативном порядке байтов)."""
+    if sys.byteorder != "little":
+        raise RuntimeError("Postal code snapshots are only supported on little-endian platforms")
+
+
+class PostalSnapshot:
+    """Снимок почтовых кодов, отображенный в память (`mmap`) только для чтения.
+
+    Столбцы читаются напрямую из отображения через `memoryview.cast` без копирования, поиск выполняется
+    двоичным поиском по отсортированным ключам. Страницы файла разделяются всеми процессами через кэш ОС.
+    Таблица строк декодируется один раз при открытии, поэтому поиск не создает объектов, кроме результата.
+    """
+    def __init__(self, path: str) -> None:
+        """Открывает снимок.
+
+        :param path: Путь к файлу снимка.
+        :raises ValueError: Если файл не является снимком или записан в неподдерживаемой версии формата.
+        """
+        _check_byteorder()
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count, string_count, blob_size, created_at = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a postal code snapshot")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format version {version}, expected {FORMAT_VERSION}")
+            self.count = count
+            self.created_at = created_at
+            self.format_version = version
+
+            view = memoryview(self._mmap)
+            self._views = [view]
+            position = HEADER.size
+
+            def column(type_code: str, length: int) -> memoryview:
+                nonlocal position
+                size = length * struct.calcsize(type_code)
+                section = view[position:position + size].cast(type_code)
+                self._views.append(section)
+                position += size
+                return section
+
+            self._keys = column("Q", count)
+            self._longitudes = column("f", count)
+            self._latitudes = column("f", count)
+            self._countries = column("I", count)
+            self._states = column("I", count)
+            self._places = column("I", count)
+            offsets = column("I", string_count + 1)
+            blob = view[position:position + blob_size]
+            self._strings: List[str] = [
+                str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(string_count)]
+            blob.release()
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, postal_code: str) -> Optional[PostalCodeInfo]:
+        """Ищет почтовый код в снимке.
+            :param postal_code: Почтовый код.
+            :return: Информация о почтовом коде или `None`, если кода нет в снимке."""
+        key = postal_code_key(postal_code)
+        if key is None:
+            return None
+        index = bisect_left(self._keys, key)
+        if index == self.count or self._keys[index] != key:
+            return None
+        return PostalCodeInfo(self._longitudes[index], self._latitudes[index],
+                              self._strings[self._countries[index]], self._strings[self._states[index]])
+
+    def place_name(self, postal_code: str) -> Optional[str]:
+        """Возвращает название населенного пункта почтового кода.
+            :param postal_code: Почтовый код.
+            :return: Название или `None`, если кода нет в снимке."""
+        key = postal_code_key(postal_code)
+        if key is None:
+            return None
+        index = bisect_left(self._keys, key)
+        if index == self.count or self._keys[index] != key:
+            return None
+        return self._strings[self._places[index]]
+
+    def rows(self) -> Iterator[SnapshotRow]:
+        """Перебирает все коды снимка в порядке ключей.
+            :return: Итератор строк (почтовый код, долгота, широта, страна, субъект, населенный пункт)."""
+        strings = self._strings
+        for index in range(self.count):
+            length, number = divmod(self._keys[index], _LENGTH_FACTOR)
+            yield (str(number).zfill(length), self._longitudes[index], self._latitudes[index],
+                   strings[self._countries[index]], strings[self._states[index]], strings[self._places[index]])
+
+    def close(self) -> None:
+        """Освобождает представления памяти и закрывает отображение файла."""
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self) -> "PostalSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+# utils/prefix_index.py
+import bisect
+import heapq
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+POST_CODE = "post_code"
+PLACE_NAME = "place_name"
+FIELDS = (POST_CODE, PLACE_NAME)
+
+
+class PrefixMatch(NamedTuple):
+    """Результат поиска по префиксу."""
+    post_code: str
+    place_name: str
+    request_count: int
+
+
+def normalize_place_name(place_name: str) -> str:
+    """Ключ поиска по названию населенного пункта: без учета регистра, как `lower(place_name)` в PostgreSQL."""
+    return place_name.strip().lower()
+
+
+class _SortedKeys(NamedTuple):
+    """Отсортированные ключи поиска и соответствующие им почтовые коды."""
+    keys: List[str]
+    codes: List[str]
+
+    @classmethod
+    def build(cls, pairs: Iterable[Tuple[str, str]]) -> "_SortedKeys":
+        pairs = sorted(pairs)
+        return cls([key for key, _ in pairs], [post_code for _, post_code in pairs])
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        """Диапазон [lo, hi) ключей, начинающихся с `prefix`."""
+        lo = bisect.bisect_left(self.keys, prefix)
+        return lo, bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+
+
+class _PrefixState(NamedTuple):
+    """Согласованное состояние индекса, которое `build` заменяет целиком."""
+    by_post_code: _SortedKeys
+    by_place_name: _SortedKeys
+    place_names: Dict[str, str]
+    request_counts: Dict[str, int]
+    precomputed: Dict[Tuple[str, str], List[PrefixMatch]]  # (поле, короткий префикс) -> лучшие коды
+
+
+class PrefixIndex:
+    """Индекс в памяти для автодополнения почтовых кодов и названий населенных пунктов.
+
+    Ключи хранятся в отсортированных массивах: коды с заданным префиксом занимают непрерывный диапазон,
+    который находится двоичным поиском, а из диапазона выбираются `k` самых запрашиваемых кодов.
+    Короткие префиксы дают длинные диапазоны, поэтому для префиксов, которым соответствует больше
+    `precompute_threshold` кодов, лучшие коды вычисляются заранее при построении.
+    """
+    def __init__(self, precompute_threshold: int = 256, precomputed_k: int = 20) -> None:
+        """Инициализация пустого индекса.
+
+        :param precompute_threshold: Размер диапазона, начиная с которого результаты префикса вычисляются заранее.
+        :param precomputed_k: Сколько лучших кодов хранить для каждого такого префикса.
+        """
+        self.precompute_threshold = precompute_threshold
+        self.precomputed_k = precomputed_k
+        self._state = _PrefixState(_SortedKeys([], []), _SortedKeys([], []), {}, {}, {})
+
+    def __len__(self) -> int:
+        return len(self._state.place_names)
+
+    def build(self, rows: Iterable[Tuple[str, str, int]]) -> int:
+        """Заменяет содержимое индекса.
+            :param rows: Строки (почтовый код, название населенного пункта, количество запросов).
+            :return: Количество проиндексированных кодов."""
+        place_names: Dict[str, str] = {}
+        request_counts: Dict[str, int] = {}
+        for post_code, place_name, request_count in rows:
+            place_names[post_code] = place_name or ""
+            request_counts[post_code] = request_count or 0
+        state = _PrefixState(_SortedKeys.build((post_code, post_code) for post_code in place_names),
+                             _SortedKeys.build((normalize_place_name(place_name), post_code)
+                                               for post_code, place_name in place_names.items()),
+                             place_names, request_counts, {})
+        for field in FIELDS:
+            self._precompute(state, field, state.by_post_code if field == POST_CODE else state.by_place_name)
+        self._state = state
+        custom_logger.log_with_context("Built prefix index of %s postal codes", len(place_names))
+        return len(place_names)
+
+    def search(self, field: str, prefix: str, k: int = 10) -> List[PrefixMatch]:
+        """Находит `k` самых запрашиваемых почтовых кодов, у которых поле `field` начинается с `prefix`.
+            :param field: `post_code` или `place_name` (без учета регистра).
+            :param prefix: Начало почтового кода или названия.
+            :param k: Количество результатов.
+            :return: Список по убыванию количества запросов (при равенстве - по ключу и коду).
+            :raises ValueError: Если поле не поддерживается."""
+        if field not in FIELDS:
+            raise ValueError(f"Unsupported prefix search field: {field}")
+        key = prefix.strip() if field == POST_CODE else normalize_place_name(prefix)
+        if k <= 0:
+            return []
+        state = self._state
+        precomputed = state.precomputed.get((field, key))
+        if precomputed is not None and k <= self.precomputed_k:
+            return precomputed[:k]
+        return self._top(state, state.by_post_code if field == POST_CODE else state.by_place_name, key, k)
+
+    def _precompute(self, state: _PrefixState, field: str, sorted_keys: _SortedKeys) -> None:
+        """Вычисляет лучшие коды для всех префиксов с длинными диапазонами, спускаясь от пустого префикса."""
+        prefixes = [""]
+        while prefixes:
+            prefix = prefixes.pop()
+            lo, hi = sorted_keys.range(prefix)
+            if hi - lo <= self.precompute_threshold:
+                continue
+            state.precomputed[field, prefix] = self._top(state, sorted_keys, prefix, self.precomputed_k)
+            length = len(prefix) + 1
+            prefixes.extend({key[:length] for key in sorted_keys.keys[lo:hi] if len(key) >= length})
+
+    @staticmethod
+    def _top(state: _PrefixState, sorted_keys: _SortedKeys, prefix: str, k: int) -> List[PrefixMatch]:
+        lo, hi = sorted_keys.range(prefix)
+        keys, codes, counts = sorted_keys.keys, sorted_keys.codes, state.request_counts
+        # Диапазон уже упорядочен по ключу, поэтому при равном количестве запросов выигрывает меньшая позиция
+        best = heapq.nsmallest(k, range(lo, hi), key=lambda position: (-counts[codes[position]], position))
+        return [PrefixMatch(codes[position], state.place_names[codes[position]], counts[codes[position]])
+                for position in best]
@@ -0,0 +1,114 @@
+# utils/prepared_statements.py
+import logging
+import threading
+import weakref
+from typing import Dict, NamedTuple, Optional, Sequence, Set, Tuple
+
+from utils.custom_logger import CustomLogger
+from utils.metrics import PREPARED_STATEMENT_DURATION, PREPARED_STATEMENT_PREPARES, CounterChild, HistogramChild
+
+custom_logger = CustomLogger(__name__)
+
+
+class PreparedStatement(NamedTuple):
+    """Серверный подготовленный запрос: PostgreSQL разбирает и планирует его один раз на соединение.
+    Параметры в тексте запроса обозначаются $1, $2, ... в порядке `parameter_types`."""
+    name: str
+    parameter_types: Tuple[str, ...]
+    statement: str
+
+    def prepare_sql(self) -> str:
+        """Текст запроса `PREPARE` (без параметров клиента, символы % в нем не экранируются)."""
+        return f"PREPARE {self.name} ({', '.join(self.parameter_types)}) AS {self.statement}"
+
+    def execute_sql(self, placeholders: Optional[Sequence[str]] = None) -> str:
+        """Текст запроса `EXECUTE`.
+            :param placeholders: Плейсхолдеры параметров драйвера; по умолчанию `%s` для каждого параметра.
+            :return: Запрос вида `EXECUTE name (%s, ...)`."""
+        placeholders = placeholders or ["%s"] * len(self.parameter_types)
+        return f"EXECUTE {self.name} ({', '.join(placeholders)})" if placeholders else f"EXECUTE {self.name}"
+
+
+class _StatementMetrics(NamedTuple):
+    """Метрики одного запроса, полученные один раз при регистрации: на горячем пути нет поиска по меткам."""
+    duration: HistogramChild
+    prepares: CounterChild
+
+
+class PreparedStatementRegistry:
+    """Реестр серверных подготовленных запросов процесса.
+
+    Помнит, на каких соединениях DB-API какой запрос уже подготовлен: подготовленный запрос живет, пока живет
+    серверная сессия, поэтому после переподключения (новый объект соединения) он подготавливается заново.
+    Ведет для каждого запроса количество выполнений и `PREPARE` и гистограмму длительности выполнения
+    (метрики `postal_prepared_statement_*`).
+    """
+    def __init__(self) -> None:
+        """Инициализация пустого реестра."""
+        self._lock = threading.Lock()
+        self._statements: Dict[str, PreparedStatement] = {}
+        self._metrics: Dict[str, _StatementMetrics] = {}
+        self._prepared: "weakref.WeakKeyDictionary[object, Set[str]]" = weakref.WeakKeyDictionary()
+
+    def register(self, statement: PreparedStatement) -> PreparedStatement:
+        """Регистрирует запрос (повторная регистрация того же запроса допускается).
+            :param statement: Подготовленный запрос.
+            :return: Тот же запрос (для объявления констант: `QUERY = REGISTRY.register(PreparedStatement(...))`).
+            :raises ValueError: Если под тем же именем уже зарегистрирован другой запрос."""
+        with self._lock:
+            registered = self._statements.setdefault(statement.name, statement)
+            if registered != statement:
+                raise ValueError(f"Prepared statement {statement.name!r} is already registered with another query")
+            if statement.name not in self._metrics:
+                self._metrics[statement.name] = _StatementMetrics(PREPARED_STATEMENT_DURATION.labels(statement.name),
+                                                                  PREPARED_STATEMENT_PREPARES.labels(statement.name))
+        return statement
+
+    def metrics(self, statement: PreparedStatement) -> _StatementMetrics:
+        """Метрики запроса; незарегистрированный запрос регистрируется."""
+        metrics = self._metrics.get(statement.name)
+        if metrics is None:
+            self.register(statement)
+            metrics = self._metrics[statement.name]
+        return metrics
+
+    def is_prepared(self, connection: object, statement: PreparedStatement) -> bool:
+        """Проверяет, подготовлен ли запрос на соединении.
+            :param connection: Соединение DB-API (psycopg2).
+            :param statement: Подготовленный запрос.
+            :return: `True`, если `PREPARE` уже выполнялся на этом соединении."""
+        with self._lock:
+            return statement.name in self._prepared.get(connection, ())
+
+    def mark_prepared(self, connection: object, statement: PreparedStatement) -> None:
+        """Отмечает запрос как подготовленный на соединении (после успешного `PREPARE`).
+            :param connection: Соединение DB-API (psycopg2).
+            :param statement: Подготовленный запрос."""
+        self.metrics(statement).prepares.inc()
+        with self._lock:
+            self._prepared.setdefault(connection, set()).add(statement.name)
+        custom_logger.log_with_context("Prepared statement %s on connection %s", statement.name, id(connection),
+                                       level=logging.DEBUG)
+
+    def forget(self, connection: object) -> None:
+        """Забывает все запросы, подготовленные на соединении (сервер их больше не помнит).
+            :param connection: Соединение DB-API (psycopg2)."""
+        with self._lock:
+            self._prepared.pop(connection, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Возвращает статистику выполнения запросов.
+            :return: Словарь {имя запроса: {"calls", "prepares", "total_seconds", "mean_seconds", "p99_seconds"}}."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        result = {}
+        for name, statement_metrics in sorted(metrics.items()):
+            _, total, calls = statement_metrics.duration.snapshot()
+            result[name] = {"calls": calls, "prepares": statement_metrics.prepares.value, "total_seconds": total,
+                            "mean_seconds": total / calls if calls else 0.0,
+                            "p99_seconds": statement_metrics.duration.quantile(0.99) or 0.0}
+        return result
+
+
+# Общий реестр процесса: соединения берутся из общих пулов, поэтому и учет подготовленных запросов общий.
+PREPARED_STATEMENTS = PreparedStatementRegistry()
@@ -1,48 +1,63 @@
 # utils/psycopg2_connection.py
-from typing import Optional, Tuple, Any, Union, List
+import logging
+from contextlib import contextmanager
+from typing import Optional, Tuple, Any, Union, List, Iterator, Iterable
 
 import psycopg2
 from psycopg2 import pool
+from psycopg2.extras import execute_values
 from config.db_data import Data
 from utils.custom_logger import CustomLogger
+from utils.prepared_statements import PREPARED_STATEMENTS, PreparedStatement, PreparedStatementRegistry
+from utils.psycopg2_pool import Psycopg2PoolRegistry, SharedConnectionPool
+from utils.replica_router import ReplicaRouter
 
 custom_logger = CustomLogger(__name__)
 
 class Psycopg2Connection:
     """Класс для управления соединением с базой данных PostgresSQL с использованием библиотеки psycopg2.
-    Этот класс предоставляет методы для подключения к базе данных, выполнения SQL-запросов, закрытия соединения и курсора.    """
+    Этот класс предоставляет методы для подключения к базе данных, выполнения SQL-запросов, закрытия соединения и курсора.
+
+    Соединения берутся из общего для процесса пула (`Psycopg2PoolRegistry`). Если соединение не закреплено
+    вызовом `connect()`, каждый запрос `execute_query` берет соединение из пула только на время своего выполнения,
+    поэтому один экземпляр класса можно безопасно использовать из нескольких потоков.
+
+    Горячие запросы выполняются как серверные подготовленные запросы (`execute_prepared`); реестр `statements`
+    помнит, на каких соединениях пула они уже подготовлены, и ведет статистику их выполнения.
+
+    Если настроены реплики (`Data.DB_REPLICAS`), запросы с `read_only=True` выполняются на реплике, выбранной
+    маршрутизатором `router`; остальные запросы и чтения кодов, записанных только что (`note_written`), -
+    на основном сервере. Если реплика недоступна, чтение повторяется на основном сервере.
+    """
+    statements: PreparedStatementRegistry = PREPARED_STATEMENTS
+
     def __init__(self) -> None:
         """метод устанавливает значение атрибутов connection и cursor в None."""
         Data.validate()
-        self.connection_pool:  Optional[psycopg2.pool.SimpleConnectionPool] = None
+        self.connection_pool: Optional[SharedConnectionPool] = None
         self.connection: Optional[psycopg2.extensions.connection] = None
         self.cursor: Optional[psycopg2.extensions.cursor] = None
+        self.router: Optional[ReplicaRouter] = Psycopg2PoolRegistry.get_router()
 
-    def connect_to_db(self) -> Optional[psycopg2.pool.SimpleConnectionPool]:
-        """Устанавливает соединение с базой данных PostgresSQL
+    def connect_to_db(self) -> Optional[SharedConnectionPool]:
+        """Возвращает общий пул соединений с базой данных PostgresSQL, создавая его при первом обращении.
              :return: connection_pool: Возвращает объект пула соединений, или None в случае ошибки."""
         try:
-            self.connection_pool = psycopg2.pool.SimpleConnectionPool(minconn=1,
-                maxconn=5,
-                user=Data.DB_USER,
-                password=Data.DB_PASS,
-                host=Data.DB_HOST,
-                port=Data.DB_PORT,
-                database=Data.DB_NAME
-            )
+            self.connection_pool = Psycopg2PoolRegistry.get_pool(Data.DB_DSN)
             return self.connection_pool
 
         except psycopg2.Error as e:
-            custom_logger.log_with_context(f"Error connecting to the database: {e}")
+            custom_logger.log_with_context("Error connecting to the database: %s", e, level=logging.ERROR)
             return None
 
     def connect(self) -> None:
-        """Устанавливает соединение с базой данных и создает курсор."""
+        """Закрепляет за экземпляром соединение из пула и создает курсор.
+        Нужен для последовательностей запросов на одном соединении (например, создание таблиц)."""
         self.connection_pool = self.connect_to_db()
         if self.connection_pool is not None:
             self.connection = self.connection_pool.getconn()
             self.cursor = self.connection.cursor()
-        custom_logger.log_with_context(f"Connected to PostgresSQL conn:{id(self.connection)}")
+        custom_logger.log_with_context("Connected to PostgresSQL conn:%s", id(self.connection), level=logging.DEBUG)
 
     def disconnect(self) -> None:
         """Закрывает курсор и соединение."""
@@ -50,15 +65,39 @@ class Psycopg2Connection:
             self.cursor.close()
         if self.connection_pool and self.connection:
             self.connection_pool.putconn(self.connection)
-            custom_logger.log_with_context(f"Returned connection {id(self.connection)} to pool")
-        custom_logger.log_with_context("Disconnected from PostgresSQL")
+            custom_logger.log_with_context("Returned connection %s to pool", id(self.connection), level=logging.DEBUG)
+        self.connection = None
+        self.cursor = None
+        custom_logger.log_with_context("Disconnected from PostgresSQL", level=logging.DEBUG)
+
+    @contextmanager
+    def checkout(self, replica: Optional[str] = None) -> Iterator[psycopg2.extensions.connection]:
+        """Выдает соединение на время одной операции и возвращает его в пул после выхода из блока `with`.
+        Если соединение закреплено вызовом `connect()`, используется оно.
+            :param replica: Имя реплики (`host:port`), из пула которой взять соединение; `None` - основной сервер.
+            :return: Соединение psycopg2."""
+        if replica is not None:
+            with Psycopg2PoolRegistry.get_pool(Data.replica_dsn(replica)).connection() as connection:
+                yield connection
+            return
+        if self.connection is not None:
+            yield self.connection
+            return
+        connection_pool = self.connection_pool or self.connect_to_db()
+        if connection_pool is None:
+            raise psycopg2.OperationalError("Connection pool is not available")
+        with connection_pool.connection() as connection:
+            yield connection
 
     def execute_query( self,
         query: str,
         params: Optional[Tuple[Any, ...]] = None,
         fetch_one: bool = False,
         fetch_all: bool = False,
-        commit: bool = False) -> Optional[Union[Tuple, List[Tuple]]]:
+        commit: bool = False,
+        raise_errors: bool = False,
+        read_only: bool = False,
+        keys: Iterable[str] = ()) -> Optional[Union[Tuple, List[Tuple]]]:
         """
         Выполняет SQL-запрос к базе данных.
 
@@ -70,25 +109,169 @@ class Psycopg2Connection:
         :param fetch_one: Флаг, указывающий, нужно ли возвращать одну строку (по умолчанию False).
         :param fetch_all: Флаг, указывающий, нужно ли возвращать все строки (по умолчанию False).
         :param commit: Флаг, указывающий, нужно ли выполнять commit для изменения данных (по умолчанию False).
+        :param raise_errors: Флаг, указывающий, нужно ли пробрасывать ошибку базы данных вызывающему коду
+            после записи в лог (по умолчанию False - ошибка только записывается в лог).
+        :param read_only: Флаг, указывающий, что запрос только читает данные и может выполняться на реплике.
+        :param keys: Почтовые коды, которые читает запрос: если один из них только что записан, запрос выполняется
+            на основном сервере.
         :return: Метод возвращает `Optional[Union[Tuple, List[Tuple]]]`, он может вернуть результат запроса одну строку (кортеж),
             если `fetch_one=True`, или все строки (список кортежей), если `fetch_all=True`; `None` в противном случае.
+            Строки читаются до commit, поэтому запрос, изменяющий данные, может вернуть результат (RETURNING, CTE).
+        """
+        return self._execute(query, params, fetch_one, fetch_all, commit, raise_errors, read_only, keys)
+
+    def execute_prepared(self,
+        statement: PreparedStatement,
+        params: Tuple[Any, ...] = (),
+        fetch_one: bool = False,
+        fetch_all: bool = False,
+        commit: bool = False,
+        raise_errors: bool = False,
+        read_only: bool = False,
+        keys: Iterable[str] = ()) -> Optional[Union[Tuple, List[Tuple]]]:
+        """
+        Выполняет серверный подготовленный запрос через `EXECUTE`. На каждом соединении пула запрос
+        подготавливается (`PREPARE`) при первом использовании, дальше сервер не разбирает и не планирует его заново.
+        Если сервер запрос не помнит (соединение переоткрыто пулером, `DISCARD ALL`), запрос подготавливается
+        повторно и выполняется еще раз. Длительность выполнения учитывается в статистике `statements`.
+
+        :param statement: Подготовленный запрос.
+        :param params: Значения параметров $1, $2, ... запроса.
+        :param fetch_one: Флаг, указывающий, нужно ли возвращать одну строку.
+        :param fetch_all: Флаг, указывающий, нужно ли возвращать все строки.
+        :param commit: Флаг, указывающий, нужно ли выполнять commit после чтения результата.
+        :param raise_errors: Флаг, указывающий, нужно ли пробрасывать ошибку базы данных вызывающему коду.
+        :param read_only: Флаг, указывающий, что запрос только читает данные и может выполняться на реплике.
+        :param keys: Почтовые коды, которые читает запрос (см. `execute_query`).
+        :return: Результат запроса, как у `execute_query`.
         """
+        return self._execute(statement, params, fetch_one, fetch_all, commit, raise_errors, read_only, keys)
+
+    def note_written(self, keys: Iterable[str]) -> None:
+        """Отмечает почтовые коды, только что записанные на основной сервер: пока реплики могут их еще не получить,
+        чтения этих кодов выполняются на основном сервере.
+            :param keys: Записанные почтовые коды."""
+        if self.router is not None:
+            self.router.note_written(keys)
+
+    def _execute(self,
+        query: Union[str, PreparedStatement],
+        params: Optional[Tuple[Any, ...]],
+        fetch_one: bool,
+        fetch_all: bool,
+        commit: bool,
+        raise_errors: bool,
+        read_only: bool = False,
+        keys: Iterable[str] = ()) -> Optional[Union[Tuple, List[Tuple]]]:
+        if fetch_one and fetch_all:
+            raise ValueError("You can't get fetch_one and fetch_all at the same time..")
         try:
-            if not self.connection:  # Если нет активного соединения, подключаемся
-                self.connect()
-            self.cursor.execute(query, params)
-            if fetch_one and fetch_all:
-                raise ValueError("You can't get fetch_one and fetch_all at the same time..")
-            if commit:
-                self.connection.commit()
-            elif fetch_one:
-                return self.cursor.fetchone()  # Возвращаем одну строку
-            elif fetch_all:
-                return self.cursor.fetchall()  # Возвращаем все строки
+            # Закрепленное вызовом connect() соединение всегда остается на основном сервере
+            replica = self.router.choose(keys) if read_only and self.router and self.connection is None else None
+            if replica is not None:
+                try:
+                    return self._execute_on(replica, query, params, fetch_one, fetch_all, commit)
+                except (psycopg2.OperationalError, pool.PoolError) as e:
+                    custom_logger.log_with_context("Replica %s error, retrying on the primary: %s", replica, e,
+                                                   level=logging.WARNING)
+                    if isinstance(e, psycopg2.OperationalError):  # Исчерпанный пул реплики не значит, что она недоступна
+                        self.router.mark_failed(replica)
+            return self._execute_on(None, query, params, fetch_one, fetch_all, commit)
 
         except psycopg2.Error as e:
-            custom_logger.log_with_context(f"Database error: {e}")
-            if commit:
-                self.connection.rollback()
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
+            if raise_errors:
+                raise
+
+    def _execute_on(self, replica: Optional[str], query: Union[str, PreparedStatement],
+                    params: Optional[Tuple[Any, ...]], fetch_one: bool, fetch_all: bool,
+                    commit: bool) -> Optional[Union[Tuple, List[Tuple]]]:
+        with self.checkout(replica) as connection:
+            if connection is not self.connection:
+                # Соединение пула выдается в транзакционном режиме: запрос с commit выполняется в транзакции,
+                # чтение - в autocommit, чтобы не держать транзакцию открытой до возврата соединения в пул
+                connection.autocommit = not commit
+            # Закрепленное соединение работает через свой курсор, соединение из пула - через временный
+            cursor = self.cursor if connection is self.connection and self.cursor else connection.cursor()
+            try:
+                if isinstance(query, PreparedStatement):
+                    result = self._execute_prepared(connection, cursor, query, params, fetch_one, fetch_all)
+                else:
+                    result = self._fetch(cursor, query, params, fetch_one, fetch_all)
+                if commit:
+                    connection.commit()
+                return result
+            except psycopg2.Error:
+                if commit:
+                    connection.rollback()
+                raise
+            finally:
+                if cursor is not self.cursor:
+                    cursor.close()
 
+    def _execute_prepared(self, connection: psycopg2.extensions.connection, cursor: psycopg2.extensions.cursor,
+                          statement: PreparedStatement, params: Optional[Tuple[Any, ...]],
+                          fetch_one: bool, fetch_all: bool) -> Optional[Union[Tuple, List[Tuple]]]:
+        for attempt in range(2):
+            if not self.statements.is_prepared(connection, statement):
+                cursor.execute(statement.prepare_sql())
+                self.statements.mark_prepared(connection, statement)
+            try:
+                with self.statements.metrics(statement).duration.time():
+                    return self._fetch(cursor, statement.execute_sql(), params, fetch_one, fetch_all)
+            except psycopg2.errors.InvalidSqlStatementName:
+                if attempt:
+                    raise
+                custom_logger.log_with_context("Prepared statement %s is missing on connection %s, re-preparing",
+                                               statement.name, id(connection), level=logging.WARNING)
+                self.statements.forget(connection)
+                if not connection.autocommit:
+                    connection.rollback()
 
+    @staticmethod
+    def _fetch(cursor: psycopg2.extensions.cursor, query: str, params: Optional[Tuple[Any, ...]],
+               fetch_one: bool, fetch_all: bool) -> Optional[Union[Tuple, List[Tuple]]]:
+        cursor.execute(query, params)
+        if fetch_one:
+            return cursor.fetchone()  # Возвращаем одну строку
+        if fetch_all:
+            return cursor.fetchall()  # Возвращаем все строки
+        return None
+
+    def execute_values(self,
+        query: str,
+        rows: List[Tuple[Any, ...]],
+        page_size: int = 1000,
+        raise_errors: bool = False) -> bool:
+        """
+        Выполняет запрос вида `INSERT ... VALUES %s` для множества строк в одной транзакции с фиксацией в конце.
+        Строки передаются пачками по `page_size` в одном запросе (`psycopg2.extras.execute_values`);
+        при ошибке в любой пачке транзакция отменяется целиком.
+
+        :param query: SQL-запрос с единственным плейсхолдером `%s` на месте списка VALUES.
+        :param rows: Список кортежей со значениями вставляемых строк.
+        :param page_size: Максимальное количество строк в одном запросе.
+        :param raise_errors: Флаг, указывающий, нужно ли пробрасывать ошибку базы данных вызывающему коду.
+        :return: `True`, если строки записаны (или вставлять нечего); `False` при ошибке базы данных.
+        """
+        if not rows:
+            return True
+        try:
+            with self.checkout() as connection:
+                cursor = self.cursor if connection is self.connection and self.cursor else connection.cursor()
+                try:
+                    execute_values(cursor, query, rows, page_size=page_size)
+                    connection.commit()
+                except psycopg2.Error:
+                    connection.rollback()
+                    raise
+                finally:
+                    if cursor is not self.cursor:
+                        cursor.close()
+
+        except psycopg2.Error as e:
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
+            if raise_errors:
+                raise
+            return False
+        return True
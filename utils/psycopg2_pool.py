@@ -0,0 +1,173 @@
+# utils/psycopg2_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Type
+
+import psycopg2
+from psycopg2 import pool
+
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import POOL_CHECKOUT_WAIT
+from utils.replica_router import RECENT_WRITES, REPLICATION_LAG_QUERY, ReplicaRouter
+
+custom_logger = CustomLogger(__name__)
+_checkout_wait = POOL_CHECKOUT_WAIT.labels("psycopg2")
+
+
+class SharedConnectionPool:
+    """Потокобезопасная обёртка над пулом соединений psycopg2.
+
+    В отличие от самого пула psycopg2, который сразу выбрасывает `PoolError` при исчерпании соединений,
+    обёртка ждёт освобождения соединения не дольше `timeout` секунд.
+    Соединения выдаются в транзакционном режиме драйвера (autocommit выключен), поэтому commit/rollback
+    вызывающего кода действительно фиксируют или отменяют всю транзакцию; запросы только на чтение включают
+    autocommit сами (`Psycopg2Connection.execute_query` без commit), чтобы не держать открытую транзакцию.
+    """
+    def __init__(self,
+                 dsn: str,
+                 minconn: int,
+                 maxconn: int,
+                 pool_class: Optional[Type[pool.AbstractConnectionPool]] = None,
+                 timeout: Optional[float] = None) -> None:
+        """Создает пул соединений.
+
+        :param dsn: Строка подключения к базе данных.
+        :param minconn: Количество соединений, которые открываются сразу и остаются открытыми в простое.
+        :param maxconn: Максимальное количество одновременно выданных соединений.
+        :param pool_class: Класс пула psycopg2 (по умолчанию `ThreadedConnectionPool`).
+        :param timeout: Сколько секунд ждать свободное соединение (`None` - ждать без ограничения).
+        """
+        pool_class = pool_class or psycopg2.pool.ThreadedConnectionPool
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.pool = pool_class(minconn, maxconn, dsn=dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self) -> psycopg2.extensions.connection:
+        """Выдает соединение из пула, при необходимости дожидаясь освобождения одного из занятых.
+            :return: Соединение psycopg2, которое необходимо вернуть через `putconn`."""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(f"No free connection in pool after {self.timeout} seconds")
+        try:
+            connection = self.pool.getconn()
+            if connection.autocommit:  # Предыдущий владелец мог включить autocommit для чтения
+                connection.autocommit = False
+            _checkout_wait.observe(time.perf_counter() - started)
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection: psycopg2.extensions.connection) -> None:
+        """Возвращает соединение в пул. Закрытые (потерянные) соединения пулом отбрасываются.
+            :param connection: Соединение, ранее полученное через `getconn`."""
+        try:
+            self.pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        """Контекстный менеджер: выдает соединение на время блока `with` и возвращает его в пул после выхода."""
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def closeall(self) -> None:
+        """Закрывает все соединения пула."""
+        self.pool.closeall()
+
+
+class Psycopg2PoolRegistry:
+    """Реестр пулов соединений, общих для всего процесса.
+
+    Пулы создаются один раз на DSN и переиспользуются всеми экземплярами `Psycopg2Connection`.
+    После `fork` унаследованные от родителя пулы не используются: дочерний процесс создает свои.
+    Пулы реплик (`Data.DB_REPLICAS`) создаются при первом чтении с реплики, выбор реплики - `get_router()`.
+    """
+    _pools: Dict[str, SharedConnectionPool] = {}
+    _router: Optional[ReplicaRouter] = None
+    _pid: int = os.getpid()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_pool(cls,
+                 dsn: Optional[str] = None,
+                 minconn: Optional[int] = None,
+                 maxconn: Optional[int] = None,
+                 pool_class: Optional[Type[pool.AbstractConnectionPool]] = None) -> SharedConnectionPool:
+        """Возвращает общий пул для заданного DSN, создавая его при первом обращении.
+
+        :param dsn: Строка подключения (по умолчанию `Data.DB_DSN`).
+        :param minconn: Минимальный размер пула (по умолчанию `Data.DB_POOL_MIN`).
+        :param maxconn: Максимальный размер пула (по умолчанию `Data.DB_POOL_MAX`).
+        :param pool_class: Класс пула psycopg2 (по умолчанию `ThreadedConnectionPool`).
+        :return: Общий для процесса пул соединений.
+        """
+        dsn = dsn or Data.DB_DSN
+        with cls._lock:
+            cls._forget_parent_process()
+            shared_pool = cls._pools.get(dsn)
+            if shared_pool is None:
+                shared_pool = SharedConnectionPool(dsn,
+                    minconn=Data.DB_POOL_MIN if minconn is None else minconn,
+                    maxconn=Data.DB_POOL_MAX if maxconn is None else maxconn,
+                    pool_class=pool_class,
+                    timeout=Data.DB_POOL_TIMEOUT)
+                cls._pools[dsn] = shared_pool
+                custom_logger.log_with_context("Created shared connection pool (%s-%s connections)",
+                                               shared_pool.minconn, shared_pool.maxconn)
+            return shared_pool
+
+    @classmethod
+    def get_router(cls) -> Optional[ReplicaRouter]:
+        """Возвращает общий маршрутизатор чтений по репликам `Data.DB_REPLICAS`, создавая его при первом обращении.
+        Отставание реплик проверяется запросом через их пулы.
+            :return: Маршрутизатор или `None`, если реплики не настроены."""
+        if not Data.DB_REPLICAS:
+            return None
+        with cls._lock:
+            cls._forget_parent_process()
+            if cls._router is None:
+                cls._router = ReplicaRouter(Data.DB_REPLICAS, Data.DB_REPLICA_SELECTION,
+                                            max_lag=Data.DB_REPLICA_MAX_LAG,
+                                            check_interval=Data.DB_REPLICA_CHECK_INTERVAL,
+                                            retry_after=Data.DB_REPLICA_RETRY_AFTER,
+                                            probe=cls._replica_lag, recent_writes=RECENT_WRITES)
+            return cls._router
+
+    @classmethod
+    def _forget_parent_process(cls) -> None:
+        if cls._pid != os.getpid():
+            # Соединения родительского процесса нельзя использовать после fork
+            cls._pools = {}
+            cls._router = None
+            cls._pid = os.getpid()
+
+    @classmethod
+    def _replica_lag(cls, replica: str) -> float:
+        with cls.get_pool(Data.replica_dsn(replica)).connection() as connection, connection.cursor() as cursor:
+            cursor.execute(REPLICATION_LAG_QUERY)
+            return float(cursor.fetchone()[0])
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Закрывает все пулы реестра. Вызывается при завершении процесса."""
+        with cls._lock:
+            pools, cls._pools = cls._pools, {}
+            router, cls._router = cls._router, None
+        if router is not None:
+            router.close()  # Вне блокировки: проверка реплики получает пул через get_pool
+        for shared_pool in pools.values():
+            try:
+                shared_pool.closeall()
+            except psycopg2.Error as e:
+                custom_logger.log_with_context("Error closing connection pool: %s", e)
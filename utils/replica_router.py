@@ -0,0 +1,170 @@
+# utils/replica_router.py
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import DB_READS
+from utils.ttl_cache import LRUTTLCache
+
+custom_logger = CustomLogger(__name__)
+
+# Отставание реплики в секундах. Если реплика воспроизвела все полученные WAL, она не отстает, даже если
+# на основном сервере давно не было записей (pg_last_xact_replay_timestamp() тогда показывает время последней
+# записи). На основном сервере функции реплики возвращают NULL - отставание 0.
+REPLICATION_LAG_QUERY = '''
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+'''
+
+# Почтовые коды, недавно записанные на основной сервер, общие для всех клиентов процесса (psycopg2 и SQLAlchemy).
+# Код помнится, пока реплика, допущенная к чтению, может его еще не получить: отставание допущенной реплики
+# не больше DB_REPLICA_MAX_LAG на момент проверки, а проверки идут раз в DB_REPLICA_CHECK_INTERVAL секунд.
+RECENT_WRITES = LRUTTLCache(max_size=Data.CACHE_MAX_SIZE,
+                            ttl=Data.DB_REPLICA_MAX_LAG + Data.DB_REPLICA_CHECK_INTERVAL)
+
+
+class _ReplicaState:
+    """Состояние реплики: последнее отставание, сглаженная задержка проверки и время, до которого она исключена."""
+    __slots__ = ("lag", "latency", "failed_until")
+
+    def __init__(self) -> None:
+        self.lag = 0.0
+        self.latency: Optional[float] = None
+        self.failed_until = 0.0
+
+
+class ReplicaRouter:
+    """Выбор реплики для запросов на чтение.
+
+    Запись всегда идет на основной сервер, чтение - на одну из реплик по кругу (`round_robin`) или на реплику
+    с наименьшей задержкой (`least_latency`, экспоненциальное сглаживание времени проверки реплики).
+    Раз в `check_interval` секунд фоновый поток проверяет реплики функцией `probe` (она возвращает отставание
+    в секундах): реплика с отставанием больше `max_lag` или с ошибкой соединения на время исключается, и чтения
+    идут на основной сервер. Выбор реплики проверку не ждет: медленная или недоступная реплика задерживает
+    только фоновый поток. Чтения почтовых кодов, записанных меньше `max_lag + check_interval` секунд назад
+    (`note_written`), тоже идут на основной сервер: реплика могла еще не получить свежий код (read-your-writes).
+    """
+    SELECTIONS = ("round_robin", "least_latency")
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self,
+                 replicas: Sequence[str],
+                 selection: str = "round_robin",
+                 max_lag: float = 5.0,
+                 check_interval: float = 1.0,
+                 retry_after: float = 30.0,
+                 probe: Optional[Callable[[str], float]] = None,
+                 recent_writes: Optional[LRUTTLCache] = None) -> None:
+        """Инициализация маршрутизатора.
+            :param replicas: Имена реплик (`host:port`).
+            :param selection: Способ выбора реплики: `round_robin` или `least_latency`.
+            :param max_lag: Максимальное отставание реплики в секундах, при котором с нее можно читать.
+            :param check_interval: Период проверки отставания реплик в секундах.
+            :param retry_after: Сколько секунд не использовать реплику после ошибки соединения с ней.
+            :param probe: Функция, возвращающая отставание реплики в секундах; `None` - реплики не проверяются
+                и фоновый поток не запускается.
+            :param recent_writes: Кэш недавно записанных кодов (по умолчанию собственный, на `max_lag + check_interval`
+                секунд).
+            :raises ValueError: Если способ выбора реплики неизвестен."""
+        if selection not in self.SELECTIONS:
+            raise ValueError(f"Unknown replica selection {selection!r}, expected one of {self.SELECTIONS}")
+        self.replicas = tuple(replicas)
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self.probe = probe
+        self.recent_writes = recent_writes if recent_writes is not None else LRUTTLCache(
+            max_size=Data.CACHE_MAX_SIZE, ttl=max_lag + check_interval)
+        self._states: Dict[str, _ReplicaState] = {replica: _ReplicaState() for replica in self.replicas}
+        self._reads = {server: DB_READS.labels(server) for server in ("primary", *self.replicas)}
+        self._next = itertools.count()
+        self._check_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.probe is not None and self.replicas:
+            self._thread = threading.Thread(target=self._run, name="replica-lag-checker", daemon=True)
+            self._thread.start()
+
+    def choose(self, keys: Iterable[str] = ()) -> Optional[str]:
+        """Выбирает реплику для чтения.
+            :param keys: Почтовые коды, которые читает запрос.
+            :return: Имя реплики или `None` - читать с основного сервера (реплик нет, все они недоступны
+                или отстают, либо один из кодов записан недавно)."""
+        replica = self._choose(keys)
+        self._reads[replica or "primary"].inc()
+        return replica
+
+    def _choose(self, keys: Iterable[str]) -> Optional[str]:
+        if not self.replicas or any(self.recent_writes.get(key) for key in keys):
+            return None
+        now = time.monotonic()
+        available = [replica for replica in self.replicas
+                     if self._states[replica].failed_until <= now and self._states[replica].lag <= self.max_lag]
+        if not available:
+            return None
+        if self.selection == "least_latency":
+            # Реплика без измерений выбирается первой, чтобы получить для нее задержку
+            return min(available, key=lambda replica: self._states[replica].latency or 0.0)
+        return available[next(self._next) % len(available)]
+
+    def note_written(self, keys: Iterable[str]) -> None:
+        """Запоминает почтовые коды, только что записанные на основной сервер: их чтения пойдут на основной сервер.
+            :param keys: Записанные почтовые коды."""
+        if self.replicas:
+            for key in keys:
+                self.recent_writes.set(key, True)
+
+    def mark_failed(self, replica: str) -> None:
+        """Исключает реплику на `retry_after` секунд после ошибки соединения с ней.
+            :param replica: Имя реплики."""
+        self._states[replica].failed_until = time.monotonic() + self.retry_after
+        custom_logger.log_with_context("Replica %s is unavailable, reading from the primary for %.0fs",
+                                       replica, self.retry_after, level=logging.WARNING)
+
+    def check(self) -> None:
+        """Проверяет отставание и задержку всех реплик (вызывается фоновым потоком раз в `check_interval` секунд)."""
+        with self._check_lock:
+            self._check_all()
+
+    def close(self) -> None:
+        """Останавливает фоновую проверку реплик. Повторный вызов ничего не делает."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Цикл фонового потока: первая проверка сразу после запуска, затем раз в `check_interval` секунд."""
+        while not self._stopped.is_set():
+            self.check()
+            self._stopped.wait(self.check_interval)
+
+    def _check_all(self) -> None:
+        for replica in self.replicas:
+            state = self._states[replica]
+            started = time.perf_counter()
+            try:
+                state.lag = float(self.probe(replica))
+            except Exception as e:
+                custom_logger.log_with_context("Replica %s check failed: %s", replica, e, level=logging.ERROR)
+                self.mark_failed(replica)
+                continue
+            latency = time.perf_counter() - started
+            state.latency = latency if state.latency is None else (
+                self.LATENCY_SMOOTHING * latency + (1 - self.LATENCY_SMOOTHING) * state.latency)
+            if state.lag > self.max_lag:
+                custom_logger.log_with_context("Replica %s lags %.1fs behind the primary, reading from the primary",
+                                               replica, state.lag, level=logging.WARNING)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Возвращает состояние реплик.
+            :return: Словарь {реплика: {"lag", "latency", "available"}}."""
+        now = time.monotonic()
+        return {replica: {"lag": state.lag, "latency": state.latency or 0.0,
+                          "available": state.failed_until <= now and state.lag <= self.max_lag}
+                for replica, state in self._states.items()}
@@ -0,0 +1,132 @@
+# utils/single_flight.py
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+
+class _Call:
+    """Выполняющийся вызов: результат или исключение ведущего вызова и событие его завершения."""
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом (для потоков).
+
+    Первый поток, вызвавший `do` с ключом, выполняет функцию (ведущий вызов); потоки, пришедшие с тем же ключом
+    до ее завершения, ждут и получают тот же результат или то же исключение. После завершения ключ освобождается,
+    поэтому следующий вызов выполнит функцию заново - результаты не кэшируются.
+    """
+    def __init__(self) -> None:
+        """Инициализация пустой таблицы выполняющихся вызовов."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Выполняет `fn` или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        :param key: Ключ объединения (например, почтовый код).
+        :param fn: Функция без аргументов.
+        :param timeout: Сколько секунд ожидающий поток ждет результат ведущего вызова; `None` - без ограничения.
+            На сам ведущий вызов не влияет.
+        :return: Результат `fn`.
+        :raises TimeoutError: Если ведущий вызов не завершился за `timeout` секунд.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                custom_logger.log_with_context("Shared result of %r with %s concurrent callers", key, call.waiters)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики объединения.
+            :return: Словарь с количеством выполненных (ведущих) вызовов, присоединившихся вызовов
+                и вызовов, выполняющихся сейчас."""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"executed": self.executed, "shared": self.shared, "in_flight": in_flight}
+
+
+class AsyncSingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом для asyncio.
+
+    Работает так же, как `SingleFlight`, но для корутин одного цикла событий. Ведущий вызов выполняется
+    отдельной задачей, поэтому отмена или таймаут одного из ожидающих не прерывает вызов для остальных.
+    """
+    def __init__(self) -> None:
+        """Инициализация пустой таблицы выполняющихся вызовов."""
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Выполняет корутину `fn()` или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        :param key: Ключ объединения (например, почтовый код).
+        :param fn: Функция без аргументов, возвращающая корутину.
+        :param timeout: Сколько секунд ждать результат; `None` - без ограничения.
+        :return: Результат корутины.
+        :raises TimeoutError: Если вызов не завершился за `timeout` секунд.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._release(key, finished))
+            self.executed += 1
+        else:
+            self.shared += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight call {key!r}") from None
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики объединения.
+            :return: Словарь с количеством выполненных (ведущих) вызовов, присоединившихся вызовов
+                и вызовов, выполняющихся сейчас."""
+        return {"executed": self.executed, "shared": self.shared, "in_flight": len(self._calls)}
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        """Освобождает ключ после завершения вызова; исключение помечается полученным,
+        чтобы цикл событий не сообщал о нем, если все ожидающие уже отменены."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
@@ -1,76 +1,115 @@
 # utils/sqlalchemy_connection.py
-from typing import Optional, Tuple, Any, Union, List, Mapping
+import logging
+from typing import Optional, Tuple, Any, Union, List, Mapping, Iterable, Dict, Callable, TypeVar
 
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.sql import Executable
 
 from config.db_data import Data
 from utils.custom_logger import CustomLogger
+from utils.replica_router import ReplicaRouter
+from utils.sqlalchemy_engine import SQLAlchemyEngineRegistry
 
 custom_logger = CustomLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SQLAlchemyConnection:
     """Класс для управления соединением с базой данных PostgresSQL с использованием SQLAlchemy.
 
       Этот класс предоставляет методы для подключения к базе данных, выполнения SQL-запросов,
       закрытия соединения и работы с сессиями.
+
+      Движок берется из общего для процесса реестра (`SQLAlchemyEngineRegistry`), а каждая операция
+      получает собственную короткоживущую сессию через `get_session()`.
+
+      Если настроены реплики (`Data.DB_REPLICAS`), чтения `read()` выполняются на реплике, выбранной
+      маршрутизатором `router`, и повторяются на основном сервере, если реплика недоступна; сессии `get_session()`
+      и чтения кодов, записанных только что (`note_written`), работают с основным сервером.
       """
 
     def __init__(self) -> None:
-        """Инициализация класса и создание движка базы данных.
-
-            Создаем движок базы данных.\n
-            Создаем фабрику сессий.\n
-            Используем фабрику для создания новой сессии.
-        """
-        self.engine: Optional[create_engine] = None
+        """Инициализация класса. Движок и фабрика сессий создаются при вызове `connect()`."""
+        self.engine: Optional[Engine] = None
         self.SessionLocal: Optional[sessionmaker] = None
-        self.session: Optional[Session] = None
+        self.router: Optional[ReplicaRouter] = None
+        self._replica_sessions: Dict[str, sessionmaker] = {}
 
 
     def connect(self) -> None:
-        """Устанавливает соединение с базой данных, создавая движок SQLAlchemy и сеансовую фабрику."""
-
-        """
-        pool_size (int): Максимальное количество соединений, которые пул будет поддерживать открытыми.
-        max_overflow (int): Максимальное количество соединений, которое пул может создать сверх pool_size. 
-                           Если это значение равно 0, пул не будет переполняться.
-        pool_recycle (int): Количество секунд, после которых соединение будет переработано. Это полезно для 
-                           баз данных, которые отключают соединения после определенного периода бездействия.
-        """
+        """Подключается к общему движку SQLAlchemy и создает фабрику сессий.
+        expire_on_commit=False: объекты остаются доступны после commit без повторного запроса к базе данных."""
         try:
             Data.validate()
-            self.engine = create_engine(Data.DB_URL, pool_size=5, max_overflow=0, pool_recycle=3600)
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+            self.engine = SQLAlchemyEngineRegistry.get_engine(Data.DB_URL)
+            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                                             bind=self.engine)
+            self.router = SQLAlchemyEngineRegistry.get_router()
         except SQLAlchemyError as e:
-            custom_logger.log_with_context(f"Error creating database engine: {e}")
+            custom_logger.log_with_context("Error creating database engine: %s", e, level=logging.ERROR)
 
     def get_session(self) -> Session:
-        """Создает новую сессию для взаимодействия с базой данных.
+        """Создает новую сессию для одной операции с базой данных.
+        Сессию следует использовать как контекстный менеджер (`with connection.get_session() as session`),
+        чтобы по завершении операции она закрылась и вернула соединение в пул.
             :return: Новая сессия SQLAlchemy."""
         if self.SessionLocal is None:
             raise Exception("SessionLocal is not initialized. Check database connection.")
-        self.session = self.SessionLocal()
-        custom_logger.log_with_context(f"Created new session, session_id: {id(self.session)}")
-        return self.session
+        session = self.SessionLocal()
+        custom_logger.log_with_context("Created new session, session_id: %s", id(session), level=logging.DEBUG)
+        return session
+
+    def read(self, work: Callable[[Session], T], keys: Iterable[str] = ()) -> T:
+        """Выполняет чтение в сессии реплики, если она настроена и доступна, иначе - в сессии основного сервера.
+        Если соединение с репликой не удалось или оборвалось, реплика исключается из выбора, а `work`
+        выполняется заново в новой сессии основного сервера, поэтому `work` не должна ничего изменять.
+            :param work: Функция, выполняющая запросы в переданной сессии и возвращающая результат.
+            :param keys: Почтовые коды, которые читает `work`: если один из них только что записан,
+                чтение выполняется на основном сервере.
+            :return: Результат `work`."""
+        replica = self.router.choose(keys) if self.router is not None else None
+        if replica is not None:
+            try:
+                with self._replica_session_factory(replica)() as session:
+                    return work(session)
+            except DBAPIError as e:
+                if not isinstance(e, OperationalError) and not e.connection_invalidated:
+                    raise
+                custom_logger.log_with_context("Replica %s error, retrying on the primary: %s", replica, e.orig,
+                                               level=logging.WARNING)
+                self.router.mark_failed(replica)
+        with self.get_session() as session:
+            return work(session)
+
+    def note_written(self, keys: Iterable[str]) -> None:
+        """Отмечает почтовые коды, только что записанные на основной сервер: пока реплики могут их еще не получить,
+        сессии для их чтения работают с основным сервером.
+            :param keys: Записанные почтовые коды."""
+        if self.router is not None:
+            self.router.note_written(keys)
+
+    def _replica_session_factory(self, replica: str) -> sessionmaker:
+        factory = self._replica_sessions.get(replica)
+        if factory is None:
+            factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                                   bind=SQLAlchemyEngineRegistry.get_replica_engine(replica))
+            self._replica_sessions[replica] = factory
+        return factory
 
     def disconnect(self) -> None:
-        """Закрывает движок базы данных и освобождает ресурсы.
+        """Освобождает ссылки на движок и фабрику сессий.
 
-        Если сессия открыта, она будет закрыта.
+        Общий движок не закрывается, чтобы его пул соединений оставался прогретым для других экземпляров;
+        для закрытия всех соединений процесса используется `SQLAlchemyEngineRegistry.dispose_all()`.
         """
-        if self.session:
-            custom_logger.log_with_context(f"Closed session {id(self.session)}")
-            self.session.close()
-            self.session = None
-        if self.engine:
-            self.engine.dispose()
-            self.engine = None
+        self.engine = None
         self.SessionLocal = None
-        custom_logger.log_with_context("Disconnected from PostgresSQL")
+        self.router = None
+        self._replica_sessions = {}
+        custom_logger.log_with_context("Disconnected from PostgresSQL", level=logging.DEBUG)
 
     def execute_query(self,
                       query: Executable,
@@ -103,7 +142,7 @@ class SQLAlchemyConnection:
                 return [tuple(row) for row in result.fetchall()]
 
         except SQLAlchemyError as e:
-            custom_logger.log_with_context(f"Database error: {e}")
+            custom_logger.log_with_context("Database error: %s", e, level=logging.ERROR)
             if commit:
                 session.rollback()
 
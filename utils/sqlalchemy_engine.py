@@ -0,0 +1,152 @@
+# utils/sqlalchemy_engine.py
+import os
+import threading
+import time
+from functools import partial
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, ExceptionContext
+from sqlalchemy.pool import QueuePool
+
+from config.db_data import Data
+from utils.custom_logger import CustomLogger
+from utils.metrics import POOL_CHECKOUT_WAIT
+from utils.replica_router import RECENT_WRITES, REPLICATION_LAG_QUERY, ReplicaRouter
+
+custom_logger = CustomLogger(__name__)
+_checkout_wait = POOL_CHECKOUT_WAIT.labels("sqlalchemy")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """`QueuePool`, учитывающий время ожидания свободного соединения (включая открытие нового) в метриках."""
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        _checkout_wait.observe(time.perf_counter() - started)
+        return connection
+
+
+class SQLAlchemyEngineRegistry:
+    """Реестр движков SQLAlchemy, общих для всего процесса.
+
+    Движок (и его пул соединений) создается один раз на URL базы данных и переиспользуется всеми
+    экземплярами `SQLAlchemyConnection`, поэтому прогретые соединения сохраняются между запросами.
+    После `fork` унаследованные от родителя движки не используются: дочерний процесс создает свои.
+    Движки реплик (`Data.DB_REPLICAS`) выдает `get_replica_engine()`, выбор реплики - `get_router()`.
+    """
+    _engines: Dict[str, Engine] = {}
+    _replica_engines: Dict[str, Engine] = {}
+    _router: Optional[ReplicaRouter] = None
+    _pid: int = os.getpid()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_engine(cls, url: Optional[str] = None) -> Engine:
+        """Возвращает общий движок для заданного URL, создавая его при первом обращении.
+
+        pool_size: Количество соединений, которые пул держит открытыми.
+        max_overflow: Сколько соединений пул может открыть сверх pool_size при пиковой нагрузке.
+        pool_timeout: Сколько секунд ждать свободное соединение, прежде чем выбросить ошибку.
+        pool_recycle: Через сколько секунд соединение будет переоткрыто.
+        pool_pre_ping: Проверять соединение перед выдачей из пула, чтобы не получать разорванные сервером соединения.
+
+        :param url: URL базы данных (по умолчанию `Data.DB_URL`).
+        :return: Общий для процесса движок SQLAlchemy.
+        """
+        url = url or Data.DB_URL
+        with cls._lock:
+            cls._forget_parent_process()
+            engine = cls._engines.get(url)
+            if engine is None:
+                engine = create_engine(url,
+                    poolclass=InstrumentedQueuePool,
+                    pool_size=Data.SQLALCHEMY_POOL_SIZE,
+                    max_overflow=Data.SQLALCHEMY_MAX_OVERFLOW,
+                    pool_timeout=Data.DB_POOL_TIMEOUT,
+                    pool_recycle=Data.SQLALCHEMY_POOL_RECYCLE,
+                    pool_pre_ping=True)
+                cls._engines[url] = engine
+                custom_logger.log_with_context("Created shared SQLAlchemy engine")
+            return engine
+
+    @classmethod
+    def get_replica_engine(cls, replica: str) -> Engine:
+        """Возвращает общий движок реплики. Разрыв соединения с репликой исключает ее из выбора `get_router()`
+        на `Data.DB_REPLICA_RETRY_AFTER` секунд.
+            :param replica: Имя реплики (`host:port`).
+            :return: Общий для процесса движок SQLAlchemy реплики."""
+        engine = cls.get_engine(Data.replica_url(replica))
+        with cls._lock:
+            if cls._replica_engines.get(replica) is not engine:
+                event.listen(engine, "handle_error", partial(cls._on_replica_error, replica))
+                cls._replica_engines[replica] = engine
+        return engine
+
+    @classmethod
+    def get_router(cls) -> Optional[ReplicaRouter]:
+        """Возвращает общий маршрутизатор чтений по репликам `Data.DB_REPLICAS`, создавая его при первом обращении.
+        Отставание реплик проверяется запросом через их движки.
+            :return: Маршрутизатор или `None`, если реплики не настроены."""
+        if not Data.DB_REPLICAS:
+            return None
+        with cls._lock:
+            cls._forget_parent_process()
+            if cls._router is None:
+                cls._router = ReplicaRouter(Data.DB_REPLICAS, Data.DB_REPLICA_SELECTION,
+                                            max_lag=Data.DB_REPLICA_MAX_LAG,
+                                            check_interval=Data.DB_REPLICA_CHECK_INTERVAL,
+                                            retry_after=Data.DB_REPLICA_RETRY_AFTER,
+                                            probe=cls._replica_lag, recent_writes=RECENT_WRITES)
+            return cls._router
+
+    @classmethod
+    def _forget_parent_process(cls) -> None:
+        if cls._pid != os.getpid():
+            # Соединения родительского процесса нельзя использовать после fork
+            cls._engines = {}
+            cls._replica_engines = {}
+            cls._router = None
+            cls._pid = os.getpid()
+
+    @classmethod
+    def _replica_lag(cls, replica: str) -> float:
+        with cls.get_replica_engine(replica).connect() as connection:
+            return float(connection.execute(text(REPLICATION_LAG_QUERY)).scalar())
+
+    @classmethod
+    def _on_replica_error(cls, replica: str, context: ExceptionContext) -> None:
+        router = cls._router
+        if context.is_disconnect and router is not None:
+            router.mark_failed(replica)
+
+    @classmethod
+    def pool_status(cls, url: Optional[str] = None) -> Dict[str, int]:
+        """Возвращает текущие показатели пула соединений движка.
+
+        :param url: URL базы данных (по умолчанию `Data.DB_URL`).
+        :return: Словарь с размером пула, числом свободных и выданных соединений и текущим переполнением;
+            пустой словарь, если движок еще не создан.
+        """
+        engine = cls._engines.get(url or Data.DB_URL)
+        if engine is None:
+            return {}
+        engine_pool = engine.pool
+        return {
+            "size": engine_pool.size(),
+            "checked_in": engine_pool.checkedin(),
+            "checked_out": engine_pool.checkedout(),
+            "overflow": engine_pool.overflow(),
+        }
+
+    @classmethod
+    def dispose_all(cls) -> None:
+        """Закрывает соединения всех движков реестра. Вызывается при завершении процесса."""
+        with cls._lock:
+            engines, cls._engines = cls._engines, {}
+            cls._replica_engines = {}
+            router, cls._router = cls._router, None
+        if router is not None:
+            router.close()  # Вне блокировки: проверка реплики получает движок через get_replica_engine
+        for engine in engines.values():
+            engine.dispose()
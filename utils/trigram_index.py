@@ -0,0 +1,123 @@
+# utils/trigram_index.py
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from clients.postal_code_info import PostalCodeInfo
+from utils.custom_logger import CustomLogger
+
+custom_logger = CustomLogger(__name__)
+
+# Транслитерация кириллицы в латиницу. Та же таблица задана SQL-функцией postal_translit
+# (миграция add_place_name_trigram_index): в базе данных и в памяти сравниваются одинаковые строки,
+# поэтому "Moskva", "Москва" и "Масква" близки друг к другу.
+TRANSLITERATION = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+}
+_TRANSLATE_TABLE = str.maketrans(TRANSLITERATION)
+_WORD = re.compile(r"[^\W_]+")
+
+
+class FuzzyMatch(NamedTuple):
+    """Результат нечеткого поиска по названию населенного пункта."""
+    post_code: str
+    place_name: str
+    postal_info: PostalCodeInfo
+    similarity: float
+
+
+def transliterate(text: str) -> str:
+    """Приводит название к нижнему регистру и латинице, как SQL-функция postal_translit."""
+    return text.lower().translate(_TRANSLATE_TABLE)
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Триграммы строки по правилам pg_trgm: каждое слово дополняется двумя пробелами слева и одним справа.
+        :param text: Уже транслитерированная строка.
+        :return: Множество триграмм."""
+    return frozenset(padded[i:i + 3] for word in _WORD.findall(text)
+                     for padded in ("  " + word + " ", ) for i in range(len(padded) - 2))
+
+
+class _TrigramState(NamedTuple):
+    """Согласованное состояние индекса, которое `build` заменяет целиком."""
+    names: List[str]  # Различные транслитерированные названия
+    sizes: np.ndarray  # Количество триграмм каждого названия
+    postings: Dict[str, np.ndarray]  # Триграмма -> номера названий, в которых она есть
+    entries: List[List[Tuple[str, str, PostalCodeInfo]]]  # Номер названия -> (код, название, информация)
+
+
+class TrigramIndex:
+    """Индекс триграмм названий населенных пунктов для нечеткого поиска без базы данных
+    (например, для работы по снимку postal_codes).
+
+    Сходство считается как в pg_trgm: доля общих триграмм `|A ∩ B| / |A ∪ B|`. Количество общих триграмм
+    со всеми названиями набирается за один `np.bincount` по спискам названий триграмм запроса, поэтому
+    запрос не перебирает названия в Python. Одинаковые названия индексируются один раз.
+    """
+    def __init__(self) -> None:
+        """Инициализация пустого индекса."""
+        self._state = _TrigramState([], np.zeros(0, dtype=np.int32), {}, [])
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._state.entries)
+
+    def build(self, rows: Iterable[Tuple[str, str, PostalCodeInfo]]) -> int:
+        """Заменяет содержимое индекса.
+            :param rows: Строки (почтовый код, название населенного пункта, PostalCodeInfo).
+            :return: Количество проиндексированных кодов."""
+        name_ids: Dict[str, int] = {}
+        entries: List[List[Tuple[str, str, PostalCodeInfo]]] = []
+        for post_code, place_name, postal_info in rows:
+            name = transliterate(place_name or "")
+            if name not in name_ids:
+                name_ids[name] = len(entries)
+                entries.append([])
+            entries[name_ids[name]].append((post_code, place_name, postal_info))
+        postings: Dict[str, List[int]] = {}
+        sizes = np.zeros(len(name_ids), dtype=np.int32)
+        for name, name_id in name_ids.items():
+            name_trigrams = trigrams(name)
+            sizes[name_id] = len(name_trigrams)
+            for trigram in name_trigrams:
+                postings.setdefault(trigram, []).append(name_id)
+        for name_entries in entries:
+            name_entries.sort(key=lambda entry: entry[0])
+        self._state = _TrigramState(list(name_ids), sizes,
+                                    {trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()},
+                                    entries)
+        count = sum(len(name_entries) for name_entries in entries)
+        custom_logger.log_with_context("Built trigram index of %s postal codes, %s distinct place names",
+                                       count, len(name_ids))
+        return count
+
+    def search(self, query: str, k: int = 10, threshold: float = 0.3) -> List[FuzzyMatch]:
+        """Находит почтовые коды населенных пунктов, название которых похоже на `query`.
+            :param query: Название (возможно, с опечатками или в латинской транслитерации).
+            :param k: Максимальное количество результатов.
+            :param threshold: Минимальное сходство от 0 до 1.
+            :return: Список по убыванию сходства (при равенстве - по названию и коду)."""
+        state = self._state
+        query_trigrams = trigrams(transliterate(query))
+        known = [state.postings[trigram] for trigram in query_trigrams if trigram in state.postings]
+        if k <= 0 or not known:
+            return []
+        shared = np.bincount(np.concatenate(known), minlength=len(state.names))
+        similarity = shared / (len(query_trigrams) + state.sizes - shared)
+        candidates = np.flatnonzero(similarity >= threshold)
+        if len(candidates) > k:
+            # У каждого названия есть хотя бы один код, поэтому достаточно k самых похожих названий (с равными им)
+            kth = np.partition(similarity[candidates], -k)[-k]
+            candidates = candidates[similarity[candidates] >= kth]
+        candidates = sorted(candidates.tolist(), key=lambda name_id: (-similarity[name_id], state.names[name_id]))
+        matches: List[FuzzyMatch] = []
+        for name_id in candidates:
+            for post_code, place_name, postal_info in state.entries[name_id]:
+                matches.append(FuzzyMatch(post_code, place_name, postal_info, float(similarity[name_id])))
+                if len(matches) == k:
+                    return matches
+        return matches
@@ -0,0 +1,127 @@
+# utils/ttl_cache.py
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class BaseCache(ABC):
+    """Абстрактный базовый класс для кэшей, которые клиенты используют перед обращением к базе данных."""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+            Возвращает значение из кэша.
+
+            :param key: Ключ записи.
+            :return: Значение, если запись есть и не устарела; иначе `None`.
+            """
+        pass
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+            Сохраняет значение в кэше.
+
+            :param key: Ключ записи.
+            :param value: Сохраняемое значение.
+            :param ttl: Время жизни записи в секундах (по умолчанию - время жизни, заданное для кэша).
+            :return: None
+            """
+        pass
+
+    @abstractmethod
+    def invalidate(self, key: Hashable) -> None:
+        """
+            Удаляет запись из кэша.
+
+            :param key: Ключ записи.
+            :return: None
+            """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Удаляет все записи из кэша."""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """
+            Возвращает счетчики работы кэша.
+
+            :return: Словарь со счетчиками попаданий, промахов, вытеснений и текущим размером.
+            """
+        pass
+
+
+class LRUTTLCache(BaseCache):
+    """Потокобезопасный кэш ограниченного размера с вытеснением давно не используемых записей (LRU)
+    и временем жизни записей (TTL).
+
+    Устаревшие записи удаляются лениво - при обращении к ним или при вытеснении.
+    """
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """Инициализация кэша.
+
+        :param max_size: Максимальное количество записей.
+        :param ttl: Время жизни записи по умолчанию в секундах.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)